@@ -8,6 +8,7 @@ from flask_caching import Cache
 from flask_socketio import SocketIO
 from config import Config
 import logging
+import multiprocessing
 
 # Initialize Flask extensions
 db = SQLAlchemy()
@@ -63,50 +64,20 @@ def create_app(config_class=Config):
     # Context processor: inject global app settings
     @app.context_processor
     def inject_app_settings():
-        # Safe defaults to avoid UnboundLocalError in exceptional paths
+        # Settings come from the versioned cache (memoized per request);
+        # the unread badge/preview from the per-user counter
+        from flask_login import current_user
+        from app.services.settings_service import get_settings
+        from app.services.notification_counts import unread_summary
         unread_count = 0
         notif_preview = []
-        settings = None
-        try:
-            from app.models.settings import AppSettings
-            settings = AppSettings.get()
-            # Unread notifications count (lightweight) for current user
-            from flask_login import current_user
-            if getattr(current_user, 'is_authenticated', False):
-                try:
-                    from app.models.notification import Notification
-                    # User-specific + broadcast (user_id is NULL) for their distributor/admin scope
-                    q = Notification.query
-                    # unread first
-                    q = q.order_by(Notification.is_read.asc(), Notification.created_at.desc())
-                    # Filter for distributor scope if user has distributor
-                    if current_user.distributor_id:
-                        q = q.filter(db.or_(Notification.distributor_id == current_user.distributor_id,
-                                            Notification.distributor_id.is_(None)))
-                    # For non-admin staff only show targeted or broadcast
-                    if not current_user.is_admin():
-                        q = q.filter(db.or_(Notification.user_id == current_user.id,
-                                            Notification.user_id.is_(None)))
-                    else:
-                        # Admin: show all in distributor scope
-                        pass
-                    unread_count = q.filter(Notification.is_read == False).count()
-                    notif_preview = q.limit(5).all()
-                except Exception:
-                    # If notifications table not ready or any failure, keep defaults
-                    pass
-        except Exception:
-            # In case migrations are not applied yet, return defaults
-            if settings is None:
-                settings = type('S', (), {
-                    'enable_hair': True,
-                    'enable_teeth': True,
-                    'enable_eye': True,
-                    'enable_hotel': True,
-                    'enable_leads': True,
-                    'theme_color': '#7a001d',
-                    'navbar_style': 'glass'
-                })()
+        settings = get_settings(getattr(current_user, 'distributor_id', None))
+        if getattr(current_user, 'is_authenticated', False):
+            try:
+                unread_count, notif_preview = unread_summary(current_user)
+            except Exception:
+                # If notifications table not ready or any failure, keep defaults
+                db.session.rollback()
         return {'app_settings': settings, 'unread_notifications': unread_count, 'notif_preview': notif_preview}
 
     # Create database tables
@@ -118,13 +89,23 @@ def create_app(config_class=Config):
         # Failing silently prevents startup crash if file missing during initial migration phase
         pass
     
+    # Model change hooks keeping the dashboard/lead rollups, lead stats, lead scores and search index current
+    from app.services import dashboard_stats, search_index, lead_analytics, lead_scoring, lead_stats, notification_counts, notification_dispatcher, journey_progress  # noqa: F401
+
+    # CLI commands
+    from app.cli import register_commands
+    register_commands(app)
+
     # Initialize scheduler for background tasks (currency updates)
-    try:
-        from app.utils.scheduler import init_scheduler
-        init_scheduler(app)
-    except Exception as e:
-        # Scheduler is optional; don't crash if APScheduler not installed
-        logger = logging.getLogger(__name__)
-        logger.warning(f"Scheduler başlatılamadı: {e}")
+    # Not in multiprocessing children (PDF render workers): spawn/forkserver
+    # re-import the main module, which may build an app at import time
+    if app.config.get('SCHEDULER_ENABLED', True) and multiprocessing.parent_process() is None:
+        try:
+            from app.utils.scheduler import init_scheduler
+            init_scheduler(app)
+        except Exception as e:
+            # Scheduler is optional; don't crash if APScheduler not installed
+            logger = logging.getLogger(__name__)
+            logger.warning(f"Scheduler başlatılamadı: {e}")
 
     return app
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""Flask CLI commands (`flask <command>`)"""
+import click
+
+
+def register_commands(app):
+    """Attach maintenance commands to the app's CLI group"""
+
+    @app.cli.command('rebuild-dashboard-stats')
+    @click.option('--distributor-id', type=int, default=None, help='Only rebuild this distributor')
+    def rebuild_dashboard_stats_command(distributor_id):
+        """Recompute the dashboard rollup table from source rows."""
+        from app.services.dashboard_stats import rebuild_dashboard_stats
+        rows = rebuild_dashboard_stats(distributor_id)
+        click.echo(f'Dashboard stats rebuilt: {rows} rows')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Re-index patients, encounters, documents and appointments for global search."""
+        from app.services.search_index import rebuild_search_index
+        rows = rebuild_search_index()
+        click.echo(f'Search index rebuilt: {rows} rows')
+
+    @app.cli.command('rebuild-lead-stats')
+    def rebuild_lead_stats_command():
+        """Recompute the daily lead status rollup used by lead analytics."""
+        from app.services.lead_analytics import rebuild_lead_daily_stats
+        rows = rebuild_lead_daily_stats()
+        click.echo(f'Lead daily stats rebuilt: {rows} rows')
+
+    @app.cli.command('rescore-leads')
+    @click.option('--full', is_flag=True, help='Rescore every lead, not only those due')
+    def rescore_leads_command(full):
+        """Recompute stored lead scores."""
+        from app.services.lead_scoring import rescore_leads
+        changed = rescore_leads(full=full)
+        click.echo(f'Lead scores refreshed: {changed} changed')
+
+    @app.cli.command('rebuild-journey-progress')
+    def rebuild_journey_progress_command():
+        """Recompute the step counters stored on patient journeys."""
+        from app import db
+        from app.services.journey_progress import refresh_journey_progress
+        rows = refresh_journey_progress(db.session.connection())
+        db.session.commit()
+        click.echo(f'Journey progress rebuilt: {rows} journeys')
+
+    @app.cli.command('db-audit')
+    @click.option('--seed-rows', type=int, default=1000, show_default=True,
+                  help='Synthetic rows per audited table (rolled back afterwards)')
+    @click.option('--verbose', '-v', is_flag=True, help='Print every query plan')
+    def db_audit_command(seed_rows, verbose):
+        """EXPLAIN the hot queries and fail on full table scans."""
+        from app.services.query_audit import run_audit
+        try:
+            results = run_audit(seed_rows)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        failed = [result for result in results if result.full_scans]
+        for result in results:
+            status = click.style('FULL SCAN', fg='red') if result.full_scans else click.style('ok', fg='green')
+            timing = f' ({result.duration_ms:.2f} ms)' if result.duration_ms is not None else ''
+            click.echo(f'{status:<20} {result.name}{timing}')
+            if result.full_scans:
+                click.echo(f"    scans: {', '.join(result.full_scans)}")
+            if verbose or result.full_scans:
+                for step in result.plan:
+                    click.echo(f'    | {step}')
+        if failed:
+            raise click.ClickException(f'{len(failed)} of {len(results)} queries do a full table scan')
+        click.echo(f'All {len(results)} queries use an index')
+
+    @app.cli.command('scheduler-status')
+    def scheduler_status_command():
+        """Show which process holds the scheduler leader lease."""
+        from app.utils.scheduler_leader import current_leader
+        lease = current_leader()
+        if lease is None:
+            click.echo('No scheduler leader elected yet')
+            return
+        state = 'active' if lease['active'] else 'expired'
+        click.echo(f"Leader: {lease['holder']} ({state}, since {lease['acquired_at']:%Y-%m-%d %H:%M:%S}, "
+                   f"expires {lease['expires_at']:%Y-%m-%d %H:%M:%S} UTC)")
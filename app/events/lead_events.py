@@ -23,6 +23,8 @@ def connect():
         return False
     
     user_id = current_user.id
+    # Dashboard counters: stats_delta / stats_updated go to this room
+    join_room('leads_dashboard')
     emit('connected', {'data': f'User {user_id} connected to leads stream'})
     logger.info(f"User {user_id} connected to real-time leads")
 
@@ -105,18 +107,11 @@ def broadcast_lead_created(lead):
     )
 
 
-def broadcast_stats_update():
-    """Broadcast updated statistics"""
-    from app.models.meta_lead import FacebookLead
+def broadcast_stats_update(distributor_id=None):
+    """Broadcast current statistics (live dashboards normally follow stats_delta)"""
+    from app.services.lead_stats import status_counts
     
-    stats = {
-        'total': FacebookLead.query.count(),
-        'new': FacebookLead.query.filter_by(status='new').count(),
-        'assigned': FacebookLead.query.filter_by(status='assigned').count(),
-        'contacted': FacebookLead.query.filter_by(status='contacted').count(),
-        'converted': FacebookLead.query.filter_by(status='converted').count(),
-        'rejected': FacebookLead.query.filter_by(status='rejected').count(),
-    }
+    stats = dict(status_counts(distributor_id), distributor_id=distributor_id)
     
     socketio.emit(
         'stats_updated',
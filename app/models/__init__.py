@@ -25,4 +25,9 @@ from app.models.communication import (
     SupportTicket, TicketReply, ChatSession
 )
 from app.models.currency import CurrencyRate, PriceListItem
-from app.models.meta_lead import MetaAPIConfig, FacebookLead, LeadInteraction
\ No newline at end of file
+from app.models.meta_lead import MetaAPIConfig, FacebookLead, LeadInteraction
+from app.models.dashboard_stat import DashboardStat
+from app.models.scheduler_lease import SchedulerLease
+from app.models.lead_daily_stat import LeadDailyStat
+from app.models.translation_memory import TranslationMemory
+from app.models.chatbot_keyword import ChatbotKeyword
@@ -5,7 +5,7 @@ class AestheticProcedure(db.Model):
     __tablename__ = 'aesthetic_procedures'
     
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     
     # Procedure type
     procedure_type = db.Column(db.String(50), nullable=False)  # rhinoplasty, breast_augmentation, liposuction, face_lift, etc.
@@ -4,6 +4,11 @@ from datetime import datetime
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # Availability engine: one resource's bookings in a time window
+        db.Index('ix_appointments_distributor_doctor_start', 'distributor_id', 'doctor_name', 'start_time'),
+        db.Index('ix_appointments_distributor_room_start', 'distributor_id', 'room_number', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False, index=True)
@@ -5,7 +5,7 @@ class BariatricSurgery(db.Model):
     __tablename__ = 'bariatric_surgeries'
     
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     
     # Surgery type
     surgery_type = db.Column(db.String(50), nullable=False)  # gastric_bypass, sleeve, gastric_balloon, gastric_band
@@ -0,0 +1,23 @@
+from app import db
+from datetime import datetime
+
+
+class ChatbotKeyword(db.Model):
+    """Tenant-specific chatbot keyword -> auto reply.
+
+    Matched before the built-in tables in app/utils/chatbot_service.py;
+    running processes pick up changes on their next reload check.
+    """
+    __tablename__ = 'chatbot_keywords'
+
+    id = db.Column(db.Integer, primary_key=True)
+    distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False, index=True)
+    keyword = db.Column(db.String(200), nullable=False)  # Matched as a lowercase substring
+    response = db.Column(db.Text, nullable=False)
+    language = db.Column(db.String(10))  # tr, en, ar (informational)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ChatbotKeyword {self.distributor_id} {self.keyword!r}>'
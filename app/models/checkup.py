@@ -5,7 +5,7 @@ class CheckUpPackage(db.Model):
     __tablename__ = 'checkup_packages'
     
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     
     # Package type
     package_type = db.Column(db.String(50), nullable=False)  # basic, standard, premium, vip, custom
@@ -69,7 +69,7 @@ class CheckUpTest(db.Model):
     __tablename__ = 'checkup_tests'
     
     id = db.Column(db.Integer, primary_key=True)
-    checkup_id = db.Column(db.Integer, db.ForeignKey('checkup_packages.id'), nullable=False)
+    checkup_id = db.Column(db.Integer, db.ForeignKey('checkup_packages.id'), nullable=False, index=True)
     
     test_name = db.Column(db.String(100), nullable=False)
     test_category = db.Column(db.String(50))  # Blood, Imaging, Cardiac, etc.
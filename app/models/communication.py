@@ -4,6 +4,11 @@ from app import db
 class Message(db.Model):
     """Hasta-Koordinator mesajlasma"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Message center (tenant) and conversation view (patient), newest first
+        db.Index('ix_messages_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_messages_patient_created', 'patient_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False)
@@ -43,6 +48,11 @@ class Message(db.Model):
 class CommunicationLog(db.Model):
     """Tum iletisim gecmisi (calls, emails, sms, whatsapp)"""
     __tablename__ = 'communication_logs'
+    __table_args__ = (
+        # Communication history (tenant / patient), newest first
+        db.Index('ix_communication_logs_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_communication_logs_patient_created', 'patient_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False)
@@ -90,7 +100,7 @@ class PatientFeedback(db.Model):
     # Geri bildirim bilgileri
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
     journey_id = db.Column(db.Integer, db.ForeignKey('patient_journeys.id'), nullable=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=True)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=True, index=True)
     
     # Degerlendirme
     feedback_type = db.Column(db.String(30), default='general')  # general, journey, treatment, staff, facility
@@ -205,7 +215,7 @@ class TicketReply(db.Model):
     __tablename__ = 'ticket_replies'
     
     id = db.Column(db.Integer, primary_key=True)
-    ticket_id = db.Column(db.Integer, db.ForeignKey('support_tickets.id'), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('support_tickets.id'), nullable=False, index=True)
     
     # Yanitlayan
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
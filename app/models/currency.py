@@ -50,45 +50,10 @@ class CurrencyRate(db.Model):
         Returns:
             float: Conversion rate veya None
         """
-        if from_currency == to_currency:
-            return 1.0
-        
-        # Direct rate lookup
-        direct = CurrencyRate.query.filter_by(
-            distributor_id=distributor_id,
-            base_currency=from_currency,
-            target_currency=to_currency
-        ).first()
-        
-        if direct:
-            return direct.rate
-        
-        # Reverse rate lookup
-        reverse = CurrencyRate.query.filter_by(
-            distributor_id=distributor_id,
-            base_currency=to_currency,
-            target_currency=from_currency
-        ).first()
-        
-        if reverse and reverse.rate != 0:
-            return 1.0 / reverse.rate
-        
-        # Cross-rate calculation via base currency (e.g., TRY->EUR via USD)
-        # Get base currency from settings
-        from app.models.settings import AppSettings
-        settings = AppSettings.get(distributor_id)
-        base = getattr(settings, 'base_currency', 'USD')
-        
-        if from_currency != base and to_currency != base:
-            # from_currency -> base
-            from_to_base = CurrencyRate.get_rate(distributor_id, from_currency, base)
-            # base -> to_currency
-            base_to_to = CurrencyRate.get_rate(distributor_id, base, to_currency)
-            
-            if from_to_base and base_to_to:
-                return from_to_base * base_to_to
-        
-        return None
+        # Kurlar distributor başına bir kez yüklenen matristen okunur
+        # (doğrudan, ters ve çapraz kurlar önceden hesaplanmış)
+        from app.utils.rate_matrix import get_rate_matrix
+        return get_rate_matrix(distributor_id).rate(from_currency, to_currency)
     
     @staticmethod
     def convert(amount, from_currency, to_currency, distributor_id):
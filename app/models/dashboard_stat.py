@@ -0,0 +1,32 @@
+from app import db
+from datetime import datetime
+
+
+class DashboardStat(db.Model):
+    """Per-distributor monthly rollup backing the dashboard widgets.
+
+    Rows are maintained incrementally by the hooks in
+    app/services/dashboard_stats.py; `flask rebuild-dashboard-stats`
+    recomputes them from scratch.
+    """
+    __tablename__ = 'dashboard_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False, index=True)
+    period = db.Column(db.String(7), nullable=False)  # YYYY-MM
+
+    patients_count = db.Column(db.Integer, nullable=False, default=0)
+    encounters_count = db.Column(db.Integer, nullable=False, default=0)
+    # Distinct encounters using each module (bucketed by encounter month)
+    hair_encounters = db.Column(db.Integer, nullable=False, default=0)
+    dental_encounters = db.Column(db.Integer, nullable=False, default=0)
+    eye_encounters = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('distributor_id', 'period', name='_dashboard_stat_period_uc'),
+    )
+
+    def __repr__(self):
+        return f'<DashboardStat {self.distributor_id} {self.period}>'
@@ -5,7 +5,7 @@ class DentalProcedure(db.Model):
     __tablename__ = 'dental_procedures'
 
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     tooth_no = db.Column(db.Integer, nullable=False)  # 1-32
     treatment_type = db.Column(db.String(50), nullable=False)
     note = db.Column(db.Text)
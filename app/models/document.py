@@ -31,7 +31,7 @@ class Document(db.Model):
     is_archived = db.Column(db.Boolean, default=False, index=True)
     
     # Metadata
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    uploaded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     archived_at = db.Column(db.DateTime, nullable=True)
 
     # Relationships
@@ -4,6 +4,12 @@ import uuid
 
 class Encounter(db.Model):
     __tablename__ = 'encounters'
+    __table_args__ = (
+        # Dashboard (created_at), export/patient timeline (date)
+        db.Index('ix_encounters_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_encounters_distributor_date', 'distributor_id', 'date'),
+        db.Index('ix_encounters_patient_date', 'patient_id', 'date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     uuid = db.Column(db.String(36), unique=True, default=lambda: str(uuid.uuid4()))
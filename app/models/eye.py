@@ -5,7 +5,7 @@ class EyeRefraction(db.Model):
     __tablename__ = 'eye_refractions'
 
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     
     # Right eye (OD)
     od_sph = db.Column(db.Float)
@@ -39,7 +39,7 @@ class EyeTreatmentSelection(db.Model):
     __tablename__ = 'eye_treatment_selections'
 
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     code = db.Column(db.String(20), nullable=False)
     title = db.Column(db.String(100), nullable=False)
     side = db.Column(db.String(2))  # OD, OS, OU
@@ -5,7 +5,7 @@ class HairAnnotation(db.Model):
     __tablename__ = 'hair_annotations'
 
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     region_id = db.Column(db.String(20), nullable=False)  # e.g., "front", "crown", "vertex"
     label = db.Column(db.String(100))
     note = db.Column(db.Text)
@@ -24,7 +24,7 @@ class HairPatternSelection(db.Model):
     __tablename__ = 'hair_pattern_selections'
 
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     pattern_key = db.Column(db.String(20), nullable=False)  # e.g., "norwood_01" to "norwood_16"
     note = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -7,6 +7,11 @@ from datetime import datetime, timedelta
 
 class HotelReservation(db.Model):
     __tablename__ = 'hotel_reservations'
+    __table_args__ = (
+        # Tenant list (newest first) and patient detail (by check-in)
+        db.Index('ix_hotel_reservations_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_hotel_reservations_patient_check_in', 'patient_id', 'check_in'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
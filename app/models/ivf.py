@@ -5,7 +5,7 @@ class IVFTreatment(db.Model):
     __tablename__ = 'ivf_treatments'
     
     id = db.Column(db.Integer, primary_key=True)
-    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False)
+    encounter_id = db.Column(db.Integer, db.ForeignKey('encounters.id'), nullable=False, index=True)
     
     # Treatment type
     treatment_type = db.Column(db.String(50), nullable=False)  # ivf, icsi, iui, egg_freezing, donor_egg
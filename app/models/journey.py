@@ -5,6 +5,10 @@ from datetime import datetime
 class PatientJourney(db.Model):
     """Hasta tedavi yolculuğu - geliş/dönüş arası tüm süreç koordinasyonu"""
     __tablename__ = 'patient_journeys'
+    __table_args__ = (
+        # Journey list keyset pagination: tenant, arrival_date DESC, id DESC
+        db.Index('ix_patient_journeys_distributor_arrival', 'distributor_id', 'arrival_date', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False, index=True)
@@ -37,6 +41,12 @@ class PatientJourney(db.Model):
     actual_cost = db.Column(db.Float, default=0)
     currency = db.Column(db.String(3), default='EUR')
     
+    # Adım özeti (app.services.journey_progress flush sonrası günceller)
+    steps_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    steps_completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    current_step_id = db.Column(db.Integer, nullable=True)  # ilk in_progress adım
+    next_step_id = db.Column(db.Integer, nullable=True)  # ilk pending adım
+    
     # Metadata
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -50,6 +60,10 @@ class PatientJourney(db.Model):
     creator = db.relationship('User', foreign_keys=[created_by])
     steps = db.relationship('JourneyStep', backref='journey', lazy='dynamic', 
                            order_by='JourneyStep.sequence, JourneyStep.scheduled_date', cascade='all, delete-orphan')
+    current_step = db.relationship('JourneyStep', viewonly=True,
+                                   primaryjoin='foreign(PatientJourney.current_step_id) == JourneyStep.id')
+    next_step = db.relationship('JourneyStep', viewonly=True,
+                                primaryjoin='foreign(PatientJourney.next_step_id) == JourneyStep.id')
     
     def __repr__(self):
         return f'<PatientJourney {self.journey_code}>'
@@ -67,19 +81,17 @@ class PatientJourney(db.Model):
     
     def progress_percentage(self):
         """Tamamlanma yüzdesi (adımlara göre)"""
-        total = self.steps.count()
-        if total == 0:
+        if not self.steps_total:
             return 0
-        completed = self.steps.filter_by(status='completed').count()
-        return int((completed / total) * 100)
+        return int(((self.steps_completed or 0) / self.steps_total) * 100)
     
     def get_current_step(self):
         """Şu anki aktif adımı getir"""
-        return self.steps.filter_by(status='in_progress').first()
+        return self.current_step
     
     def get_next_step(self):
         """Sıradaki adımı getir"""
-        return self.steps.filter_by(status='pending').order_by('scheduled_date').first()
+        return self.next_step
 
 
 class JourneyStep(db.Model):
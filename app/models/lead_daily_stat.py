@@ -0,0 +1,25 @@
+from app import db
+
+
+class LeadDailyStat(db.Model):
+    """Per-distributor daily lead counts by status (materialized rollup).
+
+    One row per (distributor, UTC day of created_at, current status). Rows
+    are refreshed by the hooks in app/services/lead_analytics.py when leads
+    change; `flask rebuild-lead-stats` recomputes them from scratch.
+    """
+    __tablename__ = 'lead_daily_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False)
+    day = db.Column(db.String(10), nullable=False)  # YYYY-MM-DD
+    status = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('distributor_id', 'day', 'status', name='_lead_daily_stat_uc'),
+        db.Index('ix_lead_daily_stats_day', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<LeadDailyStat {self.distributor_id} {self.day} {self.status}={self.count}>'
@@ -63,19 +63,36 @@ class FacebookLead(db.Model):
     form_data = db.Column(db.JSON)  # Custom form fields
     
     # Status tracking
-    status = db.Column(db.String(50), default='new')  # new, assigned, contacted, converted, rejected
+    # active_history: the previous status is needed by the lead_daily_stats hooks
+    status = db.column_property(
+        db.Column(db.String(50), default='new'), active_history=True
+    )  # new, assigned, contacted, converted, rejected
     notes = db.Column(db.Text)
     assigned_to_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # Assigned staff
     
+    # Lead score (app/services/lead_scoring.py) - kept current on write and by a periodic sweep
+    score = db.Column(db.Integer, nullable=False, default=0, index=True)
+    score_level = db.Column(db.String(20), nullable=False, default='very_low')
+    score_expires_at = db.Column(db.DateTime, index=True)  # Next time-based score change
+    
     # Timestamps
     lead_created_at = db.Column(db.DateTime)  # When lead was created on Facebook
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # When we fetched it
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)  # When we fetched it
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     distributor = db.relationship('Distributor', backref='facebook_leads')
     assigned_to = db.relationship('User', foreign_keys=[assigned_to_id], backref='facebook_lead_assignments')
     
+    __table_args__ = (
+        # Scoring recommendations filter by status and score threshold
+        db.Index('ix_facebook_leads_status_score', 'status', 'score'),
+        # Lead lists: per status / per tenant, newest first; per-assignee views
+        db.Index('ix_facebook_leads_status_created', 'status', 'created_at'),
+        db.Index('ix_facebook_leads_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_facebook_leads_assigned_to_status', 'assigned_to_id', 'status'),
+    )
+    
     def __repr__(self):
         return f'<FacebookLead {self.id} - {self.first_name} {self.last_name}>'
     
@@ -93,6 +110,8 @@ class FacebookLead(db.Model):
             'full_name': self.full_name(),
             'form_data': self.form_data,
             'status': self.status,
+            'score': self.score,
+            'score_level': self.score_level,
             'notes': self.notes,
             'assigned_to': self.assigned_to.username if self.assigned_to else None,
             'lead_created_at': self.lead_created_at.isoformat() if self.lead_created_at else None,
@@ -106,7 +125,7 @@ class LeadInteraction(db.Model):
     __tablename__ = 'lead_interactions'
     
     id = db.Column(db.Integer, primary_key=True)
-    lead_id = db.Column(db.Integer, db.ForeignKey('facebook_leads.id'), nullable=False)
+    lead_id = db.Column(db.Integer, db.ForeignKey('facebook_leads.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     
     # Interaction type
@@ -3,6 +3,11 @@ from datetime import datetime
 
 class Patient(db.Model):
     __tablename__ = 'patients'
+    __table_args__ = (
+        # Tenant lists: newest first, and the patient pickers sorted by name
+        db.Index('ix_patients_distributor_created', 'distributor_id', 'created_at'),
+        db.Index('ix_patients_distributor_first_name', 'distributor_id', 'first_name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     distributor_id = db.Column(db.Integer, db.ForeignKey('distributors.id'), nullable=False)
@@ -20,7 +25,7 @@ class Patient(db.Model):
     passport_number = db.Column(db.String(20))
     
     # Additional fields
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
@@ -5,7 +5,7 @@ class PatientDocument(db.Model):
     __tablename__ = 'patient_documents'
     
     id = db.Column(db.Integer, primary_key=True)
-    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patients.id'), nullable=False, index=True)
     document_type = db.Column(db.String(50), nullable=False)  # passport, test_result, consent, medical_report, other
     file_path = db.Column(db.String(255), nullable=False)
     file_name = db.Column(db.String(255), nullable=False)
@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+
+class SchedulerLease(db.Model):
+    """Leader lease for background jobs.
+
+    One row per lease name; the process whose `holder` is stored and whose
+    `expires_at` is in the future runs the scheduled jobs. See
+    app/utils/scheduler_leader.py.
+    """
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(128), nullable=False)  # host:pid:nonce
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} {self.holder}>'
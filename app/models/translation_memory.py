@@ -0,0 +1,28 @@
+from app import db
+from datetime import datetime
+
+
+class TranslationMemory(db.Model):
+    """Persistent translation cache.
+
+    One row per (normalized source text, source language, target language);
+    repeated sentences are served from here instead of the translation
+    provider. See app/utils/translation_service.py.
+    """
+    __tablename__ = 'translation_memory'
+
+    id = db.Column(db.Integer, primary_key=True)
+    text_hash = db.Column(db.String(64), nullable=False)  # sha256 of normalized text
+    source_lang = db.Column(db.String(10), nullable=False)  # '' = auto-detected by provider
+    target_lang = db.Column(db.String(10), nullable=False)
+    source_text = db.Column(db.Text, nullable=False)
+    translated_text = db.Column(db.Text, nullable=False)
+    provider = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('text_hash', 'source_lang', 'target_lang', name='_translation_memory_uc'),
+    )
+
+    def __repr__(self):
+        return f'<TranslationMemory {self.source_lang or "auto"}->{self.target_lang} {self.text_hash[:8]}>'
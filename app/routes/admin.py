@@ -1,7 +1,9 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app, jsonify
 from flask_login import login_required, current_user
 from app.models import Distributor, User, AppSettings
 from app import db
+from app.utils.permissions import invalidate_permission_cache
+from app.services.settings_service import invalidate_settings_cache
 from functools import wraps
 from werkzeug.utils import secure_filename
 import os
@@ -34,11 +36,11 @@ def superadmin_required(f):
 @login_required
 @admin_required
 def index():
-    from app.models.meta_lead import FacebookLead
+    from app.services.lead_stats import status_counts
     
     distributors_count = Distributor.query.count()
     users_count = User.query.count()
-    facebook_leads_count = FacebookLead.query.count()
+    facebook_leads_count = status_counts()['total']
     settings = AppSettings.get()
     return render_template('admin/index.html',
                          distributors_count=distributors_count,
@@ -94,6 +96,7 @@ def settings():
                     flash('Geçersiz dosya formatı! Sadece PNG, JPG, JPEG, GIF desteklenmektedir.', 'danger')
         
         db.session.commit()
+        invalidate_settings_cache()
         flash('Genel ayarlar güncellendi', 'success')
         return redirect(url_for('admin.settings'))
     return render_template('admin/settings.html', settings=settings)
@@ -435,6 +438,7 @@ def new_role():
             db.session.add(rp)
         
         db.session.commit()
+        invalidate_permission_cache()
         flash('Rol başarıyla oluşturuldu.', 'success')
         return redirect(url_for('admin.roles'))
     
@@ -463,6 +467,7 @@ def edit_role(id):
             db.session.add(rp)
         
         db.session.commit()
+        invalidate_permission_cache()
         flash('Rol güncellendi.', 'success')
         return redirect(url_for('admin.roles'))
     
@@ -486,6 +491,7 @@ def delete_role(id):
     
     db.session.delete(role)
     db.session.commit()
+    invalidate_permission_cache()
     flash('Rol silindi.', 'success')
     return redirect(url_for('admin.roles'))
 
@@ -510,6 +516,7 @@ def manage_user_roles(user_id):
             db.session.add(ur)
         
         db.session.commit()
+        invalidate_permission_cache()
         flash('Kullanıcı rolleri güncellendi.', 'success')
         return redirect(url_for('admin.users'))
     
@@ -709,21 +716,34 @@ def sync_meta_leads(distributor_id):
     return redirect(url_for('admin.view_distributor', id=distributor_id))
 
 
+@bp.route('/scheduler-metrics')
+@login_required
+@superadmin_required
+def scheduler_metrics():
+    """Background job durations (per tenant and per cycle) for this process"""
+    from flask import jsonify
+    from app.utils.scheduler import get_job_metrics
+    return jsonify(get_job_metrics())
+
+
 @bp.route('/facebook-leads', methods=['GET'])
 @login_required
 @admin_required
 def facebook_leads_list():
     """List all Facebook leads"""
     from app.models.meta_lead import FacebookLead, MetaAPIConfig
+    from app.utils.pagination import keyset_paginate, wants_json
+    from app.services import lead_stats
+    from sqlalchemy.orm import selectinload
     
-    # Get filters
+    # Get filters (the shared template's filter form sends 'distributor')
     status = request.args.get('status', '')
-    distributor_id = request.args.get('distributor_id', '')
+    distributor_id = request.args.get('distributor', request.args.get('distributor_id', ''))
     search = request.args.get('search', '')
-    page = request.args.get('page', 1, type=int)
     
     # Build query
-    query = FacebookLead.query
+    query = FacebookLead.query.options(selectinload(FacebookLead.distributor),
+                                       selectinload(FacebookLead.assigned_to))
     
     if status and status != 'all':
         query = query.filter_by(status=status)
@@ -740,21 +760,29 @@ def facebook_leads_list():
             (FacebookLead.phone.ilike(search_term))
         )
     
-    # Calculate stats
-    all_leads = FacebookLead.query.all()
-    high_score_count = len([l for l in all_leads if hasattr(l, 'quality_score') and l.quality_score >= 70])
-    medium_score_count = len([l for l in all_leads if hasattr(l, 'quality_score') and 40 <= l.quality_score < 70])
-    low_score_count = len([l for l in all_leads if hasattr(l, 'quality_score') and l.quality_score < 40])
-    
     # Paginate
-    leads = query.order_by(FacebookLead.created_at.desc()).paginate(page=page, per_page=20)
-    
-    # Get distributors for filter
-    distributors = Distributor.query.all()
+    leads_page = keyset_paginate(query, FacebookLead.created_at, per_page=20,
+                                 cursor=request.args.get('cursor'), total='approx')
+    if wants_json():
+        return jsonify(leads_page.to_dict(FacebookLead.to_dict))
+    
+    # Calculate stats: one aggregate instead of loading every lead
+    status_counts = lead_stats.status_counts(
+        int(distributor_id) if str(distributor_id).isdigit() else None
+    )
+    high_score_count, medium_score_count, low_score_count = db.session.query(
+        db.func.count(db.case((FacebookLead.score >= 70, 1))),
+        db.func.count(db.case((db.and_(FacebookLead.score >= 40, FacebookLead.score < 70), 1))),
+        db.func.count(db.case((FacebookLead.score < 40, 1))),
+    ).one()
     
     return render_template('admin/facebook_leads/index.html',
-                         leads=leads.items,
-                         distributors=distributors,
+                         leads_page=leads_page,
+                         status_counts=status_counts,
+                         meta_configs=MetaAPIConfig.query.all(),
+                         current_status=status or 'all',
+                         current_distributor=distributor_id or 'all',
+                         search_query=search,
                          high_score_count=high_score_count,
                          medium_score_count=medium_score_count,
                          low_score_count=low_score_count)
@@ -9,6 +9,9 @@ from app.models import (
 )
 from app import db
 from app.utils.email import send_new_lead_notification
+from app.utils.pdf_cache import invalidate_encounter_pdf
+from app.utils.security import rate_limit
+from app.services.pdf_jobs import JOB_KINDS, submit_pdf_job, pdf_job_state, finished_job_path
 from functools import wraps
 from datetime import datetime
 import secrets
@@ -50,10 +53,16 @@ def require_api_key(f):
     return decorated_function
 
 
+def _api_client_key():
+    """Rate limit anahtarı: API key'in distributor'ı (require_api_key'den sonra)"""
+    return f"distributor_{request.distributor.id}"
+
+
 # ========== LEAD MANAGEMENT API ==========
 
 @bp.route('/v1/leads', methods=['POST'])
 @require_api_key
+@rate_limit(max_requests=120, window_seconds=60, key_func=_api_client_key)
 def create_lead():
     """Create a new lead from web form or external source"""
     try:
@@ -124,6 +133,7 @@ def create_lead():
 
 @bp.route('/v1/leads/<int:lead_id>', methods=['GET'])
 @require_api_key
+@rate_limit(max_requests=120, window_seconds=60, key_func=_api_client_key)
 def get_lead(lead_id):
     """Get lead details"""
     if not request.api_key_obj.can_read_leads:
@@ -221,6 +231,7 @@ def save_hair_data(encounter_id):
         )
         db.session.add(new_pattern)
     
+    invalidate_encounter_pdf(encounter_id)
     db.session.commit()
     return jsonify({'status': 'success'})
 
@@ -229,6 +240,7 @@ def save_hair_data(encounter_id):
 
 @bp.route('/v1/messages', methods=['POST'])
 @require_api_key
+@rate_limit(max_requests=120, window_seconds=60, key_func=_api_client_key)
 def create_message():
     """Create an inbound patient message and optionally auto-reply via chatbot.
 
@@ -257,9 +269,11 @@ def create_message():
     # Language detect and optional translation to staff language (default tr)
     detected_language = detect_language(content)
     target_language = getattr(patient, 'preferred_language', None) or 'tr'
+    needs_translation = should_translate(detected_language, target_language)
     translated_content = None
-    if should_translate(detected_language, target_language):
-        translated_content = translate_text(content, target_language, detected_language)
+    if needs_translation:
+        # Translation memory only; misses are translated off the request path
+        translated_content = translate_text(content, target_language, detected_language, cached_only=True)
 
     # Persist inbound message (sender_id None => patient side)
     msg = Message(
@@ -306,11 +320,18 @@ def create_message():
         'created_at': msg.created_at.strftime('%d.%m.%Y %H:%M')
     }, to=room)
 
+    # After new_message, so clients have the message before its translation arrives
+    if needs_translation and translated_content is None:
+        from app.services.translation_jobs import queue_message_translation
+        queue_message_translation(msg.id, target_language)
+
     bot_message_id = None
     # Auto-respond if eligible
     try:
-        if should_auto_respond(content, sender_is_staff=False, patient_id=patient_id):
-            bot_text, rtype = generate_response(content, detected_language)
+        distributor_id = request.distributor.id
+        if should_auto_respond(content, sender_is_staff=False, patient_id=patient_id,
+                               distributor_id=distributor_id):
+            bot_text, rtype = generate_response(content, detected_language, distributor_id)
             if bot_text:
                 bot_full = f"{bot_text}{get_chatbot_signature()}"
                 bot_msg = Message(
@@ -372,6 +393,7 @@ def save_dental_data(encounter_id):
         )
         db.session.add(new_procedure)
     
+    invalidate_encounter_pdf(encounter_id)
     db.session.commit()
     return jsonify({'status': 'success'})
 
@@ -420,6 +442,7 @@ def save_eye_data(encounter_id):
             )
             db.session.add(new_treatment)
     
+    invalidate_encounter_pdf(encounter_id)
     db.session.commit()
     return jsonify({'status': 'success'})
 
@@ -445,6 +468,7 @@ def save_aesthetic_data(encounter_id):
         notes=data.get('notes', '')
     )
     db.session.add(aesthetic)
+    invalidate_encounter_pdf(encounter_id)
     db.session.commit()
     return jsonify({'status': 'success'})
 
@@ -473,6 +497,7 @@ def save_bariatric_data(encounter_id):
     )
     # BMI will be calculated automatically by the model
     db.session.add(bariatric)
+    invalidate_encounter_pdf(encounter_id)
     db.session.commit()
     return jsonify({'status': 'success', 'bmi': bariatric.bmi})
 
@@ -500,6 +525,7 @@ def save_ivf_data(encounter_id):
         notes=data.get('notes', '')
     )
     db.session.add(ivf)
+    invalidate_encounter_pdf(encounter_id)
     db.session.commit()
     return jsonify({'status': 'success'})
 
@@ -526,6 +552,7 @@ def save_checkup_data(encounter_id):
         notes=data.get('notes', '')
     )
     db.session.add(checkup)
+    invalidate_encounter_pdf(encounter_id)
     db.session.commit()
     return jsonify({'status': 'success'})
 
@@ -537,10 +564,75 @@ def generate_pdf(encounter_id):
         distributor_id=current_user.distributor_id
     ).first_or_404()
     
-    # PDF generation logic will be implemented here
-    # This will use ReportLab to generate the PDF
+    job = submit_pdf_job('encounter', encounter.id, encounter.distributor_id, user_id=current_user.id)
     
     return jsonify({
-        'status': 'success',
-        'pdf_url': url_for('static', filename=f'pdfs/{encounter.uuid}.pdf')
-    })
\ No newline at end of file
+        'status': 'queued',
+        'job_id': job.id,
+        'status_url': url_for('api.pdf_job_status', job_id=job.id)
+    }), 202
+
+
+# ========== PDF RENDER JOBS ==========
+
+def _pdf_job_target(kind, object_id):
+    """Resolve a job target inside the current user's distributor (None if not allowed)"""
+    from app.models import HotelReservation
+    distributor_id = current_user.distributor_id
+    if kind in ('encounter', 'quote'):
+        return Encounter.query.filter_by(id=object_id, distributor_id=distributor_id).first()
+    if kind == 'hotel':
+        return HotelReservation.query.filter_by(id=object_id, distributor_id=distributor_id).first()
+    if kind == 'catalog':
+        return current_user.distributor
+    return None
+
+
+@bp.route('/pdf-jobs', methods=['POST'])
+@login_required
+def submit_pdf_render():
+    """Queue a PDF render; the result is announced with a `pdf_ready` socket event"""
+    data = request.get_json() or {}
+    kind = data.get('kind')
+    if kind not in JOB_KINDS:
+        return jsonify({'error': f'kind must be one of {", ".join(JOB_KINDS)}'}), 400
+    
+    target = _pdf_job_target(kind, data.get('id'))
+    if target is None:
+        return jsonify({'error': 'Not found'}), 404
+    
+    options = {}
+    if kind == 'catalog':
+        options = {'currencies': data.get('currencies'), 'language': data.get('language', 'tr')}
+    
+    job = submit_pdf_job(kind, target.id, current_user.distributor_id, user_id=current_user.id, **options)
+    return jsonify({
+        'status': 'queued',
+        'job_id': job.id,
+        'status_url': url_for('api.pdf_job_status', job_id=job.id)
+    }), 202
+
+
+@bp.route('/pdf-jobs/<job_id>', methods=['GET'])
+@login_required
+def pdf_job_status(job_id):
+    # Also answers for jobs queued by another web worker (shared status file)
+    state = pdf_job_state(job_id, current_user.distributor_id)
+    if state is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(state)
+
+
+@bp.route('/pdf-jobs/<job_id>/download', methods=['GET'])
+@login_required
+def download_pdf_job(job_id):
+    from flask import send_file
+    path = finished_job_path(job_id, current_user.distributor_id)
+    if not path:
+        return jsonify({'error': 'PDF not ready'}), 404
+    return send_file(
+        path,
+        mimetype='application/pdf',
+        as_attachment=request.args.get('inline', '0') != '1',
+        download_name=f'{job_id}.pdf'
+    )
\ No newline at end of file
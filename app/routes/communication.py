@@ -55,10 +55,11 @@ def send_message():
     patient = Patient.query.get(patient_id)
     target_language = getattr(patient, 'preferred_language', None) or 'tr'
     
-    # Çeviri gerekiyorsa yap
+    # Çeviri gerekiyorsa: hafızada varsa hemen, yoksa kayıttan sonra kuyrukta
+    needs_translation = should_translate(detected_language, target_language)
     translated_content = None
-    if should_translate(detected_language, target_language):
-        translated_content = translate_text(content, target_language, detected_language)
+    if needs_translation:
+        translated_content = translate_text(content, target_language, detected_language, cached_only=True)
 
     message = Message(
         distributor_id=current_user.distributor_id,
@@ -148,6 +149,11 @@ def send_message():
     except Exception:
         pass
 
+    # After new_message, so clients have the message before its translation arrives
+    if needs_translation and translated_content is None:
+        from app.services.translation_jobs import queue_message_translation
+        queue_message_translation(message.id, target_language)
+
     flash('Mesaj gönderildi', 'success')
     return redirect(url_for('communication.messages', patient_id=patient_id))
 
@@ -9,7 +9,8 @@ from app.utils.currency_service import (
     format_price,
     SUPPORTED_CURRENCIES
 )
-from app.utils.price_catalog import generate_price_catalog_pdf, export_prices_to_excel
+from app.utils.price_catalog import export_prices_to_excel
+from app.services.pdf_jobs import render_and_wait
 from datetime import datetime
 
 bp = Blueprint('currency', __name__, url_prefix='/currency')
@@ -39,8 +40,8 @@ def update_rates():
         return redirect(url_for('currency.currency_rates'))
     
     try:
-        from app.models.settings import AppSettings
-        settings = AppSettings.get(current_user.distributor_id)
+        from app.services.settings_service import get_settings
+        settings = get_settings(current_user.distributor_id)
         base = getattr(settings, 'base_currency', 'USD')
         source = getattr(settings, 'currency_api_source', 'exchangerate-api')
         
@@ -190,8 +191,10 @@ def generate_catalog_pdf():
     language = request.args.get('language', 'tr')
     
     try:
-        pdf_buffer = generate_price_catalog_pdf(
-            current_user.distributor,
+        pdf_path = render_and_wait(
+            'catalog',
+            current_user.distributor_id,
+            current_user.distributor_id,
             currencies=currencies,
             language=language
         )
@@ -199,7 +202,7 @@ def generate_catalog_pdf():
         filename = f'price_catalog_{datetime.now().strftime("%Y%m%d")}.pdf'
         
         return send_file(
-            pdf_buffer,
+            pdf_path,
             mimetype='application/pdf',
             as_attachment=True,
             download_name=filename
@@ -3,7 +3,10 @@ from flask_login import login_required, current_user
 from functools import wraps
 from app.models import FacebookLead, MetaAPIConfig, LeadInteraction, User
 from app.services.meta_lead_service import MetaLeadService
+from app.services import lead_stats
 from app import db
+from app.utils.pagination import keyset_paginate, wants_json
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 import logging
 import json
@@ -29,17 +32,18 @@ def require_superadmin(f):
 @require_superadmin
 def index():
     """Facebook leads dashboard"""
-    page = request.args.get('page', 1, type=int)
     status_filter = request.args.get('status', 'all')
     distributor_filter = request.args.get('distributor', 'all')
     search = request.args.get('search', '').strip()
     
-    query = FacebookLead.query
+    query = FacebookLead.query.options(selectinload(FacebookLead.distributor),
+                                       selectinload(FacebookLead.assigned_to))
     
     # Apply filters
     if status_filter != 'all':
         query = query.filter_by(status=status_filter)
     
+    distributor_id = None
     if distributor_filter != 'all':
         try:
             distributor_id = int(distributor_filter)
@@ -56,23 +60,17 @@ def index():
             (FacebookLead.phone.ilike(search_pattern))
         )
     
-    # Get status counts
-    status_counts = {
-        'new': FacebookLead.query.filter_by(status='new').count(),
-        'assigned': FacebookLead.query.filter_by(status='assigned').count(),
-        'contacted': FacebookLead.query.filter_by(status='contacted').count(),
-        'converted': FacebookLead.query.filter_by(status='converted').count(),
-        'rejected': FacebookLead.query.filter_by(status='rejected').count(),
-    }
+    leads_page = keyset_paginate(query, FacebookLead.created_at, per_page=25,
+                                 cursor=request.args.get('cursor'), total='approx')
+    if wants_json():
+        return jsonify(leads_page.to_dict(FacebookLead.to_dict))
+    
+    # Get status counts (one GROUP BY, cached until a lead changes)
+    status_counts = lead_stats.status_counts(distributor_id)
     
     # Get all Meta configs for distributor selection
     meta_configs = MetaAPIConfig.query.all()
     
-    # Paginate
-    leads_page = query.order_by(FacebookLead.created_at.desc()).paginate(
-        page=page, per_page=25
-    )
-    
     return render_template('admin/facebook_leads/index.html',
                          leads_page=leads_page,
                          status_counts=status_counts,
@@ -276,15 +274,8 @@ def sync_leads(config_id):
 @require_superadmin
 def api_stats():
     """Get lead statistics via API"""
-    stats = {
-        'total': FacebookLead.query.count(),
-        'new': FacebookLead.query.filter_by(status='new').count(),
-        'assigned': FacebookLead.query.filter_by(status='assigned').count(),
-        'contacted': FacebookLead.query.filter_by(status='contacted').count(),
-        'converted': FacebookLead.query.filter_by(status='converted').count(),
-        'rejected': FacebookLead.query.filter_by(status='rejected').count(),
-    }
-    return jsonify(stats)
+    distributor_id = request.args.get('distributor', type=int)
+    return jsonify(lead_stats.status_counts(distributor_id))
 
 
 @bp.route('/api/recent')
@@ -380,9 +371,9 @@ def bulk_delete():
 @login_required
 @require_superadmin
 def bulk_export():
-    """Export leads"""
+    """Export leads (CSV, XLSX or JSON, streamed)"""
     from app.services.bulk_operations import BulkLeadOperations
-    from flask import send_file
+    from app.utils.export import EXPORT_FORMATS, export_response
     
     lead_ids = request.form.getlist('lead_ids', type=int)
     export_format = request.form.get('format', 'csv')
@@ -391,40 +382,17 @@ def bulk_export():
         flash('Lead seçilmedi', 'warning')
         return redirect(url_for('facebook_leads.index'))
     
-    result = BulkLeadOperations.export_leads(lead_ids, export_format)
-    
-    if not result:
-        flash('Export hatası', 'danger')
+    if export_format not in EXPORT_FORMATS:
+        flash('Desteklenmeyen format', 'danger')
         return redirect(url_for('facebook_leads.index'))
     
-    from io import BytesIO
-    
-    if export_format == 'csv':
-        output = BytesIO()
-        output.write(result.encode('utf-8-sig'))
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'facebook_leads_export.csv'
-        )
+    export = BulkLeadOperations.export_leads(lead_ids)
     
-    elif export_format == 'json':
-        output = BytesIO()
-        output.write(result.encode('utf-8'))
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/json',
-            as_attachment=True,
-            download_name=f'facebook_leads_export.json'
-        )
+    if not export:
+        flash('Export hatası', 'danger')
+        return redirect(url_for('facebook_leads.index'))
     
-    flash('Desteklenmeyen format', 'danger')
-    return redirect(url_for('facebook_leads.index'))
+    return export_response(export, export_format)
 
 
 @bp.route('/api/scoring')
@@ -434,8 +402,7 @@ def api_scoring():
     """Get lead scores via API"""
     from app.services.lead_scoring import LeadScoringEngine
     
-    leads = FacebookLead.query.all()
-    scores = LeadScoringEngine.batch_score_leads(leads)
+    scores = LeadScoringEngine.batch_score_leads()
     
     return jsonify(scores)
 
@@ -454,12 +421,7 @@ def scoring_dashboard():
     recommendations = LeadScoringEngine.get_priority_recommendations()
     
     # Score distribution
-    all_leads = FacebookLead.query.all()
-    scores = {}
-    for lead in all_leads:
-        score = LeadScoringEngine.calculate_score(lead)
-        level = LeadScoringEngine.get_score_level(score)
-        scores[level] = scores.get(level, 0) + 1
+    scores = LeadScoringEngine.get_score_distribution()
     
     return render_template(
         'admin/facebook_leads/scoring_dashboard.html',
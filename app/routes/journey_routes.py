@@ -2,23 +2,48 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
+from app.utils.pagination import keyset_paginate, wants_json
 from app.models import (
     PatientJourney, JourneyStep, Flight, Transfer,
     Patient, Encounter, Appointment, HotelReservation, User
 )
+from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 import secrets
 
 bp = Blueprint('journey', __name__, url_prefix='/journey')
 
+JOURNEYS_PER_PAGE = 50
+
 
 @bp.route('/')
 @login_required
 def journey_list():
-    """Tum yolculuklar listesi"""
-    journeys = PatientJourney.query.filter_by(distributor_id=current_user.distributor_id)\
-        .order_by(PatientJourney.arrival_date.desc()).all()
-    return render_template('main/journey_list.html', journeys=journeys)
+    """Tum yolculuklar listesi (arrival_date, id) uzerinden keyset sayfalama"""
+    query = PatientJourney.query.filter_by(distributor_id=current_user.distributor_id)\
+        .options(selectinload(PatientJourney.patient),
+                 selectinload(PatientJourney.coordinator),
+                 selectinload(PatientJourney.current_step),
+                 selectinload(PatientJourney.next_step))
+    
+    status = request.args.get('status')
+    if status:
+        query = query.filter(PatientJourney.status == status)
+    
+    journeys = keyset_paginate(query, PatientJourney.arrival_date, per_page=JOURNEYS_PER_PAGE,
+                               cursor=request.args.get('cursor'))
+    if wants_json():
+        return jsonify(journeys.to_dict(lambda j: {
+            'id': j.id,
+            'journey_code': j.journey_code,
+            'patient_id': j.patient_id,
+            'arrival_date': j.arrival_date.isoformat(),
+            'departure_date': j.departure_date.isoformat(),
+            'status': j.status,
+            'progress': j.progress_percentage(),
+            'url': url_for('journey.journey_detail', id=j.id),
+        }))
+    return render_template('main/journey_list.html', journeys=journeys, status=status)
 
 
 @bp.route('/patient/<int:patient_id>')
@@ -216,7 +241,29 @@ def update_step_status(id):
     return jsonify({
         'success': True, 
         'status': step.status,
-        'progress': step.journey.progress_percentage()
+        'progress': step.journey.progress_percentage(),
+        'steps_completed': step.journey.steps_completed,
+        'steps_total': step.journey.steps_total
+    })
+
+
+@bp.route('/<int:id>/availability')
+@login_required
+def journey_availability(id):
+    """Yolculuk randevularinin doktor/oda cakisma kontrolu (AJAX)"""
+    from app.services.availability import validate_journey_appointments
+    journey = PatientJourney.query.filter_by(id=id, distributor_id=current_user.distributor_id).first_or_404()
+    conflicts = validate_journey_appointments(journey)
+    return jsonify({
+        'success': True,
+        'conflicts': [{
+            'step_id': step.id,
+            'step_title': step.title,
+            'conflict_id': booking.id,
+            'conflict_title': booking.title,
+            'conflict_start': booking.start_time.strftime('%Y-%m-%dT%H:%M'),
+            'conflict_end': booking.end_time.strftime('%Y-%m-%dT%H:%M'),
+        } for step, booking in conflicts]
     })
 
 
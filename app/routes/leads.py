@@ -10,8 +10,8 @@ bp = Blueprint('leads', __name__, url_prefix='/leads')
 @bp.before_request
 def ensure_leads_enabled():
     try:
-        from app.models.settings import AppSettings
-        settings = AppSettings.get()
+        from app.services.settings_service import get_settings
+        settings = get_settings(getattr(current_user, 'distributor_id', None))
         # Allow superadmin to access even if disabled (for debugging)
         if not settings.enable_leads and not getattr(current_user, 'is_superadmin', lambda: False)():
             abort(404)
@@ -55,10 +55,10 @@ def index():
 @bp.route('/export')
 @login_required
 def export_leads():
-    """Export leads to Excel"""
-    from flask import send_file
-    from app.utils.export import export_leads_to_excel
+    """Export leads (?format=xlsx|csv|json, streamed)"""
+    from app.utils.export import lead_export, export_response, requested_format
     
+    fmt = requested_format()
     status_filter = request.args.get('status', 'all')
     source_filter = request.args.get('source', 'all')
     
@@ -70,17 +70,7 @@ def export_leads():
     if source_filter != 'all':
         query = query.filter_by(source=source_filter)
     
-    leads = query.order_by(Lead.created_at.desc()).all()
-    excel_file = export_leads_to_excel(leads)
-    
-    filename = f"leadler_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        excel_file,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
+    return export_response(lead_export(query.order_by(Lead.created_at.desc())), fmt)
 
 @bp.route('/<int:id>')
 @login_required
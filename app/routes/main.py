@@ -1,9 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash, abort
+from flask import Blueprint, render_template, redirect, url_for, request, flash, abort, jsonify
 from flask_login import login_required, current_user
 from app.models import Patient, Encounter, HotelReservation, AuditLog, QuoteApproval, Notification, Appointment, Document
 from app.forms import PatientForm, HotelReservationForm
 from app import db
-from datetime import datetime
+from app.utils.pagination import keyset_paginate, wants_json
+from datetime import datetime, timedelta
 import secrets
 
 bp = Blueprint('main', __name__)
@@ -11,8 +12,8 @@ bp = Blueprint('main', __name__)
 @bp.before_request
 def guard_disabled_modules():
     try:
-        from app.models.settings import AppSettings
-        settings = AppSettings.get()
+        from app.services.settings_service import get_settings
+        settings = get_settings(getattr(current_user, 'distributor_id', None))
         # Block hotel routes when disabled (allow superadmin)
         hotel_endpoints = {
             'main.add_hotel_reservation',
@@ -33,72 +34,23 @@ def guard_disabled_modules():
 @bp.route('/dashboard')
 @login_required
 def dashboard():
-    from app import cache
-    from sqlalchemy import func, extract
-    from datetime import datetime, timedelta
+    from app.services.dashboard_stats import get_dashboard_stats
     
-    # Get statistics for the current distributor
+    # Get statistics for the current distributor (rollup table, one row per month)
     dist_id = current_user.distributor_id
-    
-    # Cache key unique to distributor
-    cache_key = f'dashboard_stats_{dist_id}'
-    stats = cache.get(cache_key)
-    
-    if not stats:
-        patients_count = Patient.query.filter_by(distributor_id=dist_id).count()
-        encounters_count = Encounter.query.filter_by(distributor_id=dist_id).count()
-        stats = {'patients_count': patients_count, 'encounters_count': encounters_count}
-        cache.set(cache_key, stats, timeout=300)
-    else:
-        patients_count = stats['patients_count']
-        encounters_count = stats['encounters_count']
+    stats = get_dashboard_stats(dist_id)
     
     # Recent encounters
     recent_encounters = Encounter.query.filter_by(distributor_id=dist_id)\
         .order_by(Encounter.created_at.desc()).limit(5).all()
     
-    # Monthly statistics (last 6 months)
-    today = datetime.utcnow()
-    six_months_ago = today - timedelta(days=180)
-    
-    monthly_stats = db.session.query(
-        func.strftime('%Y-%m', Encounter.created_at).label('month'),
-        func.count(Encounter.id).label('count')
-    ).filter(
-        Encounter.distributor_id == dist_id,
-        Encounter.created_at >= six_months_ago
-    ).group_by('month').order_by('month').all()
-    
-    # Module usage statistics
-    from app.models import HairAnnotation, DentalProcedure, EyeRefraction
-    
-    hair_count = db.session.query(func.count(func.distinct(HairAnnotation.encounter_id)))\
-        .join(Encounter).filter(Encounter.distributor_id == dist_id).scalar()
-    dental_count = db.session.query(func.count(func.distinct(DentalProcedure.encounter_id)))\
-        .join(Encounter).filter(Encounter.distributor_id == dist_id).scalar()
-    eye_count = db.session.query(func.count(func.distinct(EyeRefraction.encounter_id)))\
-        .join(Encounter).filter(Encounter.distributor_id == dist_id).scalar()
-    
-    module_stats = {
-        'hair': hair_count,
-        'dental': dental_count,
-        'eye': eye_count
-    }
-    
-    # New patients this month
-    first_day_of_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    new_patients_this_month = Patient.query.filter(
-        Patient.distributor_id == dist_id,
-        Patient.created_at >= first_day_of_month
-    ).count()
-    
     return render_template('main/dashboard.html',
-                         patients_count=patients_count,
-                         encounters_count=encounters_count,
+                         patients_count=stats['patients_count'],
+                         encounters_count=stats['encounters_count'],
                          recent_encounters=recent_encounters,
-                         monthly_stats=monthly_stats,
-                         module_stats=module_stats,
-                         new_patients_this_month=new_patients_this_month)
+                         monthly_stats=stats['monthly_stats'],
+                         module_stats=stats['module_stats'],
+                         new_patients_this_month=stats['new_patients_this_month'])
 
 @bp.route('/search')
 @login_required
@@ -110,50 +62,13 @@ def global_search():
     if not q or len(q) < 2:
         return render_template('main/search_results.html', query=q, patients=[], encounters=[], documents=[], appointments=[])
     
-    search_filter = f'%{q}%'
-    
-    patients = []
-    encounters = []
-    documents = []
-    appointments = []
-    
-    if category in ('all', 'patients'):
-        patients = Patient.query.filter_by(distributor_id=current_user.distributor_id).filter(
-            db.or_(
-                Patient.first_name.ilike(search_filter),
-                Patient.last_name.ilike(search_filter),
-                Patient.phone.ilike(search_filter),
-                Patient.email.ilike(search_filter),
-                Patient.passport_number.ilike(search_filter)
-            )
-        ).limit(20).all()
-    
-    if category in ('all', 'encounters'):
-        encounters = Encounter.query.filter_by(distributor_id=current_user.distributor_id).filter(
-            db.or_(
-                Encounter.note.ilike(search_filter),
-                Encounter.status.ilike(search_filter)
-            )
-        ).limit(20).all()
-    
-    if category in ('all', 'documents'):
-        documents = Document.query.filter_by(distributor_id=current_user.distributor_id).filter(
-            db.or_(
-                Document.title.ilike(search_filter),
-                Document.description.ilike(search_filter),
-                Document.filename.ilike(search_filter),
-                Document.tags.ilike(search_filter)
-            )
-        ).limit(20).all()
-    
-    if category in ('all', 'appointments'):
-        appointments = Appointment.query.filter_by(distributor_id=current_user.distributor_id).filter(
-            db.or_(
-                Appointment.title.ilike(search_filter),
-                Appointment.description.ilike(search_filter),
-                Appointment.doctor_name.ilike(search_filter)
-            )
-        ).limit(20).all()
+    # Single ranked query against the full-text index (see app/services/search_index.py)
+    from app.services.search_index import search
+    results = search(current_user.distributor_id, q, category, limit=20)
+    patients = results['patients']
+    encounters = results['encounters']
+    documents = results['documents']
+    appointments = results['appointments']
     
     return render_template('main/search_results.html', 
                          query=q, 
@@ -197,7 +112,6 @@ def update_language():
 def patients():
     from datetime import datetime, timedelta
     
-    page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '', type=str)
     nationality = request.args.get('nationality', '', type=str)
     gender = request.args.get('gender', '', type=str)
@@ -252,7 +166,19 @@ def patients():
     ).distinct().all()
     nationalities = [n[0] for n in nationalities]
     
-    patients = query.order_by(Patient.created_at.desc()).paginate(page=page, per_page=20)
+    patients = keyset_paginate(query, Patient.created_at, per_page=20,
+                               cursor=request.args.get('cursor'), total='cached')
+    if wants_json():
+        return jsonify(patients.to_dict(lambda p: {
+            'id': p.id,
+            'full_name': p.full_name,
+            'phone': p.phone,
+            'email': p.email,
+            'nationality': p.nationality,
+            'dob': p.dob.isoformat() if p.dob else None,
+            'created_at': p.created_at.isoformat() if p.created_at else None,
+            'url': url_for('main.patient_detail', id=p.id),
+        }))
     
     return render_template('main/patients.html', 
                          patients=patients, 
@@ -266,10 +192,10 @@ def patients():
 @bp.route('/patients/export')
 @login_required
 def export_patients():
-    """Export patient list to Excel"""
-    from flask import send_file
-    from app.utils.export import export_patients_to_excel
+    """Export patient list (?format=xlsx|csv|json, streamed)"""
+    from app.utils.export import patient_export, export_response, requested_format
     
+    fmt = requested_format()
     query = Patient.query.filter_by(distributor_id=current_user.distributor_id)
     
     # Apply search if provided
@@ -285,17 +211,7 @@ def export_patients():
             )
         )
     
-    patients = query.order_by(Patient.created_at.desc()).all()
-    excel_file = export_patients_to_excel(patients)
-    
-    filename = f"hastalar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return send_file(
-        excel_file,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
+    return export_response(patient_export(query.order_by(Patient.created_at.desc())), fmt)
 
 @bp.route('/patient/new', methods=['GET', 'POST'])
 @login_required
@@ -329,10 +245,6 @@ def new_patient():
         db.session.add(patient)
         db.session.commit()
         
-        # Clear dashboard cache
-        from app import cache
-        cache.delete(f'dashboard_stats_{dist_id}')
-        
         flash('Hasta başarıyla eklendi', 'success')
         return redirect(url_for('main.patients'))
         
@@ -575,15 +487,17 @@ def new_encounter(patient_id):
         return redirect(url_for('main.encounter_detail', id=encounter.id))
     
     # GET request
-    from app.models import AppSettings
-    app_settings = AppSettings.query.first()
+    from app.services.settings_service import get_settings
+    app_settings = get_settings(current_user.distributor_id)
     today = datetime.utcnow().strftime('%Y-%m-%d')
     return render_template('main/encounter_form.html', patient=patient, today=today, app_settings=app_settings)
 
 @bp.route('/encounter/<int:id>')
 @login_required
 def encounter_detail(id):
-    encounter = Encounter.query.filter_by(id=id, distributor_id=current_user.distributor_id).first_or_404()
+    from app.services.encounter_bundle import load_encounter_bundle
+    # Module sections in the template read the eager-loaded relationships
+    encounter = (load_encounter_bundle(id, current_user.distributor_id) or abort(404)).encounter
     # Fetch last 25 audit logs for this encounter
     logs = AuditLog.query.filter_by(encounter_id=encounter.id).order_by(AuditLog.created_at.desc()).limit(25).all()
     return render_template('main/encounter_detail.html', encounter=encounter, audit_logs=logs)
@@ -594,27 +508,43 @@ def encounter_pdf(id):
     print(f"🔍 PDF Route called for encounter {id}")
     print(f"  Current user: {current_user.username if current_user.is_authenticated else 'Anonymous'}")
     print(f"  User distributor_id: {current_user.distributor_id if current_user.is_authenticated else 'N/A'}")
-    from flask import send_file
-    from app.utils.professional_pdf_generator import ProfessionalEncounterPDF
-    
-    encounter = Encounter.query.filter_by(id=id, distributor_id=current_user.distributor_id).first_or_404()
-    distributor = encounter.distributor
-    
-    # Generate PDF with new professional generator
-    generator = ProfessionalEncounterPDF(encounter, distributor)
-    pdf_buffer = generator.generate()
+    from flask import send_file, current_app
+    from app.utils.pdf_cache import encounter_fingerprint, cached_pdf_path
+    from app.services.pdf_jobs import render_and_wait
+    from app.services.encounter_bundle import load_encounter_bundle
+    
+    bundle = load_encounter_bundle(id, current_user.distributor_id) or abort(404)
+    encounter = bundle.encounter
+    
+    # Same content -> same fingerprint: browser copy (304) or cached file
+    fingerprint = encounter_fingerprint(bundle)
+    if fingerprint in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(fingerprint)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+    
+    # Generate PDF with new professional generator (only on cache miss, in the render pool)
+    pdf_path = cached_pdf_path(encounter.id, fingerprint)
+    if not pdf_path:
+        pdf_path = render_and_wait('encounter', encounter.id, encounter.distributor_id)
     
     # Create filename
     filename = f"muayene_{encounter.id}_{encounter.patient.first_name}_{encounter.patient.last_name}.pdf"
     # Inline preview support
     inline = request.args.get('inline', '0') == '1'
 
-    return send_file(
-        pdf_buffer,
+    response = send_file(
+        pdf_path,
         mimetype='application/pdf',
         as_attachment=not inline,
-        download_name=filename
+        download_name=filename,
+        etag=fingerprint
     )
+    response.cache_control.private = True
+    response.cache_control.public = False
+    return response
 
 @bp.route('/encounter/<int:id>/pdf/preview')
 @login_required
@@ -634,7 +564,9 @@ def encounter_pdf_preview(id):
 def export_encounter_csv(id):
     import csv
     from io import StringIO
-    encounter = Encounter.query.filter_by(id=id, distributor_id=current_user.distributor_id).first_or_404()
+    from app.services.encounter_bundle import load_encounter_bundle
+    bundle = load_encounter_bundle(id, current_user.distributor_id) or abort(404)
+    encounter = bundle.encounter
 
     si = StringIO()
     writer = csv.writer(si)
@@ -642,7 +574,7 @@ def export_encounter_csv(id):
 
     # Hair: summarize by total grafts (quantity)
     total_grafts = 0
-    for ann in encounter.hair_annotations:
+    for ann in bundle.hair_annotations:
         # Try to extract numeric from label if possible
         try:
             import re
@@ -655,31 +587,31 @@ def export_encounter_csv(id):
         writer.writerow(['hair', 'grafts', total_grafts, '', '', ''])
 
     # Dental
-    for d in encounter.dental_procedures:
+    for d in bundle.dental_procedures:
         writer.writerow(['dental', d.treatment_type, 1, d.price or 0, d.currency or 'EUR', d.note or '' ])
 
     # Eye treatments
-    for t in encounter.eye_treatments:
+    for t in bundle.eye_treatments:
         writer.writerow(['eye', t.title, 1, t.price or 0, t.currency or 'EUR', t.note or '' ])
 
     # Aesthetic
-    if encounter.aesthetic_procedure:
-        a = encounter.aesthetic_procedure
+    if bundle.aesthetic_procedure:
+        a = bundle.aesthetic_procedure
         writer.writerow(['aesthetic', a.procedure_type, 1, a.price or 0, a.currency or 'USD', a.notes or '' ])
 
     # Bariatric
-    if encounter.bariatric_surgery:
-        b = encounter.bariatric_surgery
+    if bundle.bariatric_surgery:
+        b = bundle.bariatric_surgery
         writer.writerow(['bariatric', b.surgery_type, 1, b.price or 0, b.currency or 'USD', b.notes or '' ])
 
     # IVF
-    if encounter.ivf_treatment:
-        v = encounter.ivf_treatment
+    if bundle.ivf_treatment:
+        v = bundle.ivf_treatment
         writer.writerow(['ivf', v.treatment_type, 1, v.price or 0, v.currency or 'USD', v.notes or '' ])
 
     # Check-up
-    if encounter.checkup_package:
-        c = encounter.checkup_package
+    if bundle.checkup_package:
+        c = bundle.checkup_package
         writer.writerow(['checkup', c.package_type, 1, c.price or 0, c.currency or 'USD', c.notes or '' ])
 
     output = si.getvalue()
@@ -752,8 +684,7 @@ def import_encounter_csv(id):
 @login_required
 def encounter_email_quote(id):
     """Generate price quote PDF and email it to patient's email"""
-    from app.utils.pdf_generator import QuotePDFGenerator
-    from app.utils.email import send_encounter_price_quote
+    from app.services.pdf_jobs import submit_pdf_job
 
     encounter = Encounter.query.filter_by(id=id, distributor_id=current_user.distributor_id).first_or_404()
     patient = encounter.patient
@@ -762,14 +693,10 @@ def encounter_email_quote(id):
         flash('Hasta için e-posta adresi bulunamadı. Hasta kartından e-posta ekleyin.', 'warning')
         return redirect(url_for('main.encounter_detail', id=id))
 
-    # Generate Quote PDF in memory
-    generator = QuotePDFGenerator(encounter, encounter.distributor)
-    pdf_buffer = generator.generate()
-    pdf_bytes = pdf_buffer.getvalue()
-
+    # Quote PDF is rendered and emailed by the render pool; pdf_ready reports the outcome
     try:
-        send_encounter_price_quote(encounter, pdf_bytes)
-        flash('Fiyat teklifi e-posta ile gönderildi.', 'success')
+        submit_pdf_job('quote', encounter.id, encounter.distributor_id, user_id=current_user.id, email=True)
+        flash('Fiyat teklifi hazırlanıyor, hazır olduğunda e-posta ile gönderilecek.', 'success')
     except Exception as e:
         flash(f'E-posta gönderilemedi: {e}', 'danger')
 
@@ -792,6 +719,7 @@ def edit_encounter(id):
     
     if request.method == 'POST':
         from app.utils.audit import log_change, persist_audit
+        from app.utils.pdf_cache import invalidate_encounter_pdf
         print(f"🔍 DEBUG - POST request for encounter {id}")
         print(f"  Form keys: {list(request.form.keys())}")
         eye_keys = [k for k in request.form.keys() if 'eye' in k.lower()]
@@ -1018,14 +946,15 @@ def edit_encounter(id):
                 db.session.add(checkup)
                 log_change(encounter.distributor_id, current_user.id, 'create', 'checkup_package', checkup.id, note=checkup.package_type, encounter_id=encounter.id)
         
+        invalidate_encounter_pdf(encounter.id)
         db.session.commit()
         persist_audit()
     flash('Muayene başarıyla güncellendi', 'success')
     return redirect(url_for('main.encounter_detail', id=encounter.id))
     
     # GET request - load existing data
-    from app.models import AppSettings
-    app_settings = AppSettings.query.first()
+    from app.services.settings_service import get_settings
+    app_settings = get_settings(current_user.distributor_id)
     return render_template('main/encounter_edit.html', 
                          encounter=encounter, 
                          patient=patient,
@@ -1040,22 +969,14 @@ def appointments_old():
 @bp.route('/appointments/export')
 @login_required
 def export_appointments():
-    """Export encounters/appointments to Excel"""
-    from flask import send_file
-    from app.utils.export import export_encounters_to_excel
-    
-    encounters = Encounter.query.filter_by(distributor_id=current_user.distributor_id)\
-        .order_by(Encounter.date.desc()).all()
+    """Export encounters/appointments (?format=xlsx|csv|json, streamed)"""
+    from app.utils.export import encounter_export, export_response, requested_format
     
-    excel_file = export_encounters_to_excel(encounters)
-    filename = f"muayeneler_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    fmt = requested_format()
+    query = Encounter.query.filter_by(distributor_id=current_user.distributor_id)\
+        .order_by(Encounter.date.desc())
     
-    return send_file(
-        excel_file,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
+    return export_response(encounter_export(query), fmt)
 
 @bp.route('/encounter/<int:id>/delete', methods=['POST'])
 @login_required
@@ -1254,14 +1175,13 @@ def delete_hotel_reservation(id):
 def hotel_reservation_pdf(id):
     from flask import send_file
     from app.models import HotelReservation
-    from app.utils.pdf_generator import HotelReservationPDFGenerator
+    from app.services.pdf_jobs import render_and_wait
 
     reservation = HotelReservation.query.filter_by(id=id, distributor_id=current_user.distributor_id).first_or_404()
-    generator = HotelReservationPDFGenerator(reservation, reservation.distributor)
-    pdf_buffer = generator.generate()
+    pdf_path = render_and_wait('hotel', reservation.id, reservation.distributor_id)
     filename = f"otel_rezervasyon_{reservation.id}_{reservation.patient.first_name}_{reservation.patient.last_name}.pdf"
     return send_file(
-        pdf_buffer,
+        pdf_path,
         mimetype='application/pdf',
         as_attachment=True,
         download_name=filename
@@ -1504,16 +1424,8 @@ def appointments_calendar():
                              timedelta=timedelta)
 
 
-@bp.route('/appointments/list')
-@login_required
-def appointments_list():
-    """List view with filters."""
-    page = request.args.get('page', 1, type=int)
-    status = request.args.get('status', '', type=str)
-    patient_search = request.args.get('patient', '', type=str)
-    date_from = request.args.get('date_from', '', type=str)
-    date_to = request.args.get('date_to', '', type=str)
-    
+def _appointment_list_query(status, patient_search, date_from, date_to):
+    """Appointment list filters (shared by the list view and its export)"""
     query = Appointment.query.filter_by(distributor_id=current_user.distributor_id)
     
     if status:
@@ -1542,7 +1454,32 @@ def appointments_list():
         except ValueError:
             pass
     
-    appointments = query.order_by(Appointment.start_time.desc()).paginate(page=page, per_page=20)
+    return query.order_by(Appointment.start_time.desc())
+
+
+@bp.route('/appointments/list')
+@login_required
+def appointments_list():
+    """List view with filters."""
+    status = request.args.get('status', '', type=str)
+    patient_search = request.args.get('patient', '', type=str)
+    date_from = request.args.get('date_from', '', type=str)
+    date_to = request.args.get('date_to', '', type=str)
+    
+    appointments = keyset_paginate(_appointment_list_query(status, patient_search, date_from, date_to),
+                                   Appointment.start_time, per_page=20,
+                                   cursor=request.args.get('cursor'), total='cached')
+    if wants_json():
+        return jsonify(appointments.to_dict(lambda a: {
+            'id': a.id,
+            'title': a.title,
+            'patient_id': a.patient_id,
+            'start_time': a.start_time.isoformat(),
+            'end_time': a.end_time.isoformat(),
+            'status': a.status,
+            'doctor_name': a.doctor_name,
+            'room_number': a.room_number,
+        }))
     
     return render_template('main/appointments_list.html',
                          appointments=appointments,
@@ -1552,6 +1489,22 @@ def appointments_list():
                          date_to=date_to)
 
 
+@bp.route('/appointments/list/export')
+@login_required
+def export_appointment_list():
+    """Export the filtered appointment list (?format=xlsx|csv|json, streamed)"""
+    from app.utils.export import appointment_export, export_response, requested_format
+    
+    fmt = requested_format()
+    query = _appointment_list_query(
+        request.args.get('status', '', type=str),
+        request.args.get('patient', '', type=str),
+        request.args.get('date_from', '', type=str),
+        request.args.get('date_to', '', type=str)
+    )
+    return export_response(appointment_export(query), fmt)
+
+
 @bp.route('/appointments/new', methods=['GET', 'POST'])
 @login_required
 def new_appointment():
@@ -1754,40 +1707,46 @@ def send_appointment_reminders():
 
 def check_appointment_conflict(distributor_id, start_time, end_time, doctor_name=None, room_number=None, exclude_id=None):
     """Check if appointment conflicts with existing ones (same doctor or room)."""
-    q = Appointment.query.filter(
-        Appointment.distributor_id == distributor_id,
-        Appointment.status.in_(['scheduled', 'confirmed']),
-        db.or_(
-            db.and_(Appointment.start_time < end_time, Appointment.end_time > start_time)
-        )
-    )
-    if exclude_id:
-        q = q.filter(Appointment.id != exclude_id)
-    
-    # If doctor specified, check doctor conflict
-    if doctor_name:
-        q = q.filter(Appointment.doctor_name == doctor_name)
-        conflict = q.first()
-        if conflict:
-            return conflict
-    
-    # If room specified, check room conflict
-    if room_number:
-        q2 = Appointment.query.filter(
-            Appointment.distributor_id == distributor_id,
-            Appointment.status.in_(['scheduled', 'confirmed']),
-            Appointment.room_number == room_number,
-            db.or_(
-                db.and_(Appointment.start_time < end_time, Appointment.end_time > start_time)
-            )
-        )
-        if exclude_id:
-            q2 = q2.filter(Appointment.id != exclude_id)
-        conflict = q2.first()
-        if conflict:
-            return conflict
+    from app.services.availability import AvailabilityEngine
+    if not doctor_name and not room_number:
+        return None
+    engine = AvailabilityEngine(distributor_id, start_time, end_time,
+                                doctors=[doctor_name], rooms=[room_number],
+                                exclude_ids=[exclude_id] if exclude_id else ())
+    return engine.conflict(start_time, end_time, doctor_name, room_number)
+
+
+@bp.route('/appointments/free-slots')
+@login_required
+def appointment_free_slots():
+    """Next free slots for a doctor and/or room (JSON)."""
+    from app.services.availability import AvailabilityEngine, WORKING_HOURS
+    doctor_name = request.args.get('doctor_name', '', type=str).strip() or None
+    room_number = request.args.get('room_number', '', type=str).strip() or None
+    duration = request.args.get('duration', 60, type=int)
+    count = min(request.args.get('count', 5, type=int), 50)
+    days = min(request.args.get('days', 14, type=int), 90)
+    if not doctor_name and not room_number:
+        return jsonify({'success': False, 'message': 'Doktor veya oda belirtin'}), 400
+    if duration <= 0:
+        return jsonify({'success': False, 'message': 'Geçersiz süre'}), 400
     
-    return None
+    try:
+        start = datetime.strptime(request.args['from'], '%Y-%m-%dT%H:%M') if request.args.get('from') \
+            else datetime.utcnow()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Geçersiz tarih/saat formatı'}), 400
+    end = start + timedelta(days=days)
+    
+    engine = AvailabilityEngine(current_user.distributor_id, start, end,
+                                doctors=[doctor_name], rooms=[room_number],
+                                exclude_ids=[request.args.get('exclude_id', type=int)])
+    slots = engine.find_free_slots(timedelta(minutes=duration), count, doctor_name, room_number,
+                                   hours=None if request.args.get('all_day') else WORKING_HOURS)
+    return jsonify({
+        'success': True,
+        'slots': [{'start': s.strftime('%Y-%m-%dT%H:%M'), 'end': e.strftime('%Y-%m-%dT%H:%M')} for s, e in slots]
+    })
 
 
 # ========== DOCUMENT MANAGEMENT ==========
@@ -1796,7 +1755,6 @@ def check_appointment_conflict(distributor_id, start_time, end_time, doctor_name
 @login_required
 def documents():
     """List documents with filters."""
-    page = request.args.get('page', 1, type=int)
     doc_type = request.args.get('type', '', type=str)
     patient_search = request.args.get('patient', '', type=str)
     archived = request.args.get('archived', '0', type=str)
@@ -1819,7 +1777,16 @@ def documents():
             )
         )
     
-    documents = query.order_by(Document.uploaded_at.desc()).paginate(page=page, per_page=20)
+    documents = keyset_paginate(query, Document.uploaded_at, per_page=20,
+                                cursor=request.args.get('cursor'), total='cached')
+    if wants_json():
+        return jsonify(documents.to_dict(lambda d: {
+            'id': d.id,
+            'title': d.title,
+            'document_type': d.document_type,
+            'patient_id': d.patient_id,
+            'uploaded_at': d.uploaded_at.isoformat() if d.uploaded_at else None,
+        }))
     
     return render_template('main/documents.html',
                          documents=documents,
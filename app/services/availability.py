@@ -0,0 +1,311 @@
+"""Availability engine - doctor/room schedules for conflict checks and free-slot search
+
+`AvailabilityEngine` loads every active appointment of the requested doctors
+and rooms in a time window with one query (served by the
+(distributor_id, doctor_name, start_time) and (distributor_id, room_number,
+start_time) indexes) and keeps one sorted timeline per resource. After that:
+
+- `conflict()` answers an overlap check with two bisects,
+- `find_free_slots()` walks the gaps of the doctor's and room's merged
+  timelines and returns the next N slots of a given length,
+- `validate_batch()` checks a list of proposed bookings (e.g. every
+  appointment of a journey) against the schedule and against each other in
+  one pass; accepted proposals are added to the timelines as it goes.
+
+Only scheduled/confirmed appointments block time.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from app import db
+from app.models.appointment import Appointment
+
+ACTIVE_STATUSES = ('scheduled', 'confirmed')
+
+# Appointments starting this long before the window are not considered.
+# Bounds the index range scan; no booking is expected to span longer.
+MAX_APPOINTMENT_SPAN = timedelta(days=14)
+
+WORKING_HOURS = (time(9, 0), time(18, 0))
+
+Proposal = namedtuple('Proposal', 'start end doctor_name room_number key title')
+Proposal.__new__.__defaults__ = (None, None, None, None)
+
+# Busy time that does not come from a saved appointment (batch proposals)
+Booking = namedtuple('Booking', 'id title start_time end_time doctor_name room_number')
+
+
+class Timeline:
+    """Busy intervals of one resource: raw bookings plus merged, disjoint blocks"""
+
+    def __init__(self, bookings=()):
+        self._items = sorted(bookings, key=lambda b: (b.start_time, b.end_time))
+        self._item_starts = [b.start_time for b in self._items]
+        self.starts = []
+        self.ends = []
+        for booking in self._items:
+            if self.ends and booking.start_time <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], booking.end_time)
+            else:
+                self.starts.append(booking.start_time)
+                self.ends.append(booking.end_time)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _block_at(self, start, end):
+        """Index of the merged block overlapping [start, end), or None"""
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and self.ends[i] > start:
+            return i
+        i += 1
+        if i < len(self.starts) and self.starts[i] < end:
+            return i
+        return None
+
+    def overlapping(self, start, end):
+        """First booking overlapping [start, end), or None"""
+        block = self._block_at(start, end)
+        if block is None:
+            return None
+        lo = bisect_left(self._item_starts, self.starts[block])
+        hi = bisect_left(self._item_starts, end)
+        for booking in self._items[lo:hi]:
+            if booking.end_time > start:
+                return booking
+        return None
+
+    def add(self, booking):
+        """Mark [start_time, end_time) as busy"""
+        i = bisect_right(self._item_starts, booking.start_time)
+        self._items.insert(i, booking)
+        self._item_starts.insert(i, booking.start_time)
+
+        start, end = booking.start_time, booking.end_time
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+
+def _union_blocks(timelines):
+    """Merged busy blocks of several timelines, sorted"""
+    blocks = sorted(
+        (start, end) for timeline in timelines for start, end in zip(timeline.starts, timeline.ends)
+    )
+    merged = []
+    for start, end in blocks:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _align(moment, granularity):
+    """Round up to the next multiple of `granularity` within the day"""
+    midnight = datetime.combine(moment.date(), time(0))
+    step = granularity.total_seconds()
+    offset = (moment - midnight).total_seconds()
+    return midnight + timedelta(seconds=-(-offset // step) * step)
+
+
+def _working_windows(window_start, window_end, hours):
+    """Working-hour windows (per day) inside [window_start, window_end)"""
+    if hours is None:
+        yield window_start, window_end
+        return
+    day = window_start.date()
+    while datetime.combine(day, time(0)) < window_end:
+        start = max(window_start, datetime.combine(day, hours[0]))
+        end = min(window_end, datetime.combine(day, hours[1]))
+        if start < end:
+            yield start, end
+        day += timedelta(days=1)
+
+
+class AvailabilityEngine:
+    """
+    Tek sorguda yüklenen doktor/oda takvimi
+
+    Args:
+        distributor_id: Tenant
+        window_start, window_end: Yüklenecek zaman aralığı
+        doctors, rooms: Takvimi yüklenecek doktor adları / oda numaraları
+        exclude_ids: Yok sayılacak randevular (ör. düzenlenen randevu)
+    """
+
+    def __init__(self, distributor_id, window_start, window_end, doctors=(), rooms=(), exclude_ids=()):
+        self.distributor_id = distributor_id
+        self.window_start = window_start
+        self.window_end = window_end
+        self.doctors = {name for name in doctors if name}
+        self.rooms = {number for number in rooms if number}
+        self._timelines = {}
+        self._load(set(exclude_ids or ()))
+
+    def _load(self, exclude_ids):
+        by_doctor, by_room = {}, {}
+        if self.doctors or self.rooms:
+            resource_filters = []
+            if self.doctors:
+                resource_filters.append(Appointment.doctor_name.in_(sorted(self.doctors)))
+            if self.rooms:
+                resource_filters.append(Appointment.room_number.in_(sorted(self.rooms)))
+            query = Appointment.query.filter(
+                Appointment.distributor_id == self.distributor_id,
+                db.or_(*resource_filters),
+                Appointment.start_time >= self.window_start - MAX_APPOINTMENT_SPAN,
+                Appointment.start_time < self.window_end,
+                Appointment.end_time > self.window_start,
+                Appointment.status.in_(ACTIVE_STATUSES),
+            )
+            for appointment in query.all():
+                if appointment.id in exclude_ids:
+                    continue
+                if appointment.doctor_name in self.doctors:
+                    by_doctor.setdefault(appointment.doctor_name, []).append(appointment)
+                if appointment.room_number in self.rooms:
+                    by_room.setdefault(appointment.room_number, []).append(appointment)
+        for name in self.doctors:
+            self._timelines[('doctor', name)] = Timeline(by_doctor.get(name, ()))
+        for number in self.rooms:
+            self._timelines[('room', number)] = Timeline(by_room.get(number, ()))
+
+    def _resources(self, doctor_name, room_number):
+        timelines = []
+        for kind, value in (('doctor', doctor_name), ('room', room_number)):
+            if not value:
+                continue
+            if (kind, value) not in self._timelines:
+                raise ValueError(f'{kind} {value!r} was not loaded into this engine')
+            timelines.append(self._timelines[(kind, value)])
+        return timelines
+
+    def _check_window(self, start, end):
+        if start < self.window_start or end > self.window_end:
+            raise ValueError('Interval is outside the loaded window')
+
+    def conflict(self, start, end, doctor_name=None, room_number=None):
+        """Doktor veya odada çakışan ilk randevu (yoksa None)"""
+        self._check_window(start, end)
+        for timeline in self._resources(doctor_name, room_number):
+            booking = timeline.overlapping(start, end)
+            if booking is not None:
+                return booking
+        return None
+
+    def book(self, start, end, doctor_name=None, room_number=None, title=None, key=None):
+        """Aralığı (kaydetmeden) dolu işaretle"""
+        booking = Booking(key, title, start, end, doctor_name, room_number)
+        for timeline in self._resources(doctor_name, room_number):
+            timeline.add(booking)
+        return booking
+
+    def find_free_slots(self, duration, count=5, doctor_name=None, room_number=None,
+                        start=None, end=None, hours=WORKING_HOURS, granularity=timedelta(minutes=15)):
+        """
+        Doktor ve odanın birlikte boş olduğu ilk `count` aralık
+
+        Args:
+            duration: Slot uzunluğu (timedelta)
+            start, end: Arama aralığı (varsayılan: yüklenen pencere)
+            hours: (başlangıç, bitiş) çalışma saatleri; None ise gün boyu
+            granularity: Slot başlangıçlarının hizalanacağı adım
+
+        Returns:
+            list: (start, end) tuple'ları, kronolojik
+        """
+        start = max(start or self.window_start, self.window_start)
+        end = min(end or self.window_end, self.window_end)
+        if duration <= timedelta(0) or count <= 0:
+            return []
+        busy = _union_blocks(self._resources(doctor_name, room_number))
+        slots = []
+        i = 0
+        for window_start, window_end in _working_windows(start, end, hours):
+            cursor = _align(window_start, granularity)
+            while cursor + duration <= window_end:
+                # Skip blocks that end before the cursor
+                while i < len(busy) and busy[i][1] <= cursor:
+                    i += 1
+                if i < len(busy) and busy[i][0] < cursor + duration:
+                    cursor = _align(busy[i][1], granularity)
+                    continue
+                slots.append((cursor, cursor + duration))
+                if len(slots) >= count:
+                    return slots
+                cursor = _align(cursor + duration, granularity)
+        return slots
+
+    def validate_batch(self, proposals):
+        """
+        Önerilen randevuları tek geçişte doğrula
+
+        Proposals are checked in chronological order against existing bookings
+        and against the proposals accepted before them; a conflicting proposal
+        is not booked, so it does not cascade into the rest of the batch.
+
+        Args:
+            proposals: Proposal(start, end, doctor_name, room_number, key, title) listesi
+
+        Returns:
+            list: (proposal, conflicting booking) çiftleri
+        """
+        conflicts = []
+        for proposal in sorted(proposals, key=lambda p: (p.start, p.end)):
+            booking = self.conflict(proposal.start, proposal.end, proposal.doctor_name, proposal.room_number)
+            if booking is not None:
+                conflicts.append((proposal, booking))
+                continue
+            self.book(proposal.start, proposal.end, proposal.doctor_name, proposal.room_number,
+                      title=proposal.title, key=proposal.key)
+        return conflicts
+
+    @classmethod
+    def for_proposals(cls, distributor_id, proposals, exclude_ids=()):
+        """Engine whose window and resources cover all proposals"""
+        proposals = list(proposals)
+        if not proposals:
+            now = datetime.utcnow()
+            return cls(distributor_id, now, now)
+        return cls(
+            distributor_id,
+            min(p.start for p in proposals),
+            max(p.end for p in proposals),
+            doctors={p.doctor_name for p in proposals},
+            rooms={p.room_number for p in proposals},
+            exclude_ids=exclude_ids,
+        )
+
+
+def validate_journey_appointments(journey):
+    """
+    Yolculuk adımlarına bağlı randevuları birlikte doğrula
+
+    Returns:
+        list: (JourneyStep, conflicting booking) çiftleri
+    """
+    from app.models.journey import JourneyStep
+    steps = JourneyStep.query.filter(
+        JourneyStep.journey_id == journey.id,
+        JourneyStep.appointment_id.isnot(None),
+    ).all()
+    appointments = {
+        a.id: a for a in Appointment.query.filter(
+            Appointment.id.in_([s.appointment_id for s in steps]),
+            Appointment.distributor_id == journey.distributor_id,
+            Appointment.status.in_(ACTIVE_STATUSES),
+        )
+    } if steps else {}
+    steps_by_appointment = {s.appointment_id: s for s in steps if s.appointment_id in appointments}
+    proposals = [
+        Proposal(a.start_time, a.end_time, a.doctor_name, a.room_number, a.id, a.title)
+        for a in appointments.values()
+    ]
+    engine = AvailabilityEngine.for_proposals(journey.distributor_id, proposals, exclude_ids=appointments)
+    return [(steps_by_appointment[proposal.key], booking) for proposal, booking in engine.validate_batch(proposals)]
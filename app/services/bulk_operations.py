@@ -1,67 +1,135 @@
-"""Bulk operations for Facebook leads - batch processing"""
+"""Bulk operations for Facebook leads - batch processing
 
+Leads are changed with one UPDATE/DELETE per chunk of IDs and their
+LeadInteraction rows are written with one multi-row INSERT per chunk; no
+FacebookLead objects are loaded into the session. Core statements skip the
+mapper hooks, so the lead_daily_stats rollup and the cached status
+histogram are adjusted here from the (distributor, created_at, status) rows
+read before each change. Stored scores don't depend on status and stay valid.
+"""
+
+from collections import Counter
 from app import db
 from app.models.meta_lead import FacebookLead, LeadInteraction
 from app.models.user import User
+from app.services.lead_analytics import bump_lead_daily_stats, day_for
+from app.services.lead_stats import mark_status_deltas
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+VALID_STATUSES = ('new', 'assigned', 'contacted', 'converted', 'rejected')
+
+
+def _chunks(ids, size):
+    ids = sorted(set(ids))
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _select_leads(chunk):
+    """(id, distributor_id, created_at, status) rows for the existing leads in chunk"""
+    leads = FacebookLead.__table__
+    return db.session.execute(
+        db.select(leads.c.id, leads.c.distributor_id, leads.c.created_at, leads.c.status)
+        .where(leads.c.id.in_(chunk))
+    ).all()
+
+
+def _shift_rollup(rows, new_status=None):
+    """Move rows' rollup and histogram counts to new_status (None: the rows were deleted)"""
+    deltas = Counter()
+    status_deltas = Counter()
+    for _, distributor_id, created_at, status in rows:
+        if status == new_status:
+            continue
+        day = day_for(created_at)
+        deltas[(distributor_id, day, status)] -= 1
+        status_deltas[(distributor_id, status)] -= 1
+        if new_status is not None:
+            deltas[(distributor_id, day, new_status)] += 1
+            status_deltas[(distributor_id, new_status)] += 1
+    bump_lead_daily_stats(db.session.connection(), deltas)
+    mark_status_deltas(db.session, status_deltas)
+
+
+def _add_interactions(lead_ids, user_id, interaction_type, description, now):
+    """One multi-row INSERT; description is a string or {lead_id: text}"""
+    if not lead_ids:
+        return
+    db.session.execute(LeadInteraction.__table__.insert().values([
+        {
+            'lead_id': lead_id,
+            'user_id': user_id,
+            'interaction_type': interaction_type,
+            'description': description if isinstance(description, str) else description[lead_id],
+            'result': 'success',
+            'created_at': now,
+        }
+        for lead_id in lead_ids
+    ]))
+
 
 class BulkLeadOperations:
     """Handle bulk operations on multiple leads"""
     
+    # IDs per statement: keeps IN lists and multi-row INSERT parameters under driver limits
+    CHUNK_SIZE = 500
+    
+    @staticmethod
+    def _set_leads(lead_ids, values, user_id, description):
+        """UPDATE leads chunk by chunk and log a status_changed interaction for each
+
+        Args:
+            values: Column values; must include 'status'
+            description: callable(old_status) -> interaction text
+
+        Returns:
+            int: Number of leads updated
+        """
+        leads = FacebookLead.__table__
+        now = datetime.utcnow()
+        updated = 0
+        for chunk in _chunks(lead_ids, BulkLeadOperations.CHUNK_SIZE):
+            rows = _select_leads(chunk)
+            if not rows:
+                continue
+            ids = [row.id for row in rows]
+            db.session.execute(
+                leads.update().where(leads.c.id.in_(ids)).values(updated_at=now, **values)
+            )
+            _shift_rollup(rows, values['status'])
+            _add_interactions(ids, user_id, 'status_changed',
+                              {row.id: description(row.status) for row in rows}, now)
+            updated += len(ids)
+        return updated
+    
     @staticmethod
     def bulk_status_change(lead_ids, new_status, user_id):
         """Change status for multiple leads at once"""
         try:
-            user = User.query.get(user_id)
+            user = db.session.get(User, user_id)
             if not user:
                 return {'success': False, 'message': 'Kullanıcı bulunamadı', 'updated': 0}
             
-            valid_statuses = ['new', 'assigned', 'contacted', 'converted', 'rejected']
-            if new_status not in valid_statuses:
+            if new_status not in VALID_STATUSES:
                 return {'success': False, 'message': 'Geçersiz durum', 'updated': 0}
             
-            # Get leads
-            leads = FacebookLead.query.filter(FacebookLead.id.in_(lead_ids)).all()
-            
-            if not leads:
+            updated_count = BulkLeadOperations._set_leads(
+                lead_ids, {'status': new_status}, user_id,
+                lambda old_status: f"{old_status} → {new_status} (Toplu İşlem)"
+            )
+            if not updated_count:
                 return {'success': False, 'message': 'Lead bulunamadı', 'updated': 0}
             
-            updated_count = 0
-            errors = []
-            
-            for lead in leads:
-                try:
-                    old_status = lead.status
-                    lead.status = new_status
-                    lead.updated_at = datetime.utcnow()
-                    
-                    # Create interaction record
-                    interaction = LeadInteraction(
-                        lead_id=lead.id,
-                        user_id=user_id,
-                        interaction_type='status_changed',
-                        description=f"{old_status} → {new_status} (Toplu İşlem)",
-                        result='success'
-                    )
-                    
-                    db.session.add(interaction)
-                    updated_count += 1
-                
-                except Exception as e:
-                    logger.error(f"Bulk status change error for lead {lead.id}: {str(e)}")
-                    errors.append(f"Lead {lead.id}: {str(e)}")
-            
             db.session.commit()
             
             return {
                 'success': True,
                 'message': f'{updated_count} lead durumu güncellendi',
                 'updated': updated_count,
-                'errors': errors
+                'errors': []
             }
         
         except Exception as e:
@@ -73,38 +141,17 @@ class BulkLeadOperations:
     def bulk_assign(lead_ids, user_id, assign_to_user_id):
         """Assign multiple leads to a user"""
         try:
-            assign_user = User.query.get(assign_to_user_id)
+            assign_user = db.session.get(User, assign_to_user_id)
             if not assign_user:
                 return {'success': False, 'message': 'Personel bulunamadı', 'updated': 0}
             
-            # Get leads
-            leads = FacebookLead.query.filter(FacebookLead.id.in_(lead_ids)).all()
-            
-            if not leads:
+            updated_count = BulkLeadOperations._set_leads(
+                lead_ids, {'assigned_to_id': assign_to_user_id, 'status': 'assigned'}, user_id,
+                lambda old_status: f"Toplu atama: {assign_user.username}"
+            )
+            if not updated_count:
                 return {'success': False, 'message': 'Lead bulunamadı', 'updated': 0}
             
-            updated_count = 0
-            
-            for lead in leads:
-                try:
-                    lead.assigned_to_id = assign_to_user_id
-                    lead.status = 'assigned'
-                    lead.updated_at = datetime.utcnow()
-                    
-                    interaction = LeadInteraction(
-                        lead_id=lead.id,
-                        user_id=user_id,
-                        interaction_type='status_changed',
-                        description=f"Toplu atama: {assign_user.username}",
-                        result='success'
-                    )
-                    
-                    db.session.add(interaction)
-                    updated_count += 1
-                
-                except Exception as e:
-                    logger.error(f"Bulk assign error for lead {lead.id}: {str(e)}")
-            
             db.session.commit()
             
             return {
@@ -120,39 +167,28 @@ class BulkLeadOperations:
     
     @staticmethod
     def bulk_delete(lead_ids, user_id):
-        """Delete multiple leads"""
+        """Delete multiple leads (and their interactions)"""
         try:
-            # Get leads
-            leads = FacebookLead.query.filter(FacebookLead.id.in_(lead_ids)).all()
-            
-            if not leads:
-                return {'success': False, 'message': 'Lead bulunamadı', 'deleted': 0}
-            
+            leads = FacebookLead.__table__
+            interactions = LeadInteraction.__table__
             deleted_count = 0
             
-            for lead in leads:
-                try:
-                    # Delete interactions first
-                    LeadInteraction.query.filter_by(lead_id=lead.id).delete()
-                    
-                    # Log deletion
-                    interaction = LeadInteraction(
-                        lead_id=lead.id,
-                        user_id=user_id,
-                        interaction_type='note',
-                        description='Lead silinmiş (Toplu İşlem)',
-                        result='success'
-                    )
-                    db.session.add(interaction)
-                    
-                    # Delete lead
-                    db.session.delete(lead)
-                    deleted_count += 1
-                
-                except Exception as e:
-                    logger.error(f"Bulk delete error for lead {lead.id}: {str(e)}")
+            for chunk in _chunks(lead_ids, BulkLeadOperations.CHUNK_SIZE):
+                rows = _select_leads(chunk)
+                if not rows:
+                    continue
+                ids = [row.id for row in rows]
+                db.session.execute(interactions.delete().where(interactions.c.lead_id.in_(ids)))
+                db.session.execute(leads.delete().where(leads.c.id.in_(ids)))
+                _shift_rollup(rows)
+                deleted_count += len(ids)
+            
+            if not deleted_count:
+                return {'success': False, 'message': 'Lead bulunamadı', 'deleted': 0}
             
             db.session.commit()
+            # The leads' interaction history is gone with them, so the deletion is logged here
+            logger.info(f"User {user_id} bulk-deleted {deleted_count} leads")
             
             return {
                 'success': True,
@@ -169,28 +205,19 @@ class BulkLeadOperations:
     def bulk_add_tag(lead_ids, tag_text, user_id):
         """Add a tag/note to multiple leads"""
         try:
-            leads = FacebookLead.query.filter(FacebookLead.id.in_(lead_ids)).all()
-            
-            if not leads:
-                return {'success': False, 'message': 'Lead bulunamadı', 'updated': 0}
-            
+            leads = FacebookLead.__table__
+            now = datetime.utcnow()
             updated_count = 0
             
-            for lead in leads:
-                try:
-                    interaction = LeadInteraction(
-                        lead_id=lead.id,
-                        user_id=user_id,
-                        interaction_type='note',
-                        description=tag_text,
-                        result='success'
-                    )
-                    
-                    db.session.add(interaction)
-                    updated_count += 1
-                
-                except Exception as e:
-                    logger.error(f"Bulk tag error for lead {lead.id}: {str(e)}")
+            for chunk in _chunks(lead_ids, BulkLeadOperations.CHUNK_SIZE):
+                ids = db.session.execute(
+                    db.select(leads.c.id).where(leads.c.id.in_(chunk))
+                ).scalars().all()
+                _add_interactions(ids, user_id, 'note', tag_text, now)
+                updated_count += len(ids)
+            
+            if not updated_count:
+                return {'success': False, 'message': 'Lead bulunamadı', 'updated': 0}
             
             db.session.commit()
             
@@ -206,47 +233,17 @@ class BulkLeadOperations:
             return {'success': False, 'message': str(e), 'updated': 0}
     
     @staticmethod
-    def export_leads(lead_ids, format='csv'):
-        """Export leads to CSV or Excel"""
-        import csv
-        from io import StringIO
-        
-        leads = FacebookLead.query.filter(FacebookLead.id.in_(lead_ids)).all()
+    def export_leads(lead_ids):
+        """
+        Streaming export of the selected leads (see app.utils.export)
+
+        Returns:
+            Export or None if none of the leads exist
+        """
+        from app.utils.export import facebook_lead_export
         
-        if not leads:
+        lead_ids = list(set(lead_ids))
+        query = FacebookLead.query.filter(FacebookLead.id.in_(lead_ids))
+        if not db.session.query(query.exists()).scalar():
             return None
-        
-        if format == 'csv':
-            output = StringIO()
-            writer = csv.writer(output)
-            
-            # Headers
-            writer.writerow([
-                'ID', 'Ad Soyad', 'Email', 'Telefon', 'Dağıtıcı', 
-                'Durum', 'Atanan Kişi', 'Oluşturulma Tarihi'
-            ])
-            
-            # Rows
-            for lead in leads:
-                writer.writerow([
-                    lead.id,
-                    lead.full_name(),
-                    lead.email,
-                    lead.phone,
-                    lead.distributor.name,
-                    lead.status,
-                    lead.assigned_to.username if lead.assigned_to else '',
-                    lead.created_at.strftime('%d.%m.%Y %H:%M')
-                ])
-            
-            return output.getvalue()
-        
-        elif format == 'json':
-            import json
-            return json.dumps(
-                [lead.to_dict() for lead in leads],
-                ensure_ascii=False,
-                indent=2
-            )
-        
-        return None
+        return facebook_lead_export(query.order_by(FacebookLead.id))
@@ -0,0 +1,252 @@
+"""Dashboard statistics rollup - incrementally maintained per distributor/month"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import event, select, func, extract
+from sqlalchemy.orm import Session
+from app import db
+from app.models.dashboard_stat import DashboardStat
+from app.models.patient import Patient
+from app.models.encounter import Encounter
+from app.models.hair import HairAnnotation
+from app.models.dental import DentalProcedure
+from app.models.eye import EyeRefraction
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Module tables counted on the dashboard -> rollup column
+MODULE_COLUMNS = {
+    HairAnnotation.__table__: 'hair_encounters',
+    DentalProcedure.__table__: 'dental_encounters',
+    EyeRefraction.__table__: 'eye_encounters',
+}
+
+COUNTER_COLUMNS = ('patients_count', 'encounters_count',
+                   'hair_encounters', 'dental_encounters', 'eye_encounters')
+
+
+def period_for(dt):
+    """Rollup bucket key for a timestamp (YYYY-MM)"""
+    return (dt or datetime.utcnow()).strftime('%Y-%m')
+
+
+def _bump(connection, distributor_id, period, column, delta):
+    """Apply a +/- delta to one rollup counter inside the current transaction"""
+    if not distributor_id or not delta:
+        return
+    table = DashboardStat.__table__
+    result = connection.execute(
+        table.update()
+        .where(table.c.distributor_id == distributor_id, table.c.period == period)
+        .values({column: table.c[column] + delta, 'updated_at': datetime.utcnow()})
+    )
+    if result.rowcount == 0:
+        values = {name: 0 for name in COUNTER_COLUMNS}
+        values[column] = max(delta, 0)
+        connection.execute(table.insert().values(
+            distributor_id=distributor_id,
+            period=period,
+            updated_at=datetime.utcnow(),
+            **values
+        ))
+
+
+def _encounter_bucket(connection, encounter_id):
+    """(distributor_id, period) of an encounter, or None if it is gone"""
+    row = connection.execute(
+        select(Encounter.__table__.c.distributor_id, Encounter.__table__.c.created_at)
+        .where(Encounter.__table__.c.id == encounter_id)
+    ).first()
+    if not row:
+        return None
+    return row.distributor_id, period_for(row.created_at)
+
+
+def _module_rows(connection, table, encounter_id):
+    return connection.execute(
+        select(func.count()).select_from(table).where(table.c.encounter_id == encounter_id)
+    ).scalar() or 0
+
+
+# ========== MAPPER HOOKS ==========
+
+@event.listens_for(Patient, 'after_insert')
+def _patient_inserted(mapper, connection, target):
+    _bump(connection, target.distributor_id, period_for(target.created_at), 'patients_count', 1)
+
+
+@event.listens_for(Patient, 'after_delete')
+def _patient_deleted(mapper, connection, target):
+    _bump(connection, target.distributor_id, period_for(target.created_at), 'patients_count', -1)
+
+
+@event.listens_for(Encounter, 'after_insert')
+def _encounter_inserted(mapper, connection, target):
+    _bump(connection, target.distributor_id, period_for(target.created_at), 'encounters_count', 1)
+
+
+@event.listens_for(Encounter, 'after_delete')
+def _encounter_deleted(mapper, connection, target):
+    period = period_for(target.created_at)
+    _bump(connection, target.distributor_id, period, 'encounters_count', -1)
+    # Module rows left behind (no FK cascade) stop counting with their encounter
+    for table, column in MODULE_COLUMNS.items():
+        if _module_rows(connection, table, target.id):
+            _bump(connection, target.distributor_id, period, column, -1)
+
+
+def _apply_module_changes(connection, table, changes, known_buckets=None):
+    """Flip module counters for encounters whose row count crossed zero.
+
+    Args:
+        changes: {encounter_id: net row delta} already written to the table
+        known_buckets: {encounter_id: (distributor_id, period)} for encounters
+            deleted in the same flush
+    """
+    for encounter_id, delta in changes.items():
+        after = _module_rows(connection, table, encounter_id)
+        before = after - delta
+        flip = int(after > 0) - int(before > 0)
+        if not flip:
+            continue
+        bucket = _encounter_bucket(connection, encounter_id) or (known_buckets or {}).get(encounter_id)
+        if bucket:
+            _bump(connection, bucket[0], bucket[1], MODULE_COLUMNS[table], flip)
+
+
+@event.listens_for(Session, 'after_flush')
+def _modules_flushed(session, flush_context):
+    """Module rows can arrive several per encounter in one batched INSERT, so
+    they are accounted per flush rather than per row."""
+    changes = {}
+    for obj, delta in [(o, 1) for o in session.new] + [(o, -1) for o in session.deleted]:
+        table = getattr(type(obj), '__table__', None)
+        if table in MODULE_COLUMNS and obj.encounter_id:
+            per_table = changes.setdefault(table, {})
+            per_table[obj.encounter_id] = per_table.get(obj.encounter_id, 0) + delta
+    if not changes:
+        return
+    deleted_encounters = {
+        obj.id: (obj.distributor_id, period_for(obj.created_at))
+        for obj in session.deleted if isinstance(obj, Encounter)
+    }
+    connection = session.connection()
+    for table, per_table in changes.items():
+        _apply_module_changes(connection, table, per_table, deleted_encounters)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _module_bulk_deleted(orm_execute_state):
+    """Keep module counters exact for Query.delete() calls.
+
+    Routes clear module rows with `Model.query.filter_by(encounter_id=...).delete()`,
+    which bypasses the flush hooks above.
+    """
+    if not orm_execute_state.is_delete:
+        return None
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(mapper, 'local_table', None)
+    if table not in MODULE_COLUMNS:
+        return None
+
+    statement = orm_execute_state.statement
+    connection = orm_execute_state.session.connection()
+    changes = dict(connection.execute(
+        select(table.c.encounter_id, -func.count())
+        .where(statement.whereclause)
+        .group_by(table.c.encounter_id)
+    ).all())
+
+    result = orm_execute_state.invoke_statement()
+    _apply_module_changes(connection, table, changes)
+    return result
+
+
+# ========== READ / REBUILD ==========
+
+def get_dashboard_stats(distributor_id, months=6):
+    """Dashboard numbers for a distributor from the rollup table.
+
+    Reads one row per month of history regardless of how many patients or
+    encounters the distributor has.
+    """
+    rows = DashboardStat.query.filter_by(distributor_id=distributor_id)\
+        .order_by(DashboardStat.period.asc()).all()
+
+    today = datetime.utcnow()
+    current_period = period_for(today)
+    first_period = period_for(today - timedelta(days=30 * months))
+
+    stats = {
+        'patients_count': 0,
+        'encounters_count': 0,
+        'module_stats': {'hair': 0, 'dental': 0, 'eye': 0},
+        'monthly_stats': [],
+        'new_patients_this_month': 0,
+    }
+    for row in rows:
+        stats['patients_count'] += row.patients_count
+        stats['encounters_count'] += row.encounters_count
+        stats['module_stats']['hair'] += row.hair_encounters
+        stats['module_stats']['dental'] += row.dental_encounters
+        stats['module_stats']['eye'] += row.eye_encounters
+        if row.period >= first_period and row.encounters_count:
+            stats['monthly_stats'].append({'month': row.period, 'count': row.encounters_count})
+        if row.period == current_period:
+            stats['new_patients_this_month'] = row.patients_count
+    return stats
+
+
+def _grouped_counts(dist_col, created_col, count_expr, model, distributor_id=None, join=None):
+    """Run a (distributor, year, month) -> count aggregate in a dialect-neutral way"""
+    year = extract('year', created_col)
+    month = extract('month', created_col)
+    q = db.session.query(dist_col, year, month, count_expr).select_from(model)
+    if join is not None:
+        q = q.join(join)
+    if distributor_id:
+        q = q.filter(dist_col == distributor_id)
+    return q.group_by(dist_col, year, month).all()
+
+
+def rebuild_dashboard_stats(distributor_id=None):
+    """Recompute the rollup from the source tables.
+
+    Args:
+        distributor_id: Only rebuild this distributor (default: all)
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    buckets = {}
+
+    def add(rows, column):
+        for dist_id, year, month, count in rows:
+            if dist_id is None or year is None:
+                continue
+            key = (dist_id, f'{int(year):04d}-{int(month):02d}')
+            buckets.setdefault(key, {name: 0 for name in COUNTER_COLUMNS})[column] = count or 0
+
+    add(_grouped_counts(Patient.distributor_id, Patient.created_at, func.count(Patient.id),
+                        Patient, distributor_id), 'patients_count')
+    add(_grouped_counts(Encounter.distributor_id, Encounter.created_at, func.count(Encounter.id),
+                        Encounter, distributor_id), 'encounters_count')
+    for model in (HairAnnotation, DentalProcedure, EyeRefraction):
+        add(_grouped_counts(Encounter.distributor_id, Encounter.created_at,
+                            func.count(func.distinct(model.encounter_id)),
+                            model, distributor_id, join=Encounter),
+            MODULE_COLUMNS[model.__table__])
+
+    q = DashboardStat.query
+    if distributor_id:
+        q = q.filter_by(distributor_id=distributor_id)
+    q.delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    db.session.add_all([
+        DashboardStat(distributor_id=dist_id, period=period, updated_at=now, **counts)
+        for (dist_id, period), counts in buckets.items()
+    ])
+    db.session.commit()
+    logger.info(f"Dashboard stats rebuilt: {len(buckets)} rows")
+    return len(buckets)
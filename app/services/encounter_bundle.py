@@ -0,0 +1,78 @@
+"""Encounter aggregate loader - one eager-loaded snapshot for renderers and exports"""
+
+from sqlalchemy.orm import selectinload, joinedload
+from app.models import Encounter
+
+# Module relationships on Encounter (collections first, then single rows)
+MODULE_COLLECTIONS = ('hair_annotations', 'hair_patterns', 'dental_procedures', 'eye_treatments')
+MODULE_SINGLES = ('eye_refraction', 'aesthetic_procedure', 'bariatric_surgery',
+                  'ivf_treatment', 'checkup_package')
+
+
+class EncounterBundle:
+    """Read-only view of an encounter with everything the PDFs/exports need.
+
+    Collections are tuples ordered by id; single-row modules are the row or
+    None. The bundle itself cannot be modified after loading.
+    """
+
+    __slots__ = ('encounter', 'patient', 'distributor') + MODULE_COLLECTIONS + MODULE_SINGLES
+
+    def __init__(self, encounter):
+        values = {
+            'encounter': encounter,
+            'patient': encounter.patient,
+            'distributor': encounter.distributor,
+        }
+        for name in MODULE_COLLECTIONS:
+            values[name] = tuple(sorted(getattr(encounter, name), key=lambda row: row.id))
+        for name in MODULE_SINGLES:
+            values[name] = getattr(encounter, name)
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('EncounterBundle is read-only')
+
+    def __delattr__(self, name):
+        raise AttributeError('EncounterBundle is read-only')
+
+    @property
+    def module_rows(self):
+        """(table name, rows) for every module, empty ones included"""
+        for name in MODULE_COLLECTIONS:
+            yield name, getattr(self, name)
+        for name in MODULE_SINGLES:
+            row = getattr(self, name)
+            yield name, (row,) if row is not None else ()
+
+    def __repr__(self):
+        return f'<EncounterBundle {self.encounter.id}>'
+
+
+def load_encounter_bundle(encounter_id, distributor_id=None):
+    """
+    Encounter'ı hasta, distributor ve tüm modül satırlarıyla birlikte yükle
+
+    Hasta/distributor join ile, dokuz modül ilişkisi selectinload ile tek
+    seferde gelir; sonraki erişimler sorgu üretmez.
+
+    Args:
+        encounter_id: Encounter ID
+        distributor_id: Verilirse encounter bu distributor'a ait olmalı
+
+    Returns:
+        EncounterBundle veya None
+    """
+    q = Encounter.query.options(
+        joinedload(Encounter.patient),
+        joinedload(Encounter.distributor),
+        *[selectinload(getattr(Encounter, name)) for name in MODULE_COLLECTIONS + MODULE_SINGLES],
+    ).filter(Encounter.id == encounter_id)
+    if distributor_id is not None:
+        q = q.filter(Encounter.distributor_id == distributor_id)
+
+    encounter = q.first()
+    if encounter is None:
+        return None
+    return EncounterBundle(encounter)
@@ -0,0 +1,101 @@
+"""Journey progress counters - denormalized step summary on patient_journeys
+
+The journey list used to run `steps.count()`, a completed count and two
+`.first()` lookups per row. `PatientJourney` now carries steps_total,
+steps_completed, current_step_id (first in_progress step) and next_step_id
+(first pending step), in the timeline order of `PatientJourney.steps`.
+
+A session hook collects the journeys whose steps were added, changed or
+deleted during a flush and recomputes their summary with one correlated
+UPDATE, in the same transaction. Every writer (add_journey_step,
+update_step_status, reorder_steps, create_default_steps, flight and
+transfer forms) is covered without calling anything explicitly.
+"""
+
+from sqlalchemy import event, select, func, inspect
+from sqlalchemy.orm import Session
+from app.models.journey import PatientJourney, JourneyStep
+import logging
+
+logger = logging.getLogger(__name__)
+
+_STEP_ORDER = ('sequence', 'scheduled_date', 'id')
+
+
+def _first_step_id(journeys, steps, status):
+    return (
+        select(steps.c.id)
+        .where(steps.c.journey_id == journeys.c.id, steps.c.status == status)
+        .order_by(*(steps.c[name] for name in _STEP_ORDER))
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def refresh_journey_progress(connection, journey_ids=None):
+    """
+    Recompute the step summary of the given journeys (all when None)
+
+    Returns:
+        int: Updated journey rows
+    """
+    journeys = PatientJourney.__table__
+    steps = JourneyStep.__table__
+    stmt = journeys.update().values(
+        steps_total=select(func.count()).where(steps.c.journey_id == journeys.c.id).scalar_subquery(),
+        steps_completed=select(func.count())
+        .where(steps.c.journey_id == journeys.c.id, steps.c.status == 'completed')
+        .scalar_subquery(),
+        current_step_id=_first_step_id(journeys, steps, 'in_progress'),
+        next_step_id=_first_step_id(journeys, steps, 'pending'),
+        # Progress is not an edit of the journey itself
+        updated_at=journeys.c.updated_at,
+    )
+    if journey_ids is not None:
+        journey_ids = {journey_id for journey_id in journey_ids if journey_id}
+        if not journey_ids:
+            return 0
+        stmt = stmt.where(journeys.c.id.in_(sorted(journey_ids)))
+    return connection.execute(stmt).rowcount
+
+
+@event.listens_for(JourneyStep.journey_id, 'set', active_history=True)
+def _load_previous_journey(target, value, oldvalue, initiator):
+    """active_history loads the old journey_id of an expired step (e.g. one
+    moved after a commit) so the journey it left is refreshed as well"""
+
+
+def _step_journey_ids(step):
+    """Current and previous journey_id of a step (a step may be moved)"""
+    ids = {step.journey_id}
+    history = inspect(step).attrs.journey_id.history
+    ids.update(history.deleted or ())
+    return ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_journeys(session, flush_context):
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, JourneyStep):
+            changed |= _step_journey_ids(obj)
+    if changed:
+        session.info.setdefault('journey_progress', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _refresh_changed_journeys(session, flush_context):
+    journey_ids = session.info.pop('journey_progress', None)
+    if not journey_ids:
+        return
+    refresh_journey_progress(session.connection(), journey_ids)
+    # Loaded journeys re-read the new counters on next access
+    for obj in session.identity_map.values():
+        if isinstance(obj, PatientJourney) and obj.id in journey_ids:
+            session.expire(obj, ['steps_total', 'steps_completed', 'current_step_id', 'next_step_id',
+                                 'current_step', 'next_step'])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_changed_journeys(session):
+    session.info.pop('journey_progress', None)
@@ -1,9 +1,248 @@
-"""Advanced analytics and conversion funnel tracking"""
+"""Advanced analytics and conversion funnel tracking
+
+All figures come from GROUP BY queries. Status counts per day/distributor are
+read from the `lead_daily_stats` rollup (kept current by the hooks below)
+unless LEAD_STATS_ROLLUP is disabled, in which case the same aggregates run
+against `facebook_leads` directly.
+"""
 
 from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, func, case, inspect, bindparam
+from sqlalchemy.orm import Session
 from app import db
 from app.models.meta_lead import FacebookLead, LeadInteraction
+from app.models.lead_daily_stat import LeadDailyStat
+from app.models.distributor import Distributor
+from app.models.user import User
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+FUNNEL_STATUSES = ('new', 'assigned', 'contacted', 'converted', 'rejected')
+
+
+def day_for(dt):
+    """Rollup bucket key for a timestamp (YYYY-MM-DD, UTC)"""
+    return (dt or datetime.utcnow()).strftime('%Y-%m-%d')
+
+
+def rollup_enabled():
+    return not has_app_context() or current_app.config.get('LEAD_STATS_ROLLUP', True)
+
+
+# ========== ROLLUP MAINTENANCE ==========
+
+def bump_lead_daily_stat(connection, distributor_id, day, status, delta):
+    """Apply a +/- delta to one rollup counter inside the current transaction"""
+    if not distributor_id or not delta or not rollup_enabled():
+        return
+    table = LeadDailyStat.__table__
+    status = status or ''
+    result = connection.execute(
+        table.update()
+        .where(table.c.distributor_id == distributor_id, table.c.day == day, table.c.status == status)
+        .values(count=table.c.count + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(
+            distributor_id=distributor_id, day=day, status=status, count=max(delta, 0)
+        ))
+
+
+def bump_lead_daily_stats(connection, deltas):
+    """Apply many deltas at once: {(distributor_id, day, status): delta}
+
+    One SELECT of the existing counters, one executemany UPDATE and one
+    INSERT for the missing ones, however many buckets are touched.
+    """
+    deltas = {
+        (distributor_id, day, status or ''): delta
+        for (distributor_id, day, status), delta in deltas.items() if distributor_id and delta
+    }
+    if not deltas or not rollup_enabled():
+        return
+    table = LeadDailyStat.__table__
+    existing = {
+        tuple(row) for row in connection.execute(
+            select(table.c.distributor_id, table.c.day, table.c.status)
+            .where(table.c.distributor_id.in_({key[0] for key in deltas}),
+                   table.c.day.in_({key[1] for key in deltas}))
+        )
+    }
+    updates = [
+        {'b_distributor_id': key[0], 'b_day': key[1], 'b_status': key[2], 'delta': delta}
+        for key, delta in deltas.items() if key in existing
+    ]
+    if updates:
+        connection.execute(
+            table.update()
+            .where(table.c.distributor_id == bindparam('b_distributor_id'),
+                   table.c.day == bindparam('b_day'), table.c.status == bindparam('b_status'))
+            .values(count=table.c.count + bindparam('delta')),
+            updates
+        )
+    inserts = [
+        {'distributor_id': key[0], 'day': key[1], 'status': key[2], 'count': max(delta, 0)}
+        for key, delta in deltas.items() if key not in existing
+    ]
+    if inserts:
+        connection.execute(table.insert(), inserts)
+
+
+def _recount_buckets(connection, buckets):
+    """Recount (distributor_id, day) buckets from facebook_leads after bulk statements"""
+    table = LeadDailyStat.__table__
+    leads = FacebookLead.__table__
+    for distributor_id, day in buckets:
+        start = datetime.strptime(day, '%Y-%m-%d')
+        counts = {
+            status or '': count for status, count in connection.execute(
+                select(leads.c.status, func.count())
+                .where(leads.c.distributor_id == distributor_id,
+                       leads.c.created_at >= start,
+                       leads.c.created_at < start + timedelta(days=1))
+                .group_by(leads.c.status)
+            )
+        }
+        # Statuses that emptied out keep a zero row instead of being deleted
+        connection.execute(
+            table.update()
+            .where(table.c.distributor_id == distributor_id, table.c.day == day,
+                   table.c.status.notin_(list(counts)))
+            .values(count=0)
+        )
+        for status, count in counts.items():
+            result = connection.execute(
+                table.update()
+                .where(table.c.distributor_id == distributor_id, table.c.day == day, table.c.status == status)
+                .values(count=count)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(
+                    distributor_id=distributor_id, day=day, status=status, count=count
+                ))
+
+
+@event.listens_for(FacebookLead, 'after_insert')
+def _lead_inserted(mapper, connection, target):
+    bump_lead_daily_stat(connection, target.distributor_id, day_for(target.created_at), target.status, 1)
+
+
+@event.listens_for(FacebookLead, 'after_delete')
+def _lead_deleted(mapper, connection, target):
+    bump_lead_daily_stat(connection, target.distributor_id, day_for(target.created_at), target.status, -1)
+
+
+@event.listens_for(FacebookLead.status, 'set', active_history=True)
+@event.listens_for(FacebookLead.distributor_id, 'set', active_history=True)
+@event.listens_for(FacebookLead.created_at, 'set', active_history=True)
+def _load_previous_bucket(target, value, oldvalue, initiator):
+    """active_history loads the old value of an expired lead (e.g. one modified
+    after a commit) so _lead_updated can take it out of its old bucket"""
+
+
+@event.listens_for(FacebookLead, 'after_update')
+def _lead_updated(mapper, connection, target):
+    state = inspect(target)
+
+    def before(attr):
+        history = state.attrs[attr].history
+        return history.deleted[0] if history.deleted else getattr(target, attr)
+
+    old = (before('distributor_id'), day_for(before('created_at')), before('status'))
+    new = (target.distributor_id, day_for(target.created_at), target.status)
+    if old != new:
+        bump_lead_daily_stat(connection, *old, -1)
+        bump_lead_daily_stat(connection, *new, 1)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _leads_bulk_changed(orm_execute_state):
+    """Query.update()/delete() on leads bypasses the mapper hooks; recount
+    the affected (distributor, day) buckets instead."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if getattr(mapper, 'local_table', None) is not FacebookLead.__table__ or not rollup_enabled():
+        return None
+
+    leads = FacebookLead.__table__
+    connection = orm_execute_state.session.connection()
+    query = select(leads.c.distributor_id, leads.c.created_at).distinct()
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    buckets = {(dist_id, day_for(created_at)) for dist_id, created_at in connection.execute(query)}
+
+    result = orm_execute_state.invoke_statement()
+    _recount_buckets(connection, buckets)
+    return result
+
+
+def rebuild_lead_daily_stats():
+    """Recompute the rollup from facebook_leads
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    day = func.date(FacebookLead.created_at)
+    rows = db.session.query(
+        FacebookLead.distributor_id, day, FacebookLead.status, func.count(FacebookLead.id)
+    ).group_by(FacebookLead.distributor_id, day, FacebookLead.status).all()
+
+    LeadDailyStat.query.delete(synchronize_session=False)
+    db.session.add_all([
+        LeadDailyStat(distributor_id=dist_id, day=str(bucket)[:10], status=status or '', count=count)
+        for dist_id, bucket, status, count in rows if bucket is not None
+    ])
+    db.session.commit()
+    logger.info(f"Lead daily stats rebuilt: {len(rows)} rows")
+    return len(rows)
+
+
+# ========== QUERIES ==========
+
+def _status_counts(group_by, since=None):
+    """
+    (key, status, count) rows, from the rollup when enabled
+
+    Args:
+        group_by: 'day' or 'distributor'
+        since: datetime lower bound on created_at
+    """
+    def live(since, until=None):
+        key = func.date(FacebookLead.created_at) if group_by == 'day' else FacebookLead.distributor_id
+        q = db.session.query(key, FacebookLead.status, func.count(FacebookLead.id))
+        if since:
+            q = q.filter(FacebookLead.created_at >= since)
+        if until:
+            q = q.filter(FacebookLead.created_at < until)
+        return q.group_by(key, FacebookLead.status).all()
+
+    if rollup_enabled():
+        key = LeadDailyStat.day if group_by == 'day' else LeadDailyStat.distributor_id
+        q = db.session.query(key, LeadDailyStat.status, func.sum(LeadDailyStat.count))
+        rows = []
+        if since:
+            # Whole days from the rollup, a partial first day from the leads table
+            first_day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+            if since > first_day:
+                first_day += timedelta(days=1)
+                rows = live(since, first_day)
+            q = q.filter(LeadDailyStat.day >= day_for(first_day))
+        rows += q.group_by(key, LeadDailyStat.status).all()
+    else:
+        rows = live(since)
+
+    rows = [(k, s or '', int(n or 0)) for k, s, n in rows if k is not None and n]
+    if group_by == 'day':
+        return [(str(k)[:10], s, n) for k, s, n in rows]
+    return rows
+
+
+def _rate(part, total):
+    return round(part / total * 100, 2) if total else 0
 
 
 class LeadAnalytics:
@@ -14,26 +253,20 @@ class LeadAnalytics:
         """Calculate conversion funnel for last N days"""
         start_date = datetime.utcnow() - timedelta(days=days)
         
-        leads = FacebookLead.query.filter(FacebookLead.created_at >= start_date).all()
-        
-        # Count by status
-        statuses = {
-            'total': len(leads),
-            'new': len([l for l in leads if l.status == 'new']),
-            'assigned': len([l for l in leads if l.status == 'assigned']),
-            'contacted': len([l for l in leads if l.status == 'contacted']),
-            'converted': len([l for l in leads if l.status == 'converted']),
-            'rejected': len([l for l in leads if l.status == 'rejected']),
-        }
+        statuses = dict.fromkeys(('total',) + FUNNEL_STATUSES, 0)
+        for _, status, count in _status_counts('day', since=start_date):
+            statuses['total'] += count
+            if status in statuses:
+                statuses[status] += count
         
         # Calculate conversion rates
         conversion_rates = {}
         if statuses['total'] > 0:
             conversion_rates = {
-                'to_assigned': round((statuses['assigned'] / statuses['total']) * 100, 2),
-                'to_contacted': round((statuses['contacted'] / statuses['total']) * 100, 2),
-                'to_converted': round((statuses['converted'] / statuses['total']) * 100, 2),
-                'rejection_rate': round((statuses['rejected'] / statuses['total']) * 100, 2),
+                'to_assigned': _rate(statuses['assigned'], statuses['total']),
+                'to_contacted': _rate(statuses['contacted'], statuses['total']),
+                'to_converted': _rate(statuses['converted'], statuses['total']),
+                'rejection_rate': _rate(statuses['rejected'], statuses['total']),
             }
         
         return {
@@ -44,150 +277,144 @@ class LeadAnalytics:
     
     @staticmethod
     def get_daily_stats(days=30):
-        """Get daily lead statistics for the last N days"""
-        daily_stats = {}
+        """Get daily lead statistics for the last N days (today excluded)"""
+        now = datetime.utcnow()
+        daily_stats = {
+            (now - timedelta(days=i)).strftime('%Y-%m-%d'): {'total': 0, 'new': 0, 'converted': 0, 'conversion_rate': 0}
+            for i in range(days, 0, -1)
+        }
         
-        for i in range(days, 0, -1):
-            date = datetime.utcnow() - timedelta(days=i)
-            date_key = date.strftime('%Y-%m-%d')
-            
-            # Get leads created on this day
-            start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end = date.replace(hour=23, minute=59, second=59, microsecond=999999)
-            
-            day_leads = FacebookLead.query.filter(
-                FacebookLead.created_at.between(start, end)
-            ).all()
-            
-            daily_stats[date_key] = {
-                'total': len(day_leads),
-                'new': len([l for l in day_leads if l.status == 'new']),
-                'converted': len([l for l in day_leads if l.status == 'converted']),
-                'conversion_rate': round(
-                    (len([l for l in day_leads if l.status == 'converted']) / len(day_leads) * 100)
-                    if day_leads else 0, 2
-                )
-            }
+        since = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        for day, status, count in _status_counts('day', since=since):
+            stats = daily_stats.get(day)
+            if stats is None:
+                continue
+            stats['total'] += count
+            if status in ('new', 'converted'):
+                stats[status] += count
         
+        for stats in daily_stats.values():
+            stats['conversion_rate'] = _rate(stats['converted'], stats['total'])
         return daily_stats
     
     @staticmethod
     def get_source_analysis():
         """Analyze leads by source (Facebook form, distributor, etc)"""
-        all_leads = FacebookLead.query.all()
+        names = dict(db.session.query(Distributor.id, Distributor.name))
         
         by_distributor = {}
-        for lead in all_leads:
-            dist_name = lead.distributor.name
-            if dist_name not in by_distributor:
-                by_distributor[dist_name] = {
-                    'total': 0,
-                    'new': 0,
-                    'contacted': 0,
-                    'converted': 0,
-                    'conversion_rate': 0
-                }
-            
-            by_distributor[dist_name]['total'] += 1
-            if lead.status == 'new':
-                by_distributor[dist_name]['new'] += 1
-            elif lead.status == 'contacted':
-                by_distributor[dist_name]['contacted'] += 1
-            elif lead.status == 'converted':
-                by_distributor[dist_name]['converted'] += 1
+        for dist_id, status, count in _status_counts('distributor'):
+            dist = by_distributor.setdefault(names.get(dist_id, str(dist_id)), {
+                'total': 0,
+                'new': 0,
+                'contacted': 0,
+                'converted': 0,
+                'conversion_rate': 0
+            })
+            dist['total'] += count
+            if status in ('new', 'contacted', 'converted'):
+                dist[status] += count
         
         # Calculate rates
         for dist in by_distributor.values():
-            if dist['total'] > 0:
-                dist['conversion_rate'] = round((dist['converted'] / dist['total']) * 100, 2)
+            dist['conversion_rate'] = _rate(dist['converted'], dist['total'])
         
         return by_distributor
     
     @staticmethod
     def get_assignment_analytics():
         """Analyze which staff members are most effective"""
-        all_leads = FacebookLead.query.filter(FacebookLead.assigned_to_id.isnot(None)).all()
+        rows = db.session.query(
+            User.username,
+            func.count(FacebookLead.id),
+            func.sum(case((FacebookLead.status == 'contacted', 1), else_=0)),
+            func.sum(case((FacebookLead.status == 'converted', 1), else_=0)),
+        ).select_from(FacebookLead)\
+            .outerjoin(User, User.id == FacebookLead.assigned_to_id)\
+            .filter(FacebookLead.assigned_to_id.isnot(None))\
+            .group_by(FacebookLead.assigned_to_id, User.username).all()
         
         by_user = {}
-        for lead in all_leads:
-            user_name = lead.assigned_to.username if lead.assigned_to else 'Unassigned'
-            if user_name not in by_user:
-                by_user[user_name] = {
-                    'assigned_count': 0,
-                    'contacted': 0,
-                    'converted': 0,
-                    'conversion_rate': 0,
-                    'avg_response_time': 0
-                }
-            
-            by_user[user_name]['assigned_count'] += 1
-            if lead.status == 'contacted':
-                by_user[user_name]['contacted'] += 1
-            if lead.status == 'converted':
-                by_user[user_name]['converted'] += 1
+        for username, assigned, contacted, converted in rows:
+            user = by_user.setdefault(username or 'Unassigned', {
+                'assigned_count': 0,
+                'contacted': 0,
+                'converted': 0,
+                'conversion_rate': 0,
+                'avg_response_time': 0
+            })
+            user['assigned_count'] += assigned
+            user['contacted'] += int(contacted or 0)
+            user['converted'] += int(converted or 0)
         
         # Calculate rates
         for user in by_user.values():
-            if user['assigned_count'] > 0:
-                user['conversion_rate'] = round(
-                    (user['converted'] / user['assigned_count']) * 100, 2
-                )
+            user['conversion_rate'] = _rate(user['converted'], user['assigned_count'])
         
         return by_user
     
     @staticmethod
     def get_interaction_stats():
         """Get interaction type statistics"""
-        all_interactions = LeadInteraction.query.all()
+        success = func.sum(case((LeadInteraction.result == 'success', 1), else_=0))
+        rows = db.session.query(
+            LeadInteraction.interaction_type, func.count(LeadInteraction.id), success
+        ).group_by(LeadInteraction.interaction_type).all()
         
         interaction_types = {}
-        for interaction in all_interactions:
-            itype = interaction.interaction_type
-            if itype not in interaction_types:
-                interaction_types[itype] = {
-                    'count': 0,
-                    'success': 0,
-                    'failed': 0
-                }
-            
-            interaction_types[itype]['count'] += 1
-            if interaction.result == 'success':
-                interaction_types[itype]['success'] += 1
-            else:
-                interaction_types[itype]['failed'] += 1
+        for itype, count, succeeded in rows:
+            succeeded = int(succeeded or 0)
+            interaction_types[itype] = {
+                'count': count,
+                'success': succeeded,
+                'failed': count - succeeded
+            }
         
         return interaction_types
     
+    @staticmethod
+    def _hours_between(later, earlier):
+        """Dialect-specific SQL expression for (later - earlier) in hours"""
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            return (func.julianday(later) - func.julianday(earlier)) * 24.0
+        if dialect == 'postgresql':
+            return func.extract('epoch', later - earlier) / 3600.0
+        if dialect in ('mysql', 'mariadb'):
+            return func.timestampdiff(db.text('SECOND'), earlier, later) / 3600.0
+        return None
+    
     @staticmethod
     def get_response_time_stats():
         """Calculate average response time (time to first contact)"""
-        leads_with_interactions = FacebookLead.query.filter(
-            FacebookLead.id.in_(
-                db.session.query(LeadInteraction.lead_id).distinct()
-            )
-        ).all()
+        first_contact = db.session.query(
+            LeadInteraction.lead_id.label('lead_id'),
+            func.min(LeadInteraction.created_at).label('first_at')
+        ).group_by(LeadInteraction.lead_id).subquery()
         
-        response_times = []
-        for lead in leads_with_interactions:
-            # Get first interaction
-            first_interaction = LeadInteraction.query.filter_by(
-                lead_id=lead.id
-            ).order_by(LeadInteraction.created_at.asc()).first()
-            
-            if first_interaction:
-                response_time = (first_interaction.created_at - lead.created_at).total_seconds() / 3600
-                response_times.append(response_time)
+        hours = LeadAnalytics._hours_between(first_contact.c.first_at, FacebookLead.created_at)
+        base = db.session.query(FacebookLead).join(first_contact, first_contact.c.lead_id == FacebookLead.id)
         
-        if response_times:
-            avg_response_time = sum(response_times) / len(response_times)
-            min_response_time = min(response_times)
-            max_response_time = max(response_times)
-            
+        if hours is not None:
+            avg_h, min_h, max_h, sample = base.with_entities(
+                func.avg(hours), func.min(hours), func.max(hours), func.count()
+            ).one()
+        else:
+            response_times = [
+                (first_at - created_at).total_seconds() / 3600
+                for created_at, first_at in base.with_entities(FacebookLead.created_at, first_contact.c.first_at)
+            ]
+            sample = len(response_times)
+            avg_h = sum(response_times) / sample if sample else 0
+            min_h = min(response_times, default=0)
+            max_h = max(response_times, default=0)
+        
+        if sample:
             return {
-                'average_hours': round(avg_response_time, 2),
-                'min_hours': round(min_response_time, 2),
-                'max_hours': round(max_response_time, 2),
-                'sample_size': len(response_times)
+                'average_hours': round(float(avg_h), 2),
+                'min_hours': round(float(min_h), 2),
+                'max_hours': round(float(max_h), 2),
+                'sample_size': sample
             }
         
         return {
@@ -1,11 +1,10 @@
 """Email notifications for lead events"""
 
 from flask_mail import Message
-from app import mail
 from app.models.meta_lead import FacebookLead
 from app.models.user import User
 import logging
-from threading import Thread
+from app.utils.email import queue_email
 
 logger = logging.getLogger(__name__)
 
@@ -13,23 +12,9 @@ logger = logging.getLogger(__name__)
 class LeadEmailNotifications:
     """Handle email notifications for lead events"""
     
-    @staticmethod
-    def send_async(app, msg):
-        """Send email asynchronously"""
-        with app.app_context():
-            try:
-                mail.send(msg)
-                logger.info(f"Email sent to {msg.recipients}")
-            except Exception as e:
-                logger.error(f"Email send failed: {str(e)}")
-    
     @staticmethod
     def notify_new_lead(lead: FacebookLead):
         """Notify admin about new high-quality lead"""
-        from app import create_app
-        
-        app = create_app()
-        
         # Get admin users
         admins = User.query.filter(User.role.in_(['admin', 'superadmin'])).all()
         
@@ -95,16 +80,12 @@ class LeadEmailNotifications:
             )
             
             # Send in background thread
-            Thread(target=LeadEmailNotifications.send_async, args=(app, msg)).start()
+            queue_email(msg)
             logger.info(f"New lead notification sent to {admin.email}")
     
     @staticmethod
     def notify_status_change(lead: FacebookLead, old_status: str, new_status: str, changed_by: User):
         """Notify assigned user about status change"""
-        from app import create_app
-        
-        app = create_app()
-        
         # Only notify if lead is assigned
         if not lead.assigned_to or not lead.assigned_to.email:
             return
@@ -148,7 +129,7 @@ class LeadEmailNotifications:
             html=html
         )
         
-        Thread(target=LeadEmailNotifications.send_async, args=(app, msg)).start()
+        queue_email(msg)
         logger.info(f"Status change notification sent to {lead.assigned_to.email}")
     
     @staticmethod
@@ -232,7 +213,7 @@ class LeadEmailNotifications:
                 html=html
             )
             
-            Thread(target=LeadEmailNotifications.send_async, args=(app, msg)).start()
+            queue_email(msg)
             logger.info(f"Daily summary sent to {admin.email}")
 
 
@@ -1,6 +1,8 @@
 """Lead scoring system - automatically evaluate lead quality"""
 
 from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import event, inspect, select, bindparam, case, and_, cast, String
 from app import db
 from app.models.meta_lead import FacebookLead
 import logging
@@ -22,9 +24,17 @@ class LeadScoringEngine:
     
     TOTAL_MAX_SCORE = sum(FACTORS.values())  # 100
     
+    # Fields calculate_score reads; changing one of them (or status) re-scores the lead
+    SCORED_FIELDS = ('email', 'phone', 'form_data', 'created_at', 'lead_created_at', 'status')
+    
     @staticmethod
-    def calculate_score(lead: FacebookLead) -> int:
-        """Calculate lead quality score (0-100)"""
+    def calculate_score(lead: FacebookLead, now: datetime = None) -> int:
+        """Calculate lead quality score (0-100)
+        
+        `lead` can be any object with the lead's scored fields (e.g. a row
+        about to be bulk inserted); a missing created_at counts as now.
+        """
+        now = now or datetime.utcnow()
         score = 0
         
         # Factor 1: Contact information completeness
@@ -34,7 +44,7 @@ class LeadScoringEngine:
             score += LeadScoringEngine.FACTORS['contact_complete'] // 2
         
         # Factor 2: How recent the lead is
-        age_hours = (datetime.utcnow() - lead.created_at).total_seconds() / 3600
+        age_hours = (now - (lead.created_at or now)).total_seconds() / 3600
         if age_hours < 1:
             score += LeadScoringEngine.FACTORS['age']
         elif age_hours < 24:
@@ -42,7 +52,10 @@ class LeadScoringEngine:
         
         # Factor 3: Quick response (lead created within 24h)
         if lead.lead_created_at:
-            lead_age = (datetime.utcnow() - lead.lead_created_at).total_seconds() / 3600
+            lead_created_at = lead.lead_created_at
+            if lead_created_at.tzinfo is not None:
+                lead_created_at = lead_created_at.replace(tzinfo=None) - lead_created_at.utcoffset()
+            lead_age = (now - lead_created_at).total_seconds() / 3600
             if lead_age < 24:
                 score += LeadScoringEngine.FACTORS['quick_response']
         
@@ -61,6 +74,31 @@ class LeadScoringEngine:
         
         return min(score, LeadScoringEngine.TOTAL_MAX_SCORE)
     
+    @staticmethod
+    def next_score_change(lead, now: datetime = None):
+        """When the time-based factors (age, quick_response) next change, or None"""
+        now = now or datetime.utcnow()
+        created_at = lead.created_at or now
+        thresholds = [created_at + timedelta(hours=1), created_at + timedelta(hours=24)]
+        if lead.lead_created_at:
+            lead_created_at = lead.lead_created_at
+            if lead_created_at.tzinfo is not None:
+                lead_created_at = lead_created_at.replace(tzinfo=None) - lead_created_at.utcoffset()
+            thresholds.append(lead_created_at + timedelta(hours=24))
+        upcoming = [t for t in thresholds if t > now]
+        return min(upcoming) if upcoming else None
+    
+    @staticmethod
+    def score_fields(lead, now: datetime = None) -> dict:
+        """Column values to persist for a lead: score, score_level, score_expires_at"""
+        now = now or datetime.utcnow()
+        score = LeadScoringEngine.calculate_score(lead, now)
+        return {
+            'score': score,
+            'score_level': LeadScoringEngine.get_score_level(score),
+            'score_expires_at': LeadScoringEngine.next_score_change(lead, now),
+        }
+    
     @staticmethod
     def get_score_level(score: int) -> str:
         """Get score level label"""
@@ -75,6 +113,10 @@ class LeadScoringEngine:
         else:
             return 'very_low'    # Çok Düşük
     
+    # Score level thresholds for the array path (same cut-offs as get_score_level)
+    LEVEL_BINS = (20, 40, 60, 80)
+    LEVELS = ('very_low', 'low', 'medium', 'good', 'excellent')
+    
     @staticmethod
     def get_score_color(score: int) -> str:
         """Get badge color for score"""
@@ -88,16 +130,124 @@ class LeadScoringEngine:
         }
         return colors.get(level, 'secondary')
     
+    @staticmethod
+    def form_features(form_data_values):
+        """(filled field count, service indicated) arrays from form_data dicts
+        
+        JSON truthiness is Python's, so this is the one per-row pass; the
+        rest of the scoring runs on arrays.
+        """
+        service_fields = ('interested_service', 'service', 'procedure', 'treatment')
+        n = len(form_data_values)
+        filled = np.zeros(n, dtype=np.int64)
+        service = np.zeros(n, dtype=bool)
+        for i, form_data in enumerate(form_data_values):
+            if form_data:
+                filled[i] = sum(1 for v in form_data.values() if v)
+                service[i] = any(form_data.get(f) for f in service_fields)
+        return filled, service
+    
+    @staticmethod
+    def _datetime_array(values):
+        """datetime64[us] array from datetime64 arrays, ISO strings or datetimes (None -> NaT)"""
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'M':
+            return values.astype('datetime64[us]')
+        values = list(values)
+        sample = next((v for v in values if v is not None), None)
+        if sample is None or isinstance(sample, str):
+            # Timestamps selected as text parse in C
+            return np.array(values, dtype='datetime64[us]')
+        epoch = datetime(1970, 1, 1)
+        micro = timedelta(microseconds=1)
+        nat = np.iinfo(np.int64).min
+
+        def to_micros(v):
+            if v is None:
+                return nat
+            if v.tzinfo is not None:
+                v = v.replace(tzinfo=None) - v.utcoffset()
+            return (v - epoch) // micro
+
+        return np.fromiter(map(to_micros, values), dtype=np.int64, count=len(values)).view('datetime64[us]')
+    
+    @staticmethod
+    def score_arrays(has_email, has_phone, created_at, lead_created_at, form_filled, service_indicated,
+                     now: datetime = None):
+        """
+        Vectorized calculate_score over column arrays
+        
+        Args:
+            has_email, has_phone: bool arrays (field present and non-empty)
+            created_at, lead_created_at: datetime64 arrays, or sequences of
+                datetimes / ISO strings (None allowed)
+            form_filled, service_indicated: form_features() output
+        
+        Returns:
+            tuple: (scores int array, score_expires_at datetime64 array, NaT = no further change)
+        """
+        now = now or datetime.utcnow()
+        f = LeadScoringEngine.FACTORS
+        now64 = np.datetime64(now, 'us')
+        hour = np.timedelta64(1, 'h')
+        has_email = np.asarray(has_email, dtype=bool)
+        has_phone = np.asarray(has_phone, dtype=bool)
+        created = LeadScoringEngine._datetime_array(created_at)
+        created = np.where(np.isnat(created), now64, created)
+        lead_created = LeadScoringEngine._datetime_array(lead_created_at)
+        has_lead_time = ~np.isnat(lead_created)
+        
+        # Factor 1: contact completeness
+        score = np.where(has_email & has_phone, f['contact_complete'],
+                         np.where(has_email | has_phone, f['contact_complete'] // 2, 0))
+        
+        # Factor 2: age
+        age = now64 - created
+        score += np.where(age < hour, f['age'], np.where(age < 24 * hour, f['age'] // 2, 0))
+        
+        # Factor 3: quick response
+        score += np.where(has_lead_time & (now64 - lead_created < 24 * hour), f['quick_response'], 0)
+        
+        # Factor 4: service interest
+        score += np.where(np.asarray(service_indicated, dtype=bool), f['service_indicated'], 0)
+        
+        # Factor 5: engagement
+        filled = np.asarray(form_filled)
+        score += np.where(filled >= 3, f['engagement'], np.where(filled >= 1, f['engagement'] // 2, 0))
+        
+        score = np.minimum(score, LeadScoringEngine.TOTAL_MAX_SCORE)
+        
+        # Next threshold still ahead (see next_score_change)
+        never = np.datetime64('NaT', 'us')
+        thresholds = np.stack([
+            created + hour,
+            created + 24 * hour,
+            np.where(has_lead_time, lead_created + 24 * hour, never),
+        ])
+        far = np.datetime64('9999-12-31', 'us')
+        thresholds = np.where(thresholds > now64, thresholds, far)  # NaT compares False
+        expires = thresholds.min(axis=0)
+        expires = np.where(expires == far, never, expires)
+        return score, expires
+    
+    @staticmethod
+    def score_levels(scores):
+        """Score level label per score (array version of get_score_level)"""
+        return np.array(LeadScoringEngine.LEVELS, dtype=object)[
+            np.searchsorted(LeadScoringEngine.LEVEL_BINS, scores, side='right')
+        ]
+    
     @staticmethod
     def batch_score_leads(leads=None):
-        """Calculate scores for all leads or specified ones"""
+        """Stored scores for all leads or specified ones"""
         if leads is None:
-            leads = FacebookLead.query.all()
+            rows = db.session.query(FacebookLead.id, FacebookLead.score).all()
+        else:
+            rows = [(lead.id, lead.score) for lead in leads]
         
         scores = {}
-        for lead in leads:
-            score = LeadScoringEngine.calculate_score(lead)
-            scores[lead.id] = {
+        for lead_id, score in rows:
+            score = score or 0
+            scores[lead_id] = {
                 'score': score,
                 'level': LeadScoringEngine.get_score_level(score),
                 'color': LeadScoringEngine.get_score_color(score)
@@ -108,71 +258,146 @@ class LeadScoringEngine:
     @staticmethod
     def get_top_leads(limit=10, min_score=50):
         """Get top scoring leads"""
-        all_leads = FacebookLead.query.all()
-        
-        scored_leads = [
-            (lead, LeadScoringEngine.calculate_score(lead))
-            for lead in all_leads
-            if LeadScoringEngine.calculate_score(lead) >= min_score
-        ]
-        
-        # Sort by score descending
-        scored_leads.sort(key=lambda x: x[1], reverse=True)
-        
-        return scored_leads[:limit]
+        leads = FacebookLead.query.filter(FacebookLead.score >= min_score)\
+            .order_by(FacebookLead.score.desc(), FacebookLead.id.asc())\
+            .limit(limit).all()
+        return [(lead, lead.score) for lead in leads]
+    
+    @staticmethod
+    def get_score_distribution():
+        """Lead count per score level"""
+        return dict(
+            db.session.query(FacebookLead.score_level, db.func.count(FacebookLead.id))
+            .group_by(FacebookLead.score_level).all()
+        )
     
     @staticmethod
     def get_priority_recommendations():
         """Get lead management recommendations based on scoring"""
-        recommendations = {
-            'high_quality_unassigned': [],
-            'low_quality_contacted': [],
-            'abandoned_high_quality': [],
-        }
-        
-        all_leads = FacebookLead.query.all()
+        now = datetime.utcnow()
+        by_status = lambda status: FacebookLead.query.filter(FacebookLead.status == status)\
+            .order_by(FacebookLead.id.asc())
         
-        for lead in all_leads:
-            score = LeadScoringEngine.calculate_score(lead)
-            
+        recommendations = {
             # High quality leads that haven't been assigned
-            if score >= 70 and lead.status == 'new':
-                recommendations['high_quality_unassigned'].append({
-                    'lead_id': lead.id,
-                    'name': lead.full_name(),
-                    'score': score,
-                    'reason': 'Yüksek kaliteli lead henüz işleme alınmamış'
-                })
+            'high_quality_unassigned': [{
+                'lead_id': lead.id,
+                'name': lead.full_name(),
+                'score': lead.score,
+                'reason': 'Yüksek kaliteli lead henüz işleme alınmamış'
+            } for lead in by_status('new').filter(FacebookLead.score >= 70)],
             
             # Low quality leads that have been contacted
-            if score <= 30 and lead.status == 'contacted':
-                recommendations['low_quality_contacted'].append({
-                    'lead_id': lead.id,
-                    'name': lead.full_name(),
-                    'score': score,
-                    'reason': 'Düşük kaliteli lead - işlem durdurulabilir'
-                })
+            'low_quality_contacted': [{
+                'lead_id': lead.id,
+                'name': lead.full_name(),
+                'score': lead.score,
+                'reason': 'Düşük kaliteli lead - işlem durdurulabilir'
+            } for lead in by_status('contacted').filter(FacebookLead.score <= 30)],
             
-            # High quality leads not contacted in 48 hours
-            if score >= 60 and lead.status == 'assigned':
-                age_hours = (datetime.utcnow() - lead.created_at).total_seconds() / 3600
-                if age_hours > 48:
-                    recommendations['abandoned_high_quality'].append({
-                        'lead_id': lead.id,
-                        'name': lead.full_name(),
-                        'score': score,
-                        'age_hours': int(age_hours),
-                        'reason': 'Yüksek kaliteli lead 48 saattir işleme alınmadı'
-                    })
+            'abandoned_high_quality': [],
+        }
+        
+        # High quality leads not contacted in 48 hours
+        abandoned = by_status('assigned').filter(
+            FacebookLead.score >= 60,
+            FacebookLead.created_at < now - timedelta(hours=48)
+        )
+        for lead in abandoned:
+            age_hours = (now - lead.created_at).total_seconds() / 3600
+            recommendations['abandoned_high_quality'].append({
+                'lead_id': lead.id,
+                'name': lead.full_name(),
+                'score': lead.score,
+                'age_hours': int(age_hours),
+                'reason': 'Yüksek kaliteli lead 48 saattir işleme alınmadı'
+            })
         
         return recommendations
 
 
+# ========== PERSISTED SCORES ==========
+
+@event.listens_for(FacebookLead, 'before_insert')
+def _score_new_lead(mapper, connection, target):
+    for key, value in LeadScoringEngine.score_fields(target).items():
+        setattr(target, key, value)
+
+
+@event.listens_for(FacebookLead, 'before_update')
+def _rescore_changed_lead(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in LeadScoringEngine.SCORED_FIELDS):
+        for key, value in LeadScoringEngine.score_fields(target).items():
+            setattr(target, key, value)
+
+
+def _present(column):
+    return case((and_(column.isnot(None), column != ''), True), else_=False)
+
+
+def rescore_leads(full=False, batch_size=10000):
+    """
+    Recompute stored scores whose time-based factors have changed
+    
+    Each lead stores when its score next decays (`score_expires_at`, only
+    set during its first 24 hours), so the periodic sweep is an index range
+    scan; `full=True` rescores everything. Batches are scored with
+    LeadScoringEngine.score_arrays.
+    
+    Returns:
+        int: Number of leads whose score changed
+    """
+    now = datetime.utcnow()
+    table = FacebookLead.__table__
+    # Timestamps come back as text: numpy parses them far faster than the driver/ORM builds datetimes
+    q = select(
+        table.c.id, _present(table.c.email), _present(table.c.phone), table.c.form_data,
+        cast(table.c.created_at, String), cast(table.c.lead_created_at, String),
+        table.c.score, cast(table.c.score_expires_at, String)
+    ).order_by(table.c.id)
+    if not full:
+        q = q.where(table.c.score_expires_at <= now)
+    stmt = table.update().where(table.c.id == bindparam('lead_id')).values(
+        score=bindparam('score'), score_level=bindparam('score_level'),
+        score_expires_at=bindparam('score_expires_at')
+    )
+    
+    changed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(q.where(table.c.id > last_id).limit(batch_size)).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        ids, has_email, has_phone, form_data, created_at, lead_created_at, old_scores, old_expires = zip(*rows)
+        filled, service = LeadScoringEngine.form_features(form_data)
+        scores, expires = LeadScoringEngine.score_arrays(
+            has_email, has_phone, created_at, lead_created_at, filled, service, now
+        )
+        score_changed = scores != np.asarray(old_scores)
+        old_expires = LeadScoringEngine._datetime_array(old_expires)
+        # Write only rows whose score or next decay time moved
+        dirty = np.flatnonzero(score_changed | ~((expires == old_expires) | (np.isnat(expires) & np.isnat(old_expires))))
+        changed += int(np.count_nonzero(score_changed))
+        if len(dirty):
+            levels = LeadScoringEngine.score_levels(scores[dirty])
+            # datetime64[us].tolist() yields datetimes, None for NaT
+            db.session.execute(stmt, [
+                {'lead_id': ids[i], 'score': int(scores[i]), 'score_level': level, 'score_expires_at': expires_at}
+                for i, level, expires_at in zip(dirty, levels, expires[dirty].tolist())
+            ])
+        db.session.commit()
+    
+    logger.info(f"Lead scores refreshed: {changed} changed")
+    return changed
+
+
 def add_score_to_lead(lead_id):
     """Utility function to add score to a lead in template"""
     lead = FacebookLead.query.get(lead_id)
     if lead:
-        score = LeadScoringEngine.calculate_score(lead)
+        score = lead.score or 0
         return {
             'score': score,
             'level': LeadScoringEngine.get_score_level(score),
@@ -0,0 +1,175 @@
+"""Facebook lead status histogram - one GROUP BY, cached, pushed as deltas
+
+The lead dashboards (facebook_leads.index, /api/stats, the admin list and
+the stats socket event) used to run one COUNT(*) per status over the whole
+table on every page load and polling call. `status_counts()` computes all
+statuses with a single `GROUP BY status`, optionally for one distributor,
+and keeps the result in the app cache for STATS_TTL seconds.
+
+Changes are tracked per transaction as (distributor_id, status) deltas: the
+flush hook sees ORM inserts, status/distributor changes and deletes; Core
+bulk writers (BulkLeadOperations, MetaLeadService.store_leads) report theirs
+through `mark_status_deltas()`. After commit the affected cache entries are
+dropped and the deltas go out as one `stats_delta` event to the
+`leads_dashboard` room of the `/facebook-leads` namespace, so open
+dashboards adjust their counters without polling.
+
+Query.update()/delete() on leads can't be attributed without extra reads;
+they invalidate every cached histogram and the event carries `stale: true`
+so clients refetch /api/stats once.
+
+Invalidation only reaches the cache of the worker that committed. With a
+shared cache backend (redis) every worker sees it at once; with the
+per-process SimpleCache other workers keep serving their own copy, so a
+dashboard polling them can be up to STATS_TTL seconds behind.
+"""
+
+import time
+from collections import Counter
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from app import db, socketio
+from app.models.meta_lead import FacebookLead
+from app.services.lead_analytics import FUNNEL_STATUSES
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATS_TTL = 60
+STATS_NAMESPACE = '/facebook-leads'
+STATS_ROOM = 'leads_dashboard'
+
+_VERSION_KEY = 'lead_status_counts:version'
+
+
+def _cache_key(version, distributor_id):
+    return f'lead_status_counts:{version}:{distributor_id or "all"}'
+
+
+def _version():
+    from app import cache
+    return cache.get(_VERSION_KEY) or 0
+
+
+def count_by_status(distributor_id=None):
+    """{status: count} straight from facebook_leads (one GROUP BY)"""
+    q = db.session.query(FacebookLead.status, func.count(FacebookLead.id))
+    if distributor_id:
+        q = q.filter(FacebookLead.distributor_id == distributor_id)
+    return dict(q.group_by(FacebookLead.status).all())
+
+
+def status_counts(distributor_id=None):
+    """
+    Durum bazında lead sayıları ve 'total' (cache'ten)
+
+    Args:
+        distributor_id: Sadece bu distributor (varsayılan: tümü)
+
+    Returns:
+        dict: {'new': .., 'assigned': .., 'contacted': .., 'converted': .., 'rejected': .., 'total': ..}
+    """
+    from app import cache
+    key = _cache_key(_version(), distributor_id)
+    counts = cache.get(key)
+    if counts is None:
+        counts = dict.fromkeys(FUNNEL_STATUSES, 0)
+        counts['total'] = 0
+        for status, count in count_by_status(distributor_id).items():
+            counts['total'] += count
+            if status:
+                counts[status] = counts.get(status, 0) + count
+        cache.set(key, counts, timeout=STATS_TTL)
+    return counts
+
+
+def _invalidate(distributor_ids, everything=False):
+    from app import cache
+    if everything:
+        cache.set(_VERSION_KEY, time.time_ns(), timeout=0)
+        return
+    version = _version()
+    # One by one: delete_many stops at the first key that isn't cached
+    for distributor_id in distributor_ids | {None}:
+        cache.delete(_cache_key(version, distributor_id))
+
+
+# ========== CHANGE TRACKING ==========
+
+def mark_status_deltas(session, deltas):
+    """Core statements bypass the flush hook; register their {(distributor_id, status): delta} here"""
+    pending = session.info.setdefault('lead_status_deltas', Counter())
+    for key, delta in deltas.items():
+        if delta:
+            pending[key] += delta
+
+
+@event.listens_for(FacebookLead.status, 'set', active_history=True)
+@event.listens_for(FacebookLead.distributor_id, 'set', active_history=True)
+def _keep_previous_value(target, value, oldvalue, initiator):
+    """active_history loads the old value of an expired lead (e.g. one modified
+    after a commit) so the flush hook can see where its count came from"""
+
+
+def _before(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_status_deltas(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, FacebookLead):
+            deltas[(obj.distributor_id, obj.status)] += 1
+    for obj in session.deleted:
+        if isinstance(obj, FacebookLead):
+            deltas[(_before(obj, 'distributor_id'), _before(obj, 'status'))] -= 1
+    for obj in session.dirty:
+        if isinstance(obj, FacebookLead):
+            old = (_before(obj, 'distributor_id'), _before(obj, 'status'))
+            new = (obj.distributor_id, obj.status)
+            if old != new:
+                deltas[old] -= 1
+                deltas[new] += 1
+    if deltas:
+        mark_status_deltas(session, deltas)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _leads_bulk_statement(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if getattr(mapper, 'local_table', None) is FacebookLead.__table__:
+        orm_execute_state.session.info['lead_stats_stale'] = True
+    return None
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_status_deltas(session):
+    deltas = session.info.pop('lead_status_deltas', None) or {}
+    stale = session.info.pop('lead_stats_stale', False)
+    changes = [(distributor_id, status, delta) for (distributor_id, status), delta in deltas.items() if delta]
+    if not changes and not stale:
+        return
+    try:
+        _invalidate({distributor_id for distributor_id, _, _ in changes}, everything=stale)
+    except Exception as e:
+        logger.warning(f"Lead stats invalidation failed: {e}")
+    try:
+        socketio.emit('stats_delta', {
+            'changes': [
+                {'distributor_id': distributor_id, 'status': status, 'delta': delta}
+                for distributor_id, status, delta in changes
+            ],
+            'stale': stale,
+        }, to=STATS_ROOM, namespace=STATS_NAMESPACE)
+    except Exception as e:
+        logger.warning(f"stats_delta event could not be sent: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_status_deltas(session):
+    session.info.pop('lead_status_deltas', None)
+    session.info.pop('lead_stats_stale', None)
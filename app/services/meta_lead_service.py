@@ -1,21 +1,38 @@
 import requests
 import logging
+import calendar
+from types import SimpleNamespace
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime
+from datetime import datetime, timedelta
 from app import db
 from app.models.meta_lead import MetaAPIConfig, FacebookLead, LeadInteraction
+from app.services.lead_analytics import bump_lead_daily_stat, day_for
+from app.services.lead_stats import mark_status_deltas
+from app.services.lead_scoring import LeadScoringEngine
 
 logger = logging.getLogger(__name__)
 
 
+class MetaAPIError(Exception):
+    """Graph API returned an error response"""
+
+
 class MetaLeadService:
     """Service for managing Meta/Facebook lead integration"""
     
     BASE_URL = "https://graph.instagram.com"
+    MAX_PAGES = 500  # Safety stop for runaway `paging.next` chains
+    SINCE_OVERLAP = timedelta(minutes=5)  # Re-read a little; duplicates are ignored on insert
+    INSERT_CHUNK = 500
     
-    def __init__(self, config: MetaAPIConfig):
-        """Initialize service with Meta API config"""
+    def __init__(self, config: MetaAPIConfig, http: Optional[requests.Session] = None):
+        """Initialize service with Meta API config
+        
+        Args:
+            http: Shared requests.Session (default: module-level requests)
+        """
         self.config = config
+        self.http = http or requests
         self.api_url = f"{self.BASE_URL}/{config.api_version}"
         self.access_token = config.access_token
         self.form_id = config.form_id
@@ -30,7 +47,7 @@ class MetaLeadService:
             # Test endpoint
             url = f"{self.api_url}/{self.form_id}"
             params = {'access_token': self.access_token}
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params, timeout=10)
             
             if response.status_code == 200:
                 return True, "Bağlantı başarılı"
@@ -45,32 +62,64 @@ class MetaLeadService:
             logger.error(f"Meta API test hatası: {str(e)}")
             return False, f"Test hatası: {str(e)}"
     
-    def fetch_leads(self, limit: int = 100) -> Tuple[List[Dict], Optional[str]]:
-        """Fetch leads from Meta/Facebook lead form"""
+    def _get(self, url: str, params: Optional[Dict] = None) -> Dict:
+        """GET a Graph API URL, raising MetaAPIError on non-200 responses"""
+        response = self.http.get(url, params=params, timeout=30)
+        if response.status_code != 200:
+            try:
+                error_msg = response.json().get('error', {}).get('message', 'Bilinmeyen hata')
+            except ValueError:
+                error_msg = f'HTTP {response.status_code}'
+            raise MetaAPIError(error_msg)
+        return response.json()
+    
+    def iter_lead_pages(self, limit: int = 100, since: Optional[datetime] = None):
+        """Yield lead pages, following `paging.next` until the form is exhausted
+        
+        Args:
+            limit: Page size requested from the Graph API
+            since: Only leads created after this UTC time (minus SINCE_OVERLAP)
+        """
+        url = f"{self.api_url}/{self.form_id}/leads"
+        params = {
+            'access_token': self.access_token,
+            'limit': limit,
+            'fields': 'id,created_time,field_data'
+        }
+        if since:
+            params['since'] = calendar.timegm((since - self.SINCE_OVERLAP).utctimetuple())
+        
+        for _ in range(self.MAX_PAGES):
+            payload = self._get(url, params)
+            leads_data = payload.get('data', [])
+            if leads_data:
+                yield leads_data
+            
+            # `next` already carries the token, cursor and filters
+            url = (payload.get('paging') or {}).get('next')
+            params = None
+            if not url or not leads_data:
+                return
+        logger.warning(f"Distributor {self.distributor_id}: {self.MAX_PAGES} sayfa sınırına ulaşıldı")
+    
+    def fetch_leads(self, limit: int = 100, since: Optional[datetime] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch all leads (every page) from Meta/Facebook lead form"""
         try:
             if not self.access_token or not self.form_id:
                 logger.warning(f"Distributor {self.distributor_id}: Eksik API bilgileri")
                 return [], "Eksik API bilgileri"
             
-            url = f"{self.api_url}/{self.form_id}/leads"
-            params = {
-                'access_token': self.access_token,
-                'limit': limit,
-                'fields': 'id,created_time,field_data'
-            }
-            
-            response = requests.get(url, params=params, timeout=30)
-            
-            if response.status_code != 200:
-                error_msg = response.json().get('error', {}).get('message', 'Bilinmeyen hata')
-                logger.error(f"Meta API hatası ({self.distributor_id}): {error_msg}")
-                return [], error_msg
-            
-            leads_data = response.json().get('data', [])
+            leads_data = []
+            for page in self.iter_lead_pages(limit, since):
+                leads_data.extend(page)
             logger.info(f"Distributor {self.distributor_id}: {len(leads_data)} lead alındı")
             
             return leads_data, None
         
+        except MetaAPIError as e:
+            error = str(e)
+            logger.error(f"Meta API hatası ({self.distributor_id}): {error}")
+            return [], error
         except requests.exceptions.Timeout:
             error = "API timeout"
             logger.error(f"Meta API timeout ({self.distributor_id}): {error}")
@@ -122,109 +171,174 @@ class MetaLeadService:
             logger.error(f"Lead parse hatası: {str(e)}")
             return {}
     
-    def store_leads(self, leads_data: List[Dict]) -> Tuple[int, List[str]]:
-        """Store leads in database, avoiding duplicates"""
-        stored_count = 0
+    @staticmethod
+    def _parse_created_time(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    
+    def _insert_ignoring_duplicates(self, rows: List[Dict]) -> int:
+        """Bulk insert; rows whose meta_lead_id already exists are skipped by the database"""
+        table = FacebookLead.__table__
+        dialect = db.session.get_bind().dialect.name
+        stored = 0
+        for start in range(0, len(rows), self.INSERT_CHUNK):
+            chunk = rows[start:start + self.INSERT_CHUNK]
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+                stmt = insert(table).values(chunk).on_conflict_do_nothing(index_elements=['meta_lead_id'])
+            elif dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+                stmt = insert(table).values(chunk).on_conflict_do_nothing(index_elements=['meta_lead_id'])
+            elif dialect in ('mysql', 'mariadb'):
+                stmt = table.insert().values(chunk).prefix_with('IGNORE')
+            else:
+                stmt = table.insert().values(chunk)
+            result = db.session.execute(stmt)
+            stored += max(result.rowcount or 0, 0)
+        return stored
+    
+    def store_leads(self, leads_data: List[Dict], commit: bool = True) -> Tuple[int, List[str]]:
+        """Store leads in database, avoiding duplicates
+        
+        One IN query resolves the IDs already stored; the rest go in with a
+        single bulk INSERT ... ON CONFLICT DO NOTHING.
+        
+        Each call runs in a savepoint, so a failing batch leaves the batches
+        already stored in the caller's transaction untouched.
+        
+        Args:
+            commit: False leaves the transaction open for the caller (sync_leads)
+                and re-raises storage errors instead of returning them
+        """
         errors = []
+        rows = {}
+        now = datetime.utcnow()
+        
+        for lead_data in leads_data:
+            parsed = self.parse_lead_data(lead_data)
+            meta_lead_id = parsed.get('meta_lead_id')
+            if not meta_lead_id:
+                errors.append("Meta lead ID bulunamadı")
+                continue
+            rows[meta_lead_id] = {
+                'distributor_id': self.distributor_id,
+                'meta_lead_id': meta_lead_id,
+                'first_name': parsed.get('first_name', ''),
+                'last_name': parsed.get('last_name', ''),
+                'email': parsed.get('email', ''),
+                'phone': parsed.get('phone', ''),
+                'form_data': parsed.get('form_data', {}),
+                'lead_created_at': self._parse_created_time(parsed.get('lead_created_at')),
+                'status': 'new',
+                'created_at': now,
+                'updated_at': now,
+            }
+        
+        if not rows:
+            return 0, errors
         
         try:
-            for lead_data in leads_data:
-                try:
-                    parsed = self.parse_lead_data(lead_data)
-                    
-                    if not parsed.get('meta_lead_id'):
-                        errors.append("Meta lead ID bulunamadı")
-                        continue
-                    
-                    # Check if lead already exists
-                    existing = FacebookLead.query.filter_by(
-                        meta_lead_id=parsed['meta_lead_id']
-                    ).first()
-                    
-                    if existing:
-                        logger.info(f"Lead zaten mevcut: {parsed['meta_lead_id']}")
-                        continue
-                    
-                    # Create new lead
-                    lead_created_at = None
-                    if parsed.get('lead_created_at'):
-                        try:
-                            lead_created_at = datetime.fromisoformat(
-                                parsed['lead_created_at'].replace('Z', '+00:00')
-                            )
-                        except:
-                            pass
-                    
-                    new_lead = FacebookLead(
-                        distributor_id=self.distributor_id,
-                        meta_lead_id=parsed.get('meta_lead_id'),
-                        first_name=parsed.get('first_name', ''),
-                        last_name=parsed.get('last_name', ''),
-                        email=parsed.get('email', ''),
-                        phone=parsed.get('phone', ''),
-                        form_data=parsed.get('form_data', {}),
-                        lead_created_at=lead_created_at,
-                        status='new'
-                    )
-                    
-                    db.session.add(new_lead)
-                    db.session.commit()
-                    stored_count += 1
-                    logger.info(f"Lead kaydedildi: {new_lead.full_name()}")
-                
-                except Exception as e:
-                    db.session.rollback()
-                    error_msg = f"Lead saklama hatası: {str(e)}"
-                    logger.error(error_msg)
-                    errors.append(error_msg)
+            with db.session.begin_nested():
+                existing = {
+                    meta_lead_id for (meta_lead_id,) in db.session.query(FacebookLead.meta_lead_id)
+                    .filter(FacebookLead.meta_lead_id.in_(list(rows)))
+                }
+                new_rows = [row for meta_lead_id, row in rows.items() if meta_lead_id not in existing]
+                # Core insert skips the mapper hook that scores ORM inserts
+                for row in new_rows:
+                    row.update(LeadScoringEngine.score_fields(SimpleNamespace(**row), now))
+                stored_count = self._insert_ignoring_duplicates(new_rows) if new_rows else 0
+                # ...and the hooks that keep the lead rollup current
+                bump_lead_daily_stat(db.session.connection(), self.distributor_id, day_for(now), 'new', stored_count)
+            mark_status_deltas(db.session, {(self.distributor_id, 'new'): stored_count})
+            if commit:
+                db.session.commit()
             
+            skipped = len(rows) - stored_count
+            logger.info(f"Distributor {self.distributor_id}: {stored_count} lead kaydedildi, {skipped} zaten mevcut")
             return stored_count, errors
         
         except Exception as e:
-            logger.error(f"Toplu lead saklama hatası: {str(e)}")
-            return stored_count, errors
+            error_msg = f"Lead saklama hatası: {str(e)}"
+            logger.error(error_msg)
+            if not commit:
+                raise
+            db.session.rollback()
+            errors.append(error_msg)
+            return 0, errors
     
     def sync_leads(self, limit: int = 100) -> Dict:
-        """Complete sync process: fetch and store leads"""
+        """Complete sync process: page through new leads and store them
+        
+        Pages are requested from `last_fetch_time` on and stored in one
+        transaction, one savepoint per page; `last_fetch_time` only advances
+        when every page was read and stored.
+        
+        Args:
+            limit: Graph API page size
+        """
         result = {
             'success': False,
             'fetched': 0,
             'stored': 0,
+            'pages': 0,
             'errors': [],
             'message': ''
         }
+        started_at = datetime.utcnow()
         
         try:
-            # Fetch leads
-            leads_data, error = self.fetch_leads(limit)
-            
-            if error:
-                result['errors'].append(error)
-                result['message'] = error
+            if not self.access_token or not self.form_id:
+                result['errors'].append("Eksik API bilgileri")
+                result['message'] = "Eksik API bilgileri"
                 return result
             
-            result['fetched'] = len(leads_data)
+            fetch_error = None
+            try:
+                for page in self.iter_lead_pages(limit, since=self.config.last_fetch_time):
+                    result['pages'] += 1
+                    result['fetched'] += len(page)
+                    try:
+                        stored, errors = self.store_leads(page, commit=False)
+                    except Exception as e:
+                        # The page's savepoint is gone; earlier pages stay stored
+                        fetch_error = f"Lead saklama hatası: {str(e)}"
+                        break
+                    result['stored'] += stored
+                    result['errors'].extend(errors)
+            except requests.exceptions.Timeout:
+                fetch_error = "API timeout"
+            except (MetaAPIError, requests.exceptions.RequestException) as e:
+                fetch_error = str(e)
             
-            if not leads_data:
-                result['message'] = "Yeni lead yok"
-                result['success'] = True
+            if fetch_error:
+                # Keep what was stored; the next run resumes from the old last_fetch_time
+                logger.error(f"Meta API hatası ({self.distributor_id}): {fetch_error}")
+                result['errors'].append(fetch_error)
+                result['message'] = fetch_error
+                self.config.last_error = fetch_error
+                db.session.commit()
                 return result
             
-            # Store leads
-            stored, errors = self.store_leads(leads_data)
-            result['stored'] = stored
-            result['errors'].extend(errors)
-            result['message'] = f"{stored}/{result['fetched']} lead kaydedildi"
+            if not result['fetched']:
+                result['message'] = "Yeni lead yok"
+            else:
+                result['message'] = f"{result['stored']}/{result['fetched']} lead kaydedildi"
             result['success'] = True
             
             # Update config
-            self.config.last_fetch_time = datetime.utcnow()
-            self.config.last_error = None if not errors else '; '.join(errors[:3])
+            self.config.last_fetch_time = started_at
+            self.config.last_error = None if not result['errors'] else '; '.join(result['errors'][:3])
             db.session.commit()
             
             return result
         
         except Exception as e:
+            db.session.rollback()
             error_msg = f"Sync hatası: {str(e)}"
             logger.error(error_msg)
             result['errors'].append(error_msg)
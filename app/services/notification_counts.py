@@ -0,0 +1,119 @@
+"""Unread notification counter - navbar badge and preview without per-page queries
+
+The context processor used to run a count and a 5-row preview query on
+every rendered page. Each user's (unread count, preview) is now kept in
+process and reused until a notification in the user's scope is created,
+read or deleted.
+
+Scopes follow the visibility rules of `main.notifications`: a user with a
+distributor sees that distributor's notifications plus the global ones
+(distributor_id NULL); a user without a distributor sees everything. A
+session hook collects the scopes touched by a flush and bumps their
+versions in the app cache after commit. With a shared cache backend every
+worker sees the bump at once; with the per-process SimpleCache other
+workers refresh within SUMMARY_TTL seconds.
+"""
+
+import time
+import threading
+from types import SimpleNamespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models.notification import Notification
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TTL = 30
+PREVIEW_SIZE = 5
+_PREVIEW_FIELDS = ('id', 'title', 'message', 'level', 'link_url', 'is_read', 'created_at')
+
+# user_id -> (scope versions, loaded_at, unread count, preview)
+_summaries = {}
+_summaries_lock = threading.Lock()
+
+
+def _scope_keys(distributor_id):
+    """Version keys a notification with this distributor_id invalidates"""
+    scope = f'notifications_version:{distributor_id}' if distributor_id else 'notifications_version:global'
+    return [scope, 'notifications_version:all']
+
+
+def _user_scope_keys(user):
+    if user.distributor_id:
+        return [f'notifications_version:{user.distributor_id}', 'notifications_version:global']
+    return ['notifications_version:all']
+
+
+def _bump(keys):
+    from app import cache
+    stamp = time.time_ns()
+    cache.set_many({key: stamp for key in keys}, timeout=0)
+
+
+def user_notifications_query(user):
+    """Notifications visible to `user`, unread first"""
+    q = Notification.query.order_by(Notification.is_read.asc(), Notification.created_at.desc())
+    if user.distributor_id:
+        q = q.filter(db.or_(Notification.distributor_id == user.distributor_id,
+                            Notification.distributor_id.is_(None)))
+    # Non-admin staff only see targeted or broadcast notifications
+    if not user.is_admin():
+        q = q.filter(db.or_(Notification.user_id == user.id,
+                            Notification.user_id.is_(None)))
+    return q
+
+
+def unread_summary(user):
+    """
+    (unread count, preview) for the navbar
+
+    The preview holds plain snapshots (id, title, message, level, link_url,
+    is_read, created_at) so it can outlive the request that loaded it.
+    """
+    from app import cache
+    versions = tuple(cache.get_many(*_user_scope_keys(user)))
+    cached = _summaries.get(user.id)
+    if cached and cached[0] == versions and time.monotonic() - cached[1] < SUMMARY_TTL:
+        return cached[2], cached[3]
+
+    q = user_notifications_query(user)
+    unread = q.filter(Notification.is_read.is_(False)).count()
+    preview = [
+        SimpleNamespace(**{field: getattr(n, field) for field in _PREVIEW_FIELDS})
+        for n in q.limit(PREVIEW_SIZE).all()
+    ]
+    with _summaries_lock:
+        _summaries[user.id] = (versions, time.monotonic(), unread, preview)
+    return unread, preview
+
+
+def mark_scopes_changed(session, distributor_ids):
+    """Bulk (Core) statements bypass the session hook; register their scopes here"""
+    session.info.setdefault('notification_scopes', set()).update(distributor_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_notification_scopes(session, flush_context):
+    mark_scopes_changed(session, {
+        obj.distributor_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Notification)
+    })
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_notification_scopes(session):
+    scopes = session.info.pop('notification_scopes', None)
+    if not scopes:
+        return
+    try:
+        _bump({key for distributor_id in scopes for key in _scope_keys(distributor_id)})
+    except Exception as e:
+        logger.warning(f"Notification counter invalidation failed: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_notification_scopes(session):
+    session.info.pop('notification_scopes', None)
@@ -0,0 +1,122 @@
+"""Notification dispatcher - bulk insert, socket.io push after commit
+
+`dispatch()` writes one notification row per recipient with a single
+executemany INSERT (whatever the channel), queues the email (one message,
+bounded sender pool) and, for in-app channels, registers a socket.io push. Pushes are sent only after the caller's
+transaction commits, as one `notification` event addressed to all
+recipient rooms (`user_<id>`); the client bumps its badge and prepends the
+item to the navbar dropdown.
+
+Notifications added through the ORM (create_notification) are pushed the
+same way: targeted ones to the user's room, distributor-wide ones to the
+`distributor_<id>` room that every logged-in socket joins on connect.
+"""
+
+from datetime import datetime
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from app import db, socketio
+from app.models.notification import Notification
+from app.models.user import User
+from app.services.notification_counts import mark_scopes_changed
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _payload(title, message, level, ntype, link_url, created_at, notification_id=None):
+    return {
+        'id': notification_id,
+        'title': title,
+        'message': message,
+        'level': level,
+        'ntype': ntype,
+        'link_url': link_url,
+        'created_at': created_at.strftime('%H:%M'),
+    }
+
+
+def _queue_push(session, rooms, payload):
+    if rooms:
+        session.info.setdefault('notification_pushes', []).append((rooms, payload))
+
+
+def dispatch(user_ids, title, message='', link_url=None, level='info', ntype='general',
+             distributor_id=None, created_by=None, channel='in_app'):
+    """
+    Bildirimi alıcı kümesine gönder
+
+    Args:
+        user_ids: Alıcı kullanıcı ID'leri
+        distributor_id: None ise her alıcının kendi distributor'ı
+
+    Returns:
+        int: Oluşturulan bildirim sayısı
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return 0
+    recipients = db.session.query(User.id, User.distributor_id, User.email)\
+        .filter(User.id.in_(user_ids)).all()
+    if not recipients:
+        return 0
+
+    now = datetime.utcnow()
+    # Every channel keeps its row (the notification history); only in-app ones are pushed
+    db.session.execute(insert(Notification), [{
+        'title': title,
+        'message': message,
+        'level': level,
+        'ntype': ntype,
+        'link_url': link_url,
+        'distributor_id': distributor_id or user_distributor_id,
+        'user_id': user_id,
+        'created_by': created_by,
+        'channel': channel,
+        'is_read': False,
+        'created_at': now,
+    } for user_id, user_distributor_id, _ in recipients])
+    # Bulk INSERT bypasses the unit of work: tell the counters explicitly
+    mark_scopes_changed(db.session, {distributor_id or r.distributor_id for r in recipients})
+    if channel in ('in_app', 'both'):
+        _queue_push(db.session, [f'user_{r.id}' for r in recipients],
+                    _payload(title, message, level, ntype, link_url, now))
+
+    emails = [r.email for r in recipients if r.email]
+    if channel in ('email', 'both') and emails:
+        from app.utils.email import send_email
+        try:
+            send_email(subject=title, recipients=emails, text_body=message or title, html_body=None)
+        except Exception as e:
+            logger.warning(f"E-posta bildirimi gönderilemedi: {e}")
+    return len(recipients)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_notification_pushes(session, flush_context):
+    for obj in session.new:
+        if not isinstance(obj, Notification) or obj.channel == 'email':
+            continue
+        if obj.user_id:
+            room = f'user_{obj.user_id}'
+        elif obj.distributor_id:
+            room = f'distributor_{obj.distributor_id}'
+        else:
+            continue
+        _queue_push(session, [room], _payload(obj.title, obj.message, obj.level, obj.ntype,
+                                              obj.link_url, obj.created_at or datetime.utcnow(), obj.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _send_notification_pushes(session):
+    pushes = session.info.pop('notification_pushes', None)
+    for rooms, payload in pushes or ():
+        try:
+            socketio.emit('notification', payload, to=rooms if len(rooms) > 1 else rooms[0])
+        except Exception as e:
+            logger.warning(f"notification event could not be sent: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_notification_pushes(session):
+    session.info.pop('notification_pushes', None)
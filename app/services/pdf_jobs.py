@@ -0,0 +1,414 @@
+"""
+PDF render queue - ReportLab işleri web process'i dışında çalışır
+
+ReportLab CPU-bound olduğu ve GIL'i tuttuğu için işler ayrı process'lerde
+render edilir. Web process'i havuz açıldığında zaten thread'ler çalıştırıyor
+(APScheduler, socket.io, mail, çeviri); böyle bir process'i fork etmek
+çocukları o thread'lerin tuttuğu kilitlerde kilitleyebilir. Bu yüzden
+worker'lar forkserver (yoksa spawn) ile başlar ve initializer'da kendi
+app'lerini kurar. Sonuç dosyası PDF_FOLDER/jobs/<distributor_id>/<job_id>.pdf
+altına yazılır ve iş bittiğinde kullanıcının socket.io odasına `pdf_ready`
+olayı gönderilir. İşin durumu (queued/running/done/failed) yanındaki
+<job_id>.json dosyasında tutulur; böylece durum sorgusu hangi web worker'a
+düşerse düşsün cevaplanır. Süresi dolan işler ve dosyaları zamanlayıcıdan da
+temizlenir (prune_pdf_jobs).
+"""
+import os
+import json
+import uuid
+import atexit
+import pickle
+import shutil
+import time
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app, url_for
+from app import db, socketio
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ('encounter', 'quote', 'hotel', 'catalog')
+
+# Finished jobs (and their files) are kept this long for download
+JOB_RETENTION = timedelta(hours=1)
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+# Flask app of this process: built by _init_worker in render processes,
+# the web app itself for pool threads and completion callbacks
+_app = None
+
+
+class PDFJobError(Exception):
+    """Render job failed or timed out"""
+
+
+class PDFJob:
+    """One queued render; status is derived from its future"""
+
+    def __init__(self, kind, object_id, distributor_id, user_id, path, options):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.object_id = object_id
+        self.distributor_id = distributor_id
+        self.user_id = user_id
+        self.path = path
+        self.options = options
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def status(self):
+        if self.future is None or not self.future.done():
+            return 'running' if self.future is not None and self.future.running() else 'queued'
+        return 'failed' if self.error else 'done'
+
+    def state(self):
+        """Fields kept in the shared status file"""
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'object_id': self.object_id,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'error': self.error,
+        }
+
+    def to_dict(self):
+        data = self.state()
+        if self.status == 'done':
+            data['download_url'] = url_for('api.download_pdf_job', job_id=self.id)
+        return data
+
+
+# ========== SHARED STATUS FILE ==========
+
+def _state_path(path):
+    return f'{os.path.splitext(path)[0]}.json'
+
+
+def _write_state(path, **changes):
+    """Merge `changes` into the job's status file (read by every web worker)"""
+    state_path = _state_path(path)
+    try:
+        state = _read_state(state_path) or {}
+        state.update(changes)
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        tmp_path = f'{state_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+    except OSError as e:
+        logger.warning(f"PDF job status could not be written ({state_path}): {e}")
+
+
+def _read_state(state_path):
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ========== WORKER SIDE ==========
+
+def _worker_config(app):
+    """Picklable config of the web app for the render processes"""
+    config = {}
+    for key, value in app.config.items():
+        if not key.isupper():
+            continue
+        try:
+            pickle.dumps(value)
+        except Exception:
+            continue
+        config[key] = value
+    # Render processes never schedule jobs or open pools of their own
+    config.update(SCHEDULER_ENABLED=False, PDF_WORKERS=0)
+    return config
+
+
+def _init_worker(config):
+    """Render process: build its own app from the parent's config"""
+    global _app
+    from config import Config
+    from app import create_app
+    _app = create_app(type('PDFWorkerConfig', (Config,), config))
+
+
+def _render_encounter(object_id, options):
+    """Returns the render cache's file; _run_job links it instead of writing it again"""
+    from app.services.encounter_bundle import load_encounter_bundle
+    from app.utils.pdf_cache import get_encounter_pdf
+    path, _ = get_encounter_pdf(load_encounter_bundle(object_id))
+    return path
+
+
+def _render_quote(object_id, options):
+    from app.services.encounter_bundle import load_encounter_bundle
+    from app.utils.pdf_generator import QuotePDFGenerator
+    bundle = load_encounter_bundle(object_id)
+    encounter = bundle.encounter
+    pdf_bytes = QuotePDFGenerator(encounter, bundle.distributor, bundle).generate().getvalue()
+    if options.get('email'):
+        from app.utils.email import send_encounter_price_quote
+        send_encounter_price_quote(encounter, pdf_bytes)
+    return pdf_bytes
+
+
+def _render_hotel(object_id, options):
+    from app.models import HotelReservation
+    from app.utils.pdf_generator import HotelReservationPDFGenerator
+    reservation = db.session.get(HotelReservation, object_id)
+    return HotelReservationPDFGenerator(reservation, reservation.distributor).generate().getvalue()
+
+
+def _render_catalog(object_id, options):
+    from app.models import Distributor
+    from app.utils.price_catalog import generate_price_catalog_pdf
+    distributor = db.session.get(Distributor, object_id)
+    return generate_price_catalog_pdf(
+        distributor,
+        currencies=options.get('currencies') or ['USD', 'EUR', 'TRY'],
+        language=options.get('language', 'tr')
+    ).getvalue()
+
+
+_RENDERERS = {
+    'encounter': _render_encounter,
+    'quote': _render_quote,
+    'hotel': _render_hotel,
+    'catalog': _render_catalog,
+}
+
+
+def _run_job(kind, object_id, options, path):
+    """Render one job and write it to `path` (runs in the pool)
+
+    Renderers return PDF bytes, or the path of a file they already wrote
+    (the encounter render cache), which is hard-linked (copied across
+    file systems) rather than written a second time.
+    """
+    _write_state(path, status='running')
+    with _app.app_context():
+        try:
+            result = _RENDERERS[kind](object_id, options)
+        finally:
+            db.session.remove()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if isinstance(result, str):
+        try:
+            os.link(result, tmp_path)
+            # Retention (prune_pdf_jobs) counts from now, not from the cached render
+            os.utime(tmp_path)
+        except OSError:
+            shutil.copyfile(result, tmp_path)
+    else:
+        with open(tmp_path, 'wb') as f:
+            f.write(result)
+    os.replace(tmp_path, path)
+    # Before the future resolves, so pollers never see the file as still running
+    _write_state(path, status='done', finished_at=datetime.utcnow().isoformat())
+    return path
+
+
+# ========== PARENT SIDE ==========
+
+def _get_executor():
+    global _executor, _app
+    with _executor_lock:
+        if _executor is None:
+            _app = current_app._get_current_object()
+            workers = _app.config.get('PDF_WORKERS', 2)
+            if workers:
+                # Never fork the (multithreaded) web process itself
+                methods = multiprocessing.get_all_start_methods()
+                method = 'forkserver' if 'forkserver' in methods else 'spawn'
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context(method),
+                    initializer=_init_worker,
+                    initargs=(_worker_config(_app),)
+                )
+            else:
+                # Disabled: keep rendering off the request thread at least
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf')
+            atexit.register(_executor.shutdown, wait=False)
+        return _executor
+
+
+def _job_finished(job, future):
+    job.finished_at = datetime.utcnow()
+    try:
+        future.result()
+    except Exception as e:
+        job.error = str(e) or e.__class__.__name__
+        logger.error(f"PDF job {job.id} ({job.kind} #{job.object_id}) failed: {job.error}")
+    _write_state(job.path, status=job.status, finished_at=job.finished_at.isoformat(), error=job.error)
+
+    if job.user_id:
+        payload = {'job_id': job.id, 'kind': job.kind, 'object_id': job.object_id, 'status': job.status}
+        if not job.error:
+            with _app.test_request_context():
+                payload['download_url'] = url_for('api.download_pdf_job', job_id=job.id)
+        try:
+            socketio.emit('pdf_ready', payload, to=f'user_{job.user_id}')
+        except Exception as e:
+            logger.warning(f"pdf_ready event could not be sent: {e}")
+
+
+def _prune_jobs():
+    cutoff = datetime.utcnow() - JOB_RETENTION
+    with _jobs_lock:
+        expired = [job for job in _jobs.values() if job.finished_at and job.finished_at < cutoff]
+        for job in expired:
+            _jobs.pop(job.id, None)
+    for job in expired:
+        for path in (job.path, _state_path(job.path)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def prune_pdf_jobs():
+    """
+    Süresi dolan işleri ve dosyalarını sil
+
+    Bu process'in kayıtlarının yanında PDF_FOLDER/jobs altındaki eski
+    dosyaları da siler: başka (ör. boşta kalan ya da yeniden başlayan)
+    worker'ların işleri de temizlenir.
+
+    Returns:
+        int: Silinen dosya sayısı
+    """
+    _prune_jobs()
+    root = os.path.join(current_app.config['PDF_FOLDER'], 'jobs')
+    cutoff = time.time() - JOB_RETENTION.total_seconds()
+    removed = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _valid_job_id(job_id):
+    return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
+
+
+def job_path(distributor_id, job_id):
+    return os.path.join(current_app.config['PDF_FOLDER'], 'jobs', str(distributor_id), f'{job_id}.pdf')
+
+
+def submit_pdf_job(kind, object_id, distributor_id, user_id=None, **options):
+    """
+    Render işini kuyruğa ekle
+
+    Args:
+        kind: 'encounter', 'quote', 'hotel' veya 'catalog'
+        object_id: Encounter/HotelReservation/Distributor ID (yetki kontrolü çağıranda)
+        distributor_id: Sahip distributor
+        user_id: Hazır olduğunda `pdf_ready` gönderilecek kullanıcı
+        options: Renderer seçenekleri (ör. email=True, currencies, language)
+
+    Returns:
+        PDFJob
+    """
+    if kind not in _RENDERERS:
+        raise ValueError(f'Unknown PDF job kind: {kind}')
+    _prune_jobs()
+
+    executor = _get_executor()
+    job = PDFJob(kind, object_id, distributor_id, user_id, None, options)
+    job.path = job_path(distributor_id, job.id)
+    with _jobs_lock:
+        _jobs[job.id] = job
+    _write_state(job.path, **job.state())
+    job.future = executor.submit(_run_job, kind, object_id, options, job.path)
+    job.future.add_done_callback(lambda future: _job_finished(job, future))
+    return job
+
+
+def get_pdf_job(job_id, distributor_id):
+    """Distributor'a ait işi döndür (bilinmiyorsa None)"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job and job.distributor_id == distributor_id:
+        return job
+    return None
+
+
+def pdf_job_state(job_id, distributor_id):
+    """
+    İşin durumu (to_dict biçiminde; bilinmiyorsa None)
+
+    İş başka bir web worker'da kuyruğa alınmış olabilir; o durumda bu
+    process'te kaydı yoktur, durum ortak PDF_FOLDER altındaki dosyadan okunur.
+    """
+    job = get_pdf_job(job_id, distributor_id)
+    if job:
+        return job.to_dict()
+    if not _valid_job_id(job_id):
+        return None
+    path = job_path(distributor_id, job_id)
+    state = _read_state(_state_path(path))
+    if state is None:
+        # Status file already pruned/missing: a finished file still counts
+        if not os.path.exists(path):
+            return None
+        state = {'job_id': job_id, 'status': 'done'}
+    if state.get('status') == 'done':
+        if not os.path.exists(path):
+            return None
+        state['download_url'] = url_for('api.download_pdf_job', job_id=job_id)
+    return state
+
+
+def finished_job_path(job_id, distributor_id):
+    """Bitmiş işin dosyası (hangi web worker'da kuyruğa alındığından bağımsız)"""
+    job = get_pdf_job(job_id, distributor_id)
+    if job:
+        return job.path if job.status == 'done' and os.path.exists(job.path) else None
+    if _valid_job_id(job_id):
+        path = job_path(distributor_id, job_id)
+        state = _read_state(_state_path(path))
+        if (state is None or state.get('status') == 'done') and os.path.exists(path):
+            return path
+    return None
+
+
+def render_and_wait(kind, object_id, distributor_id, timeout=None, **options):
+    """
+    Senkron indirme route'ları için: işi kuyruğa ekle ve sonucunu bekle
+
+    Render yine ayrı process'te olur; istek thread'i sadece bekler.
+
+    Returns:
+        str: PDF dosya yolu
+    """
+    job = submit_pdf_job(kind, object_id, distributor_id, **options)
+    timeout = timeout or current_app.config.get('PDF_JOB_TIMEOUT', 120)
+    try:
+        job.future.result(timeout=timeout)
+    except FutureTimeout:
+        raise PDFJobError(f'PDF render timed out after {timeout}s')
+    except Exception as e:
+        raise PDFJobError(str(e)) from e
+    return job.path
@@ -0,0 +1,289 @@
+"""Query-plan audit - `flask db-audit`
+
+Replays the app's hot queries (tenant lists, patient timelines, module rows
+by encounter, lead lists, journey and availability lookups) under the
+database's EXPLAIN and reports every full table scan.
+
+Runs inside one transaction that is always rolled back: it first seeds
+synthetic rows into the audited tables (and the parents their foreign keys
+need), refreshes planner statistics with ANALYZE, then explains each query.
+
+- SQLite: `EXPLAIN QUERY PLAN`; any `SCAN <table>` step is a full scan,
+  including a walk of a whole index (`SCAN t USING INDEX ...`).
+- PostgreSQL: `EXPLAIN (ANALYZE, FORMAT JSON)` with seq scans disabled for
+  the transaction, so a `Seq Scan` node means no index can serve the query
+  (rather than the planner preferring a scan on a small seeded table).
+"""
+
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+import json
+import re
+from sqlalchemy import select, func, insert, Integer, Boolean, Float, Numeric, DateTime, Date, Time, JSON, Enum
+from app import db
+from app.models import (
+    Patient, Encounter, Message, CommunicationLog, HotelReservation, FacebookLead,
+    Appointment, Document, PatientJourney, HairAnnotation, HairPatternSelection,
+    DentalProcedure, EyeRefraction, EyeTreatmentSelection, AestheticProcedure,
+    BariatricSurgery, IVFTreatment, CheckUpPackage, CheckUpTest, PatientFeedback,
+    TicketReply, PatientDocument,
+)
+
+AuditResult = namedtuple('AuditResult', 'name full_scans plan duration_ms')
+
+_MODULE_MODELS = (
+    HairAnnotation, HairPatternSelection, DentalProcedure, EyeRefraction, EyeTreatmentSelection,
+    AestheticProcedure, BariatricSurgery, IVFTreatment, CheckUpPackage, PatientFeedback,
+)
+
+# Parent tables (distributors, users...) get this share of the seeded rows
+_PARENT_RATIO = 50
+_SEED_EPOCH = datetime(2020, 1, 1)
+
+
+def hot_queries(ids):
+    """
+    (name, statement) pairs mirroring the routes' hot paths
+
+    Args:
+        ids: {'distributor': .., 'patient': .., 'encounter': .., 'user': .., 'checkup': .., 'ticket': ..}
+    """
+    d, p, e = ids['distributor'], ids['patient'], ids['encounter']
+    window = (_SEED_EPOCH, _SEED_EPOCH + timedelta(days=7))
+    queries = [
+        ('patients: tenant list, newest first',
+         select(Patient).where(Patient.distributor_id == d).order_by(Patient.created_at.desc()).limit(20)),
+        ('patients: picker by name',
+         select(Patient).where(Patient.distributor_id == d).order_by(Patient.first_name)),
+        ('encounters: dashboard recent',
+         select(Encounter).where(Encounter.distributor_id == d).order_by(Encounter.created_at.desc()).limit(5)),
+        ('encounters: export by date',
+         select(Encounter).where(Encounter.distributor_id == d).order_by(Encounter.date.desc())),
+        ('encounters: patient timeline',
+         select(Encounter).where(Encounter.patient_id == p).order_by(Encounter.date.desc())),
+        ('messages: message center',
+         select(Message).where(Message.distributor_id == d).order_by(Message.created_at.desc())),
+        ('messages: conversation',
+         select(Message).where(Message.patient_id == p).order_by(Message.created_at.desc())),
+        ('communication_logs: tenant history',
+         select(CommunicationLog).where(CommunicationLog.distributor_id == d)
+         .order_by(CommunicationLog.created_at.desc())),
+        ('communication_logs: patient history',
+         select(CommunicationLog).where(CommunicationLog.patient_id == p)
+         .order_by(CommunicationLog.created_at.desc())),
+        ('hotel_reservations: patient detail',
+         select(HotelReservation).where(HotelReservation.patient_id == p)
+         .order_by(HotelReservation.check_in.desc())),
+        ('hotel_reservations: tenant list',
+         select(HotelReservation).where(HotelReservation.distributor_id == d)
+         .order_by(HotelReservation.created_at.desc()).limit(20)),
+        ('facebook_leads: by status',
+         select(FacebookLead).where(FacebookLead.status == 'new').order_by(FacebookLead.created_at.desc()).limit(25)),
+        ('facebook_leads: status count',
+         select(func.count()).select_from(FacebookLead).where(FacebookLead.status == 'new')),
+        ('facebook_leads: by tenant',
+         select(FacebookLead).where(FacebookLead.distributor_id == d)
+         .order_by(FacebookLead.created_at.desc()).limit(25)),
+        ('facebook_leads: assigned to user',
+         select(FacebookLead).where(FacebookLead.assigned_to_id == ids['user'], FacebookLead.status == 'assigned')),
+        ('documents: patient detail',
+         select(Document).where(Document.patient_id == p).order_by(Document.uploaded_at.desc()).limit(10)),
+        ('patient_documents: by patient',
+         select(PatientDocument).where(PatientDocument.patient_id == p)),
+        ('patient_journeys: keyset list',
+         select(PatientJourney).where(PatientJourney.distributor_id == d)
+         .order_by(PatientJourney.arrival_date.desc(), PatientJourney.id.desc()).limit(50)),
+        ('appointments: doctor window',
+         select(Appointment).where(Appointment.distributor_id == d, Appointment.doctor_name == 'doctor_name-0',
+                                   Appointment.start_time >= window[0], Appointment.start_time < window[1])),
+        ('appointments: room window',
+         select(Appointment).where(Appointment.distributor_id == d, Appointment.room_number == 'room_number-0',
+                                   Appointment.start_time >= window[0], Appointment.start_time < window[1])),
+        ('checkup_tests: by package',
+         select(CheckUpTest).where(CheckUpTest.checkup_id == ids['checkup'])),
+        ('ticket_replies: by ticket',
+         select(TicketReply).where(TicketReply.ticket_id == ids['ticket'])),
+    ]
+    queries += [
+        (f'{model.__tablename__}: by encounter', select(model).where(model.encounter_id == e))
+        for model in _MODULE_MODELS
+    ]
+    return queries
+
+
+def audited_tables():
+    """Tables the hot queries read"""
+    tables = {model.__table__ for model in _MODULE_MODELS}
+    tables.update(model.__table__ for model in (
+        Patient, Encounter, Message, CommunicationLog, HotelReservation, FacebookLead, Document,
+        PatientDocument, PatientJourney, Appointment, CheckUpTest, TicketReply,
+    ))
+    return tables
+
+
+# ========== SEEDING ==========
+
+def _index_columns(table):
+    return {column.name for index in table.indexes for column in index.columns}
+
+
+def _tables_to_seed(tables):
+    """Audited tables plus the parents of their seeded foreign keys, parents first"""
+    needed = set()
+
+    def visit(table):
+        if table in needed:
+            return
+        needed.add(table)
+        indexed = _index_columns(table)
+        for column in table.columns:
+            if column.foreign_keys and (not column.nullable or column.name in indexed):
+                for fk in column.foreign_keys:
+                    if fk.column.table is not table:
+                        visit(fk.column.table)
+
+    for table in tables:
+        visit(table)
+    return [table for table in db.metadata.sorted_tables if table in needed]
+
+
+def _fake_value(column, i, seeded):
+    if column.foreign_keys:
+        parent_ids = seeded.get(next(iter(column.foreign_keys)).column.table.name)
+        return parent_ids[i % len(parent_ids)] if parent_ids else None
+    column_type = column.type
+    if isinstance(column_type, Boolean):
+        return i % 2 == 0
+    if isinstance(column_type, Integer):
+        return i
+    if isinstance(column_type, (Float, Numeric)):
+        return float(i)
+    if isinstance(column_type, DateTime):
+        return _SEED_EPOCH + timedelta(minutes=37 * i)
+    if isinstance(column_type, Date):
+        return (_SEED_EPOCH + timedelta(days=i % 730)).date()
+    if isinstance(column_type, Time):
+        return time(i % 24, 0)
+    if isinstance(column_type, Enum):
+        return column_type.enums[0]
+    if isinstance(column_type, JSON):
+        return {}
+    value = f'{column.name}-{i}'
+    length = getattr(column_type, 'length', None)
+    return value[-length:] if length else value
+
+
+def _seed_table(connection, table, count, seeded):
+    primary_key = list(table.primary_key.columns)
+    if len(primary_key) != 1 or not isinstance(primary_key[0].type, Integer):
+        return []
+    pk = primary_key[0]
+    start = (connection.execute(select(func.max(pk))).scalar() or 0) + 1
+    indexed = _index_columns(table)
+    columns = [
+        column for column in table.columns
+        if column is not pk and (
+            (not column.nullable and column.default is None and column.server_default is None)
+            or column.name in indexed
+        )
+    ]
+    rows = [
+        {pk.name: start + i, **{column.name: _fake_value(column, start + i, seeded) for column in columns}}
+        for i in range(count)
+    ]
+    connection.execute(insert(table), rows)
+    return [row[pk.name] for row in rows]
+
+
+def seed(connection, rows):
+    """Insert `rows` synthetic rows per audited table; returns {table name: ids}"""
+    audited = audited_tables()
+    seeded = {}
+    for table in _tables_to_seed(audited):
+        count = rows if table in audited else max(2, rows // _PARENT_RATIO)
+        seeded[table.name] = _seed_table(connection, table, count, seeded)
+    return seeded
+
+
+# ========== EXPLAIN ==========
+
+_SQLITE_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+def _explain_sqlite(connection, sql):
+    plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+    full_scans = []
+    for step in plan:
+        # SEARCH = index lookup; SCAN = every row, in table or index order
+        match = _SQLITE_FULL_SCAN.match(step)
+        if match:
+            full_scans.append(match.group(1))
+    return full_scans, plan, None
+
+
+def _explain_postgresql(connection, sql):
+    raw = connection.exec_driver_sql(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}').scalar()
+    document = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    full_scans, plan = [], []
+
+    def walk(node, depth):
+        relation = node.get('Relation Name')
+        plan.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else '')
+                    + (f" using {node['Index Name']}" if node.get('Index Name') else ''))
+        if node['Node Type'] == 'Seq Scan' and relation:
+            full_scans.append(relation)
+        for child in node.get('Plans', ()):
+            walk(child, depth + 1)
+
+    walk(document['Plan'], 0)
+    return full_scans, plan, document.get('Execution Time')
+
+
+_EXPLAINERS = {
+    'sqlite': _explain_sqlite,
+    'postgresql': _explain_postgresql,
+}
+
+
+def _first(seeded, table, default=1):
+    ids = seeded.get(table)
+    return ids[0] if ids else default
+
+
+def run_audit(seed_rows=1000):
+    """
+    Seed, explain every hot query, roll back
+
+    Returns:
+        list: AuditResult per query
+    """
+    dialect = db.engine.dialect
+    explain = _EXPLAINERS.get(dialect.name)
+    if explain is None:
+        raise ValueError(f'db-audit does not support the {dialect.name} dialect')
+
+    results = []
+    with db.engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            seeded = seed(connection, seed_rows) if seed_rows else {}
+            for table in audited_tables():
+                connection.exec_driver_sql(f'ANALYZE {table.name}')
+            if dialect.name == 'postgresql':
+                connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            ids = {
+                'distributor': _first(seeded, 'distributors'),
+                'patient': _first(seeded, 'patients'),
+                'encounter': _first(seeded, 'encounters'),
+                'user': _first(seeded, 'users'),
+                'checkup': _first(seeded, 'checkup_packages'),
+                'ticket': _first(seeded, 'support_tickets'),
+            }
+            for name, statement in hot_queries(ids):
+                # Only our own ids and constants are bound: render them inline
+                sql = statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}).string
+                full_scans, plan, duration = explain(connection, sql)
+                results.append(AuditResult(name, full_scans, plan, duration))
+        finally:
+            transaction.rollback()
+    return results
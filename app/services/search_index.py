@@ -0,0 +1,407 @@
+"""Full-text search index for global search (patients, encounters, documents, appointments)
+
+The index lives next to the regular tables and is fed by a session hook, so
+`main.global_search` runs one ranked query instead of four ILIKE scans.
+
+Backends:
+    - SQLite: FTS5 virtual table (`search_index`) with the trigram tokenizer,
+      so any fragment of 3+ characters matches (phone digits, "ilma" in
+      "yilmaz"), bm25 ranking
+    - PostgreSQL: `search_documents` table with a tsvector GIN index plus a
+      pg_trgm index for substring and typo matches
+    - anything else: ILIKE over the same denormalized table
+
+All text is folded with `fold_text()` before it is indexed or queried, which
+makes matching case- and diacritic-insensitive for Turkish (ı/İ→i, ş→s, ğ→g,
+ç→c, ö→o, ü→u).
+"""
+
+import re
+import unicodedata
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+from app import db
+from app.models.patient import Patient
+from app.models.encounter import Encounter
+from app.models.document import Document
+from app.models.appointment import Appointment
+import logging
+
+logger = logging.getLogger(__name__)
+
+# entity_type -> (model, type code used for SQLite rowids)
+ENTITY_TYPES = {
+    'patient': (Patient, 1),
+    'encounter': (Encounter, 2),
+    'document': (Document, 3),
+    'appointment': (Appointment, 4),
+}
+MODEL_TYPES = {model: name for name, (model, _) in ENTITY_TYPES.items()}
+
+# global_search category -> entity_type
+CATEGORY_TYPES = {
+    'patients': 'patient',
+    'encounters': 'encounter',
+    'documents': 'document',
+    'appointments': 'appointment',
+}
+
+_TURKISH_FOLD = str.maketrans({
+    'ı': 'i', 'İ': 'i', 'I': 'i',
+    'ş': 's', 'Ş': 's',
+    'ğ': 'g', 'Ğ': 'g',
+    'ç': 'c', 'Ç': 'c',
+    'ö': 'o', 'Ö': 'o',
+    'ü': 'u', 'Ü': 'u',
+})
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold_text(value):
+    """Lowercase and strip diacritics (Turkish-aware) for indexing and querying"""
+    if not value:
+        return ''
+    value = str(value).translate(_TURKISH_FOLD)
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(c for c in value if not unicodedata.combining(c))
+    return value.lower()
+
+
+def tokenize(value):
+    return _TOKEN_RE.findall(fold_text(value))
+
+
+# entity_type -> (title columns, body columns)
+_FIELDS = {
+    'patient': (('first_name', 'last_name'), ('phone', 'email', 'passport_number')),
+    'encounter': (('status',), ('note',)),
+    'document': (('title',), ('description', 'filename', 'tags')),
+    'appointment': (('title',), ('description', 'doctor_name')),
+}
+
+
+def _document(entity_type, row):
+    title_fields, body_fields = _FIELDS[entity_type]
+    title = fold_text(' '.join(getattr(row, name) or '' for name in title_fields)).strip()
+    body = ' '.join([title] + [fold_text(getattr(row, name)) for name in body_fields if getattr(row, name)])
+    return row.distributor_id, title, body
+
+
+def document_for(obj):
+    """(distributor_id, title, body) indexed for a model instance"""
+    entity_type = MODEL_TYPES.get(type(obj))
+    if entity_type is None:
+        return None
+    return _document(entity_type, obj)
+
+
+def _like_pattern(token):
+    """%token% for LIKE ... ESCAPE '\\' (tokens are \\w+, so only _ needs escaping)"""
+    return '%' + token.replace('_', '\\_') + '%'
+
+
+class SearchBackend:
+    """Storage/query strategy for one database dialect"""
+
+    def create_schema(self, connection):
+        raise NotImplementedError
+
+    def drop_schema(self, connection):
+        raise NotImplementedError
+
+    def upsert(self, connection, entity_type, entity_id, distributor_id, title, body):
+        raise NotImplementedError
+
+    def remove(self, connection, entity_type, entity_id):
+        raise NotImplementedError
+
+    def clear(self, connection):
+        raise NotImplementedError
+
+    def search(self, connection, distributor_id, query, entity_type=None, limit=20):
+        """Return [(entity_type, entity_id), ...] best match first"""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 trigram table; rowid = entity_id * 8 + type code so updates hit the rowid index"""
+
+    # Text is folded before indexing, so the tokenizer needs no diacritic handling
+    SCHEMA = ("CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+              "kind UNINDEXED, tenant UNINDEXED, title, body, tokenize = 'trigram')")
+
+    def create_schema(self, connection):
+        connection.execute(text(self.SCHEMA))
+
+    def drop_schema(self, connection):
+        connection.execute(text("DROP TABLE IF EXISTS search_index"))
+
+    @staticmethod
+    def _rowid(entity_type, entity_id):
+        return int(entity_id) * 8 + ENTITY_TYPES[entity_type][1]
+
+    def upsert(self, connection, entity_type, entity_id, distributor_id, title, body):
+        rowid = self._rowid(entity_type, entity_id)
+        connection.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), {'rowid': rowid})
+        connection.execute(text(
+            "INSERT INTO search_index (rowid, kind, tenant, title, body) "
+            "VALUES (:rowid, :kind, :tenant, :title, :body)"
+        ), {'rowid': rowid, 'kind': entity_type, 'tenant': f't{distributor_id}',
+            'title': title, 'body': body})
+
+    def remove(self, connection, entity_type, entity_id):
+        connection.execute(text("DELETE FROM search_index WHERE rowid = :rowid"),
+                           {'rowid': self._rowid(entity_type, entity_id)})
+
+    def clear(self, connection):
+        connection.execute(text("DELETE FROM search_index"))
+
+    def search(self, connection, distributor_id, query, entity_type=None, limit=20):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Every token must occur somewhere in the row. Trigrams match fragments
+        # of 3+ characters; shorter tokens are checked with LIKE on the hits.
+        params = {'tenant': f't{distributor_id}', 'limit': limit}
+        where = ["tenant = :tenant"]
+        phrases = ' AND '.join('"{}"'.format(t) for t in tokens if len(t) >= 3)
+        if phrases:
+            where.append("search_index MATCH :match")
+            params['match'] = phrases
+        for i, token in enumerate(t for t in tokens if len(t) < 3):
+            where.append(f"body LIKE :short{i} ESCAPE '\\'")
+            params[f'short{i}'] = _like_pattern(token)
+        if entity_type:
+            where.append("kind = :kind")
+            params['kind'] = entity_type
+        order = "bm25(search_index, 0.0, 0.0, 10.0, 1.0)" if phrases else "rowid DESC"
+        rows = connection.execute(text(
+            f"SELECT kind, rowid FROM search_index WHERE {' AND '.join(where)} "
+            f"ORDER BY {order} LIMIT :limit"
+        ), params).all()
+        return [(kind, rowid // 8) for kind, rowid in rows]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """tsvector (prefix tsquery) ranking; pg_trgm serves substring (LIKE) and fuzzy (%) hits"""
+
+    def create_schema(self, connection):
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "entity_type VARCHAR(20) NOT NULL, "
+            "entity_id INTEGER NOT NULL, "
+            "distributor_id INTEGER, "
+            "title TEXT, "
+            "body TEXT, "
+            "tsv TSVECTOR, "
+            "PRIMARY KEY (entity_type, entity_id))"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)"))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_trgm ON search_documents "
+            "USING GIN (body gin_trgm_ops)"))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_distributor ON search_documents (distributor_id)"))
+
+    def drop_schema(self, connection):
+        connection.execute(text("DROP TABLE IF EXISTS search_documents"))
+
+    def upsert(self, connection, entity_type, entity_id, distributor_id, title, body):
+        connection.execute(text(
+            "INSERT INTO search_documents (entity_type, entity_id, distributor_id, title, body, tsv) "
+            "VALUES (:entity_type, :entity_id, :distributor_id, :title, :body, "
+            "setweight(to_tsvector('simple', :title), 'A') || setweight(to_tsvector('simple', :body), 'B')) "
+            "ON CONFLICT (entity_type, entity_id) DO UPDATE SET "
+            "distributor_id = EXCLUDED.distributor_id, title = EXCLUDED.title, "
+            "body = EXCLUDED.body, tsv = EXCLUDED.tsv"
+        ), {'entity_type': entity_type, 'entity_id': entity_id,
+            'distributor_id': distributor_id, 'title': title, 'body': body})
+
+    def remove(self, connection, entity_type, entity_id):
+        connection.execute(text(
+            "DELETE FROM search_documents WHERE entity_type = :entity_type AND entity_id = :entity_id"
+        ), {'entity_type': entity_type, 'entity_id': entity_id})
+
+    def clear(self, connection):
+        connection.execute(text("TRUNCATE search_documents"))
+
+    def search(self, connection, distributor_id, query, entity_type=None, limit=20):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        params = {
+            'tsquery': ' & '.join(f'{t}:*' for t in tokens),
+            'raw': ' '.join(tokens),
+            'distributor_id': distributor_id,
+            'limit': limit,
+        }
+        substring = []
+        for i, token in enumerate(tokens):
+            substring.append(f"body LIKE :t{i} ESCAPE '\\'")
+            params[f't{i}'] = _like_pattern(token)
+        sql = (
+            "SELECT entity_type, entity_id FROM search_documents, "
+            "to_tsquery('simple', :tsquery) AS q "
+            f"WHERE distributor_id = :distributor_id AND (tsv @@ q OR body % :raw OR ({' AND '.join(substring)})) "
+        )
+        if entity_type:
+            sql += "AND entity_type = :entity_type "
+            params['entity_type'] = entity_type
+        sql += "ORDER BY ts_rank(tsv, q) + similarity(body, :raw) DESC LIMIT :limit"
+        return [tuple(row) for row in connection.execute(text(sql), params).all()]
+
+
+class LikeSearchBackend(PostgresSearchBackend):
+    """Portable fallback: same denormalized table, ILIKE matching, no ranking index"""
+
+    def create_schema(self, connection):
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "entity_type VARCHAR(20) NOT NULL, "
+            "entity_id INTEGER NOT NULL, "
+            "distributor_id INTEGER, "
+            "title TEXT, "
+            "body TEXT, "
+            "PRIMARY KEY (entity_type, entity_id))"
+        ))
+
+    def upsert(self, connection, entity_type, entity_id, distributor_id, title, body):
+        self.remove(connection, entity_type, entity_id)
+        connection.execute(text(
+            "INSERT INTO search_documents (entity_type, entity_id, distributor_id, title, body) "
+            "VALUES (:entity_type, :entity_id, :distributor_id, :title, :body)"
+        ), {'entity_type': entity_type, 'entity_id': entity_id,
+            'distributor_id': distributor_id, 'title': title, 'body': body})
+
+    def clear(self, connection):
+        connection.execute(text("DELETE FROM search_documents"))
+
+    def search(self, connection, distributor_id, query, entity_type=None, limit=20):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        sql = "SELECT entity_type, entity_id FROM search_documents WHERE distributor_id = :distributor_id "
+        params = {'distributor_id': distributor_id, 'limit': limit}
+        for i, token in enumerate(tokens):
+            sql += f"AND body LIKE :t{i} ESCAPE '\\' "
+            params[f't{i}'] = _like_pattern(token)
+        if entity_type:
+            sql += "AND entity_type = :entity_type "
+            params['entity_type'] = entity_type
+        sql += "LIMIT :limit"
+        return [tuple(row) for row in connection.execute(text(sql), params).all()]
+
+
+_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(dialect_name):
+    return _BACKENDS.get(dialect_name, LikeSearchBackend)()
+
+
+# ========== INDEX MAINTENANCE ==========
+
+def index_object(connection, obj, backend=None):
+    backend = backend or get_backend(connection.dialect.name)
+    entity_type = MODEL_TYPES[type(obj)]
+    distributor_id, title, body = document_for(obj)
+    backend.upsert(connection, entity_type, obj.id, distributor_id, title, body)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    """Mirror inserts/updates/deletes of searchable rows into the index"""
+    changed = [o for o in list(session.new) + list(session.dirty) if type(o) in MODEL_TYPES]
+    deleted = [o for o in session.deleted if type(o) in MODEL_TYPES]
+    if not changed and not deleted:
+        return
+    connection = session.connection()
+    backend = get_backend(connection.dialect.name)
+    for obj in changed:
+        if obj.id is not None:
+            index_object(connection, obj, backend)
+    for obj in deleted:
+        backend.remove(connection, MODEL_TYPES[type(obj)], obj.id)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_schema(target, connection, **kw):
+    """db.create_all() also creates the index (migrations do the same)"""
+    get_backend(connection.dialect.name).create_schema(connection)
+
+
+def populate_search_index(connection, backend=None, batch_size=1000):
+    """Index every searchable row from plain column SELECTs (also used by the
+    migration that creates the index). Returns the number of indexed rows."""
+    backend = backend or get_backend(connection.dialect.name)
+    total = 0
+    for entity_type, (model, _) in ENTITY_TYPES.items():
+        table = model.__table__
+        title_fields, body_fields = _FIELDS[entity_type]
+        columns = [table.c[name] for name in ('id', 'distributor_id') + title_fields + body_fields]
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                select(*columns).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for row in rows:
+                distributor_id, title, body = _document(entity_type, row)
+                backend.upsert(connection, entity_type, row.id, distributor_id, title, body)
+            total += len(rows)
+            last_id = rows[-1].id
+    return total
+
+
+def rebuild_search_index(batch_size=1000):
+    """Re-index every searchable row. Returns the number of indexed rows."""
+    connection = db.session.connection()
+    backend = get_backend(connection.dialect.name)
+    backend.create_schema(connection)
+    backend.clear(connection)
+    total = populate_search_index(connection, backend, batch_size)
+    db.session.commit()
+    logger.info(f"Search index rebuilt: {total} rows")
+    return total
+
+
+# ========== QUERY ==========
+
+def search(distributor_id, query, category='all', limit=20):
+    """Ranked global search for a distributor.
+
+    Returns:
+        dict: {'patients': [...], 'encounters': [...], 'documents': [...], 'appointments': [...]}
+        with model instances in rank order.
+    """
+    results = {category_name: [] for category_name in CATEGORY_TYPES}
+    entity_type = CATEGORY_TYPES.get(category)
+    if category != 'all' and not entity_type:
+        return results
+
+    connection = db.session.connection()
+    backend = get_backend(connection.dialect.name)
+    hits = backend.search(connection, distributor_id, query, entity_type,
+                          limit=limit if entity_type else limit * len(ENTITY_TYPES))
+
+    ids_by_type = {}
+    for hit_type, hit_id in hits:
+        ids_by_type.setdefault(hit_type, []).append(hit_id)
+
+    for category_name, hit_type in CATEGORY_TYPES.items():
+        ids = ids_by_type.get(hit_type, [])[:limit]
+        if not ids:
+            continue
+        model = ENTITY_TYPES[hit_type][0]
+        # Primary-key lookups; the distributor filter guards against a stale index
+        objs = {o.id: o for o in model.query.filter(model.id.in_(ids),
+                                                   model.distributor_id == distributor_id)}
+        results[category_name] = [objs[i] for i in ids if i in objs]
+    return results
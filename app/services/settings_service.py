@@ -0,0 +1,107 @@
+"""
+App settings service - AppSettings okumaları için sürümlü cache
+
+Her sayfa görünümü (context processor, modül guard'ları, muayene formları)
+ayarları okur; satır süreç içinde salt-okunur bir anlık görüntü olarak
+tutulur ve istek başına flask.g'de memoize edilir. admin.settings kaydedince
+invalidate_settings_cache() sürümü değiştirir: sürüm app cache'inde
+(flask-caching) durduğu için paylaşılan cache backend'inde tüm worker'lar
+hemen, process içi SimpleCache'te en geç _SNAPSHOT_TTL saniye sonra yeniler.
+
+Ayarlar bugün global (tek satır); get_settings distributor_id alır, böylece
+tenant bazlı ayarlar çağıranlar değişmeden eklenebilir.
+
+Yazmak için (admin.settings) hâlâ AppSettings.get() kullanılır.
+"""
+import time
+import uuid
+import threading
+from types import SimpleNamespace
+from flask import g, has_app_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+_VERSION_KEY = 'app_settings_version'
+_SNAPSHOT_TTL = 60
+
+# Tablo yoksa (migration çalışmadı) kullanılan değerler
+DEFAULT_SETTINGS = {
+    'enable_hair': True,
+    'enable_teeth': True,
+    'enable_eye': True,
+    'enable_hotel': True,
+    'enable_leads': True,
+    'enable_aesthetic': True,
+    'enable_bariatric': True,
+    'enable_ivf': True,
+    'enable_checkup': True,
+    'logo_path': None,
+    'theme_color': '#7a001d',
+    'navbar_style': 'glass',
+}
+
+# (version, loaded_at, SimpleNamespace)
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def _version():
+    from app import cache
+    return cache.get(_VERSION_KEY) or '0'
+
+
+def invalidate_settings_cache():
+    """AppSettings commit edildikten sonra çağrılır"""
+    global _snapshot
+    from app import cache
+    cache.set(_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+    with _snapshot_lock:
+        _snapshot = None
+    if has_app_context():
+        g.pop('_app_settings', None)
+
+
+def _load():
+    from app.models.settings import AppSettings
+    settings = AppSettings.get()
+    return SimpleNamespace(**{
+        attr.key: getattr(settings, attr.key) for attr in AppSettings.__mapper__.column_attrs
+    })
+
+
+def _current_snapshot():
+    global _snapshot
+    version = _version()
+    snapshot = _snapshot
+    if snapshot and snapshot[0] == version and time.monotonic() - snapshot[1] < _SNAPSHOT_TTL:
+        return snapshot[2]
+    with _snapshot_lock:
+        if not (_snapshot and _snapshot[0] == version and time.monotonic() - _snapshot[1] < _SNAPSHOT_TTL):
+            try:
+                _snapshot = (version, time.monotonic(), _load())
+            except Exception as e:
+                # Settings table missing: serve defaults but retry on the next call
+                logger.debug(f"AppSettings unavailable, using defaults: {e}")
+                from app import db
+                db.session.rollback()
+                return SimpleNamespace(**DEFAULT_SETTINGS)
+        return _snapshot[2]
+
+
+def get_settings(distributor_id=None):
+    """
+    Salt-okunur ayarlar (istek başına memoize)
+
+    Args:
+        distributor_id: Tenant (ayarlar şimdilik global)
+
+    Returns:
+        SimpleNamespace: AppSettings sütunları
+    """
+    if not has_app_context():
+        return SimpleNamespace(**DEFAULT_SETTINGS)
+    memo = g.setdefault('_app_settings', {})
+    if distributor_id not in memo:
+        memo[distributor_id] = _current_snapshot()
+    return memo[distributor_id]
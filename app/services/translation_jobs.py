@@ -0,0 +1,88 @@
+"""
+Message translation queue - çeviri istek thread'i dışında yapılır
+
+Mesaj çevirisi hafızada (app/utils/translation_service.py) yoksa mesaj
+çevirisiz kaydedilir ve iş bir thread havuzuna verilir. Çeviri gelince
+Message.translated_content güncellenir ve hastanın socket.io odasına
+`message_translated` olayı gönderilir. TRANSLATION_WORKERS=0 ise çeviri
+istek içinde yapılır (testler).
+"""
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db, socketio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Flask app used by pool threads
+_app = None
+
+
+def _get_executor():
+    global _executor, _app
+    with _executor_lock:
+        if _executor is None:
+            _app = current_app._get_current_object()
+            workers = _app.config.get('TRANSLATION_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='translate')
+            atexit.register(_executor.shutdown, wait=False)
+        return _executor
+
+
+def translate_message(message_id, target_language):
+    """
+    Mesajı çevir, kaydet ve `message_translated` gönder
+
+    Returns:
+        str veya None: Çeviri
+    """
+    from app.models import Message
+    from app.utils.translation_service import translate_text
+
+    message = db.session.get(Message, message_id)
+    if message is None:
+        return None
+
+    translated = translate_text(message.content, target_language, message.detected_language)
+    if not translated:
+        db.session.rollback()
+        return None
+
+    message.target_language = target_language
+    message.translated_content = translated
+    db.session.commit()
+
+    try:
+        socketio.emit('message_translated', {
+            'id': message.id,
+            'patient_id': message.patient_id,
+            'target_language': target_language,
+            'translated_content': translated,
+        }, to=f'patient_{message.patient_id}')
+    except Exception as e:
+        logger.warning(f"message_translated event could not be sent: {e}")
+    return translated
+
+
+def _run(message_id, target_language):
+    with _app.app_context():
+        try:
+            translate_message(message_id, target_language)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Message {message_id} translation failed: {e}")
+        finally:
+            db.session.remove()
+
+
+def queue_message_translation(message_id, target_language):
+    """Kaydedilmiş (commit edilmiş) mesajın çevirisini kuyruğa al"""
+    if not current_app.config.get('TRANSLATION_WORKERS', 2):
+        return translate_message(message_id, target_language)
+    _get_executor().submit(_run, message_id, target_language)
+    return None
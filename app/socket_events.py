@@ -10,6 +10,12 @@ from app.utils.security import rate_limit
 @socketio.on('connect')
 def handle_connect():
     # Optionally authenticate here; for now, accept and let client join rooms explicitly
+    # Personal room for per-user pushes (e.g. pdf_ready, notification)
+    if getattr(current_user, 'is_authenticated', False):
+        join_room(f"user_{current_user.id}")
+        # Distributor-wide notifications
+        if current_user.distributor_id:
+            join_room(f"distributor_{current_user.distributor_id}")
     emit('connected', {'ok': True})
 
 
@@ -52,8 +58,15 @@ def handle_stop_typing(data):
     }, to=room, include_self=False)
 
 
+def _socket_client_key():
+    """Giriş yapmış kullanıcı, yoksa IP (worker'lar arası aynı anahtar)"""
+    if getattr(current_user, 'is_authenticated', False):
+        return f"user_{current_user.id}"
+    return request.remote_addr or 'unknown'
+
+
 @socketio.on('mark_read')
-@rate_limit(max_requests=30, window_seconds=60)
+@rate_limit(max_requests=30, window_seconds=60, key_func=_socket_client_key)
 def handle_mark_read(data):
     """Mark message(s) as read and broadcast read receipt to room"""
     from app import db
@@ -3,10 +3,12 @@ Chatbot Service - Basit kural tabanlı otomatik yanıtlayıcı
 Gelecekte ML/NLP modelleri veya embedding-tabanlı semantik arama eklenebilir
 """
 import re
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple
 import logging
-from datetime import datetime, timedelta
+from functools import lru_cache
 from threading import Lock
+from time import monotonic
+from sqlalchemy.exc import OperationalError, ProgrammingError
 
 logger = logging.getLogger(__name__)
 
@@ -67,44 +69,209 @@ FAQ_PATTERNS = {
     r'(طرق الدفع|كيف ادفع|اقساط|بطاقة|كريدت)': 'نقبل الدفع نقداً وبطاقة الائتمان والتحويل البنكي. اسأل منسقك عن خيارات التقسيط المتاحة.',
 }
 
-# Bot yanıt frekans sınırlaması (in-memory; production'da kalıcı store önerilir)
-_LAST_RESPONSE: Dict[int, datetime] = {}
-_MIN_INTERVAL = timedelta(seconds=30)  # Aynı hasta için iki bot yanıt arası minimum süre
-_response_lock = Lock()  # Thread safety için
+# Bot yanıt frekans sınırlaması: aynı hasta için iki bot yanıt arası minimum süre (saniye)
+_MIN_INTERVAL = 30
 
 
-def detect_intent(message: str) -> Optional[str]:
+# Tenant tabloları en fazla bu sıklıkla DB'den kontrol edilir (hot reload)
+_RELOAD_INTERVAL = 60
+_INTENT_CACHE_SIZE = 1024
+# Bu sayının altında C seviyesindeki `keyword in message` döngüsü otomattan hızlı
+# (scripts/bench_chatbot_intent.py: ~0.12 us/keyword vs. ~8 us/mesaj)
+_AUTOMATON_MIN_KEYWORDS = 64
+
+
+class _KeywordAutomaton:
+    """
+    Aho-Corasick otomatı: tüm anahtar kelimeler mesaj üzerinde tek geçişte aranır
+
+    Fail linkleri derleme sırasında tam geçiş tablosuna açılır (karakter başına
+    tek dict lookup). Her durum, kendisinde (fail zinciri dahil) biten en
+    öncelikli anahtar kelimenin sırasını tutar; sonuç eski sıralı taramayla
+    aynıdır (listede önce gelen kazanır).
+    """
+
+    _NONE = 1 << 30
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        goto = [{}]
+        best = [self._NONE]
+        for priority, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    best.append(self._NONE)
+                state = nxt
+            best[state] = min(best[state], priority)
+
+        # BFS: delta[s] = delta[fail[s]] + goto[s]; outputs merged along the fail chain
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = list(goto[0].values())
+        for state in queue:
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+                queue.append(nxt)
+
+        self._delta = delta
+        self._best = best
+
+    def first(self, text):
+        """Metinde geçen, listede en önce gelen anahtar kelime (yoksa None)"""
+        delta, best = self._delta, self._best
+        found = self._NONE
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if best[state] < found:
+                found = best[state]
+                if not found:
+                    break
+        return self.keywords[found] if found != self._NONE else None
+
+
+class IntentMatcher:
+    """
+    Derlenmiş niyet eşleştirici
+
+    Anahtar kelimeler (büyük tablolarda) Aho-Corasick otomatında, FAQ
+    kalıpları bir kez derlenir. Sonuç mesaj başına cache'lenir
+    (should_auto_respond + generate_response aynı mesajı iki kez sorar).
+    """
+
+    def __init__(self, keyword_responses, faq_patterns):
+        self.keyword_responses = dict(keyword_responses)
+        self.faq_patterns = dict(faq_patterns)
+        keywords = list(self.keyword_responses)
+        if len(keywords) >= _AUTOMATON_MIN_KEYWORDS:
+            self._first_keyword = _KeywordAutomaton(keywords).first
+        else:
+            self._first_keyword = lambda text: next((k for k in keywords if k in text), None)
+        # One combined alternation is slower on CPython's re than trying
+        # the compiled patterns in order (each keeps its own prefix scan)
+        self._patterns = [(pattern, re.compile(pattern).search) for pattern in self.faq_patterns]
+        self.match = lru_cache(maxsize=_INTENT_CACHE_SIZE)(self._match)
+
+    def _match(self, message_lower):
+        keyword = self._first_keyword(message_lower)
+        if keyword is not None:
+            return keyword
+        for pattern, search in self._patterns:
+            if search(message_lower):
+                return pattern
+        return None
+
+    def response_for(self, intent):
+        """(yanıt, tip) veya (None, 'none')"""
+        if intent in self.keyword_responses:
+            return self.keyword_responses[intent], 'keyword'
+        if intent in self.faq_patterns:
+            return self.faq_patterns[intent], 'faq'
+        return None, 'none'
+
+
+_default_matcher = IntentMatcher(KEYWORD_RESPONSES, FAQ_PATTERNS)
+
+# distributor_id -> (matcher, stamp, checked_at monotonic)
+_tenant_matchers = {}
+_tenant_lock = Lock()
+
+
+def _tenant_stamp(distributor_id):
+    """Tenant tablosunun sürümü: (satır sayısı, son güncelleme)"""
+    from sqlalchemy import func
+    from app import db
+    from app.models.chatbot_keyword import ChatbotKeyword
+    # Savepoint: a missing table must not abort the caller's transaction
+    with db.session.begin_nested():
+        return tuple(db.session.query(
+            func.count(ChatbotKeyword.id), func.max(ChatbotKeyword.updated_at)
+        ).filter(ChatbotKeyword.distributor_id == distributor_id).one())
+
+
+def _build_tenant_matcher(distributor_id):
+    from app.models.chatbot_keyword import ChatbotKeyword
+    rows = ChatbotKeyword.query.filter_by(distributor_id=distributor_id, is_active=True)\
+        .order_by(ChatbotKeyword.id).all()
+    if not rows:
+        return _default_matcher
+    # Tenant keywords come first (and override built-in replies for the same keyword)
+    keyword_responses = {}
+    for row in rows:
+        keyword_responses.setdefault(row.keyword.lower().strip(), row.response)
+    for keyword, response in KEYWORD_RESPONSES.items():
+        keyword_responses.setdefault(keyword, response)
+    return IntentMatcher(keyword_responses, FAQ_PATTERNS)
+
+
+def get_matcher(distributor_id: Optional[int] = None) -> IntentMatcher:
+    """
+    Distributor'ın eşleştiricisi
+
+    Tenant tablosu en fazla _RELOAD_INTERVAL saniyede bir kontrol edilir ve
+    değiştiyse otomat yeniden derlenir. Tablo yoksa varsayılanlar kullanılır.
+    """
+    if distributor_id is None:
+        return _default_matcher
+    now = monotonic()
+    with _tenant_lock:
+        cached = _tenant_matchers.get(distributor_id)
+        if cached and now - cached[2] < _RELOAD_INTERVAL:
+            return cached[0]
+    try:
+        stamp = _tenant_stamp(distributor_id)
+        if cached and cached[1] == stamp:
+            matcher = cached[0]
+        else:
+            matcher = _build_tenant_matcher(distributor_id)
+    except (OperationalError, ProgrammingError) as e:
+        logger.debug(f"Chatbot keyword table unavailable: {e}")
+        stamp, matcher = None, _default_matcher
+    with _tenant_lock:
+        _tenant_matchers[distributor_id] = (matcher, stamp, now)
+    return matcher
+
+
+def reload_matchers(distributor_id: Optional[int] = None):
+    """Tenant eşleştiricilerini bir sonraki kullanımda yeniden yükle (bu process)"""
+    with _tenant_lock:
+        if distributor_id is None:
+            _tenant_matchers.clear()
+        else:
+            _tenant_matchers.pop(distributor_id, None)
+
+
+def detect_intent(message: str, distributor_id: Optional[int] = None) -> Optional[str]:
     """
     Mesajdan anahtar kelime tespit eder
     
     Args:
         message: Kullanıcı mesajı
+        distributor_id: Tenant anahtar kelimeleri için (None: sadece varsayılanlar)
         
     Returns:
-        Tespit edilen anahtar kelime veya None
+        Tespit edilen anahtar kelime / FAQ kalıbı veya None
     """
-    message_lower = message.lower().strip()
-    
-    # Anahtar kelime eşleşmesi
-    for keyword in KEYWORD_RESPONSES.keys():
-        if keyword in message_lower:
-            return keyword
-    
-    # FAQ pattern eşleşmesi
-    for pattern in FAQ_PATTERNS.keys():
-        if re.search(pattern, message_lower):
-            return pattern
-    
-    return None
+    return get_matcher(distributor_id).match(message.lower().strip())
 
 
-def generate_response(message: str, detected_language: Optional[str] = None) -> Tuple[Optional[str], str]:
+def generate_response(message: str, detected_language: Optional[str] = None,
+                      distributor_id: Optional[int] = None) -> Tuple[Optional[str], str]:
     """
     Mesaja otomatik yanıt üretir
     
     Args:
         message: Kullanıcı mesajı
         detected_language: Tespit edilen dil kodu
+        distributor_id: Tenant anahtar kelimeleri için
         
     Returns:
         (yanıt_metni, yanıt_tipi) tuple'ı
@@ -113,22 +280,19 @@ def generate_response(message: str, detected_language: Optional[str] = None) ->
     if not message or len(message.strip()) < 3:
         return None, 'none'
     
-    # Anahtar kelime kontrolü
-    intent = detect_intent(message)
-    
-    if intent and intent in KEYWORD_RESPONSES:
-        return KEYWORD_RESPONSES[intent], 'keyword'
-    
-    # FAQ pattern kontrolü
-    if intent and intent in FAQ_PATTERNS:
-        return FAQ_PATTERNS[intent], 'faq'
+    # Anahtar kelime / FAQ kontrolü (tek eşleştirme, sonuç cache'li)
+    matcher = get_matcher(distributor_id)
+    intent = matcher.match(message.lower().strip())
+    if intent:
+        return matcher.response_for(intent)
     
     # Fallback yanıt (opsiyonel - her mesaja otomatik yanıt vermemek için kapatılabilir)
     # Şimdilik None döndürüyoruz, sadece tanımlı keyword/pattern'lere yanıt veriliyor
     return None, 'none'
 
 
-def should_auto_respond(message: str, sender_is_staff: bool = False, patient_id: Optional[int] = None) -> bool:
+def should_auto_respond(message: str, sender_is_staff: bool = False, patient_id: Optional[int] = None,
+                        distributor_id: Optional[int] = None) -> bool:
     """
     Otomatik yanıt verilmeli mi kontrol eder
     
@@ -148,19 +312,16 @@ def should_auto_respond(message: str, sender_is_staff: bool = False, patient_id:
         return False
     
     # Anahtar kelime veya pattern varsa yanıt ver
-    intent = detect_intent(message)
+    intent = detect_intent(message, distributor_id)
     if not intent:
         return False
 
-    # Throttle: Aynı hastaya çok sık bot yanıtı verme (Thread-safe)
+    # Throttle: Aynı hastaya çok sık bot yanıtı verme (paylaşılan limiter, tüm worker'lar)
     if patient_id is not None:
-        with _response_lock:
-            last = _LAST_RESPONSE.get(patient_id)
-            now = datetime.utcnow()
-            if last and now - last < _MIN_INTERVAL:
-                logger.debug(f"Throttle aktif (patient_id={patient_id})")
-                return False
-            _LAST_RESPONSE[patient_id] = now
+        from app.utils.rate_limiter import check_rate_limit
+        if not check_rate_limit(f'chatbot:{patient_id}', 1, _MIN_INTERVAL).allowed:
+            logger.debug(f"Throttle aktif (patient_id={patient_id})")
+            return False
     return True
 
 
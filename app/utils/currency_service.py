@@ -5,8 +5,9 @@ External API entegrasyonu ve otomatik kur güncelleme
 import requests
 from datetime import datetime, timedelta
 import logging
-from app import db, cache
+from app import db
 from app.models.currency import CurrencyRate
+from app.utils.rate_matrix import convert_many
 
 logger = logging.getLogger(__name__)
 
@@ -18,19 +19,20 @@ EXCHANGERATE_API_URL = 'https://api.exchangerate-api.com/v4/latest/{base}'
 TCMB_API_URL = 'https://www.tcmb.gov.tr/kurlar/today.xml'  # TCMB XML
 
 
-def fetch_rates_from_exchangerate_api(base_currency='USD'):
+def fetch_rates_from_exchangerate_api(base_currency='USD', http=None):
     """
     ExchangeRate-API'den kurları çek
     
     Args:
         base_currency: Base currency (default USD)
+        http: Paylaşılan requests.Session (opsiyonel)
         
     Returns:
         dict: {target_currency: rate} veya None
     """
     try:
         url = EXCHANGERATE_API_URL.format(base=base_currency)
-        response = requests.get(url, timeout=10)
+        response = (http or requests).get(url, timeout=10)
         response.raise_for_status()
         
         data = response.json()
@@ -44,17 +46,20 @@ def fetch_rates_from_exchangerate_api(base_currency='USD'):
         return None
 
 
-def fetch_rates_from_tcmb():
+def fetch_rates_from_tcmb(http=None):
     """
     TCMB XML'den TRY bazlı kurları çek
     
+    Args:
+        http: Paylaşılan requests.Session (opsiyonel)
+    
     Returns:
         dict: {currency: rate_to_try} veya None
     """
     try:
         import xml.etree.ElementTree as ET
         
-        response = requests.get(TCMB_API_URL, timeout=10)
+        response = (http or requests).get(TCMB_API_URL, timeout=10)
         response.raise_for_status()
         
         root = ET.fromstring(response.content)
@@ -79,7 +84,73 @@ def fetch_rates_from_tcmb():
         return None
 
 
-def update_rates_for_distributor(distributor_id, source='exchangerate-api', base_currency='USD'):
+def fetch_rates(source='exchangerate-api', base_currency='USD', http=None):
+    """
+    Kaynaktan kurları çek ve saklanacak biçime getir
+    
+    Args:
+        source: API source ('exchangerate-api' or 'tcmb')
+        base_currency: Base currency (TCMB için her zaman TRY)
+        http: Paylaşılan requests.Session (opsiyonel)
+        
+    Returns:
+        tuple: (base, {target_currency: rate}) - 1 base = rate target; hata durumunda (base, None)
+    """
+    if source == 'tcmb':
+        rates = fetch_rates_from_tcmb(http)
+        if not rates:
+            return 'TRY', None
+        # Rate from TCMB is: 1 [target] = X TRY
+        # We store as: 1 TRY = (1/X) [target]
+        return 'TRY', {
+            target: (1.0 / rate if rate != 0 else 0)
+            for target, rate in rates.items()
+            if target in SUPPORTED_CURRENCIES
+        }
+    
+    rates = fetch_rates_from_exchangerate_api(base_currency, http)
+    if not rates:
+        return base_currency, None
+    return base_currency, {
+        target: rate for target, rate in rates.items()
+        if target in SUPPORTED_CURRENCIES and target != base_currency
+    }
+
+
+def store_rates(distributor_id, base_currency, rates, source):
+    """
+    Kurları distributor için kaydet (mevcut satırlar tek sorguda okunur)
+    
+    Returns:
+        int: Güncellenen kur sayısı
+    """
+    existing = {
+        row.target_currency: row
+        for row in CurrencyRate.query.filter_by(distributor_id=distributor_id, base_currency=base_currency)
+    }
+    now = datetime.utcnow()
+    
+    for target_currency, rate in rates.items():
+        row = existing.get(target_currency)
+        if row:
+            row.rate = rate
+            row.last_updated = now
+            row.source = source
+        else:
+            db.session.add(CurrencyRate(
+                distributor_id=distributor_id,
+                base_currency=base_currency,
+                target_currency=target_currency,
+                rate=rate,
+                source=source,
+                is_manual=False
+            ))
+    
+    db.session.commit()
+    return len(rates)
+
+
+def update_rates_for_distributor(distributor_id, source='exchangerate-api', base_currency='USD', fetched=None):
     """
     Belirli bir distributor için kurları güncelle
     
@@ -87,139 +158,64 @@ def update_rates_for_distributor(distributor_id, source='exchangerate-api', base
         distributor_id: Distributor ID
         source: API source ('exchangerate-api' or 'tcmb')
         base_currency: Base currency
+        fetched: Önceden çekilmiş fetch_rates() sonucu (aynı kaynağı paylaşan distributorlar için)
         
     Returns:
         int: Güncellenen kur sayısı
     """
-    if source == 'tcmb':
-        rates = fetch_rates_from_tcmb()
-        if not rates:
-            return 0
-        
-        # TCMB gives rates in TRY, so base is TRY
-        actual_base = 'TRY'
-        updated_count = 0
-        
-        for target_currency, rate in rates.items():
-            if target_currency not in SUPPORTED_CURRENCIES:
-                continue
-            
-            # Rate from TCMB is: 1 [target] = X TRY
-            # We store as: 1 TRY = (1/X) [target]
-            try:
-                inverse_rate = 1.0 / rate if rate != 0 else 0
-                
-                existing = CurrencyRate.query.filter_by(
-                    distributor_id=distributor_id,
-                    base_currency=actual_base,
-                    target_currency=target_currency
-                ).first()
-                
-                if existing:
-                    existing.rate = inverse_rate
-                    existing.last_updated = datetime.utcnow()
-                    existing.source = source
-                else:
-                    new_rate = CurrencyRate(
-                        distributor_id=distributor_id,
-                        base_currency=actual_base,
-                        target_currency=target_currency,
-                        rate=inverse_rate,
-                        source=source,
-                        is_manual=False
-                    )
-                    db.session.add(new_rate)
-                
-                updated_count += 1
-                
-            except Exception as e:
-                logger.error(f"TCMB kur kaydetme hatası ({target_currency}): {e}")
-                continue
-        
-        db.session.commit()
-        return updated_count
+    actual_base, rates = fetched or fetch_rates(source, base_currency)
+    if not rates:
+        return 0
     
-    else:
-        # ExchangeRate-API
-        rates = fetch_rates_from_exchangerate_api(base_currency)
-        if not rates:
-            return 0
-        
-        updated_count = 0
-        
-        for target_currency, rate in rates.items():
-            if target_currency not in SUPPORTED_CURRENCIES or target_currency == base_currency:
-                continue
-            
-            try:
-                existing = CurrencyRate.query.filter_by(
-                    distributor_id=distributor_id,
-                    base_currency=base_currency,
-                    target_currency=target_currency
-                ).first()
-                
-                if existing:
-                    existing.rate = rate
-                    existing.last_updated = datetime.utcnow()
-                    existing.source = source
-                else:
-                    new_rate = CurrencyRate(
-                        distributor_id=distributor_id,
-                        base_currency=base_currency,
-                        target_currency=target_currency,
-                        rate=rate,
-                        source=source,
-                        is_manual=False
-                    )
-                    db.session.add(new_rate)
-                
-                updated_count += 1
-                
-            except Exception as e:
-                logger.error(f"Kur kaydetme hatası ({target_currency}): {e}")
-                continue
-        
-        db.session.commit()
-        return updated_count
+    try:
+        return store_rates(distributor_id, actual_base, rates, source)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Kur kaydetme hatası (distributor {distributor_id}): {e}")
+        return 0
 
 
 def update_all_distributors():
-    """Tüm distributorlar için kurları güncelle"""
+    """
+    Tüm distributorlar için kurları güncelle
+    
+    Aynı (kaynak, base) çifti upstream'den bir kez çekilir; kayıtlar
+    distributor başına scheduler thread havuzunda paralel yazılır.
+    """
+    from flask import current_app
     from app.models.distributor import Distributor
+    from app.services.settings_service import get_settings
+    from app.utils.scheduler import http_session, run_tenant_jobs
     
-    distributors = Distributor.query.filter_by(is_active=True).all()
-    total_updated = 0
+    distributor_ids = [
+        dist_id for (dist_id,) in db.session.query(Distributor.id).filter(Distributor.is_active.is_(True))
+    ]
+    if not distributor_ids:
+        return 0
     
-    for dist in distributors:
-        try:
-            # Get base currency from settings
-            from app.models.settings import AppSettings
-            settings = AppSettings.get(dist.id)
-            base = getattr(settings, 'base_currency', 'USD')
-            source = getattr(settings, 'currency_api_source', 'exchangerate-api')
-            
-            count = update_rates_for_distributor(dist.id, source=source, base_currency=base)
-            total_updated += count
-            logger.info(f"Distributor {dist.id}: {count} kur güncellendi")
-            
-        except Exception as e:
-            logger.error(f"Distributor {dist.id} kur güncellemesi başarısız: {e}")
-            continue
+    # Grouped by (source, base) so each upstream table is fetched once
+    targets = {}
+    for dist_id in distributor_ids:
+        settings = get_settings(dist_id)
+        targets[dist_id] = (getattr(settings, 'currency_api_source', None) or 'exchangerate-api',
+                            getattr(settings, 'base_currency', None) or 'USD')
     
-    return total_updated
+    http = http_session()
+    fetched = {key: fetch_rates(key[0], key[1], http) for key in set(targets.values())}
+    
+    def update(dist_id):
+        key = targets[dist_id]
+        count = update_rates_for_distributor(dist_id, source=key[0], base_currency=key[1], fetched=fetched[key])
+        logger.info(f"Distributor {dist_id}: {count} kur güncellendi")
+        return count
+    
+    results = run_tenant_jobs(current_app._get_current_object(), 'currency_rates', distributor_ids, update)
+    return sum(r for r in results.values() if isinstance(r, int))
 
 
 def get_cached_rate(distributor_id, from_currency, to_currency):
-    """Cache'li kur sorgusu"""
-    cache_key = f'rate_{distributor_id}_{from_currency}_{to_currency}'
-    rate = cache.get(cache_key)
-    
-    if rate is None:
-        rate = CurrencyRate.get_rate(distributor_id, from_currency, to_currency)
-        if rate:
-            cache.set(cache_key, rate, timeout=3600)  # 1 hour cache
-    
-    return rate
+    """Cache'li kur sorgusu (distributor kur matrisinden)"""
+    return CurrencyRate.get_rate(distributor_id, from_currency, to_currency)
 
 
 def format_price(amount, currency='USD', locale='tr'):
@@ -276,11 +272,5 @@ def get_conversion_preview(amount, from_currency, to_currencies, distributor_id)
     Returns:
         dict: {currency: converted_amount}
     """
-    preview = {}
-    
-    for target in to_currencies:
-        converted = CurrencyRate.convert(amount, from_currency, target, distributor_id)
-        if converted:
-            preview[target] = converted
-    
-    return preview
+    converted = convert_many([amount], from_currency, to_currencies, distributor_id)
+    return {target: values[0] for target, values in converted.items() if values[0]}
@@ -1,19 +1,90 @@
 """
 Email notification system for MSH Med Tour
 Supports: Lead notifications, appointment reminders, etc.
+
+Mesajlar tek bir sınırlı gönderici havuzundan (MAIL_WORKERS thread) gider;
+her thread SMTP bağlantısını açık tutar ve sonraki mesajlarda yeniden kullanır.
 """
+import atexit
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask_mail import Message
 from flask import current_app
-from threading import Thread
 from app import mail
+import logging
 
-def send_async_email(app, msg):
-    """Send email asynchronously"""
-    with app.app_context():
+logger = logging.getLogger(__name__)
+
+# Idle SMTP connections are dropped by most servers after a minute or so
+SMTP_IDLE_SECONDS = 60
+
+_executor = None
+_executor_lock = threading.Lock()
+# Per sender thread: (flask_mail Connection, last used monotonic)
+_local = threading.local()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = current_app.config.get('MAIL_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='mail')
+            atexit.register(_executor.shutdown, wait=False)
+        return _executor
+
+
+def _close_connection():
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
         try:
-            mail.send(msg)
-        except Exception as e:
-            print(f"Email gönderme hatası: {e}")
+            connection.__exit__(None, None, None)
+        except Exception:
+            pass
+
+
+def _connection():
+    """Bu thread'in açık SMTP bağlantısı (boşta kaldıysa yenilenir)"""
+    connection = getattr(_local, 'connection', None)
+    if connection is not None and time.monotonic() - _local.used_at > SMTP_IDLE_SECONDS:
+        _close_connection()
+        connection = None
+    if connection is None:
+        connection = mail.connect().__enter__()
+        _local.connection = connection
+    _local.used_at = time.monotonic()
+    return connection
+
+
+def _send_pooled(app, msg):
+    with app.app_context():
+        for attempt in (1, 2):
+            try:
+                _connection().send(msg)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                # Stale kept-alive connection: reconnect once. Other SMTPExceptions
+                # (refused recipients, auth) are OSErrors too but won't pass on retry
+                _close_connection()
+                if attempt == 2:
+                    logger.error(f"Email gönderme hatası ({msg.recipients}): {e}")
+            except Exception as e:
+                _close_connection()
+                logger.error(f"Email gönderme hatası ({msg.recipients}): {e}")
+                return
+
+
+def queue_email(msg):
+    """Hazır flask_mail Message'ı gönderici havuzuna ver"""
+    app = current_app._get_current_object()
+    if not app.config.get('MAIL_WORKERS', 2):
+        # Synchronous (tests): same path, current thread
+        return _send_pooled(app, msg)
+    _get_executor().submit(_send_pooled, app, msg)
+
 
 def send_email(subject, recipients, text_body, html_body=None, attachments=None, sender=None):
     """Send email with optional HTML body and attachments
@@ -30,8 +101,8 @@ def send_email(subject, recipients, text_body, html_body=None, attachments=None,
             if filename and data:
                 msg.attach(filename=filename, content_type=mimetype or 'application/octet-stream', data=data)
     
-    # Send asynchronously
-    Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()
+    # Send through the sender pool
+    queue_email(msg)
 
 def send_new_lead_notification(lead, distributor):
     """Notify distributor about new lead"""
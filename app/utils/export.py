@@ -1,248 +1,373 @@
-"""Excel export utilities for MSH Med Tour"""
+"""Streaming export utilities for MSH Med Tour (CSV / XLSX / JSON)
+
+Rows are read as plain column tuples with yield_per: no ORM objects and no
+per-row lazy loads. Counts and flags are correlated subqueries in the same
+SELECT. The response body is a generator, so memory stays flat however many
+rows are exported. CSV and JSON start downloading with the first batch.
+XLSX rows go through openpyxl's write_only worksheet (spooled to a temp
+file) and the file is streamed once the workbook is closed.
+"""
+import csv
+import json
+import tempfile
+from collections import namedtuple
+from datetime import date, datetime
+from io import StringIO
+from flask import Response, abort, request, stream_with_context
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
-from io import BytesIO
-from datetime import datetime
+from sqlalchemy import select, func, exists, or_
+from sqlalchemy.orm import aliased
+from app.models import (
+    Patient, Encounter, HairAnnotation, DentalProcedure, EyeRefraction,
+    EyeTreatmentSelection, HotelReservation, Appointment, Lead,
+    FacebookLead, Distributor, User
+)
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'json')
+
+MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',  # Werkzeug appends '; charset=utf-8' to text/* types
+    'json': 'application/json',
+}
+
+# Rows fetched per round trip / written per response chunk
+YIELD_PER = 1000
+FILE_CHUNK = 64 * 1024
+
+# header=None: JSON only. display: value shown in CSV/XLSX cells
+Column = namedtuple('Column', 'key header width display', defaults=(None,))
+
+# name: download file prefix, sheet/color: XLSX sheet title and header color
+Export = namedtuple('Export', 'name sheet color columns rows')
+
+
+def _truncate(value, limit=50):
+    return value[:limit] + "..." if value and len(value) > limit else value
+
+
+def _check(value):
+    return "✓" if value else "-"
+
+
+def _upper(value):
+    return value.upper() if value else value
+
+
+def _yes_no(value):
+    return "Evet" if value else "Hayır"
+
+
+def _cell(column, value):
+    """CSV/XLSX cell text for a raw value"""
+    if column.display:
+        value = column.display(value)
+    if value is None or value == '':
+        return "-"
+    if isinstance(value, datetime):
+        return value.strftime('%d.%m.%Y %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%d.%m.%Y')
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _stream(query, convert=tuple):
+    """Run query lazily, YIELD_PER rows per fetch"""
+    for row in query.yield_per(YIELD_PER):
+        yield convert(row)
+
+
+def _full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+# ========== WRITERS ==========
 
+def _table_columns(export):
+    return [(i, column) for i, column in enumerate(export.columns) if column.header]
+
+
+def _csv_chunks(export):
+    columns = _table_columns(export)
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM: Excel opens the file as UTF-8
+    writer.writerow([column.header for _, column in columns])
+    for n, row in enumerate(export.rows, 1):
+        writer.writerow([_cell(column, row[i]) for i, column in columns])
+        if n % YIELD_PER == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _json_chunks(export):
+    keys = [column.key for column in export.columns]
+    parts = ['[']
+    for n, row in enumerate(export.rows):
+        if n:
+            parts.append(',')
+        parts.append(json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=_json_default))
+        if len(parts) >= 2 * YIELD_PER:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+    parts.append(']')
+    yield ''.join(parts).encode('utf-8')
+
+
+def _xlsx_chunks(export):
+    columns = _table_columns(export)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(export.sheet)
+
+    # Fixed widths: write_only sheets can't be re-walked to auto-size
+    for n, (_, column) in enumerate(columns, 1):
+        ws.column_dimensions[get_column_letter(n)].width = column.width
 
-def export_patients_to_excel(patients):
-    """Export patient list to Excel file"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Hastalar"
-    
-    # Header style
     header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
+    header_fill = PatternFill(start_color=export.color, end_color=export.color, fill_type="solid")
     header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Border style
     thin_border = Border(
         left=Side(style='thin'),
         right=Side(style='thin'),
         top=Side(style='thin'),
         bottom=Side(style='thin')
     )
-    
-    # Headers
-    headers = [
-        "ID", "Ad", "Soyad", "Telefon", "E-posta", "Doğum Tarihi",
-        "Cinsiyet", "Uyruk", "Pasaport No", "Muayene Sayısı", "Kayıt Tarihi"
-    ]
-    
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
+    header = []
+    for _, column in columns:
+        cell = WriteOnlyCell(ws, value=column.header)
         cell.font = header_font
         cell.fill = header_fill
         cell.alignment = header_alignment
         cell.border = thin_border
-    
-    # Data rows
-    for row_num, patient in enumerate(patients, 2):
-        # Format gender
-        gender_display = "Erkek" if patient.gender == "M" else ("Kadın" if patient.gender == "F" else "-")
-        
-        data = [
-            patient.id,
-            patient.first_name,
-            patient.last_name,
-            patient.phone or "-",
-            patient.email or "-",
-            patient.dob.strftime('%d.%m.%Y') if patient.dob else "-",
-            gender_display,
-            patient.nationality or "-",
-            patient.passport_number or "-",
-            len(patient.encounters),
-            patient.created_at.strftime('%d.%m.%Y %H:%M')
-        ]
-        
-        for col_num, value in enumerate(data, 1):
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.value = value
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="left", vertical="center")
-    
-    # Auto-adjust column widths
-    for col_num in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col_num)
-        max_length = 0
-        for cell in ws[column_letter]:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
-
-
-def export_encounters_to_excel(encounters):
-    """Export encounter list to Excel file"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Muayeneler"
-    
-    # Header style
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="764ba2", end_color="764ba2", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Border style
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+        header.append(cell)
+    ws.append(header)
+
+    for row in export.rows:
+        ws.append([_cell(column, row[i]) for i, column in columns])
+
+    with tempfile.TemporaryFile() as f:
+        wb.save(f)
+        f.seek(0)
+        while True:
+            chunk = f.read(FILE_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+
+
+_WRITERS = {'xlsx': _xlsx_chunks, 'csv': _csv_chunks, 'json': _json_chunks}
+
+
+def requested_format(default='xlsx'):
+    """?format= of the current request (400 if unsupported)"""
+    fmt = request.values.get('format', default)
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    return fmt
+
+
+def export_response(export, fmt='xlsx'):
+    """
+    Chunked download response for an Export
+
+    The generator runs inside the request context, so the export query
+    executes as the body is sent.
+    """
+    filename = f"{export.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    response = Response(stream_with_context(_WRITERS[fmt](export)), mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Don't let a reverse proxy buffer the whole file before sending it
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ========== EXPORTS ==========
+
+PATIENT_COLUMNS = [
+    Column('id', "ID", 8),
+    Column('first_name', "Ad", 18),
+    Column('last_name', "Soyad", 18),
+    Column('phone', "Telefon", 16),
+    Column('email', "E-posta", 28),
+    Column('dob', "Doğum Tarihi", 14),
+    Column('gender', "Cinsiyet", 10,
+           lambda g: "Erkek" if g == "M" else ("Kadın" if g == "F" else None)),
+    Column('nationality', "Uyruk", 14),
+    Column('passport_number', "Pasaport No", 16),
+    Column('encounter_count', "Muayene Sayısı", 16),
+    Column('created_at', "Kayıt Tarihi", 18),
+]
+
+
+def patient_export(query):
+    """Export of a (filtered, ordered) Patient query"""
+    encounter_count = select(func.count(Encounter.id))\
+        .where(Encounter.patient_id == Patient.id).scalar_subquery()
+    rows = query.with_entities(
+        Patient.id, Patient.first_name, Patient.last_name, Patient.phone, Patient.email,
+        Patient.dob, Patient.gender, Patient.nationality, Patient.passport_number,
+        encounter_count, Patient.created_at
     )
-    
-    # Headers
-    headers = [
-        "Muayene ID", "Hasta Adı", "Telefon", "Tarih", "Durum",
-        "Saç Ekimi", "Diş", "Göz", "Otel", "Not", "Oluşturulma"
-    ]
-    
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-    
-    # Data rows
-    for row_num, encounter in enumerate(encounters, 2):
-        # Check which modules are used
-        has_hair = bool(encounter.hair_annotations)
-        has_dental = bool(encounter.dental_procedures)
-        has_eye = bool(encounter.eye_refraction or encounter.eye_treatments)
-        has_hotel = bool(encounter.hotel_reservations)
-        
-        data = [
-            encounter.id,
-            encounter.patient.full_name,
-            encounter.patient.phone or "-",
-            encounter.date.strftime('%d.%m.%Y') if encounter.date else "-",
-            encounter.status.upper(),
-            "✓" if has_hair else "-",
-            "✓" if has_dental else "-",
-            "✓" if has_eye else "-",
-            "✓" if has_hotel else "-",
-            encounter.note[:50] + "..." if encounter.note and len(encounter.note) > 50 else (encounter.note or "-"),
-            encounter.created_at.strftime('%d.%m.%Y %H:%M')
-        ]
-        
-        for col_num, value in enumerate(data, 1):
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.value = value
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="left", vertical="center")
-    
-    # Auto-adjust column widths
-    for col_num in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col_num)
-        max_length = 0
-        for cell in ws[column_letter]:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
-
-
-def export_leads_to_excel(leads):
-    """Export lead list to Excel file"""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Lead'ler"
-    
-    # Header style
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="11998e", end_color="11998e", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Border style
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    return Export('hastalar', "Hastalar", "667eea", PATIENT_COLUMNS, _stream(rows))
+
+
+ENCOUNTER_COLUMNS = [
+    Column('id', "Muayene ID", 12),
+    Column('patient', "Hasta Adı", 26),
+    Column('phone', "Telefon", 16),
+    Column('date', "Tarih", 12, lambda d: d.date() if d else d),
+    Column('status', "Durum", 12, _upper),
+    Column('hair', "Saç Ekimi", 11, _check),
+    Column('dental', "Diş", 8, _check),
+    Column('eye', "Göz", 8, _check),
+    Column('hotel', "Otel", 8, _check),
+    Column('note', "Not", 50, _truncate),
+    Column('created_at', "Oluşturulma", 18),
+]
+
+
+def encounter_export(query):
+    """Export of a (filtered, ordered) Encounter query"""
+    rows = query.join(Patient, Encounter.patient_id == Patient.id).with_entities(
+        Encounter.id, Patient.first_name, Patient.last_name, Patient.phone,
+        Encounter.date, Encounter.status,
+        exists().where(HairAnnotation.encounter_id == Encounter.id),
+        exists().where(DentalProcedure.encounter_id == Encounter.id),
+        or_(exists().where(EyeRefraction.encounter_id == Encounter.id),
+            exists().where(EyeTreatmentSelection.encounter_id == Encounter.id)),
+        # Reservations belong to the patient, not to a single encounter
+        exists().where(HotelReservation.patient_id == Encounter.patient_id),
+        Encounter.note, Encounter.created_at
     )
-    
-    # Headers
-    headers = [
-        "Lead ID", "Ad Soyad", "Telefon", "E-posta", "İlgilenen Hizmet",
-        "Kaynak", "Durum", "Hasta Oldu", "Mesaj", "Oluşturulma"
-    ]
-    
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-    
-    # Data rows
-    for row_num, lead in enumerate(leads, 2):
-        # Format service name
-        service_map = {
-            'hair': 'Saç Ekimi',
-            'dental': 'Diş',
-            'eye': 'Göz',
-            'hotel': 'Otel'
-        }
-        service = service_map.get(lead.interested_service, lead.interested_service or '-')
-        
-        data = [
-            lead.id,
-            lead.full_name,
-            lead.phone or "-",
-            lead.email or "-",
-            service,
-            lead.source.upper() if lead.source else "-",
-            lead.status.upper(),
-            "Evet" if lead.is_converted else "Hayır",
-            lead.message[:50] + "..." if lead.message and len(lead.message) > 50 else (lead.message or "-"),
-            lead.created_at.strftime('%d.%m.%Y %H:%M')
-        ]
-        
-        for col_num, value in enumerate(data, 1):
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.value = value
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal="left", vertical="center")
-    
-    # Auto-adjust column widths
-    for col_num in range(1, len(headers) + 1):
-        column_letter = get_column_letter(col_num)
-        max_length = 0
-        for cell in ws[column_letter]:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Save to BytesIO
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+
+    def convert(row):
+        (id, first_name, last_name, phone, date_, status,
+         hair, dental, eye, hotel, note, created_at) = row
+        return (id, _full_name(first_name, last_name), phone, date_, status,
+                bool(hair), bool(dental), bool(eye), bool(hotel), note, created_at)
+
+    return Export('muayeneler', "Muayeneler", "764ba2", ENCOUNTER_COLUMNS, _stream(rows, convert))
+
+
+APPOINTMENT_COLUMNS = [
+    Column('id', "ID", 8),
+    Column('patient', "Hasta Adı", 26),
+    Column('phone', "Telefon", 16),
+    Column('title', "Başlık", 30),
+    Column('appointment_type', "Tür", 14),
+    Column('start_time', "Başlangıç", 18),
+    Column('end_time', "Bitiş", 18),
+    Column('status', "Durum", 12, _upper),
+    Column('doctor_name', "Doktor", 20),
+    Column('room_number', "Oda", 10),
+    Column('notes', "Not", 50, _truncate),
+]
+
+
+def appointment_export(query):
+    """Export of a (filtered, ordered) Appointment query"""
+    # Aliased: the list filters may already have joined Patient
+    patient = aliased(Patient)
+    rows = query.join(patient, Appointment.patient_id == patient.id).with_entities(
+        Appointment.id, patient.first_name, patient.last_name, patient.phone,
+        Appointment.title, Appointment.appointment_type, Appointment.start_time,
+        Appointment.end_time, Appointment.status, Appointment.doctor_name,
+        Appointment.room_number, Appointment.notes
+    )
+
+    def convert(row):
+        return (row[0], _full_name(row[1], row[2])) + tuple(row[3:])
+
+    return Export('randevular', "Randevular", "2c7be5", APPOINTMENT_COLUMNS, _stream(rows, convert))
+
+
+LEAD_SERVICES = {
+    'hair': 'Saç Ekimi',
+    'dental': 'Diş',
+    'eye': 'Göz',
+    'hotel': 'Otel'
+}
+
+LEAD_COLUMNS = [
+    Column('id', "Lead ID", 10),
+    Column('full_name', "Ad Soyad", 26),
+    Column('phone', "Telefon", 16),
+    Column('email', "E-posta", 28),
+    Column('interested_service', "İlgilenen Hizmet", 18, lambda s: LEAD_SERVICES.get(s, s)),
+    Column('source', "Kaynak", 12, _upper),
+    Column('status', "Durum", 12, _upper),
+    Column('is_converted', "Hasta Oldu", 12, _yes_no),
+    Column('message', "Mesaj", 50, _truncate),
+    Column('created_at', "Oluşturulma", 18),
+]
+
+
+def lead_export(query):
+    """Export of a (filtered, ordered) Lead query"""
+    rows = query.with_entities(
+        Lead.id, Lead.first_name, Lead.last_name, Lead.phone, Lead.email,
+        Lead.interested_service, Lead.source, Lead.status, Lead.converted_to_patient_id,
+        Lead.message, Lead.created_at
+    )
+
+    def convert(row):
+        (id, first_name, last_name, phone, email, service, source,
+         status, patient_id, message, created_at) = row
+        # Same fallbacks as Lead.full_name / Lead.is_converted
+        full_name = _full_name(first_name, last_name) if first_name and last_name \
+            else (first_name or last_name or 'İsimsiz Lead')
+        return (id, full_name, phone, email, service, source, status,
+                status == 'converted' and patient_id is not None, message, created_at)
+
+    return Export('leadler', "Lead'ler", "11998e", LEAD_COLUMNS, _stream(rows, convert))
+
+
+FACEBOOK_LEAD_COLUMNS = [
+    Column('id', "ID", 8),
+    Column('full_name', "Ad Soyad", 26),
+    Column('email', "Email", 28),
+    Column('phone', "Telefon", 16),
+    Column('distributor', "Dağıtıcı", 22),
+    Column('status', "Durum", 12),
+    Column('assigned_to', "Atanan Kişi", 18),
+    Column('created_at', "Oluşturulma Tarihi", 18),
+    # JSON only (FacebookLead.to_dict fields)
+    Column('meta_lead_id', None, 0),
+    Column('first_name', None, 0),
+    Column('last_name', None, 0),
+    Column('form_data', None, 0),
+    Column('score', None, 0),
+    Column('score_level', None, 0),
+    Column('notes', None, 0),
+    Column('lead_created_at', None, 0),
+    Column('updated_at', None, 0),
+]
+
+
+def facebook_lead_export(query):
+    """Export of a (filtered, ordered) FacebookLead query"""
+    rows = query.join(Distributor, FacebookLead.distributor_id == Distributor.id)\
+        .outerjoin(User, FacebookLead.assigned_to_id == User.id)\
+        .with_entities(
+            FacebookLead.id, FacebookLead.email, FacebookLead.phone, Distributor.name,
+            FacebookLead.status, User.username, FacebookLead.created_at,
+            FacebookLead.meta_lead_id, FacebookLead.first_name, FacebookLead.last_name,
+            FacebookLead.form_data, FacebookLead.score, FacebookLead.score_level,
+            FacebookLead.notes, FacebookLead.lead_created_at, FacebookLead.updated_at
+        )
+
+    def convert(row):
+        return (row[0], _full_name(row.first_name, row.last_name)) + tuple(row[1:])
+
+    return Export('facebook_leads', "Facebook Leads", "1877f2", FACEBOOK_LEAD_COLUMNS, _stream(rows, convert))
@@ -1,83 +1,96 @@
 """Meta Lead Sync Scheduler - Handles automatic lead fetching from Meta"""
 
 import logging
-from datetime import datetime
-from app import create_app, db
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
 from app.models.meta_lead import MetaAPIConfig
 from app.services.meta_lead_service import MetaLeadService
 
 logger = logging.getLogger(__name__)
 
 
-def sync_all_meta_leads():
-    """Sync leads from all active Meta configurations"""
-    try:
-        app = create_app()
-        with app.app_context():
-            configs = MetaAPIConfig.query.filter_by(is_active=True).all()
-            
-            if not configs:
-                logger.info("No active Meta configurations to sync")
-                return
-            
-            logger.info(f"Starting sync for {len(configs)} Meta configurations")
-            
-            for config in configs:
-                try:
-                    logger.info(f"Syncing leads for distributor {config.distributor_id}...")
-                    service = MetaLeadService(config)
-                    result = service.sync_leads(limit=100)
-                    
-                    log_msg = f"Distributor {config.distributor_id}: {result['message']}"
-                    if result['success']:
-                        logger.info(f"✓ {log_msg} ({result['fetched']} fetched, {result['stored']} stored)")
-                    else:
-                        logger.warning(f"✗ {log_msg}")
-                
-                except Exception as e:
-                    logger.error(f"Error syncing distributor {config.distributor_id}: {str(e)}")
-                    try:
-                        config.last_error = str(e)
-                        db.session.commit()
-                    except:
-                        pass
-            
-            logger.info("Meta lead sync completed")
-    
-    except Exception as e:
-        logger.error(f"Fatal error in sync_all_meta_leads: {str(e)}")
+def due_meta_configs(now=None):
+    """IDs of active configs whose fetch_interval_minutes has elapsed"""
+    now = now or datetime.utcnow()
+    rows = db.session.query(
+        MetaAPIConfig.id, MetaAPIConfig.last_fetch_time, MetaAPIConfig.fetch_interval_minutes
+    ).filter(MetaAPIConfig.is_active.is_(True)).all()
+    return [
+        config_id for config_id, last_fetch, interval in rows
+        if last_fetch is None or last_fetch + timedelta(minutes=interval or 5) <= now
+    ]
 
 
-def setup_meta_scheduler():
-    """Setup APScheduler for Meta lead sync"""
-    try:
-        from apscheduler.schedulers.background import BackgroundScheduler
-        from apscheduler.triggers.interval import IntervalTrigger
-        
-        scheduler = BackgroundScheduler()
-        
-        # Add job: sync every 5 minutes
-        job = scheduler.add_job(
-            sync_all_meta_leads,
-            IntervalTrigger(minutes=5),
-            id='meta_lead_sync',
-            name='Meta Lead Sync',
-            replace_existing=True,
-            misfire_grace_time=60
-        )
-        
-        scheduler.start()
-        logger.info("✓ Meta Lead Sync Scheduler started (5-minute interval)")
-        return scheduler
-    
-    except ImportError:
-        logger.warning("APScheduler not installed. Install with: pip install apscheduler")
+def sync_meta_config(config_id):
+    """Sync one Meta configuration (runs in a scheduler worker thread)"""
+    from app.utils.scheduler import http_session
+
+    config = db.session.get(MetaAPIConfig, config_id)
+    if config is None or not config.is_active:
         return None
+
+    logger.info(f"Syncing leads for distributor {config.distributor_id}...")
+    try:
+        result = MetaLeadService(config, http=http_session()).sync_leads(limit=100)
     except Exception as e:
-        logger.error(f"Error setting up scheduler: {str(e)}")
-        return None
+        db.session.rollback()
+        config.last_error = str(e)
+        db.session.commit()
+        raise
+
+    log_msg = f"Distributor {config.distributor_id}: {result['message']}"
+    if result['success']:
+        logger.info(f"✓ {log_msg} ({result['fetched']} fetched, {result['stored']} stored)")
+    else:
+        logger.warning(f"✗ {log_msg}")
+    return result
+
+
+def sync_all_meta_leads(app=None, force=False):
+    """
+    Sync leads from all active Meta configurations that are due
+
+    Args:
+        app: Flask app (default: current_app)
+        force: Ignore fetch_interval_minutes and sync every active config
+    """
+    from app.utils.scheduler import run_tenant_jobs
+
+    app = app or current_app._get_current_object()
+    with app.app_context():
+        if force:
+            config_ids = [
+                config_id for (config_id,) in
+                db.session.query(MetaAPIConfig.id).filter(MetaAPIConfig.is_active.is_(True))
+            ]
+        else:
+            config_ids = due_meta_configs()
+        db.session.remove()
+
+    if not config_ids:
+        logger.debug("No Meta configurations due for sync")
+        return {}
+
+    logger.info(f"Starting sync for {len(config_ids)} Meta configurations")
+    results = run_tenant_jobs(app, 'meta_lead_sync', config_ids, sync_meta_config)
+    logger.info("Meta lead sync completed")
+    return results
+
+
+def setup_meta_scheduler(app=None):
+    """
+    Meta lead sync now runs on the shared app scheduler (see app.utils.scheduler)
+
+    Kept for callers that still start it explicitly; returns that scheduler.
+    """
+    from app.utils import scheduler as app_scheduler
+    if app_scheduler.scheduler is None and app is not None:
+        app_scheduler.init_scheduler(app)
+    return app_scheduler.scheduler
 
 
 if __name__ == '__main__':
     # For manual testing
-    sync_all_meta_leads()
+    from app import create_app
+    sync_all_meta_leads(create_app(), force=True)
@@ -0,0 +1,224 @@
+"""
+Keyset (seek) pagination - OFFSET ve sayfa başı COUNT(*) yerine
+
+paginate(page=n) her sayfada OFFSET (n-1)*per_page satırı okuyup atar ve
+ayrıca tam bir COUNT(*) çalıştırır; derin sayfalar doğrusal yavaşlar.
+keyset_paginate() sıralama sütunu + id üzerinden son görülen satırdan devam
+eder: (sütun, id) indeksi olan tabloda 5000. sayfa da 1. sayfa kadar ucuzdur.
+
+Cursor'lar opak (base64 JSON) ve yön bilgisini taşır; bozuk bir cursor
+ilk sayfayı verir. Sıralama sütunu NOT NULL olmalıdır: NULL değerli satırlar
+seek koşuluna hiç uymaz ve ilk sayfadan sonra kaybolur (ValueError).
+
+Toplam sayı isteğe bağlıdır:
+    None      - sayılmaz
+    'exact'   - her istekte COUNT(*)
+    'cached'  - COUNT(*) sonucu COUNT_TTL saniye app cache'inde tutulur
+    'approx'  - PostgreSQL'de planlayıcı tahmini (EXPLAIN), diğerlerinde 'cached'
+"""
+import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime, date
+from flask import request
+from app import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNT_TTL = 60
+MAX_PER_PAGE = 100
+
+
+def encode_cursor(values, direction='next'):
+    """(sort value, id) -> opaque token"""
+    payload = []
+    for value in values:
+        if isinstance(value, datetime):
+            payload.append({'dt': value.isoformat()})
+        elif isinstance(value, date):
+            payload.append({'d': value.isoformat()})
+        else:
+            payload.append(value)
+    raw = json.dumps({'k': payload, 'dir': direction}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Token -> ((datetime/date, id), direction), or None when missing/invalid"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        values = []
+        for value in data['k']:
+            if isinstance(value, dict) and 'dt' in value:
+                value = datetime.fromisoformat(value['dt'])
+            elif isinstance(value, dict) and 'd' in value:
+                value = date.fromisoformat(value['d'])
+            values.append(value)
+        direction = data.get('dir', 'next')
+        if len(values) != 2 or direction not in ('next', 'prev'):
+            return None
+        # Sort value must be a timestamp/date and the tie-breaker an id;
+        # anything else would only fail later inside the query
+        value, last_id = values
+        if not isinstance(value, date) or type(last_id) is not int:
+            return None
+        return tuple(values), direction
+    except (ValueError, KeyError, TypeError, AttributeError, binascii.Error):
+        return None
+
+
+class KeysetPage:
+    """Bir keyset sayfası (şablonlar ve JSON uçları için)"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None, total_is_estimate=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def to_dict(self, serialize):
+        """JSON gövdesi (sonsuz kaydırma)"""
+        return {
+            'items': [serialize(item) for item in self.items],
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'has_next': self.has_next,
+            'total': self.total,
+            'total_is_estimate': self.total_is_estimate,
+        }
+
+
+def _count_cache_key(query, key):
+    if key is None:
+        compiled = query.statement.compile()
+        key = hashlib.sha1(
+            f'{compiled}|{sorted(compiled.params.items(), key=lambda kv: kv[0])}'.encode()
+        ).hexdigest()
+    return f'keyset_count:{key}'
+
+
+def _exact_count(query):
+    return query.order_by(None).count()
+
+
+def _cached_count(query, key):
+    from app import cache
+    cache_key = _count_cache_key(query, key)
+    total = cache.get(cache_key)
+    if total is None:
+        total = _exact_count(query)
+        cache.set(cache_key, total, timeout=COUNT_TTL)
+    return total
+
+
+def _estimated_count(query):
+    """PostgreSQL planner row estimate, or None when unavailable"""
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return None
+    try:
+        sql = query.order_by(None).statement.compile(
+            dialect=bind.dialect, compile_kwargs={'literal_binds': True}
+        ).string
+        plan = db.session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}').scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.debug(f"Row estimate unavailable: {e}")
+        return None
+
+
+def _total(query, mode, count_key):
+    if mode == 'exact':
+        return _exact_count(query), False
+    if mode == 'approx':
+        estimate = _estimated_count(query)
+        if estimate is not None:
+            return estimate, True
+    if mode in ('approx', 'cached'):
+        return _cached_count(query, count_key), False
+    return None, False
+
+
+def keyset_paginate(query, order_column=None, per_page=20, cursor=None, total=None, count_key=None):
+    """
+    Sorguyu (order_column DESC, id DESC) üzerinden sayfala
+
+    Args:
+        query: Filtrelenmiş ORM sorgusu (varsa order_by yok sayılır)
+        order_column: NOT NULL DateTime/Date sıralama sütunu (varsayılan: <model>.created_at)
+        cursor: Önceki sayfanın next_cursor/prev_cursor değeri
+        total: None, 'exact', 'cached' veya 'approx' (modül açıklaması)
+        count_key: 'cached' için cache anahtarı (varsayılan: SQL'in özeti)
+
+    Returns:
+        KeysetPage
+    """
+    entity = query.column_descriptions[0]['entity']
+    order_column = order_column if order_column is not None else entity.created_at
+    if getattr(getattr(order_column, 'expression', order_column), 'nullable', False):
+        raise ValueError(f'Keyset sort column {order_column} must be NOT NULL')
+    id_column = entity.id
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+
+    page_total, estimated = _total(query, total, count_key)
+
+    decoded = decode_cursor(cursor)
+    direction = decoded[1] if decoded else 'next'
+    seek = query.order_by(None)
+    if decoded:
+        (value, last_id), _ = decoded
+        if direction == 'next':
+            seek = seek.filter(db.or_(order_column < value,
+                                      db.and_(order_column == value, id_column < last_id)))
+        else:
+            seek = seek.filter(db.or_(order_column > value,
+                                      db.and_(order_column == value, id_column > last_id)))
+    if direction == 'next':
+        seek = seek.order_by(order_column.desc(), id_column.desc())
+    else:
+        seek = seek.order_by(order_column.asc(), id_column.asc())
+
+    rows = seek.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+
+    def token(row, to):
+        return encode_cursor((getattr(row, order_column.key), row.id), to)
+
+    if direction == 'next':
+        has_next, has_prev = more, decoded is not None
+    else:
+        has_next, has_prev = True, more
+    return KeysetPage(
+        rows, per_page,
+        next_cursor=token(rows[-1], 'next') if rows and has_next else None,
+        prev_cursor=token(rows[0], 'prev') if rows and has_prev else None,
+        total=page_total,
+        total_is_estimate=estimated,
+    )
+
+
+def wants_json():
+    """?format=json veya yalnızca JSON kabul eden istemci"""
+    if request.args.get('format') == 'json':
+        return True
+    best = request.accept_mimetypes.best
+    return best == 'application/json'
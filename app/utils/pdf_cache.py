@@ -0,0 +1,148 @@
+"""
+Encounter PDF render cache
+Muayene PDF'leri içerik parmak izine göre PDF_FOLDER altında saklanır;
+aynı içerik tekrar render edilmez, ETag ile 304 döner.
+"""
+import os
+import hashlib
+import shutil
+from datetime import datetime, date
+from flask import current_app
+from app import db
+from app.models import Encounter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping columns that do not change the rendered document
+_ENCOUNTER_IGNORED = {'pdf_path', 'pdf_generated_at', 'updated_at'}
+# Credentials are never printed, keep them out of the hash input
+_DISTRIBUTOR_IGNORED = {'facebook_access_token', 'website_api_key', 'webhook_secret', 'updated_at'}
+
+
+def _row_values(obj, ignored=()):
+    return [
+        f'{attr.key}={getattr(obj, attr.key)!r}'
+        for attr in obj.__mapper__.column_attrs
+        if attr.key not in ignored
+    ]
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+        return f'{stat.st_size}:{stat.st_mtime_ns}'
+    except OSError:
+        return '-'
+
+
+def pdf_language(encounter, distributor):
+    return encounter.pdf_language or distributor.pdf_language or 'tr'
+
+
+def encounter_fingerprint(bundle, language=None):
+    """
+    PDF çıktısını belirleyen her şeyin SHA-256 özeti
+
+    Encounter, hasta, modül satırları (bundle), distributor markalaması (logo dosyası
+    dahil), dil ve generator kodu. Yaş ve footer yılı bugüne bağlı olduğu
+    için tarih de eklenir.
+    """
+    from app.utils import professional_pdf_generator
+
+    encounter, distributor = bundle.encounter, bundle.distributor
+    language = language or pdf_language(encounter, distributor)
+    h = hashlib.sha256()
+
+    def feed(*parts):
+        for part in parts:
+            h.update(str(part).encode('utf-8'))
+            h.update(b'\x1f')
+
+    feed('lang', language, 'today', date.today().isoformat())
+    feed('renderer', _file_stamp(professional_pdf_generator.__file__))
+    feed('encounter', *_row_values(encounter, _ENCOUNTER_IGNORED))
+    feed('patient', *_row_values(bundle.patient))
+    feed('distributor', *_row_values(distributor, _DISTRIBUTOR_IGNORED))
+    if distributor.logo_path:
+        feed('logo', _file_stamp(os.path.join(current_app.config['UPLOAD_FOLDER'], distributor.logo_path)))
+
+    for name, rows in bundle.module_rows:
+        feed(name, len(rows))
+        for row in rows:
+            feed(*_row_values(row))
+    return h.hexdigest()
+
+
+def _encounter_dir(encounter_id):
+    return os.path.join(current_app.config['PDF_FOLDER'], 'encounters', str(encounter_id))
+
+
+def _set_pdf_columns(encounter_id, pdf_path, generated_at):
+    """pdf_path/pdf_generated_at güncelle (updated_at'e dokunmadan)"""
+    table = Encounter.__table__
+    db.session.execute(
+        table.update()
+        .where(table.c.id == encounter_id)
+        .values(pdf_path=pdf_path, pdf_generated_at=generated_at, updated_at=table.c.updated_at)
+    )
+
+
+def cached_pdf_path(encounter_id, fingerprint):
+    """Önbellekte varsa dosya yolu, yoksa None"""
+    path = os.path.join(_encounter_dir(encounter_id), f'{fingerprint}.pdf')
+    return path if os.path.exists(path) else None
+
+
+def get_encounter_pdf(bundle, fingerprint=None):
+    """
+    Önbellekteki PDF'i döndür, yoksa render edip kaydet
+
+    Args:
+        bundle: load_encounter_bundle() sonucu
+        fingerprint: Önceden hesaplandıysa encounter_fingerprint() sonucu
+
+    Returns:
+        tuple: (dosya yolu, fingerprint) - fingerprint ETag olarak kullanılır
+    """
+    encounter = bundle.encounter
+    fingerprint = fingerprint or encounter_fingerprint(bundle)
+    cached = cached_pdf_path(encounter.id, fingerprint)
+    if cached:
+        return cached, fingerprint
+    folder = _encounter_dir(encounter.id)
+    path = os.path.join(folder, f'{fingerprint}.pdf')
+
+    from app.utils.professional_pdf_generator import ProfessionalEncounterPDF
+    pdf_bytes = ProfessionalEncounterPDF(encounter, bundle.distributor, bundle).generate().getvalue()
+
+    os.makedirs(folder, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, path)
+
+    # Older renders of this encounter can no longer be requested
+    for name in os.listdir(folder):
+        if name != os.path.basename(path) and name.endswith('.pdf'):
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+
+    relative = os.path.relpath(path, current_app.config['PDF_FOLDER'])
+    _set_pdf_columns(encounter.id, relative, datetime.utcnow())
+    db.session.commit()
+    logger.info(f"Encounter {encounter.id} PDF rendered ({len(pdf_bytes)} bytes)")
+    return path, fingerprint
+
+
+def invalidate_encounter_pdf(encounter_id):
+    """
+    Encounter'ın önbellekteki PDF'lerini sil
+
+    Kayıt endpoint'leri commit'ten önce çağırır; sütun güncellemesi aynı
+    transaction'a dahil olur.
+    """
+    _set_pdf_columns(encounter_id, None, None)
+    shutil.rmtree(_encounter_dir(encounter_id), ignore_errors=True)
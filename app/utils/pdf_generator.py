@@ -64,8 +64,11 @@ def get_currency_symbol(currency_code):
     return symbols.get(currency_code, currency_code)
 
 class EncounterPDFGenerator:
-    def __init__(self, encounter, distributor):
+    def __init__(self, encounter, distributor, bundle=None):
+        from app.services.encounter_bundle import load_encounter_bundle
         self.encounter = encounter
+        # Module rows come from one eager-loaded snapshot instead of per-section queries
+        self.bundle = bundle or load_encounter_bundle(encounter.id)
         self.distributor = distributor
         self.patient = encounter.patient
         self.buffer = BytesIO()
@@ -128,19 +131,17 @@ class EncounterPDFGenerator:
         story.append(self._create_patient_info())
         story.append(Spacer(1, 20))
         
-        # Hair Module - Manuel sorgu kullan
-        from app.models import HairAnnotation, HairPatternSelection
-        hair_annotations = HairAnnotation.query.filter_by(encounter_id=self.encounter.id).all()
-        hair_patterns = HairPatternSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        # Hair Module
+        hair_annotations = self.bundle.hair_annotations
+        hair_patterns = self.bundle.hair_patterns
         
         if hair_patterns or hair_annotations:
             story.append(Paragraph("SAÇ EKİMİ", self.heading_style))
             story.extend(self._create_hair_section())
             story.append(Spacer(1, 20))
         
-        # Dental Module - Manuel sorgu kullan
-        from app.models import DentalProcedure
-        dental_procedures = DentalProcedure.query.filter_by(encounter_id=self.encounter.id).all()
+        # Dental Module
+        dental_procedures = self.bundle.dental_procedures
         
         if dental_procedures:
             story.append(Paragraph("DİŞ TEDAVİSİ", self.heading_style))
@@ -148,10 +149,8 @@ class EncounterPDFGenerator:
             story.append(Spacer(1, 20))
         
         # Eye Module
-        # Debug: Manuel sorgu ile kontrol et
-        from app.models import EyeRefraction, EyeTreatmentSelection
-        eye_refraction_manual = EyeRefraction.query.filter_by(encounter_id=self.encounter.id).first()
-        eye_treatments_manual = EyeTreatmentSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        eye_refraction_manual = self.bundle.eye_refraction
+        eye_treatments_manual = self.bundle.eye_treatments
         
         if eye_refraction_manual or eye_treatments_manual:
             story.append(Paragraph("GÖZ AMELİYATI", self.heading_style))
@@ -182,8 +181,8 @@ class EncounterPDFGenerator:
                     logo_path = up_path
             # 2) Fallback to global logo from AppSettings
             if not logo_path:
-                from app.models.settings import AppSettings
-                app_settings = AppSettings.get()
+                from app.services.settings_service import get_settings
+                app_settings = get_settings(self.distributor.id if self.distributor else None)
                 if app_settings and app_settings.logo_path:
                     global_logo = os.path.join(current_app.config['UPLOAD_FOLDER'], app_settings.logo_path)
                     if os.path.exists(global_logo):
@@ -254,9 +253,8 @@ class EncounterPDFGenerator:
         """Create hair transplant section with region diagram"""
         elements = []
         
-        # Collect hair regions - Manuel sorgu kullan
-        from app.models import HairAnnotation
-        hair_annotations = HairAnnotation.query.filter_by(encounter_id=self.encounter.id).all()
+        # Collect hair regions
+        hair_annotations = self.bundle.hair_annotations
         
         regions_data = {}
         total_grafts = 0
@@ -314,9 +312,7 @@ class EncounterPDFGenerator:
             elements.append(table)
         
         # Hair pattern
-        # Manuel sorgu kullan
-        from app.models import HairPatternSelection
-        hair_patterns = HairPatternSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        hair_patterns = self.bundle.hair_patterns
         
         for pattern in hair_patterns:
             pattern_text = f"<b>Saç Dökülme Paterni:</b> {pattern.pattern_key}"
@@ -383,9 +379,7 @@ class EncounterPDFGenerator:
         treated_teeth = {}
         total_price = 0
         
-        # Manuel sorgu kullan
-        from app.models import DentalProcedure
-        dental_procedures = DentalProcedure.query.filter_by(encounter_id=self.encounter.id).all()
+        dental_procedures = self.bundle.dental_procedures
         
         for proc in dental_procedures:
             if proc.tooth_no not in treated_teeth:
@@ -500,9 +494,8 @@ class EncounterPDFGenerator:
         """Create eye surgery section with refraction data"""
         elements = []
         
-        # Refraction data - Manuel sorgu kullan
-        from app.models import EyeRefraction
-        ref = EyeRefraction.query.filter_by(encounter_id=self.encounter.id).first()
+        # Refraction data
+        ref = self.bundle.eye_refraction
         
         if ref:
             
@@ -550,9 +543,8 @@ class EncounterPDFGenerator:
                 elements.append(Paragraph(f"<b>Muayene Notları:</b> {ref.note}", self.styles['Normal']))
                 elements.append(Spacer(1, 10))
         
-        # Eye treatments - Manuel sorgu kullan
-        from app.models import EyeTreatmentSelection
-        eye_treatments = EyeTreatmentSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        # Eye treatments
+        eye_treatments = self.bundle.eye_treatments
         
         if eye_treatments:
             elements.append(Paragraph("<b>Önerilen Tedavi ve Fiyatlandırma:</b>", self.styles['Normal']))
@@ -791,8 +783,11 @@ class HotelReservationPDFGenerator:
 
 class QuotePDFGenerator:
     """Professional price quote PDF for an encounter"""
-    def __init__(self, encounter, distributor):
+    def __init__(self, encounter, distributor, bundle=None):
+        from app.services.encounter_bundle import load_encounter_bundle
         self.encounter = encounter
+        # Module rows come from one eager-loaded snapshot instead of per-section queries
+        self.bundle = bundle or load_encounter_bundle(encounter.id)
         self.distributor = distributor
         self.patient = encounter.patient
         self.buffer = BytesIO()
@@ -871,9 +866,7 @@ class QuotePDFGenerator:
         # Hair transplant (if price configured)
         if getattr(self.encounter, 'hair_annotations', None) and self.distributor.price_per_graft:
             total_grafts = 0
-            # Manuel sorgu kullan
-            from app.models import HairAnnotation
-            hair_annotations = HairAnnotation.query.filter_by(encounter_id=self.encounter.id).all()
+            hair_annotations = self.bundle.hair_annotations
             
             for anno in hair_annotations:
                 if ':' in anno.label:
@@ -897,9 +890,8 @@ class QuotePDFGenerator:
                 ])
                 subtotal_by_currency[currency] = subtotal_by_currency.get(currency, 0) + total
 
-        # Dental procedures - Manuel sorgu kullan
-        from app.models import DentalProcedure
-        dental_procedures = DentalProcedure.query.filter_by(encounter_id=self.encounter.id).all()
+        # Dental procedures
+        dental_procedures = self.bundle.dental_procedures
         
         if dental_procedures:
             for proc in dental_procedures:
@@ -917,9 +909,7 @@ class QuotePDFGenerator:
 
         # Eye treatments
         if getattr(self.encounter, 'eye_treatments', None):
-            # Manuel sorgu kullan
-            from app.models import EyeTreatmentSelection
-            eye_treatments = EyeTreatmentSelection.query.filter_by(encounter_id=self.encounter.id).all()
+            eye_treatments = self.bundle.eye_treatments
             
             for tr in eye_treatments:
                 price = float(tr.price or 0)
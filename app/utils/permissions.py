@@ -1,3 +1,7 @@
+import time
+import uuid
+import threading
+from collections import defaultdict, namedtuple
 from functools import wraps
 from flask import abort, flash, redirect, url_for
 from flask_login import current_user
@@ -61,9 +65,8 @@ def any_permission_required(*permission_names):
             if hasattr(current_user, 'is_superadmin') and current_user.is_superadmin():
                 return f(*args, **kwargs)
             
-            for perm in permission_names:
-                if has_permission(current_user, perm):
-                    return f(*args, **kwargs)
+            if not user_permission_set(current_user).isdisjoint(permission_names):
+                return f(*args, **kwargs)
             
             flash('Bu işlem için yetkiniz yok.', 'danger')
             abort(403)
@@ -71,60 +74,116 @@ def any_permission_required(*permission_names):
     return decorator
 
 
+# ========== ROLE GRAPH CACHE ==========
+# Rol -> izin grafiği ve kullanıcı -> rol eşlemesi bir kez yüklenir; her
+# kullanıcının izin kümesi frozenset olarak (user_id, sürüm) ile cache'lenir.
+# Rol/izin/atama değişince invalidate_permission_cache() sürümü değiştirir;
+# sürüm app cache'inde (flask-caching) durduğu için paylaşılan bir cache
+# backend'i (redis) ile tüm worker'lar aynı anda yeniler; process içi
+# SimpleCache'te diğer worker'lar en geç _GRAPH_TTL saniye sonra yeniler.
+
+_VERSION_KEY = 'rbac_graph_version'
+_GRAPH_TTL = 60
+
+# role_permissions {role_id: frozenset(names)}, role_names {role_id: name},
+# user_roles {user_id: frozenset(role_ids)}
+_RoleGraph = namedtuple('_RoleGraph', 'version role_permissions role_names user_roles all_permissions loaded_at')
+
+_graph = None
+# user_id -> (graph it was computed from, frozenset(permission names))
+_user_permissions = {}
+_graph_lock = threading.Lock()
+
+
+def _graph_version():
+    from app import cache
+    return cache.get(_VERSION_KEY) or '0'
+
+
+def invalidate_permission_cache():
+    """Rol/izin/kullanıcı-rol değişikliği commit edildikten sonra çağrılır"""
+    global _graph
+    from app import cache
+    cache.set(_VERSION_KEY, uuid.uuid4().hex, timeout=0)
+    with _graph_lock:
+        _graph = None
+        _user_permissions.clear()
+
+
+def _load_graph(version):
+    from app import db
+    from app.models.rbac import Role, Permission, RolePermission, UserRole
+
+    role_names = dict(db.session.query(Role.id, Role.name).all())
+    all_permissions = frozenset(name for (name,) in db.session.query(Permission.name).all())
+    role_permissions = defaultdict(set)
+    for role_id, name in db.session.query(RolePermission.role_id, Permission.name)\
+            .join(Permission, Permission.id == RolePermission.permission_id).all():
+        role_permissions[role_id].add(name)
+    user_roles = defaultdict(set)
+    for user_id, role_id in db.session.query(UserRole.user_id, UserRole.role_id).all():
+        user_roles[user_id].add(role_id)
+    return _RoleGraph(
+        version,
+        {role_id: frozenset(names) for role_id, names in role_permissions.items()},
+        role_names,
+        {user_id: frozenset(role_ids) for user_id, role_ids in user_roles.items()},
+        all_permissions,
+        time.monotonic(),
+    )
+
+
+def _is_current(graph, version):
+    return graph is not None and graph.version == version and time.monotonic() - graph.loaded_at < _GRAPH_TTL
+
+
+def _role_graph():
+    """Güncel graf; sürüm değiştiyse yeniden yüklenir"""
+    global _graph
+    version = _graph_version()
+    graph = _graph
+    if _is_current(graph, version):
+        return graph
+    with _graph_lock:
+        if not _is_current(_graph, version):
+            _graph = _load_graph(version)
+            _user_permissions.clear()
+        return _graph
+
+
+def user_permission_set(user):
+    """Kullanıcının rolleri üzerinden sahip olduğu izin adları (frozenset)"""
+    graph = _role_graph()
+    cached = _user_permissions.get(user.id)
+    if cached is not None and cached[0] is graph:
+        return cached[1]
+    permissions = frozenset().union(*(
+        graph.role_permissions.get(role_id, ()) for role_id in graph.user_roles.get(user.id, ())
+    ))
+    _user_permissions[user.id] = (graph, permissions)
+    return permissions
+
+
 def has_permission(user, permission_name):
     """Check if user has a specific permission through their roles."""
-    from app.models.rbac import Permission, RolePermission, UserRole
-    
-    # Get user's roles
-    user_role_ids = [ur.role_id for ur in user.user_roles]
-    if not user_role_ids:
-        return False
-    
-    # Check if any role has the permission
-    perm = Permission.query.filter_by(name=permission_name).first()
-    if not perm:
-        return False
-    
-    role_perm = RolePermission.query.filter(
-        RolePermission.role_id.in_(user_role_ids),
-        RolePermission.permission_id == perm.id
-    ).first()
-    
-    return role_perm is not None
+    return permission_name in user_permission_set(user)
 
 
 def has_role(user, role_name):
     """Check if user has a specific role."""
-    from app.models.rbac import Role, UserRole
-    
-    role = Role.query.filter_by(name=role_name).first()
-    if not role:
-        return False
-    
-    user_role = UserRole.query.filter_by(user_id=user.id, role_id=role.id).first()
-    return user_role is not None
+    return role_name in get_user_roles(user)
 
 
 def get_user_permissions(user):
     """Get all permission names for a user."""
-    from app.models.rbac import Permission, RolePermission
-    
     if hasattr(user, 'is_superadmin') and user.is_superadmin():
         # Superadmin has all permissions
-        return [p.name for p in Permission.query.all()]
-    
-    user_role_ids = [ur.role_id for ur in user.user_roles]
-    if not user_role_ids:
-        return []
-    
-    permission_ids = [rp.permission_id for rp in RolePermission.query.filter(
-        RolePermission.role_id.in_(user_role_ids)
-    ).all()]
-    
-    permissions = Permission.query.filter(Permission.id.in_(permission_ids)).all()
-    return [p.name for p in permissions]
+        return sorted(_role_graph().all_permissions)
+    return sorted(user_permission_set(user))
 
 
 def get_user_roles(user):
     """Get all role names for a user."""
-    return [ur.role.name for ur in user.user_roles]
+    graph = _role_graph()
+    return [graph.role_names[role_id] for role_id in graph.user_roles.get(user.id, ())
+            if role_id in graph.role_names]
@@ -14,6 +14,32 @@ from datetime import datetime
 import os
 
 
+def _price_rows(items, currencies, distributor_id):
+    """
+    Kalemlerin tüm para birimlerindeki fiyatları (tek matris işlemiyle)
+    
+    item.get_price_in_currency ile aynı sonuç: kur yoksa base_price döner.
+    
+    Returns:
+        list: Her kalem için [fiyat, ...] (currencies sırasıyla)
+    """
+    from app.utils.rate_matrix import convert_many
+    
+    converted = convert_many(
+        [item.base_price for item in items],
+        [item.currency for item in items],
+        currencies,
+        distributor_id
+    )
+    rows = []
+    for i, item in enumerate(items):
+        rows.append([
+            item.base_price if item.currency == curr else (converted[curr][i] or item.base_price)
+            for curr in currencies
+        ])
+    return rows
+
+
 def generate_price_catalog_pdf(distributor, currencies=['USD', 'EUR', 'TRY'], language='tr'):
     """
     Fiyat kataloğu PDF oluştur
@@ -112,14 +138,15 @@ def generate_price_catalog_pdf(distributor, currencies=['USD', 'EUR', 'TRY'], la
         
         table_data = [[header_labels.get(language, 'Service')] + [f'{curr}' for curr in currencies]]
         
-        for item in items:
+        prices = _price_rows(items, currencies, distributor.id)
+        
+        for item, item_prices in zip(items, prices):
             # Service name
             service_name = getattr(item, f'service_name_{language}', None) or item.service_name_tr
             
             # Prices in each currency
             row = [service_name]
-            for curr in currencies:
-                price = item.get_price_in_currency(curr)
+            for curr, price in zip(currencies, item_prices):
                 if price:
                     from app.utils.currency_service import format_price
                     formatted = format_price(price, curr, language)
@@ -200,8 +227,10 @@ def export_prices_to_excel(distributor, currencies=['USD', 'EUR', 'TRY']):
             is_active=True
         ).order_by(PriceListItem.category, PriceListItem.display_order).all()
         
+        prices = _price_rows(items, currencies, distributor.id)
+        
         data = []
-        for item in items:
+        for item, item_prices in zip(items, prices):
             row = {
                 'Kategori': item.category,
                 'Hizmet Kodu': item.service_code,
@@ -210,8 +239,7 @@ def export_prices_to_excel(distributor, currencies=['USD', 'EUR', 'TRY']):
                 'Hizmet (AR)': item.service_name_ar or '',
             }
             
-            for curr in currencies:
-                price = item.get_price_in_currency(curr)
+            for curr, price in zip(currencies, item_prices):
                 row[curr] = price if price else 0
             
             data.append(row)
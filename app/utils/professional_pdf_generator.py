@@ -9,6 +9,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from io import BytesIO
 from datetime import datetime
+from flask import current_app
 import os
 
 # Font registration
@@ -81,7 +82,7 @@ class ProfessionalPDFCanvas(canvas.Canvas):
         # Logo (left side)
         if self.distributor.logo_path:
             try:
-                logo_path = os.path.join('app', 'static', 'uploads', self.distributor.logo_path)
+                logo_path = os.path.join(current_app.config['UPLOAD_FOLDER'], self.distributor.logo_path)
                 if os.path.exists(logo_path):
                     # White square background for logo
                     self.setFillColor(colors.white)
@@ -155,8 +156,11 @@ class ProfessionalPDFCanvas(canvas.Canvas):
 class ProfessionalEncounterPDF:
     """Professional PDF generator for medical encounters"""
     
-    def __init__(self, encounter, distributor):
+    def __init__(self, encounter, distributor, bundle=None):
+        from app.services.encounter_bundle import load_encounter_bundle
         self.encounter = encounter
+        # Module rows come from one eager-loaded snapshot instead of per-section queries
+        self.bundle = bundle or load_encounter_bundle(encounter.id)
         self.distributor = distributor
         self.patient = encounter.patient
         self.buffer = BytesIO()
@@ -333,59 +337,52 @@ class ProfessionalEncounterPDF:
         """Create treatment detail pages"""
         elements = []
         
-        # Hair transplant - Manuel sorgu kullan
-        from app.models import HairAnnotation, HairPatternSelection
-        hair_annotations = HairAnnotation.query.filter_by(encounter_id=self.encounter.id).all()
-        hair_patterns = HairPatternSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        # Hair transplant
+        hair_annotations = self.bundle.hair_annotations
+        hair_patterns = self.bundle.hair_patterns
         
         if hair_annotations or hair_patterns:
             elements.extend(self._create_hair_section())
             elements.append(Spacer(1, 10*mm))
         
-        # Dental - Manuel sorgu kullan
-        from app.models import DentalProcedure
-        dental_procedures = DentalProcedure.query.filter_by(encounter_id=self.encounter.id).all()
+        # Dental
+        dental_procedures = self.bundle.dental_procedures
         
         if dental_procedures:
             elements.extend(self._create_dental_section())
             elements.append(Spacer(1, 10*mm))
         
-        # Eye - Manuel sorgu kullan
-        from app.models import EyeRefraction, EyeTreatmentSelection
-        eye_refraction = EyeRefraction.query.filter_by(encounter_id=self.encounter.id).first()
-        eye_treatments = EyeTreatmentSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        # Eye
+        eye_refraction = self.bundle.eye_refraction
+        eye_treatments = self.bundle.eye_treatments
         
         if eye_refraction or eye_treatments:
             elements.extend(self._create_eye_section())
             elements.append(Spacer(1, 10*mm))
         
-        # Aesthetic - Manuel sorgu kullan
-        from app.models import AestheticProcedure
-        aesthetic_procedure = AestheticProcedure.query.filter_by(encounter_id=self.encounter.id).first()
+        # Aesthetic
+        aesthetic_procedure = self.bundle.aesthetic_procedure
         
         if aesthetic_procedure:
             elements.extend(self._create_aesthetic_section())
             elements.append(Spacer(1, 10*mm))
         
-        # Bariatric - Manuel sorgu kullan
-        from app.models import BariatricSurgery
-        bariatric_surgery = BariatricSurgery.query.filter_by(encounter_id=self.encounter.id).first()
+        # Bariatric
+        bariatric_surgery = self.bundle.bariatric_surgery
         
         if bariatric_surgery:
             elements.extend(self._create_bariatric_section())
             elements.append(Spacer(1, 10*mm))
         
-        # IVF - Manuel sorgu kullan
-        from app.models import IVFTreatment
-        ivf_treatment = IVFTreatment.query.filter_by(encounter_id=self.encounter.id).first()
+        # IVF
+        ivf_treatment = self.bundle.ivf_treatment
         
         if ivf_treatment:
             elements.extend(self._create_ivf_section())
             elements.append(Spacer(1, 10*mm))
         
-        # Check-up - Manuel sorgu kullan
-        from app.models import CheckUpPackage
-        checkup_package = CheckUpPackage.query.filter_by(encounter_id=self.encounter.id).first()
+        # Check-up
+        checkup_package = self.bundle.checkup_package
         
         if checkup_package:
             elements.extend(self._create_checkup_section())
@@ -401,39 +398,36 @@ class ProfessionalEncounterPDF:
         """Generate brief treatment summary"""
         treatments = []
         
-        # Hair - Manuel sorgu
-        from app.models import HairAnnotation
-        hair_annotations = HairAnnotation.query.filter_by(encounter_id=self.encounter.id).all()
+        # Hair
+        hair_annotations = self.bundle.hair_annotations
         if hair_annotations:
             total_grafts = sum(ann.graft_count or 0 for ann in hair_annotations if hasattr(ann, 'graft_count'))
             if total_grafts > 0:
                 treatments.append(f"• Saç Ekimi: {total_grafts} greft")
         
-        # Dental - Manuel sorgu
-        from app.models import DentalProcedure
-        dental_procedures = DentalProcedure.query.filter_by(encounter_id=self.encounter.id).all()
+        # Dental
+        dental_procedures = self.bundle.dental_procedures
         if dental_procedures:
             treatments.append(f"• Diş Tedavisi: {len(dental_procedures)} işlem")
         
-        # Eye manual check için yeniden sorgu
-        from app.models import EyeRefraction, EyeTreatmentSelection
-        eye_refraction = EyeRefraction.query.filter_by(encounter_id=self.encounter.id).first()
-        eye_treatments = EyeTreatmentSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        # Eye
+        eye_refraction = self.bundle.eye_refraction
+        eye_treatments = self.bundle.eye_treatments
         
         if eye_refraction or eye_treatments:
             treatments.append("• Göz Ameliyatı")
         
-        if self.encounter.aesthetic_procedure:
-            treatments.append(f"• Estetik Cerrahi: {self.encounter.aesthetic_procedure.procedure_type}")
+        if self.bundle.aesthetic_procedure:
+            treatments.append(f"• Estetik Cerrahi: {self.bundle.aesthetic_procedure.procedure_type}")
         
-        if self.encounter.bariatric_surgery:
-            treatments.append(f"• Bariatrik Cerrahi: {self.encounter.bariatric_surgery.surgery_type}")
+        if self.bundle.bariatric_surgery:
+            treatments.append(f"• Bariatrik Cerrahi: {self.bundle.bariatric_surgery.surgery_type}")
         
-        if self.encounter.ivf_treatment:
-            treatments.append(f"• Tüp Bebek: {self.encounter.ivf_treatment.treatment_type}")
+        if self.bundle.ivf_treatment:
+            treatments.append(f"• Tüp Bebek: {self.bundle.ivf_treatment.treatment_type}")
         
-        if self.encounter.checkup_package:
-            treatments.append(f"• Check-Up: {self.encounter.checkup_package.package_type}")
+        if self.bundle.checkup_package:
+            treatments.append(f"• Check-Up: {self.bundle.checkup_package.package_type}")
         
         return '<br/>'.join(treatments) if treatments else ''
     
@@ -454,9 +448,8 @@ class ProfessionalEncounterPDF:
         except:
             pass
         
-        # Graft details table - Manuel sorgu kullan
-        from app.models import HairAnnotation
-        hair_annotations = HairAnnotation.query.filter_by(encounter_id=self.encounter.id).all()
+        # Graft details table
+        hair_annotations = self.bundle.hair_annotations
         
         if hair_annotations:
             graft_data = [['Bölge', 'Greft Sayısı']]
@@ -519,9 +512,8 @@ class ProfessionalEncounterPDF:
         elements.append(Paragraph("🦷 Diş İşlemleri", self.section_style))
         elements.append(Spacer(1, 5*mm))
         
-        # Dental table - Manuel sorgu kullan
-        from app.models import DentalProcedure
-        dental_procedures = DentalProcedure.query.filter_by(encounter_id=self.encounter.id).all()
+        # Dental table
+        dental_procedures = self.bundle.dental_procedures
         
         dental_data = [['Diş No', 'İşlem', 'Tutar']]
         total = 0
@@ -602,9 +594,8 @@ class ProfessionalEncounterPDF:
         except:
             pass
         
-        # Refraction data if available - Manuel sorgu kullan
-        from app.models import EyeRefraction
-        refraction = EyeRefraction.query.filter_by(encounter_id=self.encounter.id).first()
+        # Refraction data if available
+        refraction = self.bundle.eye_refraction
         
         if refraction:
             ref = refraction
@@ -633,9 +624,8 @@ class ProfessionalEncounterPDF:
             elements.append(ref_table)
             elements.append(Spacer(1, 5*mm))
         
-        # Treatment details - Manuel sorgu kullan
-        from app.models import EyeTreatmentSelection
-        treatments = EyeTreatmentSelection.query.filter_by(encounter_id=self.encounter.id).all()
+        # Treatment details
+        treatments = self.bundle.eye_treatments
         
         if treatments:
             for treatment in treatments:
@@ -681,9 +671,7 @@ class ProfessionalEncounterPDF:
         elements.append(Paragraph("✨ Estetik Cerrahi", self.section_style))
         elements.append(Spacer(1, 5*mm))
         
-        # Manuel sorgu kullan
-        from app.models import AestheticProcedure
-        proc = AestheticProcedure.query.filter_by(encounter_id=self.encounter.id).first()
+        proc = self.bundle.aesthetic_procedure
         
         # Try to add relevant image based on procedure type
         try:
@@ -763,9 +751,7 @@ class ProfessionalEncounterPDF:
         elements.append(Paragraph("⚖️ Bariatrik Cerrahi", self.section_style))
         elements.append(Spacer(1, 5*mm))
         
-        # Manuel sorgu kullan
-        from app.models import BariatricSurgery
-        surg = BariatricSurgery.query.filter_by(encounter_id=self.encounter.id).first()
+        surg = self.bundle.bariatric_surgery
         
         # Try to add stomach/surgery diagram
         try:
@@ -861,9 +847,7 @@ class ProfessionalEncounterPDF:
         elements.append(Paragraph("👶 Tüp Bebek Tedavisi", self.section_style))
         elements.append(Spacer(1, 5*mm))
         
-        # Manuel sorgu kullan
-        from app.models import IVFTreatment
-        ivf = IVFTreatment.query.filter_by(encounter_id=self.encounter.id).first()
+        ivf = self.bundle.ivf_treatment
         
         # Try to add IVF diagram
         try:
@@ -936,9 +920,7 @@ class ProfessionalEncounterPDF:
         elements.append(Paragraph("❤️ Check-Up Paketi", self.section_style))
         elements.append(Spacer(1, 5*mm))
 
-        # Manuel sorgu kullan
-        from app.models import CheckUpPackage
-        pkg = CheckUpPackage.query.filter_by(encounter_id=self.encounter.id).first()
+        pkg = self.bundle.checkup_package
 
         # Optional icon
         try:
@@ -1043,7 +1025,7 @@ class ProfessionalEncounterPDF:
         # Hair
         total_grafts = 0
         if getattr(self.encounter, 'hair_annotations', None):
-            for ann in self.encounter.hair_annotations:
+            for ann in self.bundle.hair_annotations:
                 if hasattr(ann, 'graft_count') and ann.graft_count:
                     total_grafts += ann.graft_count
         if total_grafts > 0:
@@ -1092,32 +1074,32 @@ class ProfessionalEncounterPDF:
 
         # Dental
         if getattr(self.encounter, 'dental_procedures', None):
-            for proc in self.encounter.dental_procedures:
+            for proc in self.bundle.dental_procedures:
                 add_module_row("Diş Tedavisi", proc)
 
         # Eye
         if getattr(self.encounter, 'eye_treatments', None):
-            for t in self.encounter.eye_treatments:
+            for t in self.bundle.eye_treatments:
                 add_module_row("Göz Ameliyatı", t)
 
         # Aesthetic
         if getattr(self.encounter, 'aesthetic_procedure', None):
-            ap = self.encounter.aesthetic_procedure
+            ap = self.bundle.aesthetic_procedure
             add_module_row("Estetik Cerrahi", ap)
 
         # Bariatric
         if getattr(self.encounter, 'bariatric_surgery', None):
-            b = self.encounter.bariatric_surgery
+            b = self.bundle.bariatric_surgery
             add_module_row("Bariatrik Cerrahi", b)
 
         # IVF
         if getattr(self.encounter, 'ivf_treatment', None):
-            v = self.encounter.ivf_treatment
+            v = self.bundle.ivf_treatment
             add_module_row("Tüp Bebek", v)
 
         # Check-up
         if getattr(self.encounter, 'checkup_package', None):
-            c = self.encounter.checkup_package
+            c = self.bundle.checkup_package
             add_module_row("Check-Up", c)
 
         if module_rows:
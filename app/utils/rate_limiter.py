@@ -0,0 +1,241 @@
+"""
+Rate limiter - token bucket, değiştirilebilir depolama
+
+Her anahtar (ör. `handle_mark_read:1.2.3.4`) için kapasitesi `limit` olan,
+`window` saniyede tamamen dolan bir kova tutulur; kontrol O(1)'dir ve
+anahtar başına sadece (jeton, zaman) saklanır.
+
+Depolama RATE_LIMIT_STORAGE ayarıyla seçilir:
+    memory                 process içi, LRU ile sınırlı (tek worker / testler)
+    sqlite                 instance klasöründe paylaşılan SQLite dosyası (aynı makinedeki tüm worker'lar)
+    sqlite:////path/to.db  aynı, belirtilen dosya
+    redis://host:6379/0    Redis (birden çok makine; `redis` paketi gerekir)
+"""
+import os
+import math
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# allowed: izin verildi mi, remaining: kalan istek, retry_after: saniye (izin yoksa)
+RateLimitResult = namedtuple('RateLimitResult', 'allowed remaining retry_after')
+
+# Kısmi dolumların toplamı kayan noktada 0.9999999 olabilir; Retry-After kadar bekleyen reddedilmesin
+_EPSILON = 1e-9
+
+
+def _refill(tokens, updated, limit, window, now):
+    """Kovayı `now` anına doldur ve bir jeton harca: (jeton, sonuç)"""
+    rate = limit / window
+    tokens = min(limit, tokens + max(now - updated, 0) * rate)
+    if tokens >= 1 - _EPSILON:
+        tokens = max(tokens, 1) - 1
+        return tokens, RateLimitResult(True, int(tokens), 0)
+    return tokens, RateLimitResult(False, 0, _retry_after((1 - tokens) / rate))
+
+
+def _retry_after(seconds):
+    """Tam saniyeye yukarı yuvarla; 20.000000000000004 gibi kayan nokta artıkları 21 olmasın"""
+    return max(math.ceil(round(seconds, 6)), 1)
+
+
+class LimiterBackend:
+    """Rate limiter depolama arayüzü"""
+
+    name = 'base'
+
+    def hit(self, key: str, limit: int, window: float, now: float = None) -> RateLimitResult:
+        """Anahtar için bir istek harca"""
+        raise NotImplementedError
+
+    def reset(self, key: str = None):
+        """Anahtarı (None ise hepsini) sıfırla"""
+        raise NotImplementedError
+
+
+class MemoryBackend(LimiterBackend):
+    """Process içi kovalar; en eski kullanılan anahtarlar `maxsize` aşılınca atılır"""
+
+    name = 'memory'
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit, now))
+            tokens, result = _refill(tokens, updated, limit, window, now)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return result
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class SQLiteBackend(LimiterBackend):
+    """
+    Paylaşılan SQLite dosyası: aynı makinedeki worker'lar aynı kovaları görür
+
+    Her kontrol tek bir `BEGIN IMMEDIATE` transaction'ı (birincil anahtarla
+    okuma + upsert). Dolmuş kovalar her PRUNE_EVERY kontrolde bir, `full_at`
+    indeksi üzerinden silinir.
+    """
+
+    name = 'sqlite'
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets ('
+                         'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                         'updated REAL NOT NULL, full_at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_buckets_full_at ON buckets (full_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Limiter state may be lost on power failure, it only needs to be shared
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (limit, now)
+            tokens, result = _refill(tokens, updated, limit, window, now)
+            full_at = now + (limit - tokens) * window / limit
+            conn.execute('INSERT INTO buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) '
+                         'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, '
+                         'updated = excluded.updated, full_at = excluded.full_at',
+                         (key, tokens, now, full_at))
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                # A full bucket is the same as no bucket
+                conn.execute('DELETE FROM buckets WHERE full_at < ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+    def reset(self, key=None):
+        conn = self._connect()
+        if key is None:
+            conn.execute('DELETE FROM buckets')
+        else:
+            conn.execute('DELETE FROM buckets WHERE key = ?', (key,))
+
+
+class RedisBackend(LimiterBackend):
+    """Redis: kova bir hash, kontrol tek bir Lua script çağrısı (atomik)"""
+
+    name = 'redis'
+    PREFIX = 'ratelimit:'
+
+    _SCRIPT = """
+    local limit = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or limit
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(limit, tokens + math.max(now - updated, 0) * limit / window)
+    local allowed = 0
+    if tokens >= 1 - 1e-9 then
+        tokens = math.max(tokens, 1) - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self._SCRIPT)
+
+    def hit(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        allowed, tokens = self._script(keys=[self.PREFIX + key], args=[limit, window, now])
+        tokens = float(tokens)
+        if allowed:
+            return RateLimitResult(True, int(tokens), 0)
+        return RateLimitResult(False, 0, _retry_after((1 - tokens) * window / limit))
+
+    def reset(self, key=None):
+        if key is not None:
+            self._client.delete(self.PREFIX + key)
+            return
+        for name in self._client.scan_iter(self.PREFIX + '*'):
+            self._client.delete(name)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def create_backend(storage: str, instance_path: str = None) -> LimiterBackend:
+    """RATE_LIMIT_STORAGE değerinden depolama oluştur"""
+    if storage == 'memory':
+        return MemoryBackend()
+    if storage == 'sqlite':
+        return SQLiteBackend(os.path.join(instance_path or '.', 'rate_limits.db'))
+    if storage.startswith('sqlite:///'):
+        return SQLiteBackend(storage[len('sqlite:///'):])
+    if storage.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(storage)
+    raise ValueError(f'Unknown RATE_LIMIT_STORAGE: {storage}')
+
+
+def get_limiter() -> LimiterBackend:
+    """Ayarlı depolamanın (process başına tek) örneği; app context yoksa memory"""
+    from flask import current_app, has_app_context
+    if has_app_context():
+        storage = current_app.config.get('RATE_LIMIT_STORAGE', 'sqlite')
+        instance_path = current_app.instance_path
+    else:
+        storage, instance_path = 'memory', None
+    key = (storage, instance_path if storage == 'sqlite' else None)
+    with _backends_lock:
+        if key not in _backends:
+            try:
+                _backends[key] = create_backend(storage, instance_path)
+            except Exception as e:
+                # Never take the site down because the limiter store is unreachable
+                logger.error(f"Rate limit storage '{storage}' unavailable, using memory: {e}")
+                _backends[key] = MemoryBackend()
+        return _backends[key]
+
+
+def check_rate_limit(key: str, limit: int, window: float) -> RateLimitResult:
+    """`key` için bir istek harca; depolama hatasında isteğe izin verilir"""
+    try:
+        return get_limiter().hit(key, limit, window)
+    except Exception as e:
+        logger.error(f"Rate limit check failed for {key}: {e}")
+        return RateLimitResult(True, limit, 0)
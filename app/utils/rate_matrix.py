@@ -0,0 +1,216 @@
+"""
+Rate Matrix - distributor başına yoğun döviz kuru matrisi
+Kurlar tek sorguyla yüklenir, çapraz kurlar önceden hesaplanır; rates
+değiştiğinde commit sonrası geçersiz kılınır.
+
+Matrisler process içinde tutulur ve app cache'indeki (flask-caching) bir
+sürümle etiketlenir: commit sonrası sürüm değişir, paylaşılan cache
+backend'inde tüm worker'lar (ör. kur güncellemesini çalıştıran scheduler
+liderinden sonra) hemen, process içi SimpleCache'te en geç
+MATRIX_TTL_SECONDS saniye sonra yeniler.
+"""
+import threading
+import time
+import uuid
+import logging
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.currency import CurrencyRate
+
+logger = logging.getLogger(__name__)
+
+# Fallback for workers that can't see the version bump (per-process cache backend)
+MATRIX_TTL_SECONDS = 60
+
+_VERSION_PREFIX = 'rate_matrix_version'
+
+_matrices = {}
+_lock = threading.Lock()
+
+
+class RateMatrix:
+    """Dense rate table: matrix[i, j] = 1 unit of codes[i] in codes[j] (NaN = unknown)"""
+
+    def __init__(self, codes, matrix, version=None):
+        self.codes = codes
+        self.index = {code: i for i, code in enumerate(codes)}
+        self.matrix = matrix
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, distributor_id, version=None):
+        from app.utils.currency_service import SUPPORTED_CURRENCIES
+
+        rows = CurrencyRate.query.with_entities(
+            CurrencyRate.base_currency, CurrencyRate.target_currency, CurrencyRate.rate
+        ).filter_by(distributor_id=distributor_id).all()
+
+        codes = list(SUPPORTED_CURRENCIES)
+        for base, target, _ in rows:
+            for code in (base, target):
+                if code not in codes:
+                    codes.append(code)
+        index = {code: i for i, code in enumerate(codes)}
+        n = len(codes)
+
+        direct = np.full((n, n), np.nan)
+        for base, target, rate in rows:
+            if rate is not None:
+                direct[index[base], index[target]] = rate
+
+        # Direct rates win; reverse rates only fill the gaps (same order as before)
+        with np.errstate(divide='ignore'):
+            reverse = np.where(direct.T != 0, 1.0 / direct.T, np.nan)
+        matrix = np.where(np.isnan(direct), reverse, direct)
+
+        # Cross rates through one pivot, trying the most used base currency first
+        bases = [base for base, _, _ in rows]
+        pivots = sorted({index[b] for b in bases}, key=lambda i: -bases.count(codes[i]))
+        pivots += [i for i in range(n) if i not in pivots]
+        single_hop = matrix.copy()
+        for k in pivots:
+            gaps = np.isnan(matrix)
+            if not gaps.any():
+                break
+            candidate = np.outer(single_hop[:, k], single_hop[k, :])
+            matrix = np.where(gaps, candidate, matrix)
+
+        np.fill_diagonal(matrix, 1.0)
+        # Zero/negative rates are treated as missing, like the old lookups did
+        matrix[~(matrix > 0)] = np.nan
+        return cls(codes, matrix, version)
+
+    @property
+    def expired(self):
+        return time.monotonic() - self.loaded_at > MATRIX_TTL_SECONDS
+
+    def rate(self, from_currency, to_currency):
+        if from_currency == to_currency:
+            return 1.0
+        i = self.index.get(from_currency)
+        j = self.index.get(to_currency)
+        if i is None or j is None:
+            return None
+        value = self.matrix[i, j]
+        return None if np.isnan(value) else float(value)
+
+    def rates_to(self, from_currencies, to_currencies):
+        """Rate block for row currencies x column currencies (NaN where unknown)"""
+        rows = np.array([self.index.get(c, -1) for c in from_currencies])
+        cols = np.array([self.index.get(c, -1) for c in to_currencies])
+        block = self.matrix[rows[:, None], cols[None, :]]
+        block[(rows[:, None] < 0) | (cols[None, :] < 0)] = np.nan
+        same = np.asarray(from_currencies, dtype=object)[:, None] == np.asarray(to_currencies, dtype=object)[None, :]
+        block[same] = 1.0
+        return block
+
+
+def _version_keys(distributor_id):
+    return [f'{_VERSION_PREFIX}:all', f'{_VERSION_PREFIX}:{distributor_id}']
+
+
+def _version(distributor_id):
+    from app import cache
+    return tuple(cache.get_many(*_version_keys(distributor_id)))
+
+
+def get_rate_matrix(distributor_id):
+    """Distributor'ın kur matrisini döndür (gerekirse tek sorguyla yükle)"""
+    version = _version(distributor_id)
+    with _lock:
+        matrix = _matrices.get(distributor_id)
+    if matrix is None or matrix.expired or matrix.version != version:
+        matrix = RateMatrix.load(distributor_id, version)
+        with _lock:
+            _matrices[distributor_id] = matrix
+    return matrix
+
+
+def invalidate_rate_matrix(distributor_id=None):
+    """Tüm worker'lar için önbelleği geçersiz kıl (distributor_id=None ise tümü)"""
+    from app import cache
+    cache.set(f'{_VERSION_PREFIX}:{distributor_id if distributor_id is not None else "all"}',
+              uuid.uuid4().hex, timeout=0)
+    with _lock:
+        if distributor_id is None:
+            _matrices.clear()
+        else:
+            _matrices.pop(distributor_id, None)
+
+
+def convert_many(amounts, from_currency, to_currencies, distributor_id):
+    """
+    Tutarları tek dizi işlemiyle birden çok para birimine çevir
+
+    Args:
+        amounts: Miktar listesi
+        from_currency: Kaynak para birimi, ya da her miktar için bir para birimi listesi
+        to_currencies: Hedef para birimleri listesi
+        distributor_id: Distributor ID
+
+    Returns:
+        dict: {currency: [converted_amount veya None, ...]} - CurrencyRate.convert
+        ile aynı kurallar (boş/0 miktar ya da bilinmeyen kur -> None)
+    """
+    to_currencies = list(to_currencies)
+    count = len(amounts)
+    if not count or not to_currencies:
+        return {currency: [None] * count for currency in to_currencies}
+
+    sources = [from_currency] * count if isinstance(from_currency, str) else list(from_currency)
+    values = np.array([amount or np.nan for amount in amounts], dtype=float)
+
+    rates = get_rate_matrix(distributor_id).rates_to(sources, to_currencies)
+    converted = np.round(values[:, None] * rates, 2)
+
+    result = {}
+    for j, currency in enumerate(to_currencies):
+        column = converted[:, j]
+        result[currency] = [None if np.isnan(v) else float(v) for v in column]
+    return result
+
+
+# ========== INVALIDATION ==========
+
+@event.listens_for(Session, 'after_flush')
+def _rates_flushed(session, flush_context):
+    touched = {
+        obj.distributor_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, CurrencyRate)
+    }
+    if touched:
+        session.info.setdefault('rate_matrix_dirty', set()).update(touched)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _rates_bulk_changed(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is CurrencyRate:
+        orm_execute_state.session.info.setdefault('rate_matrix_dirty', set()).add(None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _rates_committed(session):
+    dirty = session.info.pop('rate_matrix_dirty', None)
+    if not dirty:
+        return
+    try:
+        if None in dirty:
+            invalidate_rate_matrix()
+        else:
+            for distributor_id in dirty:
+                invalidate_rate_matrix(distributor_id)
+    except Exception as e:
+        logger.warning(f"Kur matrisi geçersiz kılınamadı: {e}")
+        return
+    logger.debug(f"Kur matrisi geçersiz kılındı: {dirty}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _rates_rolled_back(session):
+    session.info.pop('rate_matrix_dirty', None)
@@ -1,65 +1,282 @@
 """
 Scheduled Tasks - Otomatik periyodik işlemler
-APScheduler ile günlük kur güncellemeleri
+APScheduler ile günlük kur güncellemeleri ve Meta lead senkronizasyonu
+
+Her process zamanlayıcıyı başlatır ama işleri sadece seçilmiş lider
+çalıştırır (bkz. app/utils/scheduler_leader.py); gunicorn'daki N worker
+aynı işi N kez çalıştırmaz.
+
+Tenant (distributor) başına işler sınırlı bir thread havuzunda paralel
+çalışır; yavaş bir tenant diğerlerini bekletmez. Tüm işler aynı Flask
+app'ini ve aynı requests.Session'ı kullanır.
 """
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import wraps
+import os
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 scheduler = None
+leader = None
+_scheduler_pid = None
+
+_http = None
+_http_lock = threading.Lock()
+
+# {job name: {'runs', 'failures', 'last_duration', 'max_duration', 'total_duration', 'last_run'}}
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def http_session(pool_size=10):
+    """Scheduler işlerinin paylaştığı requests.Session (keep-alive bağlantı havuzu)"""
+    global _http
+    with _http_lock:
+        if _http is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            _http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _http.mount('https://', adapter)
+            _http.mount('http://', adapter)
+        return _http
+
+
+def record_job_metric(name, duration, ok=True):
+    """Bir işin süresini kaydet"""
+    with _metrics_lock:
+        m = _metrics.setdefault(name, {
+            'runs': 0, 'failures': 0, 'last_duration': 0.0,
+            'max_duration': 0.0, 'total_duration': 0.0, 'last_run': None
+        })
+        m['runs'] += 1
+        m['failures'] += 0 if ok else 1
+        m['last_duration'] = duration
+        m['max_duration'] = max(m['max_duration'], duration)
+        m['total_duration'] += duration
+        m['last_run'] = datetime.utcnow()
+
+
+def get_job_metrics():
+    """
+    İş süresi metrikleri
+
+    Returns:
+        dict: {job name: {runs, failures, last_duration, max_duration, avg_duration, last_run}}
+    """
+    with _metrics_lock:
+        return {
+            name: {
+                'runs': m['runs'],
+                'failures': m['failures'],
+                'last_duration': round(m['last_duration'], 3),
+                'max_duration': round(m['max_duration'], 3),
+                'avg_duration': round(m['total_duration'] / m['runs'], 3),
+                'last_run': m['last_run'].isoformat() if m['last_run'] else None,
+            }
+            for name, m in _metrics.items()
+        }
 
 
-def update_currency_rates_job():
+def run_tenant_jobs(app, name, tenant_ids, func, max_workers=None):
+    """
+    func(tenant_id) çağrılarını thread havuzunda çalıştır
+
+    Her çağrı kendi app context'inde (ve kendi DB session'ında) çalışır;
+    süresi '<name>:<tenant_id>' altında, toplam döngü '<name>' altında kaydedilir.
+
+    Returns:
+        dict: {tenant_id: func sonucu veya Exception}
+    """
+    tenant_ids = list(tenant_ids)
+    if not tenant_ids:
+        return {}
+    max_workers = max_workers or app.config.get('SCHEDULER_WORKERS', 4)
+
+    def run(tenant_id):
+        started = time.monotonic()
+        ok = True
+        with app.app_context():
+            from app import db
+            try:
+                return func(tenant_id)
+            except Exception as e:
+                ok = False
+                logger.error(f"{name} ({tenant_id}) hatası: {e}")
+                return e
+            finally:
+                db.session.remove()
+                record_job_metric(f'{name}:{tenant_id}', time.monotonic() - started, ok)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tenant_ids)),
+                            thread_name_prefix=name) as pool:
+        results = dict(zip(tenant_ids, pool.map(run, tenant_ids)))
+    failed = sum(1 for r in results.values() if isinstance(r, Exception))
+    record_job_metric(name, time.monotonic() - started, failed == 0)
+    return results
+
+
+def leader_only(func):
+    """Zamanlanmış işi sadece lider process'te çalıştır"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if leader is not None and not leader.is_leader:
+            logger.debug(f"{func.__name__} skipped: not the scheduler leader")
+            return None
+        return func(*args, **kwargs)
+    return wrapper
+
+
+@leader_only
+def update_currency_rates_job(app):
     """Günlük kur güncelleme görevi"""
     try:
         from app.utils.currency_service import update_all_distributors
-        
+
         logger.info("Otomatik kur güncelleme başlatıldı...")
-        count = update_all_distributors()
+        with app.app_context():
+            count = update_all_distributors()
         logger.info(f"Kur güncelleme tamamlandı: {count} kur güncellendi")
-        
+
     except Exception as e:
         logger.error(f"Kur güncelleme hatası: {e}")
 
 
+@leader_only
+def sync_meta_leads_job(app):
+    """Zamanı gelen Meta lead senkronizasyonları"""
+    try:
+        from app.utils.meta_scheduler import sync_all_meta_leads
+        sync_all_meta_leads(app)
+    except Exception as e:
+        logger.error(f"Meta lead sync hatası: {e}")
+
+
+@leader_only
+def rescore_leads_job(app):
+    """Zaman faktörü değişen lead skorlarını güncelle"""
+    try:
+        from app.services.lead_scoring import rescore_leads
+        with app.app_context():
+            rescore_leads()
+    except Exception as e:
+        logger.error(f"Lead skor güncelleme hatası: {e}")
+
+
+def prune_pdf_jobs_job(app):
+    """Süresi dolan PDF işlerini temizle
+
+    Lider değil her process çalıştırır: iş kayıtları process'e özel,
+    dosya silme ise tekrar çalıştırılabilir.
+    """
+    try:
+        from app.services.pdf_jobs import prune_pdf_jobs
+        with app.app_context():
+            removed = prune_pdf_jobs()
+        if removed:
+            logger.info(f"{removed} eski PDF iş dosyası silindi")
+    except Exception as e:
+        logger.error(f"PDF iş temizleme hatası: {e}")
+
+
 def init_scheduler(app):
     """
     Zamanlayıcıyı başlat
-    
+
     Args:
         app: Flask app instance
     """
-    global scheduler
-    
-    if scheduler is not None:
+    global scheduler, leader, _scheduler_pid
+
+    # A forked child inherits `scheduler` but not its threads; start its own
+    if scheduler is not None and _scheduler_pid == os.getpid():
         return scheduler
-    
+
+    from app.utils.scheduler_leader import start_election
+    leader = start_election(app)
+    _scheduler_pid = os.getpid()
+
     scheduler = BackgroundScheduler(daemon=True)
-    
-    # Push app context for database access
-    with app.app_context():
-        # Günlük kur güncelleme (her gün saat 09:00'da)
-        scheduler.add_job(
-            func=lambda: app.app_context().push() or update_currency_rates_job(),
-            trigger=CronTrigger(hour=9, minute=0),
-            id='update_currency_rates',
-            name='Otomatik Kur Güncelleme',
-            replace_existing=True
-        )
-    
+
+    # Lider kirasını yenile / ölü liderin kirasını devral
+    scheduler.add_job(
+        func=leader.heartbeat,
+        trigger=IntervalTrigger(seconds=leader.renew_interval),
+        id='scheduler_leader_heartbeat',
+        name='Scheduler Leader Heartbeat',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
+    # Günlük kur güncelleme (her gün saat 09:00'da)
+    scheduler.add_job(
+        func=update_currency_rates_job,
+        args=[app],
+        trigger=CronTrigger(hour=9, minute=0),
+        id='update_currency_rates',
+        name='Otomatik Kur Güncelleme',
+        replace_existing=True
+    )
+
+    # Meta lead sync: her dakika kontrol, tenant'lar kendi fetch_interval_minutes'ına göre
+    scheduler.add_job(
+        func=sync_meta_leads_job,
+        args=[app],
+        trigger=IntervalTrigger(minutes=1),
+        id='meta_lead_sync',
+        name='Meta Lead Sync',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=60
+    )
+
+    # Lead skorlarının yaş/yanıt süresi faktörleri (ilk 24 saat içinde değişir)
+    scheduler.add_job(
+        func=rescore_leads_job,
+        args=[app],
+        trigger=IntervalTrigger(minutes=10),
+        id='rescore_leads',
+        name='Lead Skor Güncelleme',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
+    # Bitmiş PDF işleri (boşta kalan instance'larda da birikmesin)
+    scheduler.add_job(
+        func=prune_pdf_jobs_job,
+        args=[app],
+        trigger=IntervalTrigger(minutes=15),
+        id='prune_pdf_jobs',
+        name='PDF İş Temizleme',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
     scheduler.start()
     logger.info("Zamanlayıcı başlatıldı")
-    
+
     return scheduler
 
 
 def shutdown_scheduler():
     """Zamanlayıcıyı kapat"""
     global scheduler
-    
+
     if scheduler:
         scheduler.shutdown(wait=False)
+        scheduler = None
         logger.info("Zamanlayıcı kapatıldı")
+    if leader is not None:
+        leader.release()
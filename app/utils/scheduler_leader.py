@@ -0,0 +1,173 @@
+"""
+Scheduler leader election - çok worker'lı kurulumda işler tek process'te çalışır
+
+Her process kendi zamanlayıcısını başlatır ama zamanlanmış işleri yalnızca
+lider çalıştırır. Liderlik `scheduler_leases` tablosundaki bir kira
+(lease) satırıdır: lider satırı düzenli olarak yeniler, yenileyemezse (process
+öldü, DB erişimi kesildi) süre dolunca başka bir process devralır.
+
+Tablo henüz yoksa (migration çalışmadı) aynı makinedeki process'ler
+instance klasöründeki bir dosya kilidiyle seçim yapar.
+"""
+import os
+import time
+import uuid
+import socket
+import atexit
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_, case
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from app import db
+from app.models.scheduler_lease import SchedulerLease
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+
+class LeaderElection:
+    """
+    Lease tabanlı lider seçimi
+
+    heartbeat() her TTL/3 saniyede bir çağrılır; kira DB'de TTL kadar
+    uzatılır ama process kendini sadece TTL/2 boyunca lider sayar, böylece
+    saatler biraz kaysa da iki lider aynı anda iş çalıştırmaz.
+    """
+
+    def __init__(self, app, name='scheduler', ttl=60):
+        self.app = app
+        self.name = name
+        self.ttl = ttl
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._leader_until = 0.0
+        self._lock = threading.Lock()
+        self._lock_file = None
+
+    @property
+    def is_leader(self):
+        return time.monotonic() < self._leader_until
+
+    @property
+    def renew_interval(self):
+        return max(self.ttl // 3, 1)
+
+    def heartbeat(self):
+        """Kirayı al veya yenile; lider mi döndür"""
+        with self._lock:
+            was_leader = self.is_leader
+            started = time.monotonic()
+            try:
+                with self.app.app_context():
+                    acquired = self._acquire_lease()
+            except (OperationalError, ProgrammingError) as e:
+                logger.debug(f"Lease table unavailable, using file lock: {e}")
+                acquired = self._acquire_file_lock()
+            except Exception as e:
+                logger.error(f"Scheduler lease error: {e}")
+                acquired = False
+
+            self._leader_until = started + self.ttl / 2 if acquired else 0.0
+            if acquired and not was_leader:
+                logger.info(f"Scheduler leader: {self.holder}")
+            elif was_leader and not acquired:
+                logger.warning(f"Scheduler leadership lost: {self.holder}")
+            return acquired
+
+    def _acquire_lease(self):
+        table = SchedulerLease.__table__
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+
+        # Renew our own lease or take over an expired one in a single statement
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                table.update()
+                .where(table.c.name == self.name)
+                .where(or_(table.c.holder == self.holder, table.c.expires_at < now))
+                .values(
+                    holder=self.holder,
+                    expires_at=expires_at,
+                    acquired_at=case((table.c.holder == self.holder, table.c.acquired_at), else_=now)
+                )
+            )
+            if result.rowcount:
+                return True
+
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(table.insert().values(
+                    name=self.name, holder=self.holder, acquired_at=now, expires_at=expires_at
+                ))
+            return True
+        except IntegrityError:
+            # Row exists and is held by a live process
+            return False
+
+    def _acquire_file_lock(self):
+        if fcntl is None:
+            return True
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.app.instance_path, exist_ok=True)
+        handle = open(os.path.join(self.app.instance_path, f'{self.name}.lock'), 'a+')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        # Held until this process exits; the OS releases it if we die
+        self._lock_file = handle
+        return True
+
+    def release(self):
+        """Kirayı bırak (graceful shutdown'da beklemeden devir için)"""
+        with self._lock:
+            was_leader = self.is_leader
+            self._leader_until = 0.0
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+            if not was_leader:
+                return
+            try:
+                table = SchedulerLease.__table__
+                with self.app.app_context(), db.engine.begin() as conn:
+                    conn.execute(
+                        table.update()
+                        .where(table.c.name == self.name)
+                        .where(table.c.holder == self.holder)
+                        .values(expires_at=datetime.utcnow())
+                    )
+            except Exception as e:
+                logger.debug(f"Scheduler lease release failed: {e}")
+
+
+def current_leader(name='scheduler'):
+    """
+    Kira sahibini döndür
+
+    Returns:
+        dict veya None: {holder, acquired_at, expires_at, active}
+    """
+    lease = db.session.get(SchedulerLease, name)
+    if lease is None:
+        return None
+    return {
+        'holder': lease.holder,
+        'acquired_at': lease.acquired_at,
+        'expires_at': lease.expires_at,
+        'active': lease.expires_at > datetime.utcnow(),
+    }
+
+
+def start_election(app, name='scheduler', ttl=None):
+    """LeaderElection oluştur, ilk seçimi yap ve çıkışta kirayı bırak"""
+    election = LeaderElection(app, name, ttl or app.config.get('SCHEDULER_LEASE_SECONDS', 60))
+    election.heartbeat()
+    atexit.register(election.release)
+    return election
@@ -5,14 +5,11 @@ import re
 import hashlib
 from functools import wraps
 from flask import request, jsonify
-from datetime import datetime, timedelta
+from app.utils.rate_limiter import check_rate_limit
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Rate limiting basit in-memory cache (production'da Redis kullanılmalı)
-_rate_limit_cache = {}
-
 
 def sanitize_filename(filename: str) -> str:
     """
@@ -33,52 +30,39 @@ def sanitize_filename(filename: str) -> str:
     return filename
 
 
-def rate_limit(max_requests: int = 10, window_seconds: int = 60):
+def rate_limit(max_requests: int = 10, window_seconds: int = 60, key_func=None):
     """
-    Decorator: Rate limiting (basit implementation)
+    Decorator: Rate limiting (token bucket, app/utils/rate_limiter.py)
     
     Args:
         max_requests: Zaman penceresi içinde max istek sayısı
         window_seconds: Zaman penceresi (saniye)
+        key_func: İstemci anahtarı (varsayılan: IP adresi)
+    
+    HTTP isteklerinde 429 + Retry-After döner; socket.io handler'larında
+    istemciye `error` olayı gönderilir ve handler çalıştırılmaz.
     """
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
-            # İstemci IP'sini al
-            client_ip = request.remote_addr or 'unknown'
-            key = f"{f.__name__}:{client_ip}"
-            
-            now = datetime.utcnow()
-            
-            # Cache'i temizle (eski kayıtlar)
-            expired_keys = [k for k, v in _rate_limit_cache.items() 
-                          if now - v['reset_time'] > timedelta(seconds=window_seconds)]
-            for k in expired_keys:
-                del _rate_limit_cache[k]
+            client = key_func() if key_func else (request.remote_addr or 'unknown')
+            key = f"{f.__name__}:{client}"
             
-            # Rate limit kontrolü
-            if key in _rate_limit_cache:
-                data = _rate_limit_cache[key]
-                if data['count'] >= max_requests:
-                    if now < data['reset_time']:
-                        logger.warning(f"Rate limit exceeded for {key}")
-                        return jsonify({
-                            'error': 'Too many requests',
-                            'retry_after': (data['reset_time'] - now).seconds
-                        }), 429
-                    else:
-                        # Zaman penceresi doldu, sıfırla
-                        _rate_limit_cache[key] = {
-                            'count': 1,
-                            'reset_time': now + timedelta(seconds=window_seconds)
-                        }
-                else:
-                    _rate_limit_cache[key]['count'] += 1
-            else:
-                _rate_limit_cache[key] = {
-                    'count': 1,
-                    'reset_time': now + timedelta(seconds=window_seconds)
-                }
+            result = check_rate_limit(key, max_requests, window_seconds)
+            if not result.allowed:
+                logger.warning(f"Rate limit exceeded for {key}")
+                payload = {'error': 'Too many requests', 'retry_after': result.retry_after}
+                if getattr(request, 'sid', None):
+                    # socket.io event: no HTTP response to attach headers to
+                    from flask_socketio import emit
+                    emit('error', payload)
+                    return None
+                response = jsonify(payload)
+                response.status_code = 429
+                response.headers['Retry-After'] = str(result.retry_after)
+                response.headers['X-RateLimit-Limit'] = str(max_requests)
+                response.headers['X-RateLimit-Remaining'] = '0'
+                return response
             
             return f(*args, **kwargs)
         return wrapped
@@ -1,8 +1,17 @@
 """
 Translation Service - Çeviri servisi soyutlaması
-Gelecekte Google Translate API, DeepL vb. entegre edilebilir
+
+Sağlayıcılar (Google, test için offline fake) TranslationProvider arayüzünü
+uygular; TRANSLATION_PROVIDER ayarı hangisinin kullanılacağını seçer.
+Her çeviri `translation_memory` tablosuna (normalize metin hash'i, kaynak,
+hedef) anahtarıyla yazılır ve önünde süreç içi bir LRU cache vardır; aynı
+cümle ikinci kez sağlayıcıya gitmez.
 """
 from typing import Optional
+from collections import OrderedDict
+import hashlib
+import threading
+import unicodedata
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,16 +30,16 @@ SUPPORTED_LANGUAGES = {
 def detect_language(text: str) -> Optional[str]:
     """
     Metin dilini tespit eder
-    
+
     Args:
         text: Dili tespit edilecek metin
-        
+
     Returns:
         Dil kodu (örn: 'tr', 'en') veya None
     """
     if not text or len(text.strip()) < 3:
         return None
-    
+
     try:
         from langdetect import detect
         lang = detect(text)
@@ -40,37 +49,180 @@ def detect_language(text: str) -> Optional[str]:
         return None
 
 
-def translate_text(text: str, target_lang: str, source_lang: Optional[str] = None) -> Optional[str]:
+# ========== PROVIDERS ==========
+
+class TranslationProvider:
+    """Çeviri sağlayıcı arayüzü"""
+
+    name = 'base'
+
+    def translate(self, text: str, target_lang: str, source_lang: Optional[str] = None) -> Optional[str]:
+        raise NotImplementedError
+
+
+class GoogleTranslationProvider(TranslationProvider):
+    """deep-translator üzerinden Google Translate (ücretsiz API, ağ çağrısı)"""
+
+    name = 'google'
+
+    def translate(self, text, target_lang, source_lang=None):
+        from deep_translator import GoogleTranslator
+        translator = GoogleTranslator(source=source_lang or 'auto', target=target_lang)
+        return translator.translate(text)
+
+
+class FakeTranslationProvider(TranslationProvider):
+    """Offline sağlayıcı (testler / geliştirme): ağa çıkmaz, çağrıları kaydeder"""
+
+    name = 'fake'
+
+    def __init__(self):
+        self.calls = []
+
+    def translate(self, text, target_lang, source_lang=None):
+        self.calls.append((text, target_lang, source_lang))
+        return f'[{target_lang}] {text}'
+
+
+PROVIDERS = {
+    'google': GoogleTranslationProvider,
+    'fake': FakeTranslationProvider,
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def register_provider(name: str, provider_class):
+    """Yeni bir sağlayıcı ekle (örn. DeepL); TRANSLATION_PROVIDER=name ile seçilir"""
+    PROVIDERS[name] = provider_class
+
+
+def get_provider() -> TranslationProvider:
+    """Ayarlı sağlayıcının (süreç başına tek) örneği"""
+    from flask import current_app, has_app_context
+    name = current_app.config.get('TRANSLATION_PROVIDER', 'google') if has_app_context() else 'google'
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = PROVIDERS[name]()
+        return _providers[name]
+
+
+# ========== TRANSLATION MEMORY ==========
+
+class _LRUCache:
+    """Thread-safe LRU: (text hash, source, target) -> çeviri"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_memory_cache = _LRUCache()
+
+
+def normalize_text(text: str) -> str:
+    """Hafıza anahtarı için: Unicode NFC, boşluklar tekilleştirilmiş"""
+    return unicodedata.normalize('NFC', ' '.join(text.split()))
+
+
+def memory_key(text: str, target_lang: str, source_lang: Optional[str] = None):
+    text_hash = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return text_hash, source_lang or '', target_lang
+
+
+def lookup_translation(text: str, target_lang: str, source_lang: Optional[str] = None) -> Optional[str]:
+    """LRU, sonra translation_memory tablosu; yoksa None (ağ çağrısı yapmaz)"""
+    key = memory_key(text, target_lang, source_lang)
+    translated = _memory_cache.get(key)
+    if translated is not None:
+        return translated
+
+    from app import db
+    from app.models.translation_memory import TranslationMemory
+    translated = db.session.query(TranslationMemory.translated_text).filter_by(
+        text_hash=key[0], source_lang=key[1], target_lang=key[2]
+    ).scalar()
+    if translated is not None:
+        _memory_cache.put(key, translated)
+    return translated
+
+
+def remember_translation(text: str, target_lang: str, source_lang: Optional[str],
+                         translated: str, provider: Optional[str] = None):
+    """Çeviriyi hafızaya yaz (çağıranın transaction'ında; aynı anahtar varsa atlanır)"""
+    from sqlalchemy.exc import IntegrityError
+    from app import db
+    from app.models.translation_memory import TranslationMemory
+
+    key = memory_key(text, target_lang, source_lang)
+    _memory_cache.put(key, translated)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(TranslationMemory.__table__.insert().values(
+                text_hash=key[0], source_lang=key[1], target_lang=key[2],
+                source_text=normalize_text(text), translated_text=translated, provider=provider
+            ))
+    except IntegrityError:
+        # Another worker stored the same sentence first
+        pass
+
+
+def translate_text(text: str, target_lang: str, source_lang: Optional[str] = None,
+                   cached_only: bool = False) -> Optional[str]:
     """
     Metni hedef dile çevirir
-    
+
     Args:
         text: Çevrilecek metin
         target_lang: Hedef dil kodu
         source_lang: Kaynak dil (None ise otomatik tespit)
-        
+        cached_only: Sadece çeviri hafızasına bak, sağlayıcıyı çağırma
+
     Returns:
-        Çevrilmiş metin veya None (hata durumunda)
+        Çevrilmiş metin veya None (hata / hafızada yok durumunda)
     """
     if not text or not target_lang:
         return None
-    
+
     # Aynı dile çeviri gereksiz
     if source_lang and source_lang == target_lang:
         return text
-    
-    try:
-        # deep-translator kullanarak çeviri (Google Translate ücretsiz API)
-        from deep_translator import GoogleTranslator
-        
-        translator = GoogleTranslator(source='auto' if not source_lang else source_lang, 
-                                     target=target_lang)
-        translated = translator.translate(text)
+
+    translated = lookup_translation(text, target_lang, source_lang)
+    if translated is not None or cached_only:
         return translated
+
+    provider = get_provider()
+    try:
+        translated = provider.translate(text, target_lang, source_lang)
     except Exception as e:
         logger.warning(f"Translation failed ({source_lang or 'auto'} -> {target_lang}): {e}")
         return None
 
+    if translated:
+        remember_translation(text, target_lang, source_lang, translated, provider.name)
+    return translated
+
 
 def get_language_name(lang_code: str) -> str:
     """Dil kodunun okunabilir adını döner"""
@@ -28,4 +28,14 @@ class Config:
     
     # Application specific settings
     PDF_FOLDER = os.path.join(basedir, 'app/static/pdfs')
+    PDF_WORKERS = int(os.environ.get('PDF_WORKERS', '2'))  # Render processes (0 = thread in web process)
+    PDF_JOB_TIMEOUT = int(os.environ.get('PDF_JOB_TIMEOUT', '120'))  # Seconds a download waits for its render
+    SCHEDULER_WORKERS = int(os.environ.get('SCHEDULER_WORKERS', '4'))  # Parallel tenant syncs per scheduler job
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() in ('1', 'true', 'yes')  # Start APScheduler in this process
+    LEAD_STATS_ROLLUP = os.environ.get('LEAD_STATS_ROLLUP', 'true').lower() in ('1', 'true', 'yes')  # Lead analytics from lead_daily_stats
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', '60'))  # Leader failover time
+    MAIL_WORKERS = int(os.environ.get('MAIL_WORKERS', '2'))  # Email sender threads, each keeps its SMTP connection (0 = send in the request)
+    TRANSLATION_PROVIDER = os.environ.get('TRANSLATION_PROVIDER', 'google')  # google, fake (offline) or a registered provider
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'sqlite')  # memory, sqlite (shared by local workers), sqlite:///path or redis://...
+    TRANSLATION_WORKERS = int(os.environ.get('TRANSLATION_WORKERS', '2'))  # Message translation threads (0 = translate in the request)
     DEFAULT_THEME_COLOR = '#7a001d'
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""add dashboard stats rollup table
+
+Revision ID: i9j0k1l2m3n4
+Revises: add_currency_tables
+Create Date: 2026-10-18 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'i9j0k1l2m3n4'
+down_revision = 'add_currency_tables'
+branch_labels = None
+depends_on = None
+
+
+def _period(column, dialect):
+    """YYYY-MM of a timestamp column (same bucket as dashboard_stats.period_for)"""
+    if dialect == 'sqlite':
+        return f"strftime('%Y-%m', {column})"
+    if dialect in ('mysql', 'mariadb'):
+        return f"DATE_FORMAT({column}, '%Y-%m')"
+    return f"to_char({column}, 'YYYY-MM')"
+
+
+def backfill_sql(dialect):
+    """INSERT ... SELECT filling the rollup from the source tables
+    (mirrors rebuild_dashboard_stats in app/services/dashboard_stats.py)"""
+    patient_period = _period('created_at', dialect)
+    encounter_period = _period('e.created_at', dialect)
+    # (module table, its hair/dental/eye columns in the union)
+    modules = [
+        ('hair_annotations', 'COUNT(DISTINCT m.encounter_id), 0, 0'),
+        ('dental_procedures', '0, COUNT(DISTINCT m.encounter_id), 0'),
+        ('eye_refractions', '0, 0, COUNT(DISTINCT m.encounter_id)'),
+    ]
+    module_counts = [
+        f"SELECT e.distributor_id, {encounter_period} AS period, 0, 0, {columns} "
+        f"FROM {table} m JOIN encounters e ON e.id = m.encounter_id "
+        f"WHERE e.created_at IS NOT NULL GROUP BY e.distributor_id, {encounter_period}"
+        for table, columns in modules
+    ]
+    return (
+        "INSERT INTO dashboard_stats (distributor_id, period, patients_count, encounters_count, "
+        "hair_encounters, dental_encounters, eye_encounters, updated_at) "
+        "SELECT distributor_id, period, SUM(patients), SUM(encounters), SUM(hair), SUM(dental), SUM(eye), "
+        "CURRENT_TIMESTAMP FROM ("
+        f"SELECT distributor_id, {patient_period} AS period, COUNT(*) AS patients, 0 AS encounters, "
+        "0 AS hair, 0 AS dental, 0 AS eye "
+        f"FROM patients WHERE created_at IS NOT NULL GROUP BY distributor_id, {patient_period} "
+        f"UNION ALL SELECT e.distributor_id, {encounter_period} AS period, 0, COUNT(*), 0, 0, 0 "
+        f"FROM encounters e WHERE e.created_at IS NOT NULL GROUP BY e.distributor_id, {encounter_period} "
+        + ''.join(f"UNION ALL {sql} " for sql in module_counts) +
+        ") buckets WHERE distributor_id IS NOT NULL GROUP BY distributor_id, period"
+    )
+
+
+def upgrade():
+    op.create_table('dashboard_stats',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('distributor_id', sa.Integer(), sa.ForeignKey('distributors.id'), nullable=False),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('patients_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('encounters_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('hair_encounters', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('dental_encounters', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('eye_encounters', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('distributor_id', 'period', name='_dashboard_stat_period_uc')
+    )
+    op.create_index('ix_dashboard_stats_distributor_id', 'dashboard_stats', ['distributor_id'])
+    # Start from the existing data; the model hooks keep it current afterwards
+    op.execute(backfill_sql(op.get_bind().dialect.name))
+
+
+def downgrade():
+    op.drop_index('ix_dashboard_stats_distributor_id', table_name='dashboard_stats')
+    op.drop_table('dashboard_stats')
@@ -0,0 +1,54 @@
+"""add full-text search index
+
+Revision ID: j0k1l2m3n4o5
+Revises: i9j0k1l2m3n4
+Create Date: 2026-10-18 11:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'j0k1l2m3n4o5'
+down_revision = 'i9j0k1l2m3n4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Dialect-specific index storage (mirrors app/services/search_index.py),
+    filled from the existing rows so global search works right after deploy.
+    """
+    from app.services.search_index import populate_search_index
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "kind UNINDEXED, tenant UNINDEXED, title, body, tokenize = 'trigram')"
+        )
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "entity_type VARCHAR(20) NOT NULL, entity_id INTEGER NOT NULL, "
+            "distributor_id INTEGER, title TEXT, body TEXT, tsv TSVECTOR, "
+            "PRIMARY KEY (entity_type, entity_id))"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_search_documents_trgm ON search_documents USING GIN (body gin_trgm_ops)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_search_documents_distributor ON search_documents (distributor_id)")
+    else:
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS search_documents ("
+            "entity_type VARCHAR(20) NOT NULL, entity_id INTEGER NOT NULL, "
+            "distributor_id INTEGER, title TEXT, body TEXT, "
+            "PRIMARY KEY (entity_type, entity_id))"
+        )
+
+    populate_search_index(op.get_bind())
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_index")
+    else:
+        op.execute("DROP TABLE IF EXISTS search_documents")
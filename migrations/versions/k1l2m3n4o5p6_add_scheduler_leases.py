@@ -0,0 +1,27 @@
+"""add scheduler leader lease table
+
+Revision ID: k1l2m3n4o5p6
+Revises: j0k1l2m3n4o5
+Create Date: 2026-10-18 12:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'k1l2m3n4o5p6'
+down_revision = 'j0k1l2m3n4o5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduler_leases',
+        sa.Column('name', sa.String(length=64), primary_key=True),
+        sa.Column('holder', sa.String(length=128), nullable=False),
+        sa.Column('acquired_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_leases')
@@ -0,0 +1,62 @@
+"""add lead daily stats rollup and lead analytics indexes
+
+Revision ID: l2m3n4o5p6q7
+Revises: k1l2m3n4o5p6
+Create Date: 2026-10-18 13:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'l2m3n4o5p6q7'
+down_revision = 'k1l2m3n4o5p6'
+branch_labels = None
+depends_on = None
+
+
+def backfill_sql(dialect):
+    """INSERT ... SELECT filling the rollup from facebook_leads
+    (mirrors rebuild_lead_daily_stats in app/services/lead_analytics.py)"""
+    if dialect == 'sqlite':
+        day = "strftime('%Y-%m-%d', created_at)"
+    elif dialect in ('mysql', 'mariadb'):
+        day = "DATE_FORMAT(created_at, '%Y-%m-%d')"
+    else:
+        day = "to_char(created_at, 'YYYY-MM-DD')"
+    return (
+        "INSERT INTO lead_daily_stats (distributor_id, day, status, count) "
+        f"SELECT distributor_id, {day}, COALESCE(status, ''), COUNT(*) FROM facebook_leads "
+        "WHERE distributor_id IS NOT NULL AND created_at IS NOT NULL "
+        f"GROUP BY distributor_id, {day}, COALESCE(status, '')"
+    )
+
+
+def upgrade():
+    op.create_table('lead_daily_stats',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('distributor_id', sa.Integer(), sa.ForeignKey('distributors.id'), nullable=False),
+        sa.Column('day', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('distributor_id', 'day', 'status', name='_lead_daily_stat_uc')
+    )
+    op.create_index('ix_lead_daily_stats_day', 'lead_daily_stats', ['day'])
+
+    # Lead tables predate the migration history on some installs (db.create_all)
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('facebook_leads'):
+        op.create_index('ix_facebook_leads_created_at', 'facebook_leads', ['created_at'])
+        # LEAD_STATS_ROLLUP is on by default: start from the existing leads
+        op.execute(backfill_sql(op.get_bind().dialect.name))
+    if inspector.has_table('lead_interactions'):
+        op.create_index('ix_lead_interactions_lead_id', 'lead_interactions', ['lead_id'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('lead_interactions'):
+        op.drop_index('ix_lead_interactions_lead_id', table_name='lead_interactions')
+    if inspector.has_table('facebook_leads'):
+        op.drop_index('ix_facebook_leads_created_at', table_name='facebook_leads')
+    op.drop_index('ix_lead_daily_stats_day', table_name='lead_daily_stats')
+    op.drop_table('lead_daily_stats')
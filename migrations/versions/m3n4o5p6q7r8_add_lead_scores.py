@@ -0,0 +1,44 @@
+"""add persisted lead score columns
+
+Revision ID: m3n4o5p6q7r8
+Revises: l2m3n4o5p6q7
+Create Date: 2026-10-18 14:00:00.000000
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'm3n4o5p6q7r8'
+down_revision = 'l2m3n4o5p6q7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lead tables predate the migration history on some installs (db.create_all)
+    if not sa.inspect(op.get_bind()).has_table('facebook_leads'):
+        return
+    with op.batch_alter_table('facebook_leads') as batch_op:
+        batch_op.add_column(sa.Column('score', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('score_level', sa.String(length=20), nullable=False, server_default='very_low'))
+        batch_op.add_column(sa.Column('score_expires_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_facebook_leads_score', 'facebook_leads', ['score'])
+    op.create_index('ix_facebook_leads_score_expires_at', 'facebook_leads', ['score_expires_at'])
+    op.create_index('ix_facebook_leads_status_score', 'facebook_leads', ['status', 'score'])
+
+    # Mark every existing lead due so the first scoring sweep backfills it
+    leads = sa.table('facebook_leads', sa.column('score_expires_at', sa.DateTime()))
+    op.execute(leads.update().values(score_expires_at=datetime(2000, 1, 1)))
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('facebook_leads'):
+        return
+    op.drop_index('ix_facebook_leads_status_score', table_name='facebook_leads')
+    op.drop_index('ix_facebook_leads_score_expires_at', table_name='facebook_leads')
+    op.drop_index('ix_facebook_leads_score', table_name='facebook_leads')
+    with op.batch_alter_table('facebook_leads') as batch_op:
+        batch_op.drop_column('score_expires_at')
+        batch_op.drop_column('score_level')
+        batch_op.drop_column('score')
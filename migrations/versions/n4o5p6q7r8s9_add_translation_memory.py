@@ -0,0 +1,32 @@
+"""add translation memory table
+
+Revision ID: n4o5p6q7r8s9
+Revises: m3n4o5p6q7r8
+Create Date: 2026-10-18 16:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'n4o5p6q7r8s9'
+down_revision = 'm3n4o5p6q7r8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('translation_memory',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('text_hash', sa.String(length=64), nullable=False),
+        sa.Column('source_lang', sa.String(length=10), nullable=False),
+        sa.Column('target_lang', sa.String(length=10), nullable=False),
+        sa.Column('source_text', sa.Text(), nullable=False),
+        sa.Column('translated_text', sa.Text(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('text_hash', 'source_lang', 'target_lang', name='_translation_memory_uc')
+    )
+
+
+def downgrade():
+    op.drop_table('translation_memory')
@@ -0,0 +1,33 @@
+"""add tenant chatbot keyword table
+
+Revision ID: o5p6q7r8s9t0
+Revises: n4o5p6q7r8s9
+Create Date: 2026-10-18 17:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'o5p6q7r8s9t0'
+down_revision = 'n4o5p6q7r8s9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chatbot_keywords',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('distributor_id', sa.Integer(), sa.ForeignKey('distributors.id'), nullable=False),
+        sa.Column('keyword', sa.String(length=200), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('language', sa.String(length=10), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_chatbot_keywords_distributor_id', 'chatbot_keywords', ['distributor_id'])
+
+
+def downgrade():
+    op.drop_index('ix_chatbot_keywords_distributor_id', table_name='chatbot_keywords')
+    op.drop_table('chatbot_keywords')
@@ -0,0 +1,46 @@
+"""add denormalized step counters to patient journeys
+
+Revision ID: p6q7r8s9t0u1
+Revises: o5p6q7r8s9t0
+Create Date: 2026-10-18 19:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'p6q7r8s9t0u1'
+down_revision = 'o5p6q7r8s9t0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('patient_journeys', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('steps_total', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('steps_completed', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('current_step_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('next_step_id', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_patient_journeys_distributor_arrival', ['distributor_id', 'arrival_date', 'id'])
+
+    # Backfill from journey_steps (same ordering as PatientJourney.steps)
+    op.execute("""
+        UPDATE patient_journeys SET
+            steps_total = (SELECT COUNT(*) FROM journey_steps s WHERE s.journey_id = patient_journeys.id),
+            steps_completed = (SELECT COUNT(*) FROM journey_steps s
+                               WHERE s.journey_id = patient_journeys.id AND s.status = 'completed'),
+            current_step_id = (SELECT s.id FROM journey_steps s
+                               WHERE s.journey_id = patient_journeys.id AND s.status = 'in_progress'
+                               ORDER BY s.sequence, s.scheduled_date, s.id LIMIT 1),
+            next_step_id = (SELECT s.id FROM journey_steps s
+                            WHERE s.journey_id = patient_journeys.id AND s.status = 'pending'
+                            ORDER BY s.sequence, s.scheduled_date, s.id LIMIT 1)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('patient_journeys', schema=None) as batch_op:
+        batch_op.drop_index('ix_patient_journeys_distributor_arrival')
+        batch_op.drop_column('next_step_id')
+        batch_op.drop_column('current_step_id')
+        batch_op.drop_column('steps_completed')
+        batch_op.drop_column('steps_total')
@@ -0,0 +1,25 @@
+"""add doctor/room schedule indexes to appointments
+
+Revision ID: q7r8s9t0u1v2
+Revises: p6q7r8s9t0u1
+Create Date: 2026-10-18 20:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'q7r8s9t0u1v2'
+down_revision = 'p6q7r8s9t0u1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_appointments_distributor_doctor_start', 'appointments',
+                    ['distributor_id', 'doctor_name', 'start_time'])
+    op.create_index('ix_appointments_distributor_room_start', 'appointments',
+                    ['distributor_id', 'room_number', 'start_time'])
+
+
+def downgrade():
+    op.drop_index('ix_appointments_distributor_room_start', table_name='appointments')
+    op.drop_index('ix_appointments_distributor_doctor_start', table_name='appointments')
@@ -0,0 +1,63 @@
+"""add composite indexes for tenant-scoped list queries and module encounter_id FKs
+
+Revision ID: r8s9t0u1v2w3
+Revises: q7r8s9t0u1v2
+Create Date: 2026-10-18 21:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'r8s9t0u1v2w3'
+down_revision = 'q7r8s9t0u1v2'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # Tenant lists ordered by a timestamp
+    ('ix_patients_distributor_created', 'patients', ['distributor_id', 'created_at']),
+    ('ix_patients_distributor_first_name', 'patients', ['distributor_id', 'first_name']),
+    ('ix_encounters_distributor_created', 'encounters', ['distributor_id', 'created_at']),
+    ('ix_encounters_distributor_date', 'encounters', ['distributor_id', 'date']),
+    ('ix_encounters_patient_date', 'encounters', ['patient_id', 'date']),
+    ('ix_messages_distributor_created', 'messages', ['distributor_id', 'created_at']),
+    ('ix_messages_patient_created', 'messages', ['patient_id', 'created_at']),
+    ('ix_communication_logs_distributor_created', 'communication_logs', ['distributor_id', 'created_at']),
+    ('ix_communication_logs_patient_created', 'communication_logs', ['patient_id', 'created_at']),
+    ('ix_hotel_reservations_distributor_created', 'hotel_reservations', ['distributor_id', 'created_at']),
+    ('ix_hotel_reservations_patient_check_in', 'hotel_reservations', ['patient_id', 'check_in']),
+    ('ix_facebook_leads_status_created', 'facebook_leads', ['status', 'created_at']),
+    ('ix_facebook_leads_distributor_created', 'facebook_leads', ['distributor_id', 'created_at']),
+    ('ix_facebook_leads_assigned_to_status', 'facebook_leads', ['assigned_to_id', 'status']),
+    # Module rows are always loaded by their encounter
+    ('ix_aesthetic_procedures_encounter_id', 'aesthetic_procedures', ['encounter_id']),
+    ('ix_bariatric_surgeries_encounter_id', 'bariatric_surgeries', ['encounter_id']),
+    ('ix_checkup_packages_encounter_id', 'checkup_packages', ['encounter_id']),
+    ('ix_checkup_tests_checkup_id', 'checkup_tests', ['checkup_id']),
+    ('ix_dental_procedures_encounter_id', 'dental_procedures', ['encounter_id']),
+    ('ix_eye_refractions_encounter_id', 'eye_refractions', ['encounter_id']),
+    ('ix_eye_treatment_selections_encounter_id', 'eye_treatment_selections', ['encounter_id']),
+    ('ix_hair_annotations_encounter_id', 'hair_annotations', ['encounter_id']),
+    ('ix_hair_pattern_selections_encounter_id', 'hair_pattern_selections', ['encounter_id']),
+    ('ix_ivf_treatments_encounter_id', 'ivf_treatments', ['encounter_id']),
+    ('ix_patient_feedbacks_encounter_id', 'patient_feedbacks', ['encounter_id']),
+    ('ix_ticket_replies_ticket_id', 'ticket_replies', ['ticket_id']),
+    ('ix_patient_documents_patient_id', 'patient_documents', ['patient_id']),
+]
+
+
+def _existing(indexes):
+    # Lead tables predate the migration history on some installs (db.create_all)
+    inspector = sa.inspect(op.get_bind())
+    return [entry for entry in indexes if entry[1] != 'facebook_leads' or inspector.has_table('facebook_leads')]
+
+
+def upgrade():
+    for name, table, columns in _existing(INDEXES):
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(_existing(INDEXES)):
+        op.drop_index(name, table_name=table)
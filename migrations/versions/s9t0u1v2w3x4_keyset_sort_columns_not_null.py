@@ -0,0 +1,45 @@
+"""backfill and make keyset sort columns NOT NULL
+
+Keyset pagination seeks on (sort column, id); rows with a NULL sort value
+never match the seek and vanish after the first page.
+
+Revision ID: s9t0u1v2w3x4
+Revises: r8s9t0u1v2w3
+Create Date: 2026-10-18 22:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 's9t0u1v2w3x4'
+down_revision = 'r8s9t0u1v2w3'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, fallback expression for NULLs)
+COLUMNS = [
+    ('patients', 'created_at', "COALESCE(updated_at, '1970-01-01 00:00:00')"),
+    ('documents', 'uploaded_at', "'1970-01-01 00:00:00'"),
+    ('facebook_leads', 'created_at', "COALESCE(updated_at, '1970-01-01 00:00:00')"),
+]
+
+
+def _existing(columns):
+    # Lead tables predate the migration history on some installs (db.create_all)
+    inspector = sa.inspect(op.get_bind())
+    return [entry for entry in columns if inspector.has_table(entry[0])]
+
+
+def upgrade():
+    for table, column, fallback in _existing(COLUMNS):
+        # Old rows without a timestamp sort last (their updated_at if they have one)
+        op.execute(f"UPDATE {table} SET {column} = {fallback} WHERE {column} IS NULL")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table, column, _ in reversed(_existing(COLUMNS)):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, existing_type=sa.DateTime(), nullable=True)
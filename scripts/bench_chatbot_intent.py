@@ -0,0 +1,127 @@
+"""
+Chatbot intent benchmark: sequential substring/regex scan vs. IntentMatcher
+
+    python scripts/bench_chatbot_intent.py                    # built-in tables
+    python scripts/bench_chatbot_intent.py --keywords 500     # + 500 synthetic tenant keywords
+
+The legacy path is the detect_intent loop as it was (one `in` test per
+keyword, then one re.search per FAQ pattern). Both paths see the same
+messages and every result must match. The matcher's per-message cache is
+cleared before each timed pass, so only real matching is measured.
+"""
+import sys
+import re
+import time
+import random
+import argparse
+import importlib.util
+from pathlib import Path
+
+# Load chatbot_service directly by path (no app / DB needed)
+CHATBOT_PATH = Path(__file__).resolve().parents[1] / "app" / "utils" / "chatbot_service.py"
+spec = importlib.util.spec_from_file_location("chatbot_service", CHATBOT_PATH)
+chatbot = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(chatbot)
+
+SAMPLES = [
+    "Randevu almak istiyorum",
+    "Ücret nedir?",
+    "Fiyat hakkında bilgi verir misiniz?",
+    "Otel ayarlamak istiyorum",
+    "Ne zaman açıksınız?",
+    "Kaç gün sürer tedavi süresi?",
+    "I need an appointment",
+    "What is your price?",
+    "Can you help with hotel booking?",
+    "How long does the treatment take?",
+    "موعد من فضلك",
+    "أحتاج فندق",
+    "Naber",
+    "Hi",
+]
+FILLER = ("merhaba ben istanbul dan yaziyorum saç ekimi hakkında birkaç sorum olacaktı "
+          "hello i have a few questions about the procedure and my flight next month").split()
+
+
+def legacy_detect_intent(message, keyword_responses, faq_patterns):
+    message_lower = message.lower().strip()
+    for keyword in keyword_responses.keys():
+        if keyword in message_lower:
+            return keyword
+    for pattern in faq_patterns.keys():
+        if re.search(pattern, message_lower):
+            return pattern
+    return None
+
+
+def synthetic_messages(n, seed=42):
+    rnd = random.Random(seed)
+    messages = []
+    for _ in range(n):
+        words = rnd.sample(FILLER, rnd.randint(3, 20))
+        if rnd.random() < 0.5:
+            words.insert(rnd.randint(0, len(words)), rnd.choice(SAMPLES))
+        messages.append(' '.join(words))
+    return messages
+
+
+def synthetic_keywords(n, seed=7):
+    rnd = random.Random(seed)
+    alphabet = 'abcçdefgğhıijklmnoöprsştuüvyz'
+    keywords = {}
+    while len(keywords) < n:
+        keyword = ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(4, 12)))
+        keywords[keyword] = f'Yanıt: {keyword}'
+    return keywords
+
+
+def bench(label, keyword_responses, faq_patterns, messages, repeat):
+    matcher = chatbot.IntentMatcher(keyword_responses, faq_patterns)
+
+    for message in messages:
+        expected = legacy_detect_intent(message, keyword_responses, faq_patterns)
+        got = matcher.match(message.lower().strip())
+        assert got == expected, (message, got, expected)
+
+    best_legacy = best_matcher = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for message in messages:
+            legacy_detect_intent(message, keyword_responses, faq_patterns)
+        best_legacy = min(best_legacy, time.perf_counter() - t)
+
+        matcher.match.cache_clear()
+        t = time.perf_counter()
+        for message in messages:
+            matcher.match(message.lower().strip())
+        best_matcher = min(best_matcher, time.perf_counter() - t)
+
+    n = len(messages)
+    print(f"{label}: {len(keyword_responses)} keywords, {len(faq_patterns)} patterns, {n} messages")
+    print(f"  legacy scan     {best_legacy * 1e6 / n:8.1f} us/message")
+    print(f"  IntentMatcher   {best_matcher * 1e6 / n:8.1f} us/message  "
+          f"({best_legacy / best_matcher:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--keywords', type=int, default=500, help='synthetic tenant keywords (0: skip)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    messages = SAMPLES + synthetic_messages(args.messages)
+    bench('built-in', chatbot.KEYWORD_RESPONSES, chatbot.FAQ_PATTERNS, messages, args.repeat)
+
+    if args.keywords:
+        tenant = synthetic_keywords(args.keywords)
+        # Tenant keywords first, then the built-in table (as get_matcher builds it)
+        keyword_responses = dict(tenant)
+        for keyword, response in chatbot.KEYWORD_RESPONSES.items():
+            keyword_responses.setdefault(keyword, response)
+        bench('tenant', keyword_responses, chatbot.FAQ_PATTERNS, messages, args.repeat)
+    print("results identical")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Lead scoring benchmark: per-lead calculate_score vs. LeadScoringEngine.score_arrays
+
+    python scripts/bench_lead_scoring.py                  # 1M synthetic leads, scoring only
+    python scripts/bench_lead_scoring.py --db             # + end-to-end rescore on a temp SQLite DB
+
+Scoring only: the scalar path is timed on a sample and extrapolated; the
+array path scores all rows from columnar arrays. Every sampled score must
+match. With --db both rescore paths run against the same table (the
+scalar one the way rescore_leads worked before: ORM rows, one
+calculate_score per lead) and the stored scores are compared.
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+
+FORM_KEYS = ['service', 'procedure', 'treatment', 'interested_service', 'city', 'budget', 'age', 'notes']
+
+
+def synthetic_leads(n, now, seed=42):
+    rnd = random.Random(seed)
+    leads = []
+    for _ in range(n):
+        form_data = {k: rnd.choice(['x', '', None, 1]) for k in rnd.sample(FORM_KEYS, rnd.randint(0, 5))}
+        leads.append(SimpleNamespace(
+            email=rnd.choice([None, '', 'lead@example.com']),
+            phone=rnd.choice([None, '', '+905551112233']),
+            created_at=now - timedelta(minutes=rnd.randint(0, 60 * 24 * 60), microseconds=rnd.randint(0, 999999)),
+            lead_created_at=rnd.choice([None, now - timedelta(minutes=rnd.randint(0, 60 * 72))]),
+            form_data=rnd.choice([None, form_data]),
+        ))
+    return leads
+
+
+def bench_scoring(engine, leads, now, sample):
+    n = len(leads)
+    # Columnar input, as rescore_leads builds it per batch (not timed: comes from the query)
+    has_email = np.array([bool(l.email) for l in leads])
+    has_phone = np.array([bool(l.phone) for l in leads])
+    created = np.array([str(l.created_at) for l in leads], dtype='datetime64[us]')
+    lead_created = np.array([str(l.lead_created_at) if l.lead_created_at else None for l in leads],
+                            dtype='datetime64[us]')
+    form_data = [l.form_data for l in leads]
+
+    t = time.perf_counter()
+    filled, service = engine.form_features(form_data)
+    features = time.perf_counter() - t
+    t = time.perf_counter()
+    scores, _ = engine.score_arrays(has_email, has_phone, created, lead_created, filled, service, now)
+    engine.score_levels(scores)
+    vector = time.perf_counter() - t
+    print(f'array:  form_data features {features:.2f}s + scoring {vector:.2f}s '
+          f'= {n / (features + vector):,.0f} leads/s')
+
+    idx = random.Random(1).sample(range(n), min(sample, n))
+    t = time.perf_counter()
+    scalar = [engine.calculate_score(leads[i], now) for i in idx]
+    per_lead = (time.perf_counter() - t) / len(idx)
+    print(f'scalar: {1 / per_lead:,.0f} leads/s (est. {per_lead * n:.1f}s for {n:,})')
+
+    mismatches = sum(1 for i, s in zip(idx, scalar) if s != scores[i])
+    print(f'identical on {len(idx):,} sampled leads: {mismatches == 0} ({mismatches} mismatches)')
+    return mismatches == 0
+
+
+def scalar_rescore(engine, db, FacebookLead, batch_size=10000):
+    """Per-row rescore: ORM column rows + calculate_score for each lead"""
+    from sqlalchemy import bindparam
+    table = FacebookLead.__table__
+    stmt = table.update().where(table.c.id == bindparam('lead_id')).values(
+        score=bindparam('score'), score_level=bindparam('score_level'),
+        score_expires_at=bindparam('score_expires_at')
+    )
+    now = datetime.utcnow()
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            FacebookLead.id, FacebookLead.email, FacebookLead.phone, FacebookLead.form_data,
+            FacebookLead.created_at, FacebookLead.lead_created_at
+        ).filter(FacebookLead.id > last_id).order_by(FacebookLead.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        db.session.execute(stmt, [{'lead_id': row.id, **engine.score_fields(row, now)} for row in rows])
+        db.session.commit()
+
+
+def bench_db(engine, leads, now):
+    n = len(leads)
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    from config import Config
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    import app.utils.scheduler as scheduler
+    scheduler.init_scheduler = lambda app: None  # no background jobs in the benchmark
+    from app import create_app, db
+    from app.models import Distributor
+    from app.models.meta_lead import FacebookLead
+    from app.services.lead_scoring import rescore_leads
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        dist = Distributor(name='bench', email='bench@example.com')
+        db.session.add(dist)
+        db.session.commit()
+        t = time.perf_counter()
+        db.session.execute(FacebookLead.__table__.insert(), [{
+            'distributor_id': dist.id, 'meta_lead_id': f'bench-{i}', 'status': 'new',
+            'email': l.email, 'phone': l.phone, 'form_data': l.form_data,
+            'created_at': l.created_at, 'lead_created_at': l.lead_created_at,
+        } for i, l in enumerate(leads)])
+        db.session.commit()
+        print(f'seeded {n:,} rows in {time.perf_counter() - t:.1f}s ({path})')
+
+        t = time.perf_counter()
+        scalar_rescore(engine, db, FacebookLead)
+        elapsed = time.perf_counter() - t
+        print(f'per-row rescore:  {elapsed:.1f}s = {n / elapsed:,.0f} leads/s')
+        before = dict(db.session.query(FacebookLead.id, FacebookLead.score))
+
+        t = time.perf_counter()
+        rescore_leads(full=True)
+        elapsed = time.perf_counter() - t
+        print(f'rescore_leads():  {elapsed:.1f}s = {n / elapsed:,.0f} leads/s')
+        after = dict(db.session.query(FacebookLead.id, FacebookLead.score))
+        # Both runs take their own `now`; only a lead crossing a threshold in between may differ
+        diff = sum(1 for k, v in after.items() if before[k] != v)
+        print(f'stored scores differing between runs: {diff}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--sample', type=int, default=50_000, help='leads scored with calculate_score')
+    parser.add_argument('--db', action='store_true', help='also time both rescore paths on SQLite')
+    args = parser.parse_args()
+
+    from app.services.lead_scoring import LeadScoringEngine
+    now = datetime.utcnow()
+    t = time.perf_counter()
+    leads = synthetic_leads(args.rows, now)
+    print(f'generated {args.rows:,} leads in {time.perf_counter() - t:.1f}s')
+
+    ok = bench_scoring(LeadScoringEngine, leads, now, args.sample)
+    if args.db:
+        bench_db(LeadScoringEngine, leads, now)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
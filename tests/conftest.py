@@ -0,0 +1,77 @@
+"""Shared fixtures: an app on an in-memory SQLite database per test"""
+import importlib.util
+import os
+import pytest
+from config import Config
+from app import create_app, db as _db, cache
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    WTF_CSRF_ENABLED = False
+    SCHEDULER_ENABLED = False
+    RATE_LIMIT_STORAGE = 'memory'
+    PDF_WORKERS = 0
+    MAIL_WORKERS = 0
+    TRANSLATION_WORKERS = 0
+    TRANSLATION_PROVIDER = 'fake'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        _db.create_all()
+        cache.clear()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def distributor(db):
+    from app.models import Distributor
+    distributor = Distributor(name='Klinik', email='klinik@example.com')
+    db.session.add(distributor)
+    db.session.commit()
+    return distributor
+
+
+@pytest.fixture
+def user(db, distributor):
+    from app.models import User
+    user = User(username='admin', email='admin@example.com', role='admin', distributor_id=distributor.id)
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def client(app, user):
+    """Test client logged in as `user`"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture
+def migration():
+    """Load a module from migrations/versions by its revision id"""
+    versions = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations', 'versions')
+
+    def load(revision):
+        (filename,) = [name for name in os.listdir(versions) if name.startswith(f'{revision}_')]
+        spec = importlib.util.spec_from_file_location(f'migration_{revision}', os.path.join(versions, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
@@ -0,0 +1,144 @@
+"""Conflict checks, batch validation and free-slot search of the availability engine"""
+from datetime import datetime, timedelta
+import pytest
+from app.models.patient import Patient
+from app.models.appointment import Appointment
+from app.services.availability import (
+    AvailabilityEngine, Booking, MAX_APPOINTMENT_SPAN, Proposal, Timeline,
+)
+
+DAY = datetime(2026, 6, 1)
+
+
+def _at(hour, minute=0, day=DAY):
+    return day.replace(hour=hour, minute=minute)
+
+
+def _booking(start, end, key=None):
+    return Booking(key, None, start, end, None, None)
+
+
+@pytest.fixture
+def book(db, distributor):
+    patient = Patient(distributor_id=distributor.id, first_name='Ali', last_name='Veli')
+    db.session.add(patient)
+    db.session.commit()
+
+    def book(start, end, doctor_name='Dr. Kaya', room_number=None, status='scheduled'):
+        appointment = Appointment(distributor_id=distributor.id, patient_id=patient.id, title='Muayene',
+                                  start_time=start, end_time=end, doctor_name=doctor_name,
+                                  room_number=room_number, status=status)
+        db.session.add(appointment)
+        db.session.commit()
+        return appointment
+    return book
+
+
+def _engine(distributor, doctors=('Dr. Kaya',), rooms=(), start=DAY, end=DAY + timedelta(days=1), **kwargs):
+    return AvailabilityEngine(distributor.id, start, end, doctors=doctors, rooms=rooms, **kwargs)
+
+
+def test_back_to_back_slots_stay_on_the_granularity(db, distributor):
+    engine = _engine(distributor)
+
+    slots = engine.find_free_slots(timedelta(minutes=20), count=3, doctor_name='Dr. Kaya')
+
+    assert [start.strftime('%H:%M') for start, _ in slots] == ['09:00', '09:30', '10:00']
+    assert all(end - start == timedelta(minutes=20) for start, end in slots)
+
+
+def test_conflict_finds_overlaps_on_doctor_or_room(book, distributor):
+    surgery = book(_at(10), _at(11), doctor_name='Dr. Kaya', room_number='A1')
+    book(_at(12), _at(13), status='cancelled')
+    engine = _engine(distributor, doctors=['Dr. Kaya', 'Dr. Ak'], rooms=['A1', 'B2'])
+
+    assert engine.conflict(_at(10, 30), _at(10, 45), doctor_name='Dr. Kaya').id == surgery.id
+    assert engine.conflict(_at(9, 30), _at(10, 15), doctor_name='Dr. Ak', room_number='A1').id == surgery.id
+    # Touching intervals do not overlap; cancelled appointments do not block
+    assert engine.conflict(_at(9), _at(10), doctor_name='Dr. Kaya', room_number='A1') is None
+    assert engine.conflict(_at(11), _at(12), doctor_name='Dr. Kaya', room_number='A1') is None
+    assert engine.conflict(_at(12), _at(13), doctor_name='Dr. Kaya') is None
+    assert engine.conflict(_at(10), _at(11), doctor_name='Dr. Ak', room_number='B2') is None
+
+
+def test_conflict_ignores_excluded_appointments_and_rejects_unloaded_resources(book, distributor):
+    edited = book(_at(10), _at(11))
+    engine = _engine(distributor, exclude_ids=[edited.id])
+
+    assert engine.conflict(_at(10), _at(11), doctor_name='Dr. Kaya') is None
+    with pytest.raises(ValueError):
+        engine.conflict(_at(10), _at(11), doctor_name='Dr. Ak')
+    with pytest.raises(ValueError):
+        engine.conflict(DAY - timedelta(hours=1), _at(11), doctor_name='Dr. Kaya')
+
+
+def test_validate_batch_checks_proposals_against_the_schedule_and_each_other(book, distributor):
+    existing = book(_at(9), _at(10))
+    proposals = [
+        Proposal(_at(10, 45), _at(12), 'Dr. Kaya', None, 'late'),
+        Proposal(_at(11), _at(12), 'Dr. Ak', None, 'after-other'),
+        Proposal(_at(9, 30), _at(10, 30), 'Dr. Kaya', None, 'clashes-existing'),
+        Proposal(_at(10), _at(11), 'Dr. Kaya', None, 'first'),
+        Proposal(_at(10, 30), _at(11, 30), 'Dr. Kaya', None, 'clashes-first'),
+        Proposal(_at(10, 30), _at(11, 30), 'Dr. Ak', None, 'other-doctor'),
+    ]
+    engine = AvailabilityEngine.for_proposals(distributor.id, proposals + [Proposal(_at(9), _at(10), 'Dr. Kaya')])
+
+    conflicts = {proposal.key: booking for proposal, booking in engine.validate_batch(proposals)}
+
+    assert set(conflicts) == {'clashes-existing', 'clashes-first', 'late', 'after-other'}
+    assert conflicts['clashes-existing'].id == existing.id
+    # Accepted proposals are booked as the batch goes, rejected ones are not
+    assert conflicts['clashes-first'].id == 'first'
+    assert conflicts['late'].id == 'first'
+    assert conflicts['after-other'].id == 'other-doctor'
+
+
+def test_timeline_add_merges_overlapping_and_touching_blocks():
+    timeline = Timeline([_booking(_at(9), _at(10)), _booking(_at(12), _at(13)), _booking(_at(15), _at(16))])
+
+    timeline.add(_booking(_at(14), _at(14, 30)))
+    assert list(zip(timeline.starts, timeline.ends)) == [
+        (_at(9), _at(10)), (_at(12), _at(13)), (_at(14), _at(14, 30)), (_at(15), _at(16))]
+
+    # Touches the first block and overlaps the second: one block from 9 to 13
+    timeline.add(_booking(_at(10), _at(12, 30), key='bridge'))
+    assert list(zip(timeline.starts, timeline.ends)) == [
+        (_at(9), _at(13)), (_at(14), _at(14, 30)), (_at(15), _at(16))]
+
+    timeline.add(_booking(_at(9, 15), _at(9, 45)))
+    timeline.add(_booking(_at(14, 30), _at(15)))
+    assert list(zip(timeline.starts, timeline.ends)) == [(_at(9), _at(13)), (_at(14), _at(16))]
+    assert len(timeline) == 7
+    assert timeline.overlapping(_at(11), _at(11, 30)).id == 'bridge'
+
+
+def test_free_slots_skip_existing_bookings_of_doctor_and_room(book, distributor):
+    book(_at(9), _at(9, 50), doctor_name='Dr. Kaya')
+    book(_at(10), _at(11), doctor_name='Dr. Ak', room_number='A1')
+    engine = _engine(distributor, rooms=['A1'])
+
+    slots = engine.find_free_slots(timedelta(minutes=30), count=3, doctor_name='Dr. Kaya', room_number='A1')
+
+    # 09:50 rounds up to 10:00, the room is busy until 11:00
+    assert [start.strftime('%H:%M') for start, _ in slots] == ['11:00', '11:30', '12:00']
+
+
+def test_free_slots_continue_on_the_next_working_day(book, distributor):
+    book(_at(9), _at(17, 30))
+    engine = _engine(distributor, end=DAY + timedelta(days=2))
+
+    slots = engine.find_free_slots(timedelta(hours=1), count=2, doctor_name='Dr. Kaya')
+
+    assert slots == [(_at(9, day=DAY + timedelta(days=1)), _at(10, day=DAY + timedelta(days=1))),
+                     (_at(10, day=DAY + timedelta(days=1)), _at(11, day=DAY + timedelta(days=1)))]
+
+
+def test_bookings_starting_before_max_span_are_not_loaded(book, distributor):
+    long_stay = book(DAY - MAX_APPOINTMENT_SPAN + timedelta(hours=1), _at(12))
+    book(DAY - MAX_APPOINTMENT_SPAN - timedelta(hours=1), _at(14))
+    engine = _engine(distributor)
+
+    assert engine.conflict(_at(11), _at(12), doctor_name='Dr. Kaya').id == long_stay.id
+    # Starts past the cutoff, so it is outside the index range scan
+    assert engine.conflict(_at(13), _at(14), doctor_name='Dr. Kaya') is None
@@ -0,0 +1,77 @@
+"""BulkLeadOperations keep lead_daily_stats and the cached status histogram in step"""
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import func
+from app.models.distributor import Distributor
+from app.models.meta_lead import FacebookLead, LeadInteraction
+from app.models.lead_daily_stat import LeadDailyStat
+from app.services.bulk_operations import BulkLeadOperations
+from app.services.lead_analytics import day_for
+from app.services.lead_stats import status_counts
+
+
+def _grouped():
+    """(distributor_id, day, status) counts straight from facebook_leads"""
+    counts = Counter()
+    rows = FacebookLead.query.with_entities(
+        FacebookLead.distributor_id, FacebookLead.created_at, FacebookLead.status)
+    for distributor_id, created_at, status in rows:
+        counts[(distributor_id, day_for(created_at), status)] += 1
+    return counts
+
+
+def _rollup():
+    return Counter({
+        (stat.distributor_id, stat.day, stat.status): stat.count
+        for stat in LeadDailyStat.query if stat.count
+    })
+
+
+def _histogram(distributor_id=None):
+    q = FacebookLead.query.with_entities(FacebookLead.status, func.count(FacebookLead.id))
+    if distributor_id:
+        q = q.filter(FacebookLead.distributor_id == distributor_id)
+    counts = dict(q.group_by(FacebookLead.status).all())
+    return {status: counts.get(status, 0) for status in ('new', 'assigned', 'contacted', 'converted', 'rejected')}
+
+
+def _assert_in_step(*distributor_ids):
+    assert _rollup() == _grouped()
+    for distributor_id in distributor_ids + (None,):
+        counts = dict(status_counts(distributor_id))
+        total = counts.pop('total')
+        assert counts == _histogram(distributor_id)
+        assert total == sum(counts.values())
+
+
+def test_bulk_operations_match_a_fresh_group_by(db, distributor, user, monkeypatch):
+    # Small chunks so every operation spans several statements
+    monkeypatch.setattr(BulkLeadOperations, 'CHUNK_SIZE', 3)
+    other = Distributor(name='Diğer Klinik', email='diger@example.com')
+    db.session.add(other)
+    db.session.commit()
+    statuses = ['new', 'new', 'contacted', 'assigned', 'converted', 'new', 'rejected']
+    db.session.add_all([
+        FacebookLead(distributor_id=owner.id, meta_lead_id=f'{owner.id}-{i}', status=status,
+                     created_at=datetime(2026, 3, 1 + i % 3, 10))
+        for owner in (distributor, other) for i, status in enumerate(statuses)
+    ])
+    db.session.commit()
+    ids = [lead.id for lead in FacebookLead.query.order_by(FacebookLead.id)]
+    # Warm the cache: the bulk writes have to invalidate it
+    _assert_in_step(distributor.id, other.id)
+
+    result = BulkLeadOperations.bulk_status_change(ids[:5] + ids[7:10] + [10 ** 6], 'contacted', user.id)
+    assert result['updated'] == 8
+    _assert_in_step(distributor.id, other.id)
+
+    result = BulkLeadOperations.bulk_assign(ids[3:9], user.id, user.id)
+    assert result['updated'] == 6
+    _assert_in_step(distributor.id, other.id)
+
+    result = BulkLeadOperations.bulk_delete(ids[::2], user.id)
+    assert result['deleted'] == 7
+    _assert_in_step(distributor.id, other.id)
+
+    assert FacebookLead.query.count() == 7
+    assert LeadInteraction.query.filter(LeadInteraction.lead_id.in_(ids[::2])).count() == 0
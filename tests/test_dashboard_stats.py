@@ -0,0 +1,86 @@
+from datetime import datetime
+from sqlalchemy import text
+from app.models import Patient, Encounter, HairAnnotation, DentalProcedure, EyeRefraction, DashboardStat
+from app.services.dashboard_stats import get_dashboard_stats, rebuild_dashboard_stats, period_for
+
+
+def _encounter(db, distributor):
+    patient = Patient(distributor_id=distributor.id, first_name='Ali', last_name='Veli')
+    db.session.add(patient)
+    db.session.flush()
+    encounter = Encounter(distributor_id=distributor.id, patient_id=patient.id)
+    db.session.add(encounter)
+    db.session.commit()
+    return encounter
+
+
+def test_inserts_bump_the_rollup(db, distributor):
+    encounter = _encounter(db, distributor)
+    db.session.add_all([
+        HairAnnotation(encounter_id=encounter.id, region_id='front'),
+        HairAnnotation(encounter_id=encounter.id, region_id='crown'),
+        DentalProcedure(encounter_id=encounter.id, tooth_no=11, treatment_type='implant'),
+    ])
+    db.session.commit()
+
+    stats = get_dashboard_stats(distributor.id)
+    assert stats['patients_count'] == 1
+    assert stats['encounters_count'] == 1
+    # Modules count encounters, not rows
+    assert stats['module_stats'] == {'hair': 1, 'dental': 1, 'eye': 0}
+    assert stats['new_patients_this_month'] == 1
+    row = DashboardStat.query.filter_by(distributor_id=distributor.id).one()
+    assert row.period == period_for(datetime.utcnow())
+
+
+def test_bulk_delete_of_module_rows_is_counted(db, distributor):
+    encounter = _encounter(db, distributor)
+    db.session.add(HairAnnotation(encounter_id=encounter.id, region_id='front'))
+    db.session.commit()
+
+    HairAnnotation.query.filter_by(encounter_id=encounter.id).delete()
+    db.session.commit()
+    assert get_dashboard_stats(distributor.id)['module_stats']['hair'] == 0
+
+
+def test_deleting_encounter_drops_its_counters(db, distributor):
+    encounter = _encounter(db, distributor)
+    db.session.add(DentalProcedure(encounter_id=encounter.id, tooth_no=11, treatment_type='implant'))
+    db.session.commit()
+
+    DentalProcedure.query.filter_by(encounter_id=encounter.id).delete()
+    db.session.delete(encounter)
+    db.session.commit()
+    stats = get_dashboard_stats(distributor.id)
+    assert stats['encounters_count'] == 0
+    assert stats['module_stats']['dental'] == 0
+
+
+def test_rebuild_matches_incremental_counters(db, distributor):
+    encounter = _encounter(db, distributor)
+    db.session.add(HairAnnotation(encounter_id=encounter.id, region_id='front'))
+    db.session.commit()
+
+    incremental = get_dashboard_stats(distributor.id)
+    rebuild_dashboard_stats()
+    assert get_dashboard_stats(distributor.id) == incremental
+
+
+def test_migration_backfill_matches_rebuild(db, distributor, migration):
+    encounter = _encounter(db, distributor)
+    db.session.add_all([
+        HairAnnotation(encounter_id=encounter.id, region_id='front'),
+        HairAnnotation(encounter_id=encounter.id, region_id='crown'),
+        DentalProcedure(encounter_id=encounter.id, tooth_no=11, treatment_type='implant'),
+        EyeRefraction(encounter_id=_encounter(db, distributor).id),
+    ])
+    db.session.commit()
+    rebuild_dashboard_stats()
+    rebuilt = get_dashboard_stats(distributor.id)
+
+    DashboardStat.query.delete()
+    db.session.execute(text(migration('i9j0k1l2m3n4').backfill_sql('sqlite')))
+    db.session.commit()
+
+    assert get_dashboard_stats(distributor.id) == rebuilt
+    assert rebuilt['module_stats'] == {'hair': 1, 'dental': 1, 'eye': 1}
@@ -0,0 +1,13 @@
+"""Streamed exports"""
+from app.models import Patient
+
+
+def test_csv_export_declares_the_charset_once(client, db, distributor):
+    db.session.add(Patient(distributor_id=distributor.id, first_name='Ayşe', last_name='Yılmaz'))
+    db.session.commit()
+
+    response = client.get('/patients/export?format=csv')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    assert 'Ayşe' in response.get_data().decode('utf-8-sig')
@@ -0,0 +1,72 @@
+"""Denormalized step counters on patient_journeys (journey_progress hooks)"""
+from datetime import datetime, timedelta
+import pytest
+from app.models import Patient
+from app.models.journey import PatientJourney, JourneyStep
+from app.services.journey_progress import refresh_journey_progress
+
+
+@pytest.fixture
+def journey(db, distributor):
+    patient = Patient(distributor_id=distributor.id, first_name='Ali', last_name='Veli')
+    db.session.add(patient)
+    db.session.flush()
+    arrival = datetime(2026, 5, 1, 10)
+    journey = PatientJourney(distributor_id=distributor.id, patient_id=patient.id, journey_code='TRV-2026-001',
+                             arrival_date=arrival, departure_date=arrival + timedelta(days=5))
+    db.session.add(journey)
+    db.session.commit()
+    return journey
+
+
+def _step(journey, sequence, status='pending'):
+    return JourneyStep(journey_id=journey.id, sequence=sequence, step_type='other', title=f'Adım {sequence}',
+                       scheduled_date=journey.arrival_date + timedelta(hours=sequence), status=status)
+
+
+def _summary(journey):
+    return journey.steps_total, journey.steps_completed, journey.current_step_id, journey.next_step_id
+
+
+def test_counters_follow_step_inserts_updates_and_deletes(db, journey):
+    first, second, third = _step(journey, 1), _step(journey, 2), _step(journey, 3)
+    db.session.add_all([first, second, third])
+    db.session.commit()
+    assert _summary(journey) == (3, 0, None, first.id)
+
+    first.status = 'completed'
+    second.status = 'in_progress'
+    db.session.commit()
+    assert _summary(journey) == (3, 1, second.id, third.id)
+
+    db.session.delete(third)
+    db.session.commit()
+    assert _summary(journey) == (2, 1, second.id, None)
+    assert journey.progress_percentage() == 50
+
+
+def test_step_moved_to_another_journey_updates_both(db, distributor, journey):
+    other = PatientJourney(distributor_id=distributor.id, patient_id=journey.patient_id,
+                           journey_code='TRV-2026-002', arrival_date=journey.arrival_date,
+                           departure_date=journey.departure_date)
+    db.session.add(other)
+    step = _step(journey, 1)
+    db.session.add(step)
+    db.session.commit()
+
+    step.journey_id = other.id
+    db.session.commit()
+
+    assert _summary(journey) == (0, 0, None, None)
+    assert _summary(other) == (1, 0, None, step.id)
+
+
+def test_refresh_matches_the_hooks(db, journey):
+    db.session.add_all([_step(journey, 1, 'completed'), _step(journey, 2, 'in_progress'), _step(journey, 3)])
+    db.session.commit()
+    maintained = _summary(journey)
+
+    refresh_journey_progress(db.session.connection())
+    db.session.commit()
+
+    assert _summary(journey) == maintained
@@ -0,0 +1,70 @@
+"""lead_daily_stats rollup kept current by the lead_analytics hooks"""
+from datetime import datetime
+from sqlalchemy import text
+from app.models.meta_lead import FacebookLead
+from app.models.lead_daily_stat import LeadDailyStat
+from app.services.lead_analytics import rebuild_lead_daily_stats
+
+
+def _counts(distributor):
+    return {
+        (stat.day, stat.status): stat.count
+        for stat in LeadDailyStat.query.filter_by(distributor_id=distributor.id) if stat.count
+    }
+
+
+def _lead(db, distributor, meta_lead_id='1'):
+    lead = FacebookLead(distributor_id=distributor.id, meta_lead_id=meta_lead_id,
+                        status='new', created_at=datetime(2026, 3, 1, 12))
+    db.session.add(lead)
+    db.session.commit()
+    return lead
+
+
+def test_status_change_on_an_expired_lead_moves_its_count(db, distributor):
+    lead = _lead(db, distributor)
+    # commit() expired the instance; the old status is not loaded yet
+    assert 'status' not in lead.__dict__
+
+    lead.status = 'contacted'
+    db.session.commit()
+
+    assert _counts(distributor) == {('2026-03-01', 'contacted'): 1}
+
+
+def test_created_at_change_on_an_expired_lead_moves_its_day(db, distributor):
+    lead = _lead(db, distributor)
+
+    lead.created_at = datetime(2026, 3, 2, 9)
+    db.session.commit()
+
+    assert _counts(distributor) == {('2026-03-02', 'new'): 1}
+
+
+def test_delete_and_rebuild_agree_with_the_hooks(db, distributor):
+    _lead(db, distributor, '1')
+    lead = _lead(db, distributor, '2')
+    lead.status = 'converted'
+    db.session.commit()
+    db.session.delete(_lead(db, distributor, '3'))
+    db.session.commit()
+
+    maintained = _counts(distributor)
+    rebuild_lead_daily_stats()
+
+    assert maintained == {('2026-03-01', 'new'): 1, ('2026-03-01', 'converted'): 1}
+    assert _counts(distributor) == maintained
+
+
+def test_migration_backfill_matches_rebuild(db, distributor, migration):
+    _lead(db, distributor, '1')
+    _lead(db, distributor, '2').status = 'converted'
+    db.session.commit()
+    rebuild_lead_daily_stats()
+    rebuilt = _counts(distributor)
+
+    LeadDailyStat.query.delete()
+    db.session.execute(text(migration('l2m3n4o5p6q7').backfill_sql('sqlite')))
+    db.session.commit()
+
+    assert _counts(distributor) == rebuilt == {('2026-03-01', 'new'): 1, ('2026-03-01', 'converted'): 1}
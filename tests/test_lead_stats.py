@@ -0,0 +1,72 @@
+"""Cached lead status histogram and its stats_delta events"""
+import pytest
+from app import socketio
+from app.models.meta_lead import FacebookLead
+from app.services.lead_stats import status_counts, STATS_ROOM
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    events = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, data=None, **kwargs: events.append((event, data, kwargs)))
+    return events
+
+
+def _deltas(emitted):
+    return [data for event, data, kwargs in emitted if event == 'stats_delta' and kwargs.get('to') == STATS_ROOM]
+
+
+def _add(db, distributor, *statuses):
+    offset = FacebookLead.query.count()
+    leads = [FacebookLead(distributor_id=distributor.id, meta_lead_id=str(offset + i), status=status)
+             for i, status in enumerate(statuses)]
+    db.session.add_all(leads)
+    db.session.commit()
+    return leads
+
+
+def test_counts_stay_current_through_the_cache(db, distributor, emitted):
+    _add(db, distributor, 'new', 'new', 'contacted')
+    assert status_counts(distributor.id)['new'] == 2
+
+    lead = _add(db, distributor, 'new')[0]
+    lead.status = 'converted'
+    db.session.commit()
+
+    counts = status_counts(distributor.id)
+    assert (counts['new'], counts['contacted'], counts['converted'], counts['total']) == (2, 1, 1, 4)
+    assert status_counts() == counts
+
+
+def test_status_change_is_pushed_as_a_delta(db, distributor, emitted):
+    lead = _add(db, distributor, 'new')[0]
+    emitted.clear()
+
+    lead.status = 'assigned'
+    db.session.commit()
+
+    (event,) = _deltas(emitted)
+    assert not event['stale']
+    assert sorted((c['status'], c['delta']) for c in event['changes']) == [('assigned', 1), ('new', -1)]
+
+
+def test_bulk_update_invalidates_and_marks_the_event_stale(db, distributor, emitted):
+    _add(db, distributor, 'new', 'new')
+    assert status_counts(distributor.id)['new'] == 2
+    emitted.clear()
+
+    FacebookLead.query.filter_by(distributor_id=distributor.id).update({'status': 'rejected'})
+    db.session.commit()
+
+    assert [event['stale'] for event in _deltas(emitted)] == [True]
+    assert status_counts(distributor.id)['rejected'] == 2
+
+
+def test_rolled_back_changes_are_not_pushed(db, distributor, emitted):
+    db.session.add(FacebookLead(distributor_id=distributor.id, meta_lead_id='x', status='new'))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+
+    assert _deltas(emitted) == []
+    assert status_counts(distributor.id)['total'] == 0
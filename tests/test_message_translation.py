@@ -0,0 +1,20 @@
+"""Message translation is queued after the new_message event"""
+from app import socketio
+from app.models import Patient, Message
+from app.utils import translation_service
+
+
+def test_translation_event_follows_new_message(client, db, distributor, monkeypatch):
+    patient = Patient(distributor_id=distributor.id, first_name='John', last_name='Doe')
+    db.session.add(patient)
+    db.session.commit()
+    events = []
+    monkeypatch.setattr(translation_service, 'detect_language', lambda text: 'en')
+    monkeypatch.setattr(socketio, 'emit', lambda event, *args, **kwargs: events.append(event))
+
+    response = client.post('/communication/messages/send',
+                           data={'patient_id': patient.id, 'content': 'Hello, how are you?'})
+
+    assert response.status_code == 302
+    assert [event for event in events if 'message' in event] == ['new_message', 'message_translated']
+    assert Message.query.one().translated_content == '[tr] Hello, how are you?'
@@ -0,0 +1,82 @@
+"""MetaLeadService.sync_leads: paging and the failure path"""
+from datetime import datetime
+import pytest
+from app.models.meta_lead import MetaAPIConfig, FacebookLead
+from app.models.lead_daily_stat import LeadDailyStat
+from app.services.meta_lead_service import MetaLeadService
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeGraph:
+    """Serves the given pages in order, linking them with paging.next"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        page = self.pages[self.calls]
+        self.calls += 1
+        paging = {'next': f'https://graph.example/next/{self.calls}'} if self.calls < len(self.pages) else {}
+        return FakeResponse({'data': page, 'paging': paging})
+
+
+def _leads(*ids):
+    return [{'id': lead_id, 'created_time': '2026-01-05T10:00:00+0000',
+             'field_data': [{'name': 'first_name', 'values': [f'Lead {lead_id}']}]} for lead_id in ids]
+
+
+@pytest.fixture
+def config(db, distributor):
+    config = MetaAPIConfig(distributor_id=distributor.id, form_id='form', access_token='token', is_active=True)
+    db.session.add(config)
+    db.session.commit()
+    return config
+
+
+def test_sync_stores_every_page_and_advances_last_fetch_time(db, config):
+    graph = FakeGraph([_leads('1', '2'), _leads('3')])
+
+    result = MetaLeadService(config, http=graph).sync_leads()
+
+    assert result['success']
+    assert (result['pages'], result['fetched'], result['stored']) == (2, 3, 3)
+    assert FacebookLead.query.count() == 3
+    assert config.last_fetch_time is not None
+
+
+def test_failing_page_keeps_earlier_pages_and_last_fetch_time(db, config, monkeypatch):
+    previous_fetch = datetime(2026, 1, 1)
+    config.last_fetch_time = previous_fetch
+    db.session.commit()
+    insert = MetaLeadService._insert_ignoring_duplicates
+    calls = []
+
+    def insert_then_fail(self, rows):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise RuntimeError('disk full')
+        return insert(self, rows)
+
+    monkeypatch.setattr(MetaLeadService, '_insert_ignoring_duplicates', insert_then_fail)
+    graph = FakeGraph([_leads('1', '2'), _leads('3'), _leads('4')])
+
+    result = MetaLeadService(config, http=graph).sync_leads()
+    db.session.expire_all()
+
+    assert not result['success']
+    assert result['stored'] == 2
+    assert 'disk full' in config.last_error
+    # The next run re-reads from the old position; page 1 is deduplicated
+    assert config.last_fetch_time == previous_fetch
+    assert sorted(lead.meta_lead_id for lead in FacebookLead.query) == ['1', '2']
+    assert sum(stat.count for stat in LeadDailyStat.query.filter_by(status='new')) == 2
@@ -0,0 +1,54 @@
+"""Notification dispatch and the pooled mail sender"""
+import smtplib
+import pytest
+from flask_mail import Message
+from app import socketio, mail
+from app.models import Notification
+from app.services.notification_dispatcher import dispatch
+from app.utils import email
+
+
+def test_email_channel_keeps_its_notification_row_without_a_push(app, db, user, monkeypatch):
+    app.config['MAIL_DEFAULT_SENDER'] = 'noreply@example.com'
+    events = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, *args, **kwargs: events.append(event))
+
+    with mail.record_messages() as outbox:
+        assert dispatch([user.id], 'Rapor hazır', channel='email') == 1
+        db.session.commit()
+
+    row = Notification.query.one()
+    assert (row.user_id, row.channel) == (user.id, 'email')
+    assert [msg.recipients for msg in outbox] == [[user.email]]
+    assert 'notification' not in events
+
+
+class FlakyConnection:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.sent = 0
+
+    def send(self, msg):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent += 1
+
+
+@pytest.mark.parametrize('error, attempts', [
+    (smtplib.SMTPServerDisconnected('gone'), 2),
+    (ConnectionResetError(), 2),
+    (smtplib.SMTPRecipientsRefused({'x@example.com': (550, b'no such user')}), 1),
+    (smtplib.SMTPAuthenticationError(535, b'bad credentials'), 1),
+])
+def test_only_dropped_connections_are_retried(app, monkeypatch, error, attempts):
+    connection = FlakyConnection([error, error])
+    calls = []
+
+    def connect():
+        calls.append(1)
+        return connection
+
+    monkeypatch.setattr(email, '_connection', connect)
+    email._send_pooled(app, Message('Test', recipients=['x@example.com'], sender='noreply@example.com'))
+
+    assert len(calls) == attempts
@@ -0,0 +1,99 @@
+"""Keyset cursors (app/utils/pagination.py) and the lists built on them"""
+from datetime import datetime, timedelta
+import base64
+import json
+import pytest
+from app.models import Patient, PatientJourney
+from app.routes import journey_routes
+from app.utils.pagination import keyset_paginate, encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def patients(db, distributor):
+    # Two share a timestamp, so the id tie-break is exercised
+    base = datetime(2026, 1, 1)
+    stamps = [base, base + timedelta(hours=1), base + timedelta(hours=1), base + timedelta(hours=2), base + timedelta(hours=3)]
+    rows = [Patient(distributor_id=distributor.id, first_name=f'Hasta {i}', last_name='X', created_at=stamp)
+            for i, stamp in enumerate(stamps)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return sorted(rows, key=lambda p: (p.created_at, p.id), reverse=True)
+
+
+def _page(cursor=None, per_page=2):
+    return keyset_paginate(Patient.query, Patient.created_at, per_page=per_page, cursor=cursor, total='exact')
+
+
+def _ids(page):
+    return [p.id for p in page.items]
+
+
+def test_next_and_prev_cursors_walk_the_list_both_ways(patients):
+    expected = [p.id for p in patients]
+
+    first = _page()
+    second = _page(first.next_cursor)
+    third = _page(second.next_cursor)
+    assert (_ids(first), _ids(second), _ids(third)) == (expected[:2], expected[2:4], expected[4:])
+    assert (first.has_prev, third.has_next, first.total) == (False, False, 5)
+
+    back = _page(third.prev_cursor)
+    assert _ids(back) == expected[2:4]
+    assert _ids(_page(back.prev_cursor)) == expected[:2]
+    assert not _page(back.prev_cursor).has_prev
+
+
+def test_cursor_round_trip_and_bad_cursors(patients):
+    value = datetime(2026, 1, 1, 12, 30, 0, 123456)
+    assert decode_cursor(encode_cursor((value, 7), 'prev')) == ((value, 7), 'prev')
+    for broken in ('not-base64!', encode_cursor((value,)), 'eyJrIjpbXX0'):
+        assert decode_cursor(broken) is None
+    assert _ids(_page('garbage')) == _ids(_page())
+
+
+def _token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('payload', [
+    {'k': [{'x': 1}, 2]},
+    {'k': ['2026-01-01', 'abc']},
+    {'k': [{'dt': '2026-01-01T00:00:00'}, 'abc']},
+    {'k': [{'dt': '2026-01-01T00:00:00'}, True]},
+    {'k': [{'dt': 123}, 1]},
+    {'k': 5},
+    [1, 2],
+])
+def test_well_formed_cursors_with_wrong_types_give_the_first_page(client, patients, payload):
+    assert decode_cursor(_token(payload)) is None
+
+    response = client.get(f'/patients?format=json&cursor={_token(payload)}')
+
+    assert response.status_code == 200
+    assert [p['id'] for p in response.get_json()['items']] == [p.id for p in patients]
+
+
+def test_nullable_sort_column_is_rejected(db):
+    # NULL rows never match the seek and would vanish after page 1
+    with pytest.raises(ValueError):
+        keyset_paginate(Patient.query, Patient.updated_at)
+
+
+def test_journey_list_pages_with_the_shared_cursors(client, db, distributor, patients, monkeypatch):
+    monkeypatch.setattr(journey_routes, 'JOURNEYS_PER_PAGE', 2)
+    for i in range(3):
+        arrival = datetime(2026, 4, 1 + i)
+        db.session.add(PatientJourney(distributor_id=distributor.id, patient_id=patients[0].id,
+                                      journey_code=f'TRV-{i}', arrival_date=arrival,
+                                      departure_date=arrival + timedelta(days=3)))
+    db.session.commit()
+
+    first = client.get('/journey/?format=json').get_json()
+    second = client.get(f"/journey/?format=json&cursor={first['next_cursor']}").get_json()
+    back = client.get(f"/journey/?format=json&cursor={second['prev_cursor']}").get_json()
+
+    assert [j['journey_code'] for j in first['items']] == ['TRV-2', 'TRV-1']
+    assert [j['journey_code'] for j in second['items']] == ['TRV-0']
+    assert back['items'] == first['items']
+    html = client.get(f"/journey/?cursor={second['prev_cursor']}").get_data(as_text=True)
+    assert 'TRV-2' in html and 'Sonraki' in html
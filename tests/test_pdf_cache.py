@@ -0,0 +1,24 @@
+import os
+from app.models import Patient, Encounter
+from app.services.encounter_bundle import load_encounter_bundle
+from app.utils.pdf_cache import encounter_fingerprint
+
+
+def test_logo_change_changes_fingerprint_from_any_working_directory(app, db, distributor, tmp_path, monkeypatch):
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    app.config['UPLOAD_FOLDER'] = str(uploads)
+    (uploads / 'logo.png').write_bytes(b'old logo')
+    distributor.logo_path = 'logo.png'
+    patient = Patient(distributor_id=distributor.id, first_name='Ali', last_name='Veli')
+    db.session.add(patient)
+    db.session.flush()
+    encounter = Encounter(distributor_id=distributor.id, patient_id=patient.id)
+    db.session.add(encounter)
+    db.session.commit()
+
+    monkeypatch.chdir(tmp_path)
+    before = encounter_fingerprint(load_encounter_bundle(encounter.id))
+    (uploads / 'logo.png').write_bytes(b'a new, larger logo')
+    os.utime(uploads / 'logo.png', ns=(1, 1))
+    assert encounter_fingerprint(load_encounter_bundle(encounter.id)) != before
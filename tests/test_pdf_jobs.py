@@ -0,0 +1,119 @@
+import os
+import time
+import pytest
+from app import create_app, db, cache
+from app.models import Distributor, Patient, Encounter
+from app.services import pdf_jobs
+from tests.conftest import TestConfig
+
+
+@pytest.fixture
+def process_app(tmp_path):
+    """App on a file database the render processes can open too"""
+    class ProcessConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'app.db'}"
+        PDF_FOLDER = str(tmp_path / 'pdfs')
+        PDF_WORKERS = 1
+
+    app = create_app(ProcessConfig)
+    with app.app_context():
+        db.create_all()
+        cache.clear()
+        yield app
+        if pdf_jobs._executor is not None:
+            pdf_jobs._executor.shutdown(wait=True)
+        pdf_jobs._executor = None
+        pdf_jobs._jobs.clear()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_jobs_render_in_processes_that_were_not_forked_from_the_web_process(process_app):
+    distributor = Distributor(name='Klinik', email='klinik@example.com')
+    db.session.add(distributor)
+    db.session.commit()
+
+    with process_app.test_request_context():
+        path = pdf_jobs.render_and_wait('catalog', distributor.id, distributor.id, timeout=60)
+
+    assert pdf_jobs._executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+    with open(path, 'rb') as f:
+        assert f.read(4) == b'%PDF'
+
+
+def test_encounter_job_links_the_render_cache_file(app, db, distributor, tmp_path, monkeypatch):
+    import io
+    from app.utils import professional_pdf_generator
+    monkeypatch.setattr(professional_pdf_generator.ProfessionalEncounterPDF, 'generate',
+                        lambda self: io.BytesIO(b'%PDF-1.4 test'))
+    app.config['PDF_FOLDER'] = str(tmp_path)
+    patient = Patient(distributor_id=distributor.id, first_name='Ali', last_name='Veli')
+    db.session.add(patient)
+    db.session.flush()
+    encounter = Encounter(distributor_id=distributor.id, patient_id=patient.id)
+    db.session.add(encounter)
+    db.session.commit()
+
+    try:
+        with app.test_request_context():
+            path = pdf_jobs.render_and_wait('encounter', encounter.id, distributor.id, timeout=30)
+    finally:
+        pdf_jobs._executor.shutdown(wait=True)
+        pdf_jobs._executor = None
+        pdf_jobs._jobs.clear()
+
+    cache_dir = tmp_path / 'encounters' / str(encounter.id)
+    (cached,) = os.listdir(cache_dir)
+    # Written once: the job file is the render cache's file
+    assert os.path.samefile(path, cache_dir / cached)
+
+
+def test_prune_removes_expired_job_files(app, tmp_path):
+    app.config['PDF_FOLDER'] = str(tmp_path)
+    folder = tmp_path / 'jobs' / '1'
+    folder.mkdir(parents=True)
+    old, fresh = folder / ('a' * 32 + '.pdf'), folder / ('b' * 32 + '.pdf')
+    old.write_bytes(b'%PDF')
+    fresh.write_bytes(b'%PDF')
+    expired = time.time() - pdf_jobs.JOB_RETENTION.total_seconds() - 60
+    os.utime(old, (expired, expired))
+
+    assert pdf_jobs.prune_pdf_jobs() == 1
+    assert not old.exists()
+    assert fresh.exists()
+
+
+def test_status_is_shared_with_workers_that_did_not_queue_the_job(client, app, distributor, tmp_path, monkeypatch):
+    import threading
+    app.config['PDF_FOLDER'] = str(tmp_path)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_render(object_id, options):
+        started.set()
+        release.wait(10)
+        return b'%PDF-1.4 test'
+
+    monkeypatch.setitem(pdf_jobs._RENDERERS, 'catalog', slow_render)
+    try:
+        with app.test_request_context():
+            job = pdf_jobs.submit_pdf_job('catalog', distributor.id, distributor.id)
+        started.wait(10)
+        # Another web worker has no entry for this job in its registry
+        pdf_jobs._jobs.clear()
+
+        running = client.get(f'/api/pdf-jobs/{job.id}').get_json()
+        release.set()
+        job.future.result(timeout=10)
+        done = client.get(f'/api/pdf-jobs/{job.id}').get_json()
+        download = client.get(done['download_url'])
+    finally:
+        release.set()
+        pdf_jobs._executor.shutdown(wait=True)
+        pdf_jobs._executor = None
+        pdf_jobs._jobs.clear()
+
+    assert (running['status'], running['kind']) == ('running', 'catalog')
+    assert 'download_url' not in running
+    assert done['status'] == 'done'
+    assert download.data == b'%PDF-1.4 test'
+    assert client.get('/api/pdf-jobs/' + 'f' * 32).status_code == 404
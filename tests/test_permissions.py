@@ -0,0 +1,105 @@
+"""Cached role graph: role and user-role edits take effect on the next check"""
+import pytest
+from flask import g
+from app.models import User
+from app.models.rbac import Role, Permission, RolePermission, UserRole
+from app.utils.permissions import (
+    any_permission_required, has_permission, has_role, invalidate_permission_cache, role_required,
+    user_permission_set,
+)
+
+
+@pytest.fixture
+def rbac(app, db, user, distributor):
+    """Superadmin `user`, a staff member with the 'doctor' role and two permissions"""
+    # The graph lives in the process; don't reuse one loaded from an earlier test's database
+    invalidate_permission_cache()
+    user.role = 'superadmin'
+    staff = User(username='staff', email='staff@example.com', role='staff', distributor_id=distributor.id)
+    staff.set_password('secret')
+    view, edit = (Permission(name=name, display_name=name, category='patients')
+                  for name in ('patients.view', 'patients.edit'))
+    doctor = Role(name='doctor', display_name='Doktor')
+    nurse = Role(name='nurse', display_name='Hemşire')
+    db.session.add_all([staff, view, edit, doctor, nurse])
+    db.session.flush()
+    db.session.add_all([RolePermission(role_id=doctor.id, permission_id=view.id),
+                        UserRole(user_id=staff.id, role_id=doctor.id)])
+    db.session.commit()
+
+    @app.route('/_test/any-permission')
+    @any_permission_required('patients.edit', 'reports.view')
+    def any_permission_view():
+        return 'ok'
+
+    @app.route('/_test/nurse-only')
+    @role_required('nurse')
+    def nurse_view():
+        return 'ok'
+
+    return {'staff': staff, 'view': view, 'edit': edit, 'doctor': doctor, 'nurse': nurse}
+
+
+def _login(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
+
+
+def _get(client, url):
+    # Requests reuse the fixture's app context; don't let the last request's current_user stick
+    g.pop('_login_user', None)
+    return client.get(url).status_code
+
+
+def _post(client, url, data):
+    g.pop('_login_user', None)
+    return client.post(url, data=data).status_code
+
+
+def test_edit_role_grant_and_revoke_apply_on_the_next_check(app, client, rbac):
+    staff, doctor = rbac['staff'], rbac['doctor']
+    assert not has_permission(staff, 'patients.edit')
+
+    assert _post(client, f'/admin/roles/{doctor.id}/edit', {
+        'display_name': 'Doktor', 'permissions': [rbac['view'].id, rbac['edit'].id]}) == 302
+    assert user_permission_set(staff) == {'patients.view', 'patients.edit'}
+
+    _post(client, f'/admin/roles/{doctor.id}/edit', {'display_name': 'Doktor', 'permissions': []})
+    assert not has_permission(staff, 'patients.view')
+    assert not has_permission(staff, 'patients.edit')
+
+
+def test_manage_user_roles_grant_and_revoke_apply_on_the_next_check(app, client, rbac):
+    staff, doctor, nurse = rbac['staff'], rbac['doctor'], rbac['nurse']
+    assert has_role(staff, 'doctor') and not has_role(staff, 'nurse')
+
+    _post(client, f'/admin/user/{staff.id}/roles', {'roles': [nurse.id]})
+    assert has_role(staff, 'nurse')
+    assert not has_role(staff, 'doctor')
+    assert user_permission_set(staff) == frozenset()
+
+    _post(client, f'/admin/user/{staff.id}/roles', {'roles': [doctor.id, nurse.id]})
+    assert has_role(staff, 'doctor') and has_permission(staff, 'patients.view')
+
+
+def test_decorators_deny_until_the_grant_and_again_after_the_revoke(app, client, rbac):
+    staff, doctor, nurse = rbac['staff'], rbac['doctor'], rbac['nurse']
+    staff_client = _login(app, staff)
+    assert _get(staff_client, '/_test/any-permission') == 403
+    assert _get(staff_client, '/_test/nurse-only') == 403
+
+    _post(client, f'/admin/roles/{doctor.id}/edit', {
+        'display_name': 'Doktor', 'permissions': [rbac['edit'].id]})
+    _post(client, f'/admin/user/{staff.id}/roles', {'roles': [doctor.id, nurse.id]})
+    assert _get(staff_client, '/_test/any-permission') == 200
+    assert _get(staff_client, '/_test/nurse-only') == 200
+
+    _post(client, f'/admin/user/{staff.id}/roles', {'roles': []})
+    assert _get(staff_client, '/_test/any-permission') == 403
+    assert _get(staff_client, '/_test/nurse-only') == 403
+    # Superadmins bypass both decorators
+    assert _get(client, '/_test/any-permission') == 200
+    assert _get(client, '/_test/nurse-only') == 200
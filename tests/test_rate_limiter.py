@@ -0,0 +1,107 @@
+"""Token-bucket rate limiter: memory and shared SQLite storage"""
+import threading
+from types import SimpleNamespace
+import pytest
+from app.utils import rate_limiter
+from app.utils.rate_limiter import MemoryBackend, SQLiteBackend, get_limiter
+from app.utils.security import rate_limit
+from app.utils.chatbot_service import _MIN_INTERVAL, should_auto_respond
+
+T0 = 1_700_000_000.0
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / 'rate_limits.db'))
+
+
+def test_bucket_drains_then_refills_with_retry_after(backend):
+    results = [backend.hit('api:1', 3, 60, now=T0) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    # One token every 20 seconds
+    assert results[3].retry_after == 20
+    assert backend.hit('api:1', 3, 60, now=T0 + 5).retry_after == 15
+    assert backend.hit('api:1', 3, 60, now=T0 + 20).allowed
+    assert not backend.hit('api:1', 3, 60, now=T0 + 21).allowed
+    # Other keys have their own bucket
+    assert backend.hit('api:2', 3, 60, now=T0).allowed
+
+
+def test_chatbot_throttle_allows_one_reply_per_interval(backend):
+    key = 'chatbot:7'
+
+    assert backend.hit(key, 1, _MIN_INTERVAL, now=T0).allowed
+    assert backend.hit(key, 1, _MIN_INTERVAL, now=T0 + 10).retry_after == 20
+    assert not backend.hit(key, 1, _MIN_INTERVAL, now=T0 + 29).allowed
+    assert backend.hit(key, 1, _MIN_INTERVAL, now=T0 + 30).allowed
+    assert not backend.hit(key, 1, _MIN_INTERVAL, now=T0 + 31).allowed
+
+
+def test_reset_forgets_a_bucket(backend):
+    backend.hit('api:1', 1, 60, now=T0)
+    backend.reset('api:1')
+    assert backend.hit('api:1', 1, 60, now=T0).allowed
+
+
+def test_workers_share_one_sqlite_bucket(tmp_path):
+    path = str(tmp_path / 'rate_limits.db')
+    worker_a, worker_b = SQLiteBackend(path), SQLiteBackend(path)
+
+    assert worker_a.hit('chatbot:7', 1, 30, now=T0).allowed
+    assert not worker_b.hit('chatbot:7', 1, 30, now=T0 + 1).allowed
+    assert worker_b.hit('chatbot:7', 1, 30, now=T0 + 30).allowed
+    assert not worker_a.hit('chatbot:7', 1, 30, now=T0 + 31).allowed
+
+
+def test_concurrent_workers_never_exceed_the_limit(tmp_path):
+    path = str(tmp_path / 'rate_limits.db')
+    allowed = []
+    start = threading.Barrier(4)
+
+    def worker():
+        # Own backend, and a thread-local connection per thread
+        backend = SQLiteBackend(path)
+        start.wait()
+        allowed.extend(backend.hit('api:1', 10, 60, now=T0).allowed for _ in range(10))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(allowed) == 10
+
+
+def test_http_429_carries_retry_after(app, client):
+    @app.route('/_test/limited')
+    @rate_limit(max_requests=2, window_seconds=60)
+    def limited():
+        return 'ok'
+    get_limiter().reset()
+
+    assert [client.get('/_test/limited').status_code for _ in range(2)] == [200, 200]
+    response = client.get('/_test/limited')
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    assert response.headers['X-RateLimit-Remaining'] == '0'
+    assert response.get_json()['retry_after'] == 30
+
+
+def test_chatbot_replies_at_most_once_per_interval(app, monkeypatch):
+    clock = SimpleNamespace(now=T0)
+    monkeypatch.setattr(rate_limiter, 'time', SimpleNamespace(time=lambda: clock.now))
+    get_limiter().reset()
+    question = 'What are your opening hours?'
+
+    assert should_auto_respond(question, patient_id=7)
+    clock.now += _MIN_INTERVAL - 1
+    assert not should_auto_respond(question, patient_id=7)
+    assert should_auto_respond(question, patient_id=8)
+    clock.now += 1
+    assert should_auto_respond(question, patient_id=7)
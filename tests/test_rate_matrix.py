@@ -0,0 +1,38 @@
+import pytest
+from app.models.currency import CurrencyRate
+from app.utils import rate_matrix
+from app.utils.rate_matrix import get_rate_matrix
+
+
+@pytest.fixture
+def rates(db, distributor):
+    for target, rate in (('EUR', 0.9), ('TRY', 30.0)):
+        db.session.add(CurrencyRate(distributor_id=distributor.id, base_currency='USD',
+                                    target_currency=target, rate=rate))
+    db.session.commit()
+    rate_matrix._matrices.clear()
+
+
+def test_cross_rates(rates, distributor):
+    assert CurrencyRate.get_rate(distributor.id, 'EUR', 'TRY') == pytest.approx(30.0 / 0.9)
+    assert CurrencyRate.get_rate(distributor.id, 'TRY', 'USD') == pytest.approx(1 / 30.0)
+
+
+def test_commit_invalidates_matrices_held_by_other_workers(rates, db, distributor):
+    stale = get_rate_matrix(distributor.id)
+    CurrencyRate.query.filter_by(target_currency='EUR').one().rate = 0.5
+    db.session.commit()
+
+    # Another worker still holds the old matrix; the version in the app cache moved on
+    rate_matrix._matrices[distributor.id] = stale
+    assert get_rate_matrix(distributor.id) is not stale
+    assert CurrencyRate.get_rate(distributor.id, 'USD', 'EUR') == 0.5
+
+
+def test_bulk_update_invalidates_every_distributor(rates, db, distributor):
+    stale = get_rate_matrix(distributor.id)
+    CurrencyRate.query.filter_by(target_currency='EUR').update({'rate': 0.7})
+    db.session.commit()
+
+    rate_matrix._matrices[distributor.id] = stale
+    assert CurrencyRate.get_rate(distributor.id, 'USD', 'EUR') == 0.7
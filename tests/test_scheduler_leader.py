@@ -0,0 +1,108 @@
+"""Scheduler leader election across processes (app/utils/scheduler_leader.py)"""
+import multiprocessing
+from datetime import datetime, timedelta
+import pytest
+from app import create_app, db, cache
+from app.models.scheduler_lease import SchedulerLease
+from app.utils import scheduler_leader
+from app.utils.scheduler_leader import LeaderElection, current_leader
+from tests.conftest import TestConfig
+
+
+def _file_config(database):
+    return type('LeaseConfig', (TestConfig,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+
+
+def _contend(database, barrier, results):
+    """One web worker: its own app and connection pool, one heartbeat"""
+    election = LeaderElection(create_app(_file_config(database)))
+    barrier.wait(timeout=60)
+    results.put((election.holder, election.heartbeat()))
+
+
+def _run_contenders(database, count):
+    ctx = multiprocessing.get_context('spawn')
+    barrier, results = ctx.Barrier(count), ctx.Queue()
+    processes = [ctx.Process(target=_contend, args=(str(database), barrier, results)) for _ in range(count)]
+    for process in processes:
+        process.start()
+    outcome = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join(timeout=30)
+    return outcome
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """App on a file database that other processes can open"""
+    app = create_app(_file_config(tmp_path / 'app.db'))
+    app.instance_path = str(tmp_path / 'instance')
+    with app.app_context():
+        db.create_all()
+        cache.clear()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_exactly_one_of_several_processes_becomes_leader(file_app, tmp_path):
+    outcome = _run_contenders(tmp_path / 'app.db', 4)
+
+    leaders = [holder for holder, acquired in outcome if acquired]
+    assert len(leaders) == 1
+    assert current_leader()['holder'] == leaders[0]
+
+
+def test_leader_renews_and_followers_stay_followers(file_app):
+    leader, follower = LeaderElection(file_app), LeaderElection(file_app)
+
+    assert leader.heartbeat() and leader.is_leader
+    assert not follower.heartbeat() and not follower.is_leader
+    assert leader.heartbeat()
+
+
+def test_expired_lease_is_taken_over_by_another_process(file_app, tmp_path):
+    leader = LeaderElection(file_app)
+    assert leader.heartbeat()
+
+    # The leader stopped renewing (process died, DB unreachable)
+    db.session.get(SchedulerLease, 'scheduler').expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    ((holder, acquired),) = _run_contenders(tmp_path / 'app.db', 1)
+
+    assert acquired
+    assert not leader.heartbeat() and not leader.is_leader
+    db.session.expire_all()
+    assert current_leader()['holder'] == holder
+
+
+def test_release_hands_over_without_waiting_for_expiry(file_app):
+    leader, follower = LeaderElection(file_app), LeaderElection(file_app)
+    leader.heartbeat()
+
+    leader.release()
+
+    assert not leader.is_leader
+    assert follower.heartbeat()
+
+
+def test_file_lock_fallback_without_the_lease_table(file_app):
+    SchedulerLease.__table__.drop(db.engine)
+    first, second = LeaderElection(file_app), LeaderElection(file_app)
+
+    # flock is per open file, so two elections in one process compete like two processes
+    assert first.heartbeat()
+    assert not second.heartbeat()
+    assert first.heartbeat()
+
+    first.release()
+    assert second.heartbeat()
+    second.release()
+
+
+def test_without_fcntl_every_process_leads(file_app, monkeypatch):
+    SchedulerLease.__table__.drop(db.engine)
+    monkeypatch.setattr(scheduler_leader, 'fcntl', None)
+
+    assert LeaderElection(file_app).heartbeat()
+    assert LeaderElection(file_app).heartbeat()
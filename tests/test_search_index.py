@@ -0,0 +1,58 @@
+"""Global search index (app/services/search_index.py)"""
+import pytest
+from app.models import Distributor, Patient
+from app.services import search_index
+from app.services.search_index import search, populate_search_index, LikeSearchBackend
+
+
+@pytest.fixture
+def patient(db, distributor):
+    patient = Patient(distributor_id=distributor.id, first_name='Ahmet', last_name='Yılmaz',
+                      phone='+905551234567', email='ahmet@example.com')
+    db.session.add(patient)
+    db.session.commit()
+    return patient
+
+
+def _patients(distributor, query):
+    return search(distributor.id, query, 'patients')['patients']
+
+
+@pytest.mark.parametrize('query', ['555', '1234', '4567', '+90555', 'ilma', 'YILMAZ', 'yılm', 'ahmet 4567', 'ah'])
+def test_fragments_of_names_and_phone_numbers_match(distributor, patient, query):
+    assert _patients(distributor, query) == [patient]
+
+
+@pytest.mark.parametrize('query', ['9999', 'mehmet', 'ahmet 9999', 'zz'])
+def test_every_token_must_match(distributor, patient, query):
+    assert _patients(distributor, query) == []
+
+
+def test_other_tenants_do_not_see_the_row(db, patient):
+    other = Distributor(name='Diğer', email='diger@example.com')
+    db.session.add(other)
+    db.session.commit()
+
+    assert _patients(other, '555') == []
+
+
+def test_populate_indexes_existing_rows(db, distributor, patient):
+    connection = db.session.connection()
+    backend = search_index.get_backend(connection.dialect.name)
+    backend.clear(connection)
+    assert _patients(distributor, 'ilma') == []
+
+    assert populate_search_index(connection) == 1
+    assert _patients(distributor, 'ilma') == [patient]
+
+
+def test_like_backend_matches_the_same_fragments(db, distributor, patient, monkeypatch):
+    connection = db.session.connection()
+    backend = LikeSearchBackend()
+    backend.create_schema(connection)
+    populate_search_index(connection, backend)
+    monkeypatch.setattr(search_index, 'get_backend', lambda dialect_name: backend)
+
+    for query in ('1234', 'ilma', 'ahmet 4567'):
+        assert _patients(distributor, query) == [patient]
+    assert _patients(distributor, 'mehmet') == []